@@ -49,7 +49,7 @@ class AxonObject(object):
    Base class for axon objects.
       
    """
-   pass
+   __slots__ = []   # so subclasses can use __slots__ too
             
 
 if __name__ == "__main__":
@@ -100,6 +100,15 @@ a subset of the python list interface to let you add and remove items from it:
 * **postbox.pop(data)** - ie. collect a message
 * **postbox.__len__()** - ie. len(myPostbox)
 
+and also:
+
+* **postbox.extend(items)** - ie. send several messages, returning how many
+  were accepted before the destination became full
+* **postbox.popmany([n])** - ie. collect up to n (or all) waiting messages
+
+Both of these cause only a single notification, however many messages they
+move.
+
 
 Inboxes
 ~~~~~~~
@@ -276,13 +285,245 @@ collecting messages is substantially less because all the data is already there
 and up to date. In general, it is felt that messages are likely to be sent far
 more often than linkages are created and destroyed - which should justify this
 tradeoff.
+
+
+
+Backpressure - high and low watermarks
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+As well as a hard size limit, an inbox can be given a high and a low watermark
+(by calling setWatermarks(), or when a linkage to it is created). When a
+message is delivered that takes the number waiting up to the high watermark
+the storage is marked as 'congested'. A component sending to it is then
+paused (see Axon.Component.component.send()) and isFull() reports True.
+
+Whilst congested, collecting a message does not call the 'wakeOnPop'
+callbacks, until the number waiting has fallen to the low watermark. At that
+point the storage is no longer congested, and the callbacks are made - waking
+the owners of any outboxes linked to it.
+
+The high watermark is therefore a soft limit: senders are paused, rather than
+having noSpaceInBox exceptions raised, and a sender that is woken for some
+other reason can still deliver more.
+
+
+
+Delivering from other threads
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Postboxes and their storage are normally only used from the scheduler's
+thread, so they do no locking. Calling makeThreadSafe() on a postbox turns the
+storage at the end of its chain (a realsink) into a lockedsink: the same, but
+with append(), extend(), pop() and popmany() each holding a lock. Another
+thread can then append messages directly to postbox.sink, which wakes the
+owner of the inbox as usual. Axon.ThreadedComponent uses this so that the
+thread in a threaded component can deliver straight to the inboxes it sends
+to.
+
+The postboxes in the chain are retargetted, so that their append() etc. are
+those of the lockedsink. Storage stays locked once it has been made so.
+
+
+
+Spilling to disk
+~~~~~~~~~~~~~~~~
+
+Calling spillToDisk() on a postbox turns the storage at the end of its chain
+into a spillsink. This keeps the first few messages (memsize) in memory as
+usual; any more are pickled and appended to a file on disk, so a consumer that
+falls behind a bursty producer costs disk space rather than memory. Messages
+are read back from disk in order, a batch at a time, as those in memory are
+collected. So len() still counts every message waiting, and watermarks and
+size limits behave as before.
+
+The files are anonymous temporary files (so are removed when closed, even if
+the process dies). Each is written up to SpillSegmentSize bytes, then another
+is started; and each is closed once every message in it has been read back.
+A budget can be given for the number of bytes on disk. Once it has been used,
+nothing more is spilled and the storage is full - append() raises
+noSpaceInBox and extend() stops early.
+
+Collecting messages one (or a few) at a time keeps memory use bounded.
+Collecting all of them at once (popmany() with no limit, eg. a component's
+recvAll()) reads everything on disk back.
+
+As with makeThreadSafe(), the class of the existing storage object is changed
+and the postboxes in the chain are retargetted.
+
+
+
+Budgets for bytes, rather than messages
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Size limits and watermarks count messages, so a limit of 10 allows 10 bytes or
+10 video frames. Calling accountBytes() on a postbox makes the storage at the
+end of its chain also count the bytes of the messages waiting in it. By
+default a message's size is its len() (or 0 if it has none, as for most
+control messages), but any sizer function can be given.
+
+A budget can be given for those bytes. There can also be a budget for the
+whole process, set by calling setProcessBudget(), which applies to the total of
+the bytes waiting in all storage that is counting them (processBudget.bytes).
+Once either budget has been used, each piece of storage applies its policy to
+messages delivered to it:
+
+* Backpressure (the default) - the message is stored, but the storage is
+  congested (as with a high watermark), pausing senders, until the bytes
+  waiting have fallen to the low budget(s) - by default half the budget(s).
+* DropNewest - the message is discarded.
+* DropOldest - messages are discarded from the front until within the
+  budget(s) again (or there are none left), then the message is stored.
+* Refuse - as for a full box: append() raises noSpaceInBox and extend() stops
+  early.
+
+So a budget is a soft limit, that can be overshot by one message. Discarded
+messages are counted (see bytesDropped()). Collecting the last message waiting
+always ends congestion, so senders are not left paused on an empty inbox just
+because other boxes are holding on to the process's budget.
+
+The sizes of messages are measured as they are stored, and again as they are
+collected; so messages must not change size whilst waiting. The count starts
+afresh whenever the storage is emptied. For a spillsink, the messages spilled
+to disk are counted too. The totals are reported by bytesWaiting(), and for
+each component in the statistics recorded by the scheduler (see
+Axon.Scheduler.scheduler.stats()).
+
+
+
+Creating postboxes only when they are needed
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A component keeps its inboxes and outboxes in boxdict objects. A boxdict
+behaves like a normal dictionary mapping box names to postboxes, but it starts
+out empty, only knowing the names of the boxes it should hold. The postbox for
+each name is created the first time it is looked up (eg. when a message is
+sent to it, or it is linked). Boxes that a component never uses therefore
+never get created.
+
+Postboxes, and the storage objects within them, use __slots__ to keep their
+memory footprint down.
 """
 
+import threading
+import pickle
+import tempfile
+from collections import deque
+from itertools import islice
+
 from Axon.AxonExceptions import noSpaceInBox
 from Axon.AxonExceptions import BoxAlreadyLinkedToDestination
 
 ShowAllTransits = False
 
+DefaultSpillMemsize = 1000          # messages kept in memory by postbox.spillToDisk()
+SpillSegmentSize = 16*1024*1024     # bytes written to a file on disk before starting another
+
+# What storage accounting bytes does once its byte budget (or the process's)
+# has been used - see postbox.accountBytes()
+Backpressure = "backpressure"   # store it, and pause senders until drained
+DropNewest   = "dropnewest"     # discard the message being delivered
+DropOldest   = "dropoldest"     # discard messages from the front to make room
+Refuse       = "refuse"         # raise noSpaceInBox
+
+def messageLength(data):
+    """\
+    Returns len(data), or 0 if data has no length (eg. a producerFinished
+    message). The default sizer used when accounting bytes.
+    """
+    try:
+        return len(data)
+    except TypeError:
+        return 0
+
+class memoryBudget(object):
+    """\
+    memoryBudget() -> new memoryBudget object.
+
+    The total number of bytes waiting in all storage that is accounting bytes
+    (see postbox.accountBytes()), and optionally a budget for that total. There
+    is one of these for the whole process: Axon.Box.processBudget
+    """
+    __slots__ = [ "bytes", "budget", "lowbudget" ]
+
+    def __init__(self):
+        """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
+        super(memoryBudget,self).__init__()
+        self.bytes = 0          # bytes waiting in all storage accounting bytes
+        self.budget = None      # None, or bytes at which storage applies its policy
+        self.lowbudget = None   # bytes to drain to before paused senders are woken
+
+    def setBudget(self, budget, lowbudget=None):
+        """\
+        Sets the budget (None for no budget) and low budget, which defaults to
+        half the budget.
+        """
+        if budget is not None and lowbudget is None:
+            lowbudget = budget // 2
+        self.budget = budget
+        self.lowbudget = lowbudget
+
+    def full(self):
+        """Returns True if the budget has been used"""
+        return self.budget is not None and self.bytes >= self.budget
+
+    def drained(self):
+        """Returns True if there is no budget, or the low budget has been reached"""
+        return self.budget is None or self.bytes <= self.lowbudget
+
+processBudget = memoryBudget()
+
+def setProcessBudget(budget, lowbudget=None):
+    """\
+    Sets a budget for the total number of bytes waiting in all storage that is
+    accounting bytes (use None for no budget). The low budget defaults to half
+    of it. See postbox.accountBytes().
+    """
+    processBudget.setBudget(budget, lowbudget)
+
+class _byteAccount(object):
+    """\
+    _byteAccount(sizer, budget, lowbudget, policy) -> new _byteAccount object.
+
+    The number of bytes waiting in a piece of storage, as measured by calling
+    sizer() on each message, and the budget for them. See postbox.accountBytes()
+    """
+    __slots__ = [ "sizer", "bytes", "budget", "lowbudget", "policy", "dropped" ]
+
+    def __init__(self, sizer, budget, lowbudget, policy):
+        """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
+        super(_byteAccount,self).__init__()
+        if budget is not None and lowbudget is None:
+            lowbudget = budget // 2
+        self.sizer = sizer
+        self.bytes = 0              # bytes waiting (also counted in processBudget)
+        self.budget = budget        # None, or bytes at which policy is applied
+        self.lowbudget = lowbudget  # bytes to drain to before paused senders are woken
+        self.policy = policy
+        self.dropped = 0            # number of messages discarded by the policy
+
+    def full(self):
+        """Returns True if this storage's budget, or the process's, has been used"""
+        return (self.budget is not None and self.bytes >= self.budget) or processBudget.full()
+
+    def drained(self):
+        """Returns True if this storage, and the process, are within their low budgets"""
+        return (self.budget is None or self.bytes <= self.lowbudget) and processBudget.drained()
+
+    def add(self, data):
+        """Counts the bytes of a message that is being stored"""
+        size = self.sizer(data)
+        self.bytes += size
+        processBudget.bytes += size
+
+    def remove(self, items, remaining):
+        """Stops counting the bytes of messages that have been taken, leaving the number remaining"""
+        if remaining:
+            size = sum(map(self.sizer, items))
+        else:
+            size = self.bytes   # nothing left, so start afresh
+        self.bytes -= size
+        processBudget.bytes -= size
+
 class nullsink(object):
     """\
     nullsink() -> new nullsink object
@@ -292,6 +533,10 @@ class nullsink(object):
     Discards data given to it by calling append() and always reports that it
     contains no items.
     """
+    __slots__ = [ "size", "tag", "showtransit", "wakeOnPop" ]
+    congested = False
+    lock = None
+    account = None
     
     def __init__(self):
         """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
@@ -308,6 +553,17 @@ class nullsink(object):
         if self.showtransit:
             print("Discarding Delivery via [", self.tag, self, "] of ", repr(data))
 
+    def extend(self, items):
+        """\
+        Append all the items to the list - though actually they just get
+        discarded. Returns the number of items.
+        """
+        count = 0
+        for data in items:
+            self.append(data)
+            count += 1
+        return count
+
     def setShowTransit(self,showtransit, tag):
         """\
         Set showTransit to True to cause debugging output whenever a message is
@@ -324,26 +580,37 @@ class nullsink(object):
     def pop(self,index):
         """Returns an item from the list (always raises IndexError"""
         raise IndexError("nullsink: You can't pop from an empty piece of storage!")
+
+    def popmany(self, n=None):
+        """Returns items from the front of the list (always an empty list)"""
+        return []
+
     def __repr__(self):
         return "<"+str(id(self))+">"
 
-class realsink(list):
+class realsink(deque):
     """\
     realsink(notify[,size]) -> new realsink object.
 
     A working piece of storage for postboxes, that behaves a bit like a list.
+    It is built on a deque, so taking items from the front (pop(0)) takes
+    constant time however many items are waiting.
 
     Stores data given to it by calling append(), up to a limit after which
     Axon.AxonExceptions.noSpaceInBox exceptions are raised.
 
-    Calls the 'notify' callback when append() is called.
-    Calls any callbacks in the self.wakeOnPop list when pop() is called.
+    Calls the 'notify' callback when append() or extend() is called.
+    Calls any callbacks in the self.wakeOnPop list when pop() or popmany() is
+    called (unless congested - see setWatermarks()).
 
     Keyword arguments:
 
     - notify  -- notify() is called whenever append() is called
     - size    -- None, or the maximum number of items this storage can hold
     """
+    __slots__ = [ "notify", "size", "tag", "showtransit", "wakeOnPop",
+                  "highwater", "lowwater", "congested", "lock", "spill",
+                  "account" ]
     
     def __init__(self, notify, size=None):
         """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
@@ -353,21 +620,64 @@ class realsink(list):
         self.tag = None
         self.showtransit = None
         self.wakeOnPop = []   # callbacks for when a pop() happens
+        self.highwater = None
+        self.lowwater = None
+        self.congested = False  # passed highwater, not yet drained to lowwater
+        self.lock = None        # set once it is a lockedsink
+        self.spill = None       # set once it is a spillsink
+        self.account = None     # set whilst accounting bytes
         
     def append(self,data):
         """\
         Appends item to the list, or raises Axon.AxonExceptions.noSpaceInBox
-        exception if the number of items already meets the size limit.
+        exception if the number of items already meets the size limit (or the
+        byte budget, if refusing items once it is used).
 
-        Calls self.notify() callback
+        Calls self.notify() callback (unless the item is discarded by the byte
+        budget's policy)
         """
         if self.showtransit or ShowAllTransits:
             print("Delivery via [", self.tag, "] of ", repr(data))
         if self.size is not None:
            if len(self) >= self.size:
                raise noSpaceInBox(len(self),self.size)
-        list.append(self,data)
+        if self.account is not None and not self._admit(data):
+            return
+        deque.append(self,data)
+        if self.highwater is not None and len(self) >= self.highwater:
+            self.congested = True
         self.notify()
+
+    def extend(self, items):
+        """\
+        Appends items to the list, stopping early if the size limit is reached
+        (or the byte budget, if refusing items once it is used). Returns the
+        number of items that were appended, or discarded by the byte budget's
+        policy. Items after that are not taken from the iterable.
+
+        Calls self.notify() callback once, if any items were appended.
+        """
+        if self.size is not None:
+            items = islice(items, max(0, self.size - len(self)))
+        if self.showtransit or ShowAllTransits:
+            items = list(items)
+            for data in items:
+                print("Delivery via [", self.tag, "] of ", repr(data))
+        if self.account is None:
+            before = len(self)
+            deque.extend(self, items)
+            count = len(self) - before
+        else:
+            count = 0
+            for data in self._admitting(items):
+                if self._admit(data):
+                    deque.append(self, data)
+                count += 1
+        if self.highwater is not None and len(self) >= self.highwater:
+            self.congested = True
+        if count:
+            self.notify()
+        return count
         
     def setShowTransit(self,showtransit, tag):
         """\
@@ -378,17 +688,390 @@ class realsink(list):
         self.showtransit = showtransit
         self.tag = tag
         
-    def pop(self,index):
+    def setWatermarks(self, highwater, lowwater=None):
         """\
-        Returns an item from the list, or raises IndexError if there are none.
+        Sets the high and low watermarks (use None for the high watermark to
+        switch them off). The low watermark defaults to half the high one.
+
+        Once the number of items reaches the high watermark, the storage is
+        'congested' and wakeOnPop callbacks are not made until the number of
+        items has fallen to the low watermark.
+        """
+        if highwater is not None and lowwater is None:
+            lowwater = highwater // 2
+        self.highwater = highwater
+        self.lowwater = lowwater
+        self.congested = highwater is not None and len(self) >= highwater
 
-        Calls all callbacks listed in self.wakeOnPop
+    def _admit(self, data):
+        """\
+        Counts the bytes of an item about to be stored, first applying the
+        policy if the byte budget has been used. Returns False if the item
+        should be discarded instead.
         """
-        item = list.pop(self, index)
+        account = self.account
+        if account.full():
+            policy = account.policy
+            if policy == DropNewest:
+                account.dropped += 1
+                return False
+            elif policy == DropOldest:
+                while len(self) and account.full():
+                    self._dropOldest()
+                    account.dropped += 1
+            elif policy == Refuse:
+                raise noSpaceInBox(len(self),self.size)
+        account.add(data)
+        if account.policy == Backpressure and account.full():
+            self.congested = True
+        return True
+
+    def _admitting(self, items):
+        """Yields items from the iterable, stopping early (without taking another) if refusing them once the byte budget is used"""
+        account = self.account
+        items = iter(items)
+        while not (account.policy == Refuse and account.full()):
+            try:
+                data = next(items)
+            except StopIteration:
+                return
+            yield data
+
+    def _dropOldest(self):
+        """Discards the item at the front of the list, without calling the wakeOnPop callbacks"""
+        item = deque.popleft(self)
+        self.account.remove((item,), len(self))
+
+    def _popped(self):
+        """Calls the wakeOnPop callbacks, unless still congested"""
+        if self.congested:
+            if len(self) and not self._drained():
+                return
+            self.congested = False
         for n in self.wakeOnPop:
             n()
+
+    def _drained(self):
+        """Returns True if drained to the low watermark, and within the low byte budgets"""
+        if self.lowwater is not None and len(self) > self.lowwater:
+            return False
+        return self.account is None or self.account.drained()
+
+    def pop(self,index=-1):
+        """\
+        Returns an item from the list, or raises IndexError if there are none.
+
+        Calls all callbacks listed in self.wakeOnPop (unless congested)
+        """
+        if index == 0:
+            item = self.popleft()
+        elif index == -1:
+            item = deque.pop(self)
+        else:
+            item = self[index]
+            del self[index]
+        if self.account is not None:
+            self.account.remove((item,), len(self))
+        self._popped()
         return item
 
+    def popmany(self, n=None):
+        """\
+        Removes and returns a list of up to n items from the front of the list
+        (or all of them if n is None).
+
+        Calls all callbacks listed in self.wakeOnPop once, if any items were
+        removed (and it is not still congested).
+        """
+        if n is None or n >= len(self):
+            items = list(self)
+            self.clear()
+        else:
+            popleft = self.popleft
+            items = [ popleft() for _ in range(n) ]
+        if items:
+            if self.account is not None:
+                self.account.remove(items, len(self))
+            self._popped()
+        return items
+
+
+class lockedsink(realsink):
+    """\
+    A realsink that other threads may deliver to directly.
+
+    append(), extend(), pop() and popmany() each hold self.lock, so that a
+    thread appending messages cannot interleave with (for example) popmany()
+    emptying the storage. A realsink is turned into one of these by
+    postbox.makeThreadSafe(), rather than being created as one, so that
+    storage only ever used from the scheduler's thread doesn't pay for locking.
+    """
+    __slots__ = []
+
+    def append(self, data):
+        with self.lock:
+            realsink.append(self, data)
+
+    def extend(self, items):
+        with self.lock:
+            return realsink.extend(self, items)
+
+    def pop(self, index=-1):
+        with self.lock:
+            return realsink.pop(self, index)
+
+    def popmany(self, n=None):
+        with self.lock:
+            return realsink.popmany(self, n)
+
+
+class _spillover(object):
+    """\
+    _spillover(memsize, directory, budget) -> new _spillover object.
+
+    The messages a spillsink has spilled to disk. They are pickled and
+    appended to a segment file (an anonymous temporary file). Once a segment
+    holds SpillSegmentSize bytes, a new one is started. Messages are read back
+    from the oldest segment, which is closed (and so deleted) once all of it
+    has been read.
+
+    The total messageLength() of the messages spilled is kept too, so that
+    they can be counted by postbox.accountBytes() without being read back.
+    """
+    __slots__ = [ "memsize", "directory", "budget", "segments", "readpos", "count", "bytes", "lengths" ]
+
+    def __init__(self, memsize, directory, budget):
+        """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
+        super(_spillover,self).__init__()
+        self.memsize = memsize      # number of messages to keep in memory
+        self.directory = directory  # where to create segments (None for the default)
+        self.budget = budget        # None, or bytes of segments to stop spilling at
+        self.segments = deque()     # [ file, bytes written ] for each segment, oldest first
+        self.readpos = 0            # position in the oldest segment to read from
+        self.count = 0              # number of messages spilled, not yet read back
+        self.bytes = 0              # bytes in all segments
+        self.lengths = 0            # total messageLength() of the messages spilled, not yet read back
+
+    def full(self):
+        """Returns True if nothing more can be spilled, because the budget has been used"""
+        return self.budget is not None and self.bytes >= self.budget
+
+    def write(self, data):
+        """Pickles the message and appends it to the newest segment"""
+        pickled = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        segments = self.segments
+        if not segments or segments[-1][1] >= SpillSegmentSize:
+            segments.append( [ tempfile.TemporaryFile(dir=self.directory), 0 ] )
+        segment = segments[-1]
+        segment[0].seek(0, 2)
+        segment[0].write(pickled)
+        segment[1] += len(pickled)
+        self.bytes += len(pickled)
+        self.lengths += messageLength(data)
+        self.count += 1
+
+    def read(self, n=None):
+        """Reads back (and returns a list of) up to n spilled messages, oldest first (or all of them if n is None)"""
+        if n is None:
+            n = self.count
+        items = []
+        segments = self.segments
+        while n > 0 and self.count:
+            segment, written = segments[0]
+            segment.seek(self.readpos)
+            while n > 0 and self.readpos < written:
+                item = pickle.load(segment)
+                items.append(item)
+                self.readpos = segment.tell()
+                self.lengths -= messageLength(item)
+                self.count -= 1
+                n -= 1
+            if self.readpos >= written:
+                segment.close()
+                segments.popleft()
+                self.bytes -= written
+                self.readpos = 0
+        return items
+
+    def measure(self, sizer):
+        """Returns the total sizer() of the messages spilled, reading them one at a time without keeping them or reading them back"""
+        if sizer is messageLength:
+            return self.lengths
+        total = 0
+        readpos = self.readpos
+        for segment, written in self.segments:
+            segment.seek(readpos)
+            while segment.tell() < written:
+                total += sizer(pickle.load(segment))
+            readpos = 0
+        return total
+
+    def discard(self):
+        """Throws away everything spilled"""
+        while self.segments:
+            self.segments.popleft()[0].close()
+        self.readpos = self.count = self.bytes = self.lengths = 0
+
+
+class spillsink(realsink):
+    """\
+    A realsink that keeps only the first spill.memsize messages in memory. Any
+    more are spilled to disk, and read back in order as messages are taken from
+    the front. See postbox.spillToDisk().
+
+    Once spill.budget bytes are on disk, nothing more can be spilled, and
+    append() raises Axon.AxonExceptions.noSpaceInBox as if it were full.
+    Messages must be picklable to be spilled.
+    """
+    __slots__ = []
+
+    def __len__(self):
+        """Returns number of items, in memory and on disk"""
+        return deque.__len__(self) + self.spill.count
+
+    def _mustSpill(self):
+        """Returns True if the next item stored must go on disk - there are enough in memory, or already some on disk"""
+        return self.spill.count or deque.__len__(self) >= self.spill.memsize
+
+    def _refill(self, n=0):
+        """Reads spilled items back into memory, until at least n (and spill.memsize) are in memory - or all of them if n is None"""
+        spill = self.spill
+        if n is not None:
+            n = max(n, spill.memsize) - deque.__len__(self)
+        deque.extend(self, spill.read(n))
+
+    def append(self, data):
+        """\
+        Appends item to the list (spilling it to disk if need be), or raises
+        Axon.AxonExceptions.noSpaceInBox exception if the number of items
+        already meets the size limit, or the budget for disk space is used up.
+
+        Calls self.notify() callback
+        """
+        if self.showtransit or ShowAllTransits:
+            print("Delivery via [", self.tag, "] of ", repr(data))
+        if self.size is not None:
+           if len(self) >= self.size:
+               raise noSpaceInBox(len(self),self.size)
+        if self._mustSpill() and self.spill.full():
+            raise noSpaceInBox(len(self),self.size)
+        if self.account is not None and not self._admit(data):
+            return
+        if not self._mustSpill():
+            deque.append(self, data)
+        else:
+            self.spill.write(data)
+        if self.highwater is not None and len(self) >= self.highwater:
+            self.congested = True
+        self.notify()
+
+    def extend(self, items):
+        """\
+        Appends items to the list (spilling them to disk if need be), stopping
+        early if the size limit is reached or the budget for disk space is used
+        up. Returns the number of items that were appended. Items after that are
+        not taken from the iterable.
+
+        Calls self.notify() callback once, if any items were appended.
+        """
+        if self.size is not None:
+            items = islice(items, max(0, self.size - len(self)))
+        if self.account is not None:
+            items = self._admitting(items)
+        spill = self.spill
+        items = iter(items)
+        count = 0
+        while True:
+            if self._mustSpill() and spill.full():
+                break
+            try:
+                data = next(items)
+            except StopIteration:
+                break
+            if self.showtransit or ShowAllTransits:
+                print("Delivery via [", self.tag, "] of ", repr(data))
+            count += 1
+            if self.account is not None and not self._admit(data):
+                continue
+            if self._mustSpill():
+                spill.write(data)
+            else:
+                deque.append(self, data)
+        if self.highwater is not None and len(self) >= self.highwater:
+            self.congested = True
+        if count:
+            self.notify()
+        return count
+
+    def pop(self, index=-1):
+        """\
+        Returns an item from the list, or raises IndexError if there are none.
+        Taking any but the first reads everything spilled back into memory.
+
+        Calls all callbacks listed in self.wakeOnPop (unless congested)
+        """
+        spill = self.spill
+        if spill.count and index != 0:
+            self._refill(None)
+        item = realsink.pop(self, index)
+        if spill.count and deque.__len__(self) <= spill.memsize // 2:
+            self._refill()
+        return item
+
+    def popmany(self, n=None):
+        """\
+        Removes and returns a list of up to n items from the front of the list
+        (or all of them if n is None, reading everything spilled back).
+
+        Calls all callbacks listed in self.wakeOnPop once, if any items were
+        removed (and it is not still congested).
+        """
+        spill = self.spill
+        if spill.count and (n is None or n > deque.__len__(self)):
+            self._refill(n)
+        items = realsink.popmany(self, n)
+        if spill.count and deque.__len__(self) <= spill.memsize // 2:
+            self._refill()
+        return items
+
+    def _dropOldest(self):
+        """Discards the item at the front of the list (reading it back from disk if need be)"""
+        spill = self.spill
+        if not deque.__len__(self):
+            self._refill()
+        realsink._dropOldest(self)
+        if spill.count and deque.__len__(self) <= spill.memsize // 2:
+            self._refill()
+
+
+class lockedspillsink(spillsink):
+    """A spillsink that other threads may deliver to directly (see lockedsink)"""
+    __slots__ = []
+
+    def append(self, data):
+        with self.lock:
+            spillsink.append(self, data)
+
+    def extend(self, items):
+        with self.lock:
+            return spillsink.extend(self, items)
+
+    def pop(self, index=-1):
+        with self.lock:
+            return spillsink.pop(self, index)
+
+    def popmany(self, n=None):
+        with self.lock:
+            return spillsink.popmany(self, n)
+
+
+# The class of storage makeInbox() creates, and what makeThreadSafe() and
+# spillToDisk() turn each class of storage into. Axon.Trace changes these whilst
+# tracing.
+_inboxStorage = realsink
+_threadSafeStorage = { realsink : lockedsink, spillsink : lockedspillsink }
+_spillStorage = { realsink : spillsink, lockedsink : lockedspillsink }
+
 
 class postbox(object):
     """\
@@ -400,6 +1083,9 @@ class postbox(object):
     Also takes optional notify callback, that will be called whenever an item is
     taken out of a postbox further down the chain.
     """
+    __slots__ = [ "storage", "sources", "myNotifyOnPop", "target", "sink",
+                  "append", "extend", "pop", "popmany", "__target_len__",
+                  "local_len" ]
     
     def __init__(self, storage, notify=None):
         """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
@@ -501,12 +1187,142 @@ class postbox(object):
         
         # make calling these methods go direct to the sink
         self.append         = self.sink.append
+        self.extend         = self.sink.extend
         self.pop            = self.sink.pop
+        self.popmany        = self.sink.popmany
         self.__target_len__ = self.sink.__len__
         # propagate the change back up the chain
         for source in self.sources:
             source._retarget(newtarget=self)
 
+    def makeThreadSafe(self):
+        """\
+        Makes the storage that messages sent to this postbox end up in safe for
+        other threads to deliver to directly (by calling self.sink.append() or
+        self.sink.extend()). Returns True if it is (or already was), or False if
+        it can't be because that storage discards messages (a nullsink).
+
+        Must be called from the scheduler's thread.
+        """
+        owner = self
+        while owner.target is not None:
+            owner = owner.target
+        storage = owner.storage
+        if not isinstance(storage, realsink):
+            return False
+        if storage.lock is None:
+            storage.lock = threading.Lock()
+            storage.__class__ = _threadSafeStorage[storage.__class__]
+            # rebind append(), pop() etc. of every postbox in the chain
+            owner._retarget()
+        return True
+
+    def spillToDisk(self, memsize=DefaultSpillMemsize, directory=None, budget=None):
+        """\
+        Makes the storage that messages sent to this postbox end up in keep
+        only the first memsize messages in memory, spilling any more to disk.
+        They are read back, in order, as messages are collected. Returns True
+        if it does (or already did - in which case memsize, directory and
+        budget are updated), or False if it can't because that storage
+        discards messages (a nullsink).
+
+        Spilled messages must be picklable. Must be called from the scheduler's
+        thread.
+
+        Keyword arguments:
+
+        - memsize    -- number of messages to keep in memory (default=DefaultSpillMemsize)
+        - directory  -- directory to create the files on disk in (default=None - the system's temporary directory)
+        - budget     -- None, or the number of bytes on disk after which no more will be spilled (and the box is full)
+        """
+        owner = self
+        while owner.target is not None:
+            owner = owner.target
+        storage = owner.storage
+        if not isinstance(storage, realsink):
+            return False
+        if storage.spill is None:
+            storage.spill = _spillover(memsize, directory, budget)
+            storage.__class__ = _spillStorage[storage.__class__]
+            # rebind append(), pop(), len() etc. of every postbox in the chain
+            owner.local_len = storage.__len__
+            owner._retarget()
+        else:
+            storage.spill.memsize = memsize
+            storage.spill.directory = directory
+            storage.spill.budget = budget
+        return True
+
+    def accountBytes(self, budget=None, lowbudget=None, policy=Backpressure, sizer=messageLength):
+        """\
+        Makes the storage that messages sent to this postbox end up in count
+        the bytes of the messages waiting in it (as given by sizer(message)),
+        and apply a policy once a budget for them - or the budget for the whole
+        process (see setProcessBudget()) - has been used. Returns True if it
+        does (if it already did, the bytes waiting are counted afresh), or
+        False if it can't because that storage discards messages (a nullsink).
+
+        Must be called from the scheduler's thread.
+
+        Keyword arguments:
+
+        - budget     -- None, or the number of bytes at which the policy is applied
+        - lowbudget  -- bytes to drain to before paused senders are woken (default=half the budget)
+        - policy     -- Backpressure, DropNewest, DropOldest or Refuse (default=Backpressure)
+        - sizer      -- sizer(message) returns the bytes to count for a message (default=messageLength)
+        """
+        owner = self
+        while owner.target is not None:
+            owner = owner.target
+        storage = owner.storage
+        if not isinstance(storage, realsink):
+            return False
+        if storage.account is not None:
+            processBudget.bytes -= storage.account.bytes
+        account = _byteAccount(sizer, budget, lowbudget, policy)
+        for data in deque.__iter__(storage):
+            account.add(data)
+        if storage.spill is not None and storage.spill.count:
+            size = storage.spill.measure(sizer)   # left on disk
+            account.bytes += size
+            processBudget.bytes += size
+        storage.account = account
+        if policy == Backpressure and account.full():
+            storage.congested = True
+        return True
+
+    def stopAccountingBytes(self):
+        """\
+        Stops the storage that messages sent to this postbox end up in from
+        counting bytes (see accountBytes()), waking any senders paused because
+        the budget had been used.
+
+        Must be called from the scheduler's thread.
+        """
+        storage = self.sink
+        if storage.account is not None:
+            processBudget.bytes -= storage.account.bytes
+            storage.account = None
+            if storage.congested:
+                storage._popped()
+
+    def bytesWaiting(self):
+        """\
+        Returns the number of bytes waiting in the storage messages sent to this
+        postbox end up in, or None if it is not counting them (see
+        accountBytes()).
+        """
+        account = self.sink.account
+        return account and account.bytes
+
+    def bytesDropped(self):
+        """\
+        Returns the number of messages discarded because the byte budget had
+        been used, or None if bytes are not being counted (see accountBytes()).
+        """
+        account = self.sink.account
+        return account and account.dropped
+
     def setSize(self, size):
         """\
         Set box size limit (use None for no limit)
@@ -521,6 +1337,21 @@ class postbox(object):
         """Gets current box size limit"""
         return self.storage.size
 
+    def setWatermarks(self, highwater, lowwater=None):
+        """\
+        Set the high and low watermarks for this box (use None for the high
+        watermark to switch them off). The low watermark defaults to half the
+        high one.
+
+        Senders to this box are paused once the high watermark is reached, and
+        are woken once the number waiting falls to the low watermark.
+        """
+        self.storage.setWatermarks(highwater, lowwater)
+
+    def getWatermarks(self):
+        """Gets the current (high, low) watermarks"""
+        return self.storage.highwater, self.storage.lowwater
+
     def setShowTransit(self, showtransit=False, tag=None):
         """\
         Set showTransit to True to cause debugging output whenever a message is
@@ -530,8 +1361,12 @@ class postbox(object):
         self.storage.setShowTransit(showtransit, tag)
 
     def isFull(self):
-        """Returns True if the destination box is full (and has a size limit)"""
-        return (self.sink.size != None) and (len(self) >= self.sink.size)
+        """\
+        Returns True if the destination box is full (and has a size limit), or
+        has reached its high watermark (or byte budget) and not yet fallen to
+        its low watermark (or low budget).
+        """
+        return self.sink.congested or ((self.sink.size != None) and (len(self) >= self.sink.size))
 
     def __repr__(self):
         return str(id(self))+repr(self.sink.__class__)+repr(self.sink)
@@ -545,11 +1380,24 @@ def makeInbox(notify, size = None):
     - notify  -- notify() will be called whenever a message arrives at this inbox.
     - size    -- None, or a limit on the maxmimum number if items this inbox can hold (default=None)
     """
-    result = postbox(storage=realsink(notify=notify))
+    result = postbox(storage=_inboxStorage(notify=notify))
     if size is not None:
        result.setSize(size)
     return result
 
+def inboxBytes(inboxes):
+    """\
+    Returns the total bytes waiting in those of the postboxes created in a
+    boxdict that are counting them (see postbox.accountBytes()), or None if
+    none are.
+    """
+    total = None
+    for box in list(dict.values(inboxes)):
+        account = box.storage.account
+        if account is not None:
+            total = (total or 0) + account.bytes
+    return total
+
 def makeOutbox(notify):
     """\
     Returns a new postbox object suitable for use a an Axon outbox.
@@ -560,4 +1408,93 @@ def makeOutbox(notify):
     """
     return postbox(storage=nullsink(), notify=notify)
 
+class boxdict(dict):
+    """\
+    boxdict(names, makebox, owner) -> new boxdict object.
+
+    A dictionary of postboxes (inboxes or outboxes) for a component, that only
+    creates the postbox for each of the specified names when it is first
+    looked up. Iterating over it, or asking for its length, keys, values or
+    items, creates any that have not yet been created.
+
+    Boxes can also be added and deleted, as with a normal dictionary.
+
+    Keyword arguments:
+
+    - names    -- the names of the boxes (eg. a component's Inboxes)
+    - makebox  -- makebox(notify) is called to create a postbox (eg. makeInbox)
+    - owner    -- component owning the boxes; owner.unpause is the notify callback
+    """
+    __slots__ = [ "names", "makebox", "owner", "deleted" ]
+
+    def __init__(self, names, makebox, owner):
+        """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
+        super(boxdict,self).__init__()
+        self.names = names
+        self.makebox = makebox
+        self.owner = owner
+        self.deleted = None   # names deleted before their boxes were created
+
+    def _pending(self, name):
+        """Returns True if the named box is yet to be created"""
+        return name in self.names and \
+               not dict.__contains__(self, name) and \
+               (self.deleted is None or name not in self.deleted)
+
+    def _createAll(self):
+        """Creates any boxes that are yet to be created"""
+        for name in self.names:
+            if self._pending(name):
+                self[name]
+
+    def __missing__(self, name):
+        if not self._pending(name):
+            raise KeyError(name)
+        box = self.makebox(self.owner.unpause)
+        dict.__setitem__(self, name, box)
+        return box
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or self._pending(name)
+
+    def __delitem__(self, name):
+        if not self._pending(name):
+            dict.__delitem__(self, name)
+        if name in self.names:
+            # make sure it doesn't get created again
+            if self.deleted is None:
+                self.deleted = set()
+            self.deleted.add(name)
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return default
+
+    def __iter__(self):
+        self._createAll()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._createAll()
+        return dict.__len__(self)
+
+    def keys(self):
+        self._createAll()
+        return dict.keys(self)
+
+    def values(self):
+        self._createAll()
+        return dict.values(self)
+
+    def items(self):
+        self._createAll()
+        return dict.items(self)
+
+    def __repr__(self):
+        self._createAll()
+        return dict.__repr__(self)
+
+    __str__ = __repr__
+
 # RELEASE: MH, MPS
@@ -149,6 +149,15 @@ waiting at the inbox you name. recv() lets you collect a message from an inbox.
 Use the send() method to send a message to the outbox you name. There is also an
 anyReady() method that will tell you if *any* inbox has data waiting in it.
 
+To move messages in batches, recvAll() and recvUpTo() collect all (or up to a
+given number) of the messages waiting at an inbox as a list, and sendMany()
+sends everything from an iterable, returning how many messages were accepted
+before the destination inbox became full. Each of these causes only a single
+wake up of the other components involved, however many messages are moved::
+
+    for msg in self.recvAll("inbox"):
+        print str(msg)
+
 A message gets from one component's outbox to another one's inbox if there is a
 linkage between them (going from the outbox to the inbox). A component can
 create and destroy linkages by using the link() and unlink() methods.
@@ -357,10 +366,11 @@ Attributes:
           
 * **inboxes** and **outboxes** - the actual collections of inboxes and outboxes
   that are set up when the component is initialised. Implemented as dictionaries
-  mapping names to the postbox objects.
+  mapping names to the postbox objects (Axon.Box.boxdict objects, which only
+  create each postbox when it is first used).
 
 * **postoffice** - a postoffice object, used to create, destroy and manage
-  linkages.
+  linkages. Only created when first used.
   
 * **children** - list of components registered as children of this component.
 
@@ -383,7 +393,7 @@ from Axon.Linkage import linkage
 from Axon.Ipc import *
 
 
-from Axon.Box import makeInbox,makeOutbox
+from Axon.Box import makeInbox,makeOutbox,boxdict,DefaultSpillMemsize,Backpressure,messageLength
 
 TraceAllSends = False
 TraceAllRecvs = False
@@ -430,6 +440,36 @@ class component(microprocess):
    
    Usescomponents=[]
 
+   messagesSent = 0       # counted whilst counting is on - see setMessageCounting()
+   messagesReceived = 0
+
+   # methods that setMessageCounting() swaps for _counting_... versions
+   _countingHooks = [ "send", "sendMany", "recv", "recvAll", "recvUpTo" ]
+
+   def setMessageCounting(cls, counting=True):
+      """\
+      Static method, for switching counting of messages sent and received by
+      all components on (or off).
+
+      When on, send(), sendMany(), recv(), recvAll() and recvUpTo() add to the
+      component's messagesSent and messagesReceived attributes. When off (the
+      default) they count nothing. This applies to component and to every
+      subclass (such as threadedcomponent) with its own _counting_... versions.
+
+      Usually switched on by Axon.Scheduler.scheduler.recordStats().
+      """
+      classes = [ component ]
+      for klass in classes:
+         classes.extend(klass.__subclasses__())
+         if "_counting_send" in klass.__dict__:
+            for method in klass._countingHooks:
+               if counting:
+                  replacement = "_counting_" + method
+               else:
+                  replacement = "_nocounting_" + method
+               setattr(klass, method, klass.__dict__[replacement])
+   setMessageCounting=classmethod(setMessageCounting)
+
    def __init__(self, *args, **argd):
       """You want to overide this method locally.
 
@@ -438,19 +478,14 @@ class component(microprocess):
       """
       super(component, self).__init__()
       self.__dict__.update(argd)
-      self.inboxes = dict()
-      self.outboxes = dict()
 
-      # Create boxes for inboxes/outboxes
-      for boxname in self.Inboxes:
-          self.inboxes[boxname] = makeInbox(notify=self.unpause)
-      for boxname in self.Outboxes:
-          self.outboxes[boxname] = makeOutbox(notify=self.unpause)
+      # Boxes for inboxes/outboxes get created when first used
+      self.inboxes = boxdict(self.Inboxes, makeInbox, self)
+      self.outboxes = boxdict(self.Outboxes, makeOutbox, self)
 
       self.children = []
       self._callOnCloseDown = []
 
-      self.postoffice = postoffice("component :" + self.name)
       if TraceAllSends:
           self._o_send = self.send
           self.send = self._debug_send
@@ -459,10 +494,39 @@ class component(microprocess):
           self.recv = self._debug_recv
 
 
+   def _getPostoffice(self):
+      """Returns this component's postoffice, creating it if need be"""
+      try:
+         return self.__dict__["_postoffice"]
+      except KeyError:
+         self._postoffice = postoffice("component :" + self.name)
+         return self._postoffice
+
+   def _setPostoffice(self, newpostoffice):
+      self._postoffice = newpostoffice
+
+   postoffice = property(_getPostoffice, _setPostoffice)
+
    def setInboxSize(self, boxname, size):
        "boxname - some boxname, must be an inbox ; size - maximum number of items we're happy with"
        self.inboxes[boxname].setSize(size)
 
+   def spillInboxToDisk(self, boxname="inbox", memsize=DefaultSpillMemsize, directory=None, budget=None):
+       """\
+       Keeps only the first memsize messages waiting in the specified inbox in
+       memory, spilling any more to disk (within a budget of bytes, if given).
+       See Axon.Box.postbox.spillToDisk().
+       """
+       return self.inboxes[boxname].spillToDisk(memsize, directory, budget)
+
+   def accountInboxBytes(self, boxname="inbox", budget=None, lowbudget=None, policy=Backpressure, sizer=messageLength):
+       """\
+       Counts the bytes of the messages waiting in the specified inbox, applying
+       a policy once a budget for them (or the process's) has been used. See
+       Axon.Box.postbox.accountBytes().
+       """
+       return self.inboxes[boxname].accountBytes(budget, lowbudget, policy, sizer)
+
    def __str__(self):
       """Provides a useful string representation of the component.
       You probably want to override this, and append this description using
@@ -536,7 +600,8 @@ class component(microprocess):
       
        You are unlikely to want to override this method.
        """
-       for box in self.inboxes:
+       # boxes not yet created can't have anything in them
+       for box in dict.keys(self.inboxes):
           if self.dataReady(box):
              if box:
                 return box 
@@ -609,6 +674,24 @@ class component(microprocess):
       """
       return self.inboxes[boxname].pop(0)
 
+   def recvAll(self,boxname="inbox"):
+      """\
+      returns a list of all the data waiting in the requested inbox.
+
+      Equivalent to calling recv() until dataReady() returns False, but owners
+      of outboxes linked to this inbox are only woken once.
+      """
+      return self.inboxes[boxname].popmany()
+
+   def recvUpTo(self,boxname="inbox",n=1):
+      """\
+      returns a list of up to n items of data from the requested inbox.
+
+      Equivalent to calling recv() up to n times while dataReady() returns
+      True, but owners of outboxes linked to this inbox are only woken once.
+      """
+      return self.inboxes[boxname].popmany(n)
+
    def _debug_recv(self,boxname="inbox"):
       shortname = self.name[self.name.rfind(".")+1:]
       message = self._o_recv(boxname)
@@ -632,15 +715,73 @@ class component(microprocess):
       Raises Axon.AxonExceptions.noSpaceInBox if this outbox is linked to a
       destination inbox that is full.
 
+      If the destination inbox has reached its high watermark, this component
+      is paused (taking effect when it next yields) until the inbox has been
+      drained to its low watermark.
+
       You are unlikely to want to override this method.
       """
-      self.outboxes[boxname].append(message)
+      box = self.outboxes[boxname]
+      box.append(message)
+      if box.sink.congested:
+          microprocess.pause(self)
+
+   def sendMany(self,messages, boxname="outbox"):
+      """\
+      appends each message, from an iterable, to the requested outbox.
+
+      Returns the number of messages sent. If this outbox is linked to a
+      destination inbox that becomes full, this will be less than the number
+      of messages supplied; the remaining messages are not taken from the
+      iterable. Unlike send(), no noSpaceInBox exception is raised.
+
+      The owner of the destination inbox is only woken once. As with send(),
+      this component is paused if the destination inbox reaches its high
+      watermark.
+      """
+      box = self.outboxes[boxname]
+      count = box.extend(messages)
+      if box.sink.congested:
+          microprocess.pause(self)
+      return count
 
    def _debug_send(self,message, boxname="outbox"):
       shortname = self.name[self.name.rfind(".")+1:]
       
       print("SEND: %s %s '%s' : %s" % (str(id(message)), shortname , boxname, str(message)))
       self._o_send(message, boxname)
+
+   # setMessageCounting() swaps the _counting_... versions of these in (the
+   # originals are kept as _nocounting_send, _nocounting_recv, etc)
+   _nocounting_send = send
+   _nocounting_sendMany = sendMany
+   _nocounting_recv = recv
+   _nocounting_recvAll = recvAll
+   _nocounting_recvUpTo = recvUpTo
+
+   def _counting_send(self, message, boxname="outbox"):
+      component._nocounting_send(self, message, boxname)
+      self.messagesSent += 1
+
+   def _counting_sendMany(self, messages, boxname="outbox"):
+      count = component._nocounting_sendMany(self, messages, boxname)
+      self.messagesSent += count
+      return count
+
+   def _counting_recv(self, boxname="inbox"):
+      message = component._nocounting_recv(self, boxname)
+      self.messagesReceived += 1
+      return message
+
+   def _counting_recvAll(self, boxname="inbox"):
+      messages = component._nocounting_recvAll(self, boxname)
+      self.messagesReceived += len(messages)
+      return messages
+
+   def _counting_recvUpTo(self, boxname="inbox", n=1):
+      messages = component._nocounting_recvUpTo(self, boxname, n)
+      self.messagesReceived += len(messages)
+      return messages
        
 
    def main(self):
@@ -689,7 +830,8 @@ class component(microprocess):
       """
       for callback in self._callOnCloseDown:
           callback()
-      self.postoffice.unlinkAll()
+      if "_postoffice" in self.__dict__:
+          self._postoffice.unlinkAll()
       return None
 
    def _deliver(self, message, boxname="inbox"):
@@ -113,25 +113,34 @@ on to the "signal" outbox and the component will terminate.
 How does it work?
 -----------------
 
-Every execution timeslice, Introspector queries its scheduler to obtain a list
-of all components. It then queries the postoffice in each component to build a
-picture of all linkages between components. It also builds a list of all inboxes
-and outboxes on each component.
-
-This is mapped to a list of nodes and linkages. Nodes being components and
-postboxes; and linkages being what postboxes belong to what components, and what
-postboxes are linked to what postboxes.
-
-This is compared against the nodes and linkages from the previous cycle of
-processing to determine what has changed. The changes are then output as a 
-sequence of "ADD NODE", "DEL NODE", "ADD LINK" and "DEL LINK" commands.
+When it starts, Introspector subscribes to Axon.Topology.changes, so that it
+is told whenever its scheduler activates a component or a component
+terminates, and whenever a linkage is made or removed. Then it looks at what
+is already there - the components its scheduler is running, the linkages in
+their postoffices, and the components at the other ends of those.
+
+From then on it is paused until it is told of a change. The components and
+postboxes it is showing, and the linkages between them, are kept in
+dictionaries. So each change is dealt with in the same time however large the
+system is - a component is shown when it is activated or first linked to, and
+deleted once it has terminated and is no longer linked to. The changes are
+then output as a sequence of "ADD NODE", "DEL NODE", "ADD LINK" and "DEL LINK"
+commands, in the order they happened.
+
+Postboxes are found when a component is shown, or when they are linked to.
+Postboxes deleted from a component (eg. by an
+Axon.AdaptiveCommsComponent.AdaptiveCommsComponent) are not deleted from the
+topology until the component is.
 
 """
 
 
+from collections import deque
+
 import Axon.Component as Component
 import Axon.Scheduler as Scheduler
 import Axon.Ipc as Ipc
+import Axon.Topology as Topology
 
 class Introspector(Component.component):
     """\
@@ -160,91 +169,124 @@ class Introspector(Component.component):
         # reset the receiving 'axon visualiser'
         self.send("DEL ALL\n", "outbox")
         yield 1
-        
-        nodes = dict()
-        linkages = dict()
-        while 1:
-            # shutdown if requested
-            if self.dataReady("control"):
-                data = self.recv("control")
-                if isinstance(data, Ipc.shutdownMicroprocess):
-                    self.send(data, "signal")
-                    return
-        
-            if isinstance(self.scheduler, Scheduler.scheduler):
-                oldNodes    = nodes
-                oldLinkages = linkages
-                
-                nodes    = dict()
-                linkages = dict()
-            
-                components, postboxes,linkages = self.introspect()
-                # now it is safe to yield if we wish to, since we've not snapshotted all system state we need
-
-                # now go through building the new set of nodes
-                # if we find one already in oldNodes, delete it from there,
-                # so that at the end oldNodes contains only 'differences'
-                # if not already there, then add it to the 'addmsgs' output
-                
-                # if the node being added is a postbox, then also build the
-                # 'add link' message to join it to its parent component
-                addnodemsgs = ""
-                delnodemsgs = ""
-                addlinkmsgs = ""
-                dellinkmsgs = ""
-                                        
-                # build topology nodes - one node per component, one per postbox on each component
-                for id in components.keys():
-                    if id not in nodes:         # incase component activated twice (twice in scheduler.threads)
-                        name = components[id]
-                        nodes[ id ] = name
-                        if id in oldNodes:
-                            del oldNodes[id]
-                        else:
-                            addnodemsgs += 'ADD NODE "'+str(id)+'" "'+str(name)+'" randompos component\n'
-
-                # build nodes for postboxes, and also link them to the components to which they belong
-                for id in postboxes:
-                    if id not in nodes:
-                        nodes[ id ] = name
-                        if id in oldNodes:
-                            del oldNodes[id]
-                        else:
-                            (cid, io, name) = id
-                            addnodemsgs += 'ADD NODE "'+str(id)+'" "'+str(name)+'" randompos '
-                            if io=="i":
-                                addnodemsgs += "inbox\n"
-                            else:
-                                addnodemsgs += "outbox\n"
-                            addnodemsgs += 'ADD LINK "'+str(cid)+'" "'+str(id)+'"\n'
-                            
-                # now addmsgs contains msgs to create new nodes
-                # and oldNodes only contains nodes that no longer exist
-                
-                for id in oldNodes.keys():
-                    delnodemsgs += 'DEL NODE "'+str(id)+'"\n'
-                
-                # now go through inter-postbox linkages and do the same as we did for nodes
-                # note, we check not only that the link exists, but that it still goes to the same thing!
-                # otherwise leave the old link to be destroyed, and add a new one
-                for (src,dst) in linkages.keys():
-                    if (src, dst) in oldLinkages: 
-                        del oldLinkages[(src,dst)]
-                    else:
-                        addlinkmsgs += 'ADD LINK "'+str(src)+'" "'+str(dst)+'"\n'
-                        
-                # delete linkages that no longer exist
-                for (src,dst) in oldLinkages.keys():
-                    dellinkmsgs += 'DEL LINK "'+str(src)+'" "'+str(dst)+'"\n'
-
-                # note: order of the final messages is important - delete old things
-                # before adding new
-                # and del links before nodes and add nodes before links
-                msg = dellinkmsgs + delnodemsgs + addnodemsgs + addlinkmsgs
-                if msg.strip() != "":
-                    self.send(msg, "outbox")
-                
-            yield 1
+
+        if not isinstance(self.scheduler, Scheduler.scheduler):
+            return
+
+        self.events = deque()
+        self.active = set()         # components the scheduler is running
+        self.refs = dict()          # component -> number of known linkages to/from it
+        self.boxes = dict()         # component -> ids of its postboxes, for those shown
+        self.linkages = dict()      # linkage -> (src id, dst id), for those shown
+        Topology.changes.subscribe(self._topologyChanged)
+        try:
+            # subscribed first, so nothing is missed whilst looking at what is
+            # already there; anything seen twice is only added once
+            msgs = []
+            components_to_scan = [ c for c in self.scheduler.listAllThreads() if isinstance(c, Component.component) ]
+            for c in components_to_scan:
+                self._activated(c, msgs)
+            for c in components_to_scan:
+                for link in c.postoffice.linkages:
+                    if link not in self.linkages:
+                        for other in (link.source, link.sink):
+                            if other not in self.refs and other not in self.active:
+                                components_to_scan.append(other)
+                        self._linked(link, msgs)
+
+            while 1:
+                # shutdown if requested
+                if self.dataReady("control"):
+                    data = self.recv("control")
+                    if isinstance(data, Ipc.shutdownMicroprocess):
+                        self.send(data, "signal")
+                        return
+
+                while self.events:
+                    event, subject = self.events.popleft()
+                    self.handlers[event](self, subject, msgs)
+                if msgs:
+                    self.send("".join(msgs), "outbox")
+                    msgs = []
+
+                if not self.events and not self.dataReady("control"):
+                    self.pause()
+                yield 1
+        finally:
+            Topology.changes.unsubscribe(self._topologyChanged)
+
+    def _topologyChanged(self, event, subject):
+        """Called by Axon.Topology.changes, in whatever thread made the change"""
+        self.events.append( (event, subject) )
+        self.unpause()
+
+    def _activated(self, c, msgs):
+        if isinstance(c, Component.component) and c.scheduler is self.scheduler and c not in self.active:
+            self.active.add(c)
+            self._show(c, msgs)
+
+    def _terminated(self, c, msgs):
+        if c in self.active:
+            self.active.remove(c)
+            if not self.refs.get(c):
+                self._hide(c, msgs)
+
+    def _linked(self, link, msgs):
+        if link in self.linkages:
+            return
+        src = (link.source.id, Introspector.srcBoxType[link.passthrough], link.sourcebox)
+        dst = (link.sink.id  , Introspector.dstBoxType[link.passthrough], link.sinkbox)
+        self.linkages[link] = (src, dst)
+        for c, box in ((link.source, src), (link.sink, dst)):
+            self.refs[c] = self.refs.get(c, 0) + 1
+            self._show(c, msgs)
+            if box not in self.boxes[c]:
+                self._addBox(c, box, msgs)
+        msgs.append('ADD LINK "'+str(src)+'" "'+str(dst)+'"\n')
+
+    def _unlinked(self, link, msgs):
+        ends = self.linkages.pop(link, None)
+        if ends is None:
+            return
+        (src, dst) = ends
+        msgs.append('DEL LINK "'+str(src)+'" "'+str(dst)+'"\n')
+        for c in (link.source, link.sink):
+            self.refs[c] -= 1
+            if not self.refs[c]:
+                del self.refs[c]
+                if c not in self.active:
+                    self._hide(c, msgs)
+
+    handlers = { Topology.ACTIVATED  : _activated,
+                 Topology.TERMINATED : _terminated,
+                 Topology.LINKED     : _linked,
+                 Topology.UNLINKED   : _unlinked,
+               }
+
+    def _show(self, c, msgs):
+        """Adds nodes for the component and its postboxes, if not already shown"""
+        if c in self.boxes:
+            return
+        self.boxes[c] = set()
+        msgs.append('ADD NODE "'+str(c.id)+'" "'+str(c.name)+'" randompos component\n')
+        for boxname in c.inboxes.keys():
+            self._addBox(c, (c.id, "i", boxname), msgs)
+        for boxname in c.outboxes.keys():
+            self._addBox(c, (c.id, "o", boxname), msgs)
+
+    def _addBox(self, c, id, msgs):
+        (cid, io, name) = id
+        self.boxes[c].add(id)
+        msgs.append('ADD NODE "'+str(id)+'" "'+str(name)+'" randompos '+(io=="i" and "inbox" or "outbox")+'\n')
+        msgs.append('ADD LINK "'+str(cid)+'" "'+str(id)+'"\n')
+
+    def _hide(self, c, msgs):
+        """Deletes the nodes for the component and its postboxes"""
+        if c not in self.boxes:
+            return
+        for id in self.boxes.pop(c, ()):
+            msgs.append('DEL NODE "'+str(id)+'"\n')
+        msgs.append('DEL NODE "'+str(c.id)+'"\n')
 
     def introspect(self):
         """\
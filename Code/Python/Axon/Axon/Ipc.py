@@ -121,8 +121,8 @@ resolve this issue, but this decision has not been taken yet.
 
 
 
-Setting off a new microprocess and waiting for it to complete
--------------------------------------------------------------
+Running another generator and waiting for it to complete
+--------------------------------------------------------
 
 * Axon.Ipc.WaitComplete
 * Axon.Ipc.reactivate
@@ -132,9 +132,9 @@ Used by:
 * components / microprocesses
 * Axon.Scheduler.scheduler
 
-A microprocess can yield a WaitComplete() Ipc message to the scheduler to ask
-for another microprocess to be started. When that second microprocess completes,
-the original one resumes - it waits until the second one completes.
+A microprocess can yield a WaitComplete() Ipc message to ask for another
+generator to be run in place of its own. When that generator completes, the
+original one resumes - it waits until the second one completes.
 
 This is a nice little way to sidestep the restriction in python that you can't
 nest yield statements for a given generator inside methods/functions it calls.
@@ -153,12 +153,85 @@ of a component::
             while not self.dataReady("inbox"):
                 yield 1
 
-Internally, the scheduler uses Axon.Ipc.reactivate to ensure the original
-microprocess is resumed after the one that was launched terminates.
+The microprocess runs the second generator itself, keeping the original one on
+a stack until it is resumed (see Axon.Microprocess), so no new microprocess is
+created, and pausing the microprocess pauses whichever generator is running.
+If the second generator fails with an exception, it is raised in the original
+one at the point where it yielded the WaitComplete.
 
+Axon.Ipc.reactivate can be returned by a microprocess's
+_closeDownMicroprocess() to get another microprocess (re)activated when it
+terminates.
+
+
+
+Waiting until a given time
+--------------------------
+
+* Axon.Ipc.WaitUntil
+* Axon.Ipc.Sleep
+
+Used by:
+
+* components / microprocesses
+* Axon.Scheduler.scheduler
+
+A microprocess can yield a WaitUntil(t) Ipc message to the scheduler to be
+paused until time t (as returned by time.time()), or a Sleep(dt) message to be
+paused for dt seconds. The scheduler wakes it again once that time has passed.
+Whilst waiting it uses no CPU time at all, so there is no need to busy-yield
+checking time.time(), or to use a threadedcomponent just to call time.sleep().
+
+As with pause(), the microprocess is also woken if a message arrives at one of
+its inboxes in the meantime. So if it matters that the time has really passed,
+check and wait again. For example, here is a component that sends out a
+message every second, but also responds promptly to shutdown requests::
+
+    class Ticker(Axon.Component.component):
+
+        def main(self):
+            nexttick = time.time()
+            while not self.dataReady("control"):
+                if time.time() >= nexttick:
+                    self.send("tick", "outbox")
+                    nexttick += 1.0
+                yield WaitUntil(nexttick)
+
+
+
+
+Waiting for a future
+--------------------
+
+* Axon.Ipc.WaitFuture
+
+Used by:
+
+* components / microprocesses
+* Axon.Scheduler.scheduler
+
+A microprocess can yield a WaitFuture(future) Ipc message to the scheduler to be
+paused until the future is done. Anything with add_done_callback() will do - an
+asyncio future or task, or a concurrent.futures future. An asyncio coroutine
+can also be given, in which case the scheduler wraps it in a task; this needs
+the scheduler to be running in an asyncio event loop (see
+Axon.Scheduler.scheduler.runInLoop()).
+
+As with WaitUntil, the microprocess is also woken if a message arrives at one
+of its inboxes in the meantime, so check done() before calling result()::
+
+    class Fetcher(Axon.Component.component):
+
+        def main(self):
+            response = WaitFuture(fetch(self.url))    # a coroutine
+            while not response.done():
+                yield response
+            self.send(response.result(), "outbox")
 
                 
 """
+import time as _time
+
 class ipc(object):
    """Message base class"""
    pass
@@ -167,20 +240,80 @@ class WaitComplete(ipc):
    """\
    WaitComplete(generator) -> new WaitComplete object.
    
-   Message to ask the scheduler to temporarily suspect this microprocess and
-   run a new one instead based on the generator provided; resuming the original
-   when the new one completes.
+   Message to ask for the generator provided to be run in place of the
+   microprocess's current one; resuming the original when the new one
+   completes.
    
    Use within a microprocess by yielding one back to the scheduler.
 
    Arguments:
 
-   - the generator to be run as the separate microprocess
+   - the generator to be run
    """
    def __init__(self, *args,**argd):
       self.args = args
       self.argd = argd
 
+class WaitUntil(ipc):
+   """\
+   WaitUntil(when) -> new WaitUntil ipc message.
+
+   Message to ask the scheduler to pause this microprocess until the specified
+   time has passed (or until it is woken sooner, for example by a message
+   arriving at one of its inboxes).
+
+   Use within a microprocess by yielding one back to the scheduler.
+
+   Keyword arguments:
+
+   - when  -- the time (as returned by time.time()) to wait until. Assigned to self.when
+   """
+   def __init__(self, when):
+      self.when = when
+
+class Sleep(WaitUntil):
+   """\
+   Sleep(delay) -> new Sleep ipc message.
+
+   Message to ask the scheduler to pause this microprocess for the specified
+   number of seconds (or until it is woken sooner, for example by a message
+   arriving at one of its inboxes).
+
+   Use within a microprocess by yielding one back to the scheduler.
+
+   Keyword arguments:
+
+   - delay  -- number of seconds to wait for. Assigned to self.delay
+   """
+   def __init__(self, delay):
+      super(Sleep, self).__init__(_time.time() + delay)
+      self.delay = delay
+
+class WaitFuture(ipc):
+   """\
+   WaitFuture(future) -> new WaitFuture ipc message.
+
+   Message to ask the scheduler to pause this microprocess until the future is
+   done (or until it is woken sooner, for example by a message arriving at one
+   of its inboxes).
+
+   Use within a microprocess by yielding one back to the scheduler.
+
+   Keyword arguments:
+
+   - future  -- the future, or an asyncio coroutine, to wait for. Assigned to self.future (replaced by a task if a coroutine)
+   """
+   def __init__(self, future):
+      self.future = future
+
+   def done(self):
+      """Returns True if the future is done."""
+      return hasattr(self.future, "done") and self.future.done()
+
+   def result(self):
+      """Returns the result of the future (raising its exception, if it has one)."""
+      return self.future.result()
+
 class reactivate(ipc):
    """\
    reactivate(original) -> new reactivate ipc message.
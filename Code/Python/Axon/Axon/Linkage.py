@@ -73,8 +73,17 @@ class linkage(AxonObject):
     - sourcebox    -- source component's source box name (default="outbox")
     - sinkbox      -- sink component's sink box name (default="inbox")
     - passthrough  -- 0=link is from inbox to outbox; 1=from inbox to inbox; 2=from outbox to outbox (default=0)
+    - pipewidth    -- None, or size limit to set on the sink box (default=None)
+    - highwater    -- None, or high watermark to set on the sink box (default=None)
+    - lowwater     -- low watermark to set on the sink box (default=highwater//2)
+
+    If a high watermark is set, components sending along this linkage are
+    paused once that many messages are waiting in the sink box, and woken
+    when it has been drained to the low watermark (see Axon.Box).
     """
-    def __init__(self, source, sink, sourcebox="outbox", sinkbox="inbox", passthrough=0, pipewidth=None, synchronous=None):
+    __slots__ = [ "source", "sink", "sourcebox", "sinkbox", "passthrough" ]
+
+    def __init__(self, source, sink, sourcebox="outbox", sinkbox="inbox", passthrough=0, pipewidth=None, synchronous=None, highwater=None, lowwater=None):
         """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
 #        if synchronous is not None:
 #            raise NotImplementedError("Link cannot be set synchronous at present - functionality dropped at present in favour of performance")
@@ -89,6 +98,8 @@ class linkage(AxonObject):
         else:
            if synchronous is not None:
                self.getSinkbox().setSize(1) # Restore functionality
+        if highwater is not None:
+           self.getSinkbox().setWatermarks(highwater, lowwater)
 
         if Box.ShowAllTransits:
             self.getSinkbox().storage.tag = self.short_str()
@@ -206,6 +206,14 @@ client of the generator. However if the microprocess has its stopped
 flag set, the microprocess generator simply yields a null value, followed
 by stopping.
 
+If the local generator yields an Axon.Ipc.WaitComplete message, the generator
+it carries is run in place of 'pc' from the next time slice, with 'pc' kept on
+a stack. When that generator finishes, 'pc' is taken back off the stack and
+carries on from where it left off (straight away, in the same time slice). If
+it fails with an exception, the exception is raised inside 'pc' instead. These
+detours can nest, and since they all run within the one microprocess,
+pausing, unpausing and stopping the microprocess applies to all of them.
+
 This all boils down to checking to see if the microprocess is not stopped
 prior to running the body of a generator formed from the main method of the
 class. The intent here is that users will inherit from
@@ -259,11 +267,34 @@ to a scheduler.
 
 
 
+Debugging
+---------
+
+By default, debugging is switched off. All microprocesses share a single
+Axon.debug.nulldebug object as self.debugger, which silently ignores any
+debugging output. The microprocess methods on the hot paths - pause(),
+unpause(), stop(), _isStopped(), _isRunnable() and activate() - do no
+debugging checks at all.
+
+To switch debugging on, call this at startup, before creating any
+microprocesses::
+
+    Axon.Microprocess.microprocess.setDebugging(True)
+
+or set the AXON_DEBUG environment variable (to anything other than "" or "0")
+before Axon is imported. Every microprocess subsequently created then gets its
+own Axon.debug.debug object (configured from "debug.conf", if it can be found)
+and the methods listed above report what they are doing to it.
+
+Microprocesses created before the switch keep the debugger they already had.
+
+
+
 Internal flags/state
 --------------------
 
 * **id** and **name** - unique identifiers. No other Axon entity will have the
-  same name or id.
+  same name or id. The name is only worked out when it is first asked for.
 
 * **init** - a flag indicating if the microprocess has been correctly
   initialised.
@@ -280,20 +311,23 @@ Internal flags/state
 * **tracker** - The coordinating assistant tracker to be used by this
   microprocess.
 
-* **debugger** - A local debugging object. (See the debug class docs for more
-  detail)
+* **debugger** - A local debugging object, or a shared nulldebug object if
+  debugging is switched off. (See the debug class docs for more detail)
 
 Note that the paused/awake state of a microprocess is something maintained and
 managed by the scheduler; not the microprocess itself.
 """
 
+import os
+import sys
 import time
 from Axon.util import removeAll
-from Axon.idGen import strId, numId, tupleId
-from Axon.debug import debug
+from Axon.idGen import strId, numId, tupleId, idToString
+from Axon.debug import debug, nulldebug
 
 import Axon.Base
 import Axon.CoordinatingAssistantTracker as cat
+from Axon.Ipc import WaitComplete
 from Axon.util import next
 
 class _NullScheduler(object):
@@ -332,6 +366,12 @@ class microprocess(Axon.Base.AxonObject):
    """
    schedulerClass = None
    trackerClass = None
+   debugging = False
+   debugger = nulldebug()     # shared by all microprocesses unless debugging
+   priority = 0               # scheduling priority (see Axon.Scheduler.scheduler.NORMAL)
+
+   # methods that setDebugging() swaps for _debug_... versions
+   _debugHooks = [ "_isStopped", "_isRunnable", "stop", "pause", "unpause", "activate" ]
 
    def setTrackerClass(cls, newTrackerClass):
       """\
@@ -350,6 +390,23 @@ class microprocess(Axon.Base.AxonObject):
       cls.schedulerClass = newSchedulerClass
    setSchedulerClass=classmethod(setSchedulerClass)
 
+   def setDebugging(cls, debugging=True):
+      """\
+      Static method, for switching debugging on (or off) for all microprocesses.
+
+      When on, microprocesses created afterwards each get their own debug
+      object, and pause(), unpause(), stop() etc report to it. When off (the
+      default) these methods do no debugging checks at all.
+      """
+      for method in microprocess._debugHooks:
+         if debugging:
+            replacement = "_debug_" + method.lstrip("_")
+         else:
+            replacement = "_nodebug_" + method.lstrip("_")
+         setattr(microprocess, method, microprocess.__dict__[replacement])
+      microprocess.debugging = bool(debugging)
+   setDebugging=classmethod(setDebugging)
+
 
    def __init__(self, thread = None, closeDownValue = 0, tag=""):
       """\
@@ -358,11 +415,13 @@ class microprocess(Axon.Base.AxonObject):
       Subclasses must call this using the idiom super(TheClass, self).__init__()
       """
       self.init  = 1
-      self.id,self.name = tupleId(self)
-      self.name = self.name + tag
+      self.id = numId()
+      if tag:
+         self._tag = tag     # name is only worked out when first asked for
       self.__stopped = 0
       if thread is not None:
-         self.__thread = thread
+         # run through the same loop as main() would be, so WaitComplete works
+         self.__thread = self._microprocessGenerator(self, thread=thread)
       else:
          self.__thread = None # Explicit better than implicit
          
@@ -371,15 +430,31 @@ class microprocess(Axon.Base.AxonObject):
       self.scheduler = _nullscheduler
       self.tracker=cat.coordinatingassistanttracker.getcat()
 
-      # If the client has defined a debugger in their class we don't want to override it.
-      # However if they haven't, we provide them with one
-      if not 'debugger' in list(self.__dict__.keys()):
+      # If debugging, and the client hasn't already defined a debugger, we
+      # provide them with one. Otherwise they get the shared nulldebug object
+      if microprocess.debugging and not 'debugger' in self.__dict__:
          self.debugger = debug()
          self.debugger.useConfig()
          if self.debugger.areDebugging("microprocess.__init__", 5):
             self.debugger.debugmessage("microprocess.__init__", "Defining debugger for self", self.__class__)
 
 
+   def _getName(self):
+      """\
+      Returns the name of this microprocess - its class name combined with its
+      id (and tag, if one was given). Worked out when first asked for.
+      """
+      try:
+         return self.__dict__["_name"]
+      except KeyError:
+         self._name = idToString(self, self.id) + self.__dict__.get("_tag", "")
+         return self._name
+
+   def _setName(self, name):
+      self._name = name
+
+   name = property(_getName, _setName)
+
    def __str__(self):
       """Standard function for rendering the object as a string."""
       result = ""
@@ -408,8 +483,6 @@ class microprocess(Axon.Base.AxonObject):
       Returns True if this microprocess has been running but has since been
       halted or terminated of its own accord. Otherwise returns False.
       """
-      if self.debugger.areDebugging("microprocess._isStopped", 1):
-         self.debugger.debugmessage("microprocess._isStopped", "self.stopped",self.__stopped)
       return self.__stopped == 1
 
    def _isRunnable(self):
@@ -418,16 +491,12 @@ class microprocess(Axon.Base.AxonObject):
       
       This query is actually passed on to this microprocess's scheduler.
       """
-      if self.debugger.areDebugging("microprocess._isRunnable", 10):
-         self.debugger.debugmessage("microprocess._isRunnable", "self.scheduler.isMProcessPaused(self)", self.scheduler.isMProcessPaused(self))
       return not self.scheduler.isThreadPaused(self)
 
    def stop(self):
       """\
       Halts the microprocess, no way to "unstop"
       """
-      if self.debugger.areDebugging("microprocess.stop", 1):
-         self.debugger.debugmessage("microprocess.stop", "Microprocess STOPPED", self.id,self.name,self)
       self.__stopped = 1
       self.scheduler = _nullscheduler
 
@@ -440,8 +509,6 @@ class microprocess(Axon.Base.AxonObject):
        
        Internally, the request is forwarded to this microprocesses scheduler.
        """
-       if self.debugger.areDebugging("microprocess.pause", 1):
-           self.debugger.debugmessage("microprocess.pause", "Microprocess PAUSED", self.id,self.name,self)
        self.scheduler.pauseThread(self)
 
    def unpause(self):
@@ -456,8 +523,6 @@ class microprocess(Axon.Base.AxonObject):
        
        Internally, the request is forwarded to this microprocess's scheduler.
        """
-       if self.debugger.areDebugging("microprocess.unpause", 1):
-           self.debugger.debugmessage("microprocess.unpause", "Microprocess UNPAUSED", self.id,self.name,self)
        self.scheduler.wakeThread(self)
 
    def _unpause(self):
@@ -488,7 +553,7 @@ class microprocess(Axon.Base.AxonObject):
       yield 1
       return
 
-   def _microprocessGenerator(self,someobject, mainmethod="main"):
+   def _microprocessGenerator(self,someobject, mainmethod="main", thread=None):
       """\
       This contains the mainloop for a microprocess, returning a
       generator object. Creates the thread of control by calling the
@@ -501,8 +566,14 @@ class microprocess(Axon.Base.AxonObject):
 
       - someobject  -- the object containing the main method (usually 'self')
       - mainmethod  -- *name* of the method that is the generator to be run as the thread.
+      - thread      -- None, or a generator to run instead of calling the main method
       """
-      pc = someobject.__getattribute__(mainmethod)()
+      if thread is not None:
+          pc = thread
+      else:
+          pc = someobject.__getattribute__(mainmethod)()
+      waiting = []     # generators suspended by WaitComplete, innermost last
+      failed = None    # exception to raise in a generator resumed from waiting
       while(1):
           # Continually try to run the code, and then release control
           if someobject._isStopped():
@@ -511,41 +582,64 @@ class microprocess(Axon.Base.AxonObject):
               return
           else:
 #              v = pc.next()    # python 2
-              v = next(pc)
+              try:
+                  if failed is None:
+                      v = next(pc)
+                  else:
+                      e, failed = failed, None
+                      v = pc.throw(e)
+              except StopIteration:
+                  if not waiting:
+                      # main() has finished. Return rather than let StopIteration
+                      # escape, which isn't allowed from a generator (PEP 479)
+                      return
+                  # a WaitComplete detour has finished, resume what started it
+                  pc = waiting.pop()
+                  continue
+              except Exception:
+                  if not waiting:
+                      raise
+                  failed = sys.exc_info()[1]
+                  pc = waiting.pop()
+                  continue
+              if isinstance(v, WaitComplete):
+                  waiting.append(pc)
+                  pc = v.args[0]
               yield v           # Yield control back - making us into a generator function
 
-   def activate(self, Scheduler=None, Tracker=None, mainmethod="main"):
+   def activate(self, Scheduler=None, Tracker=None, mainmethod="main", priority=None):
       """\
       Call to activate this microprocess, so it can start to be executed by a
       scheduler. Usual usage is to simply call x.activate()
 
       You can optionally specify a specific scheduler or tracker to use (instead of the
-      defaults). You can also specify that a different method is the 'main' generator.
+      defaults). You can also specify that a different method is the 'main' generator,
+      and the priority it is run at.
 
       Keyword arguments:
 
       - Scheduler   -- None to use the default scheduler; or an alternate scheduler.
       - Tracker     -- None to use the default coordinating assistant tracker; or an alternative one.
       - mainmethod  -- Optional. The name of the 'main' method of this microprocess (default="main")
+      - priority    -- Optional. Scheduling priority, eg. scheduler.HIGH or scheduler.LOW (default=self.priority, normally scheduler.NORMAL)
       """
       
       # call the _microprocessGenerator function to create a generator
       # object, places this into the thread attribute of the microprocess
       # and appends the component to the scheduler's run queue.
 
-      if self.debugger.areDebugging("microprocess.activate", 1):
-         self.debugger.debugmessage("microprocess.activate", "Activating microprocess",self)
       if not self.__thread:
          self.__thread = self._microprocessGenerator(self,mainmethod)
 
+      if priority is not None:
+         self.priority = priority
+
       #
       # Whilst a basic microprocess does not "need" a local scheduler,
       # classes inheriting from microprocess may well wish to do so.
       # (Specifically the component class needs that capability)
       #
       if Scheduler is not None:
-         if self.debugger.areDebugging("microprocess.activate", 1):
-            self.debugger.debugmessage("microprocess.activate", "Activating microprocess",self)
          Scheduler._addThread(self)
          self.scheduler = Scheduler
       else:
@@ -556,9 +650,50 @@ class microprocess(Axon.Base.AxonObject):
       else:
          pass
 
+      return self
+
+   # Versions of methods that report to the debugger. setDebugging() swaps
+   # these in (the originals are kept as _nodebug_isStopped, _nodebug_stop, etc)
+
+   _nodebug_isStopped = _isStopped
+   _nodebug_isRunnable = _isRunnable
+   _nodebug_stop = stop
+   _nodebug_pause = pause
+   _nodebug_unpause = unpause
+   _nodebug_activate = activate
+
+   def _debug_isStopped(self):
+      if self.debugger.areDebugging("microprocess._isStopped", 1):
+         self.debugger.debugmessage("microprocess._isStopped", "self.stopped",self.__stopped)
+      return self._nodebug_isStopped()
+
+   def _debug_isRunnable(self):
+      if self.debugger.areDebugging("microprocess._isRunnable", 10):
+         self.debugger.debugmessage("microprocess._isRunnable", "self.scheduler.isThreadPaused(self)", self.scheduler.isThreadPaused(self))
+      return self._nodebug_isRunnable()
+
+   def _debug_stop(self):
+      if self.debugger.areDebugging("microprocess.stop", 1):
+         self.debugger.debugmessage("microprocess.stop", "Microprocess STOPPED", self.id,self.name,self)
+      return self._nodebug_stop()
+
+   def _debug_pause(self):
+       if self.debugger.areDebugging("microprocess.pause", 1):
+           self.debugger.debugmessage("microprocess.pause", "Microprocess PAUSED", self.id,self.name,self)
+       return self._nodebug_pause()
+
+   def _debug_unpause(self):
+       if self.debugger.areDebugging("microprocess.unpause", 1):
+           self.debugger.debugmessage("microprocess.unpause", "Microprocess UNPAUSED", self.id,self.name,self)
+       return self._nodebug_unpause()
+
+   def _debug_activate(self, Scheduler=None, Tracker=None, mainmethod="main", priority=None):
+      if self.debugger.areDebugging("microprocess.activate", 1):
+         self.debugger.debugmessage("microprocess.activate", "Activating microprocess",self)
+      result = self._nodebug_activate(Scheduler, Tracker, mainmethod, priority)
       if self.debugger.areDebugging("microprocess.activate", 5):
          self.debugger.debugmessage("microprocess.activate", "Using Scheduler",self.scheduler)
-      return self
+      return result
 
    def _closeDownMicroprocess(self):
       """\
@@ -580,6 +715,9 @@ class microprocess(Axon.Base.AxonObject):
       self.activate()
       self.__class__.schedulerClass.run.runThreads()
 
+if os.environ.get("AXON_DEBUG", "") not in ("", "0"):
+   microprocess.setDebugging(True)
+
 if __name__ == '__main__':
    print ("Test code currently disabled")
    if 0:
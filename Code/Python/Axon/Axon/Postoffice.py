@@ -85,10 +85,20 @@ Multiple postoffices can (in fact, will) exist in an Axon system. Each looks
 after its own collection of linkages. A linkage created at one postoffice will
 *not* be known to other postoffice objects.
 
+The postoffice indexes its linkages both by the linkage itself and by the
+components at either end. So creating a linkage, and unlinking a given linkage
+or all the linkages involving a given component, take the same time however
+many other linkages the postoffice is looking after. The 'linkages' attribute
+returns a list of them all, in the order they were made.
+
+Each linkage made or removed is announced to any subscribers to
+Axon.Topology.changes.
+
 """
 
 
 import time
+from collections import OrderedDict
 
 from Axon.util import removeAll
 from Axon.idGen import strId, numId
@@ -96,6 +106,7 @@ from Axon.debug import debug
 from Axon.AxonExceptions import AxonException
 from Axon.AxonExceptions import BoxAlreadyLinkedToDestination
 from Axon.Linkage import linkage
+import Axon.Topology as Topology
 
 class postoffice(object):
    """\
@@ -116,7 +127,37 @@ class postoffice(object):
          self.debugname = debugname + ":debug "
       else:
          self.debugname =""
-      self.linkages = list()
+      self._linkages = OrderedDict()   # linkage -> None, in the order they were made
+      self._byComponent = dict()       # component -> {linkage:None} for linkages to/from it
+
+   def _getLinkages(self):
+      """Returns a list of the linkages registered with this postoffice, in the order they were made"""
+      return list(self._linkages)
+
+   linkages = property(_getLinkages)
+
+   def _register(self, thelinkage):
+      """Records the linkage, indexing it by the components at either end"""
+      self._linkages[thelinkage] = None
+      for comp in (thelinkage.source, thelinkage.sink):
+         try:
+            self._byComponent[comp][thelinkage] = None
+         except KeyError:
+            self._byComponent[comp] = { thelinkage : None }
+
+   def _deregister(self, thelinkage):
+      """Forgets the linkage. Returns False if it wasn't registered."""
+      try:
+         del self._linkages[thelinkage]
+      except KeyError:
+         return False
+      for comp in (thelinkage.source, thelinkage.sink):
+         links = self._byComponent.get(comp)
+         if links is not None:
+            links.pop(thelinkage, None)
+            if not links:
+               del self._byComponent[comp]
+      return True
 
 
    def __str__(self):
@@ -146,7 +187,9 @@ class postoffice(object):
 #       except BoxAlreadyLinkedToDestination, e:
 #           raise e
        thelink.getSinkbox().addsource( thelink.getSourcebox() ) # Cease  rethrowing messages from here - also python 2/3 fix
-       self.linkages.append(thelink)
+       self._register(thelink)
+       if Topology.changes.subscribers:
+           Topology.changes.emit(Topology.LINKED, thelink)
        return thelink
 
    def unlink(self, thecomponent=None, thelinkage=None):
@@ -158,31 +201,19 @@ class postoffice(object):
         Note, it only destroys linkages registered in this postoffice.
         """
         if thelinkage:
-            try:
-                self.linkages.remove(thelinkage)
-            except ValueError:
-                pass
-            else:
+            if self._deregister(thelinkage):
                 thelinkage.getSinkbox().removesource( thelinkage.getSourcebox() )
+                if Topology.changes.subscribers:
+                    Topology.changes.emit(Topology.UNLINKED, thelinkage)
         if thecomponent:
-            i=0
-            num =len(self.linkages)
-            while i<num:
-                linkage = self.linkages[i]
-                if linkage.source == thecomponent or linkage.sink == thecomponent:
-                    num=num-1
-                    self.unlink(thelinkage=linkage)
-                else:
-                    i=i+1
+            for linkage in list(self._byComponent.get(thecomponent, ())):
+                self.unlink(thelinkage=linkage)
 
    def unlinkAll(self):
        """\
        Destroys all linkages made with this postoffice.
        """
-       num =len(self.linkages)
-       while num > 0:
-           linkage = self.linkages[0]
-           num=num-1
+       for linkage in list(self._linkages):
            self.unlink(thelinkage=linkage)
 
 
@@ -197,7 +228,7 @@ class postoffice(object):
 
    def islinkageregistered(self, linkage):
       """Returns a true value if the linkage given is registered with the postoffie."""
-      return self.linkages.count(linkage)
+      return int(linkage in self._linkages)
 
 
 
@@ -154,17 +154,130 @@ this case you do not have to redo the transaction. This is hard to replicate
 except under load. The reason we do this however is because most Kamaelia
 components are implemented as generators, which makes blocking operation ( as a
 .acquire() rather than .acquire(0) would be) an expensive operation.
+
+
+
+Keeping contention down
+-----------------------
+
+A store does not have just one lock. Its keys are spread across a number of
+locks (stripes - 32 by default), and only the locks for the keys involved are
+taken. So threads working on different keys rarely get in each other's way,
+and a BusyRetry means another thread really was using one of the same locks.
+Getting a single value that already exists (usevar) takes no lock at all -
+the Value the store holds is replaced by each commit, never changed. Using a
+collection takes the locks for all its keys, so the values are consistent
+with each other::
+
+    S = Store(stripes=128)
+
+Normally every value is deep copied when it is got and again when it is
+committed, so that nobody can change the store's copy behind its back. If the
+values are never changed in place - only replaced by calling .set() - that
+copying is a waste. Create the store with immutable=True and values are shared
+instead. If you do want to change a value in place, call .writable(), which
+makes a (shallow) copy first - but only if it is still shared with the store::
+
+    S = Store(immutable=True)
+    counts = S.usevar("counts")
+    counts.set({})
+    counts.commit()
+
+    counts = S.usevar("counts")
+    counts.writable()["apples"] = 5    # copies the dictionary, not S's
+    counts.commit()
+
+Rather than retrying straight away (and probably colliding again), wait a
+little, a little longer each time. backoff() yields a suitable series of waits.
+Or, in a thread, call .transaction(), which gets the values, calls a function
+to update them, and commits - retrying with backoff until it works, or giving
+up after a number of attempts::
+
+    def transfer(D):
+        D["account_one"].set(D["account_one"].value - 10)
+        D["account_two"].set(D["account_two"].value + 10)
+
+    S.transaction(["account_one", "account_two"], transfer)
+
+
+
+Waiting for something to change
+-------------------------------
+
+Rather than repeatedly looking at a value until another thread changes it,
+wait for it to be committed. In a thread, call .wait_for_change() with the
+keys (optionally with a timeout). Given a Collection, rather than keys, it
+waits until one of the values has been committed since the Collection was got
+- so nothing committed in the meantime is missed::
+
+    D = S.using("jobs")
+    while not D["jobs"].value:
+        S.wait_for_change(D)
+        D = S.using("jobs")
+
+Or, like Haskell's retry, raise Retry from the update function given to
+.transaction(), and it will be started again once one of its values has
+changed::
+
+    def takeJob(D):
+        if not D["jobs"].value:
+            raise Retry
+        ...
+
+A component mustn't block, so instead call .changed(), which returns a future
+that is done once one of the values is committed, and yield an
+Axon.Ipc.WaitFuture for it. The component is paused until then (or until it
+is woken for some other reason, such as a message arriving)::
+
+    def main(self):
+        while True:
+            D = S.using("jobs")
+            if not D["jobs"].value:
+                yield WaitFuture(S.changed(D))
+                continue
+            ...
+
+If a component stops waiting for a future before it is done, cancel it, so
+that the store stops watching for the change. Whilst nothing is being
+watched, each commit pays for just one extra test.
 """
 
 import copy
+import random
 import threading
+import time
+
+DefaultStripes = 32         # number of locks a Store spreads its keys across
+DefaultAttempts = 100       # number of tries Store.transaction() makes before giving up
+DefaultDelay = 0.0001       # seconds backoff() waits before the first retry
+DefaultMaxDelay = 0.05      # longest backoff() waits before any retry
 
 class ConcurrentUpdate(Exception): pass
 class BusyRetry(Exception): pass
+class Retry(Exception):
+    """
+    Raise this in the update function given to Store.transaction() to start it
+    again once one of the values it was given has been changed.
+    """
+    pass
+
+def backoff(attempts=DefaultAttempts, delay=DefaultDelay, maxdelay=DefaultMaxDelay):
+    """
+    backoff([attempts][,delay][,maxdelay]) -> generator of waits
+
+    Yields how long (in seconds) to wait before each retry of something that
+    failed with BusyRetry or ConcurrentUpdate - at most attempts-1 of them, so
+    that it is tried attempts times in all. The waits double each time, up to
+    maxdelay, and each is randomly between half and all of that, so that
+    threads which collided once are unlikely to collide again.
+    """
+    for _ in range(attempts-1):
+        yield delay * (0.5 + random.random()/2)
+        delay = min(delay*2, maxdelay)
 
 class Value(object):
     """
-    Value(version, value, store, key) -> new Value object
+    Value(version, value, store, key[, owned]) -> new Value object
 
     A simple versioned key-value pair which belongs to a thread-safe store
 
@@ -174,10 +287,11 @@ class Value(object):
     - value -- the object's initial value
     - store -- a Store object to hold the value and it's history
     - key -- a key to refer to the value
+    - owned -- False if value is shared with the store, so must not be changed in place (default=True)
     
     Note: You do not instantiate these - the Store does that
     """
-    def __init__(self, version, value,store,key):
+    def __init__(self, version, value,store,key, owned=True):
         """
         x.__init__(...) initializes x; see x.__class__.__doc__ for signature
         """
@@ -186,6 +300,7 @@ class Value(object):
         self.value = value
         self.store = store
         self.key = key
+        self.owned = owned
 
     def __repr__(self):
         return "Value"+repr((self.version,self.value))
@@ -193,6 +308,17 @@ class Value(object):
     def set(self, value):
         """ Set the value without storing """
         self.value = value
+        self.owned = True
+
+    def writable(self):
+        """
+        Returns the value, to be changed in place. If it is shared with the
+        store (see Store's immutable argument) it is copied (shallowly) first.
+        """
+        if not self.owned:
+            self.value = copy.copy(self.value)
+            self.owned = True
+        return self.value
 
     def commit(self):
         """ Commit a new version of the value to the store """
@@ -200,6 +326,8 @@ class Value(object):
 
     def clone(self):
         """ Returns a clone of the value """
+        if self.store.immutable:
+            return Value(self.version, self.value, self.store, self.key, owned=False)
         return Value(self.version, copy.deepcopy(self.value),self.store,self.key)
 
 class Collection(dict):
@@ -219,24 +347,53 @@ class Collection(dict):
         self.store.set_values(self)
 
 
+class _watch(object):
+    """
+    _watch(versions) -> new _watch object
+
+    A wait for any of the keys in the dictionary of versions to have a newer
+    version, finishing the future when it does.
+    """
+    __slots__ = [ "versions", "future", "waiting" ]
+    def __init__(self, versions):
+        # imported here, so the rest of the store works without it (eg. Python 2)
+        from concurrent.futures import Future
+        self.versions = versions
+        self.future = Future()
+        self.waiting = True       # still in the store's watchers
+
+    def done(self, changed):
+        """ Gives the future its result - unless it has been cancelled """
+        if self.future.set_running_or_notify_cancel():
+            self.future.set_result(changed)
+
 class Store(object):
     """
-    Store() -> new Store object
+    Store([stripes][,immutable]) -> new Store object
 
     A thread-safe versioning store for key-value pairs
     
     You instantiate this as per the documentation for this module
+
+    Keyword arguments:
+
+    - stripes -- number of locks to spread the keys across (default=DefaultStripes)
+    - immutable -- True if values are never changed in place, so need not be copied (default=False)
     """
-    def __init__(self):
+    def __init__(self, stripes=DefaultStripes, immutable=False):
         self.store = {}                # Threadsafe
-        self.lock = threading.Lock()
+        self.locks = [ threading.Lock() for _ in range(stripes) ]
+        self.immutable = immutable
+        self.watchers = {}             # key -> list of _watch objects waiting for it to change
+        self.watchlock = threading.Lock()
 
     # ////---------------------- Direct access -----------------------\\\\
-    # Let's make this lock free, and force the assumption that to do this the store must be locked.
-    # Let's make this clear by marking these private
-    def __get(self, key):                # Reads Store Value - need to protect during clone
+    # Let's make this lock free, and force the assumption that to do this the
+    # locks for the keys must be held. Let's make this clear by marking these private
+    def __get(self, key):                # Reads Store Value - committed Values are replaced, never changed
         """
-        Retreive a value.  Returns a clone of the Value.  Not thread-safe.
+        Retreive a value.  Returns a clone of the Value.  Safe without the lock,
+        since the Value held by the store is never changed.
         """
         return self.store[key].clone()
 
@@ -244,12 +401,19 @@ class Store(object):
         """ Create a new key-value pair.  Not thread-safe """
         self.store[key] = Value(0, None,self,key)
 
-    def __do_update(self, key, value):   # Writes Store Value  - need to prevent multiple concurrent write
+    def __stored(self, value):           # Doesn't touch the store, so done before locking
+        """ Returns what the store should hold for a Value being committed """
+        if self.immutable:
+            return value.value
+        return copy.deepcopy(value.value)
+
+    def __do_update(self, key, value, stored):   # Writes Store Value  - need to prevent multiple concurrent write
         """
         Update a key-value pair and increment the version.  Not thread-safe
         """
-        self.store[key] = Value(value.version+1, copy.deepcopy(value.value), self, key)
+        self.store[key] = Value(value.version+1, stored, self, key)
         value.version= value.version+1
+        value.owned = not self.immutable
 
     def __can_update(self,key, value):   # Reads Store Value - possibly thread safe, depending on VM implementation
         """
@@ -257,6 +421,26 @@ class Store(object):
         thread-safe
         """
         return not (self.store[key].version > value.version)
+
+    def __locks(self, keys):
+        """ Returns the locks for the keys, each only once, in a consistent order """
+        locks = self.locks
+        return [ locks[stripe] for stripe in sorted(set( hash(key) % len(locks) for key in keys )) ]
+
+    def __acquire(self, locks):
+        """
+        Acquires all the locks without blocking, or (if any is in use) none of
+        them and raises BusyRetry.
+        """
+        for i, lock in enumerate(locks):
+            if not lock.acquire(0):
+                for held in locks[:i]:
+                    held.release()
+                raise BusyRetry
+
+    def __release(self, locks):
+        for lock in locks:
+            lock.release()
     # \\\\---------------------- Direct access -----------------------////
 
 
@@ -266,46 +450,47 @@ class Store(object):
     def usevar(self, key, islocked=False):   # Reads and Writes Values (since value may not exist)
         """
         Tries to get an item from the store.  Returns the requested Value
-        object.  If the store is already in use a BusyRetry error is raised.
+        object.  Only needs a lock if the item has to be created - if that
+        lock is in use a BusyRetry error is raised.
         """
-        locked = islocked
-        if not locked:
-            locked = self.lock.acquire(0)
-        result = None
-        if locked:
+        if not islocked:
             try:
-                try:
-                    result = self.__get(key)
-                except KeyError:
-                    self.__make(key)
-                    result = self.__get(key)
-            finally:
-                if not islocked:
-                    self.lock.release() # only release if we acquire
-        else:
-            raise BusyRetry
+                return self.__get(key)
+            except KeyError:
+                pass
+            locks = self.__locks((key,))
+            self.__acquire(locks)
+        try:
+            try:
+                result = self.__get(key)
+            except KeyError:
+                self.__make(key)
+                result = self.__get(key)
+        finally:
+            if not islocked:
+                self.__release(locks) # only release if we acquire
         return result
 
 
     def set(self, key, value): # Reads and Writes Values (has to check store contents)
         """
-        Tries to update a value in the store.  If the store is already in use
-        a BusyRetry error is raised.  If the value has been updated by another
-        thread a ConcurrentUpdate error is raised
+        Tries to update a value in the store.  If the key's lock is already in
+        use a BusyRetry error is raised.  If the value has been updated by
+        another thread a ConcurrentUpdate error is raised
         """
-        locked = self.lock.acquire(0)
-        HasBeenSet = False
-        if locked:
-            try:
-                if self.__can_update(key, value):
-                    self.__do_update(key, value)
-                    HasBeenSet = True
-            finally:
-                self.lock.release()
-        else:
-            raise BusyRetry
+        stored = self.__stored(value)
+        locks = self.__locks((key,))
+        self.__acquire(locks)
+        try:
+            HasBeenSet = self.__can_update(key, value)
+            if HasBeenSet:
+                self.__do_update(key, value, stored)
+        finally:
+            self.__release(locks)
         if not HasBeenSet:
             raise ConcurrentUpdate
+        if self.watchers:
+            self.__changed((key,))
 
     # \\\\----------------- Single Value Mediation ------------------////
 
@@ -314,52 +499,178 @@ class Store(object):
     def using(self, *keys):    # Reads and Writes Values (since values may not exist)
         """
         Tries to get a selection of items from the store.  Returns a Collection
-        dictionary containing the requested values.  If the store is already
-        in use a BusyRetry error is raised.
-        """
-        locked = self.lock.acquire(0)
-        if locked:
-            try:
-
-                D = Collection()
-                for key in keys:
-                    D[key] = self.usevar(key,islocked=True)
-                D.set_store(self)
-
-            finally:
-                self.lock.release()
-        else:
-            raise BusyRetry
+        dictionary containing the requested values.  If the lock for any of
+        the keys is already in use a BusyRetry error is raised.
 
+        The locks are held whilst they are got, so they are consistent with
+        each other - but not whilst they are copied.
+        """
+        locks = self.__locks(keys)
+        self.__acquire(locks)
+        try:
+            current = []
+            for key in keys:
+                if key not in self.store:
+                    self.__make(key)
+                current.append(self.store[key])
+        finally:
+            self.__release(locks)
+
+        D = Collection()
+        for value in current:
+            D[value.key] = value.clone()
+        D.set_store(self)
         return D
 
     def set_values(self, D):  # Reads and Writes Values (has to check store contents)
         """
-        Tries to update a selection of values in the store.  If the store is
-        already in use a BusyRetry error is raised.  If one of the values has
-        been updated by another thread a ConcurrentUpdate error is raised.
+        Tries to update a selection of values in the store.  If the lock for
+        any of the keys is already in use a BusyRetry error is raised.  If one
+        of the values has been updated by another thread a ConcurrentUpdate
+        error is raised.
         """
         CanUpdateAll = True # Hope for the best :-)
 
-        locked = self.lock.acquire(0)
-        if locked:
-            try:
+        stored = dict( (key, self.__stored(D[key])) for key in D )
+        locks = self.__locks(D)
+        self.__acquire(locks)
+        try:
+            for key in D:
+                # Let experience teach us otherwise :-)
+                CanUpdateAll = CanUpdateAll and self.__can_update(key, D[key]) # Reading Store
+
+            if CanUpdateAll:
                 for key in D:
-                    # Let experience teach us otherwise :-)
-                    CanUpdateAll = CanUpdateAll and self.__can_update(key, D[key]) # Reading Store
-
-                if CanUpdateAll:
-                    for key in D:
-                        self.__do_update(key, D[key]) # Writing Store
-            finally:
-                self.lock.release()
-        else:
-            raise BusyRetry
+                    self.__do_update(key, D[key], stored[key]) # Writing Store
+        finally:
+            self.__release(locks)
 
         if not CanUpdateAll:
             raise ConcurrentUpdate
+        if self.watchers:
+            self.__changed(D)
     # \\\\----------------- Multi-Value Mediation ------------------////
 
+    def transaction(self, keys, update, attempts=DefaultAttempts, delay=DefaultDelay, maxdelay=DefaultMaxDelay):
+        """
+        Gets a Collection of the values for the keys, calls update(collection)
+        to change them, then commits it - starting again, after waiting (see
+        backoff()), if that fails because the store is busy or another thread
+        updated the values first. Returns whatever update() returned. If all
+        attempts fail, the last BusyRetry or ConcurrentUpdate is raised.
+
+        If update() raises Retry (for example, because there is nothing for it
+        to do yet), it is started again once another thread has changed one of
+        the values - which doesn't count as a failed attempt.
+
+        This blocks whilst waiting, so is for threads (eg. in a
+        threadedcomponent) rather than generators.
+        """
+        waits = backoff(attempts, delay, maxdelay)
+        while True:
+            try:
+                D = self.using(*keys)
+                result = update(D)
+                D.commit()
+                return result
+            except Retry:
+                self.wait_for_change(D)
+            except (BusyRetry, ConcurrentUpdate):
+                wait = next(waits, None)
+                if wait is None:
+                    raise
+                time.sleep(wait)
+
+    # ////-------------------- Change notification --------------------\\\\
+    def versions(self, keys):
+        """
+        Returns a dictionary mapping each of the keys to the version of its
+        value now (0 if it has never been committed).
+        """
+        store = self.store
+        return dict( (key, key in store and store[key].version or 0) for key in keys )
+
+    def changed(self, keys):
+        """
+        Returns a future (a concurrent.futures.Future) that is done once the
+        value of one of the keys has been committed since now. If keys is a
+        Collection (or other dictionary of Values), it is once one has been
+        committed since that Value was got - which may already be the case.
+        Its result is a list of the keys that had changed.
+
+        A component can wait for it to be done by yielding an
+        Axon.Ipc.WaitFuture - see the module documentation. Cancel it to stop
+        waiting.
+
+        Needs concurrent.futures (on Python 2, the "futures" backport).
+        """
+        if isinstance(keys, dict):
+            versions = dict( (key, keys[key].version) for key in keys )
+        else:
+            versions = self.versions(keys)
+        watch = _watch(versions)
+        with self.watchlock:
+            for key in versions:
+                self.watchers.setdefault(key, []).append(watch)
+            changed = self.__newer(versions)
+            if changed:
+                self.__unwatch(watch)
+        if changed:
+            watch.done(changed)
+        else:
+            watch.future.add_done_callback(lambda future : self.__cancelled(watch))
+        return watch.future
+
+    def wait_for_change(self, keys, timeout=None):
+        """
+        Blocks until the value of one of the keys has been committed (see
+        changed()), or until timeout seconds have passed. Returns the list of
+        keys that had changed - empty if the timeout passed first.
+        """
+        from concurrent.futures import TimeoutError
+        future = self.changed(keys)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.cancel():
+                return []
+            return future.result()
+
+    def __newer(self, versions):
+        """ Returns the keys whose values are newer than the versions given """
+        store = self.store
+        return [ key for key in versions if key in store and store[key].version > versions[key] ]
+
+    def __unwatch(self, watch):
+        """ Stops watch waiting for changes.  Must hold self.watchlock """
+        if watch.waiting:
+            watch.waiting = False
+            for key in watch.versions:
+                watchers = self.watchers[key]
+                watchers.remove(watch)
+                if not watchers:
+                    del self.watchers[key]
+
+    def __cancelled(self, watch):
+        """ Called when watch's future is done, in case that is because it was cancelled """
+        if watch.waiting:
+            with self.watchlock:
+                self.__unwatch(watch)
+
+    def __changed(self, keys):
+        """ Called after values for the keys have been committed, to finish any watches they satisfy """
+        finished = []
+        with self.watchlock:
+            for key in keys:
+                for watch in list(self.watchers.get(key, ())):
+                    changed = self.__newer(watch.versions)
+                    if changed:
+                        self.__unwatch(watch)
+                        finished.append( (watch, changed) )
+        for watch, changed in finished:
+            watch.done(changed)
+    # \\\\-------------------- Change notification --------------------////
+
     def dump(self):
         # Who cares really? This is a debug :-)
         print("DEBUG: Store dump ------------------------------")
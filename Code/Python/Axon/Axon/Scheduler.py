@@ -64,6 +64,34 @@ The runThreads() method is the way of bootstrapping the scheduler. Being a
 microprocess, it needs something to schedule it! The runThreads() method does
 exactly that.
 
+
+
+Running inside an asyncio event loop
+------------------------------------
+
+runThreads() takes over the thread that calls it until the scheduler finishes.
+To run Axon components alongside asyncio code in the same thread instead, call
+runInLoop() from within the event loop. It returns an asyncio future that is
+done when the scheduler finishes::
+
+    async def serve():
+        c1 = MyComponent().activate()
+        server = await asyncio.start_server(handler, port=8080)
+        await scheduler.run.runInLoop()
+
+    asyncio.run(serve())
+
+The scheduler runs for a short timeslice at a time (slicesize steps) as a loop
+callback, then lets the loop get on with other callbacks before carrying on.
+When all microprocesses are paused it stops being called at all, and is
+resumed - through loop.call_soon_threadsafe() - when one is woken (even from
+another thread) or when the next WaitUntil/Sleep deadline arrives.
+
+A component can wait for an asyncio future, task or coroutine by yielding an
+Axon.Ipc.WaitFuture - see Axon.Ipc. Kamaelia's selector service also uses the
+loop to watch sockets and files, rather than a thread of its own, when it is
+created whilst the scheduler is running in a loop.
+
 The activate() method is fully thread-safe. It can handle multiple simultaneous
 callers from different threads to the one the scheduler is running in.
 
@@ -117,6 +145,10 @@ However, this scheduler does understand certain values that can be yielded:
       
   This is simply an alternative to calling x.activate().
 
+* **Axon.Ipc.WaitFuture** - a microprocess can yield this to be paused until
+  a future (for example an asyncio future, or a concurrent.futures one) is
+  done. See "Running inside an asyncio event loop" above.
+
 * **Axon.Ipc.WaitComplete** - this is a way for a microprocess to substitute
   itself (temporarily) with another one that uses a new generator.
   For example::
@@ -131,11 +163,11 @@ However, this scheduler does understand certain values that can be yielded:
             while time.time() < t+1.0:
                 yield 1
 
-  This is a convenient way to modularise parts of your main() code. But there
-  is an important limitation with the current implementation:
-
-  * self.pause() will not cause the replacement generator to pause. (Where
-    'self' is the original microprocess - as in the example code above)
+  This is a convenient way to modularise parts of your main() code. The
+  replacement generator is run by the microprocess itself (see
+  Axon.Microprocess), not as a separate microprocess, so this is cheap, and
+  self.pause() pauses the replacement generator too. (Where 'self' is the
+  original microprocess - as in the example code above)
 
 
 
@@ -151,8 +183,6 @@ the return value if it is one of the following:
   likely to fail, possibly even crash the scheduler!
 
 * **Axon.Ipc.reactivate** - the specified microprocess will be (re)activated.
-  The scheduler uses this internally to pick up where it left off when a
-  Axon.Ipc.WaitComplete instigated detour finishes (see above).
 
   
 
@@ -169,6 +199,72 @@ depending on the exact moment it is called!
 
 Both these methods are thread safe.
 
+Rather than asking, something can be told as microprocesses are activated and
+terminate, by subscribing to Axon.Topology.changes. The scheduler announces
+each microprocess when it first adds it to those it runs, and again once it
+has finished (after stop() and _closeDownMicroprocess() have been called).
+
+
+
+Runtime statistics
+------------------
+
+The scheduler can record statistics about each microprocess as it runs. This
+is switched off by default. Switch it on with::
+
+    scheduler.run.recordStats()
+
+From then on, for each microprocess, it records how many timeslices it has been
+given, the total and longest time spent in a single one, how many times it has
+been woken after being paused, and the total time spent paused. Components also
+count the messages they send and receive (see
+Axon.Component.component.setMessageCounting()), and the bytes waiting in any
+inboxes that are counting them are totalled (see Axon.Box.postbox.accountBytes()).
+
+The stats() method returns what has been recorded, for one microprocess or for
+all of them. It is thread safe. Axon.StatsReporter.StatsReporter is a component
+that regularly sends them out of an outbox.
+
+Whilst switched on, each timeslice costs two extra reads of the clock and a
+few attribute updates, and each send() or recv() one extra increment. Whilst
+switched off, nothing is recorded and the only cost is one test per timeslice.
+
+
+
+Priorities
+----------
+
+Each microprocess is run at a priority level. Normally this is
+scheduler.NORMAL, but it can be set when activating it::
+
+    BatchEncoder().activate(priority=scheduler.LOW)
+
+or by a class attribute, for every instance of a component::
+
+    class NetworkHandler(component):
+        priority = scheduler.HIGH
+
+Levels are just numbers - scheduler.HIGH, NORMAL and LOW are 1, 0 and -1. The
+scheduler keeps a run queue for each level, and in each cycle runs the higher
+priority queues first. A microprocess woken during a cycle is run in the next
+one, so at most one cycle after it is woken.
+
+To keep each cycle short whilst a lot of lower priority work is waiting, a level
+can be given a quota: the most microprocesses at that priority that will be
+run in each cycle. The rest wait, in turn, for later cycles. By default
+scheduler.LOW has a quota of 10. Change it (or set one for any other level)
+with::
+
+    scheduler.run.setQuota(scheduler.LOW, 50)
+
+A quota can't be less than 1, so lower priority work is never starved - it is
+just spread out more thinly. Note that priorities cannot preempt a timeslice: a
+component that takes a long time to yield still holds up everything else.
+
+Whilst recording runtime statistics, the statsByPriority() method returns
+statistics for each level - the timeslices run, time spent running them, and
+the total and longest time from a microprocess being woken to being run.
+
 
 
 Slowing down execution (for debugging)
@@ -194,20 +290,23 @@ The scheduler keeps the following internal state:
 * **threads** - a dictionary containing the state of activated microprocesses
   (whether they are awake or not)
 
-* **wakeRequests** and **pauseRequests** - the thread safe queues of requests to
-  wake and pause individual microprocesses
+* **wakeRequests** and **pauseRequests** - the thread safe queues (deques) of
+  requests to wake and pause individual microprocesses
+
+* **quotas** - the most microprocesses run per cycle for each priority level
+  that has a limit
 
 * Internal to the main() generator:
     
-  * **runqueue** - the list of active and awake microprocesses being run
-
-  * **nextrunqueue** - the list of microprocesses to be run next time round
+  * **runqueues** - a run queue (deque) of active and awake microprocesses for
+    each priority level
 
-The scheduler uses a simple round robin approach - it walks through its run
-queue and calls the next() method of each microprocess in turn. As it goes, it
-builds a new run queue, ready for the next cycle. If a microprocess terminates
-(raises a StopIteration exception) then it is not included in the next cycle's
-run queue.
+The scheduler uses a simple round robin approach - it walks through each run
+queue in turn, highest priority first, and calls the next() method of each
+microprocess in it that was there at the start of the cycle (up to the quota,
+if there is one). As it goes, it puts each one back on the end of its run queue,
+ready for the next cycle. If a microprocess terminates (raises a StopIteration
+exception) then it is not put back.
 
 After it has gone through all microprocesses, the scheduler then processes
 messages in its wakeRequests and sleepRequests queues. Sleep requests are
@@ -223,7 +322,7 @@ Microprocesses are all in one of three possible states (recorded in the
   prepared for the next execution cycle.
 
 * **SLEEPING** - the microprocess is asleep/paused. It should *not* be in the
-  run queue for the next cycle.
+  run queue.
 
 * **GOINGTOSLEEP** - the microprocess has been requested to be put to sleep.
 
@@ -234,9 +333,8 @@ A request to put a microprocess to sleep is handled as follows:
 * If the microprocess is *active*, then it is changed to "going to sleep". It
   is not removed from the run queue immediately. Instead, what happens is:
 
-   * on the next cycle of execution, as the scheduler goes through items in the
-     run queue, it doesn't execute any that are "going to sleep" and doesn't
-     include them in the next run queue it is building. It also sets them to the
+   * when the scheduler next reaches it in the run queue, it doesn't execute it
+     and doesn't put it back on the run queue. It also sets it to the
      "sleeping" state,
 
 Wake requests are used to both wake up sleeping microprocesses and also to
@@ -244,8 +342,8 @@ activate new ones. A request to wake a microprocess is handled like this:
 
 * If the microprocess is already *active*, then nothing needs to happen.
 
-* If the microprocess is *sleeping* then it is added to the next run queue and
-  changed to be *active*.
+* If the microprocess is *sleeping* then it is added to the run queue for its
+  priority and changed to be *active*.
 
 * If the microprocess is *going to sleep* then it is only changed to be *active*
   (it will already be in the run queue, so doesn't need to be added)
@@ -257,19 +355,28 @@ request, then this also happens:
   both the run queue and ``threads``. It is set to be *active*.
 
 This three state system is a performance optimisation: it means that the
-scheduler does not need to waste time searching through the next run queue to
-remove items - they simply get removed on the next cycle of execution.
+scheduler does not need to waste time searching through the run queue to
+remove items - they simply get removed when next reached.
 
 Wake requests and sleep requests are handled through thread-safe queues. This
 enables other threads of execution (eg. threaded components) to safely make
 requests to wake or pause components.
 
+If every microprocess is sleeping, runThreads() blocks until a wake request
+arrives from another thread, or until the next WaitUntil/Sleep deadline. It
+does not periodically poll. Whilst blocked, the scheduler sets a flag so that
+wakeThread() knows to notify it (through a threading.Condition). At all other
+times - including every wake made from within the scheduler's own thread -
+wakeThread() simply appends to the wakeRequests deque, without taking any lock.
+
 
 
 """
 import time
 import gc as _gc
 import os
+import threading
+from collections import deque
 
 from Axon.util import removeAll
 from Axon.idGen import strId, numId
@@ -277,11 +384,12 @@ from Axon.debug import debug
 from Axon.Microprocess import microprocess
 from Axon.Base import AxonObject as _AxonObject
 from Axon.Ipc import *
+from Axon.TimerWheel import TimerWheel
+from Axon.Box import inboxBytes as _inboxBytes
+import Axon.Topology as _Topology
 try:
-    import Queue as queue
     vrange = xrange
-except ImportError:
-    import queue
+except NameError:
     vrange = range
 
 from Axon.util import next
@@ -291,6 +399,70 @@ def _sort(somelist):
    a.sort()
    return a
 
+_clock = getattr(time, "perf_counter", time.time)
+
+class microprocessStats(object):
+   """\
+   microprocessStats() -> new microprocessStats object.
+
+   Runtime statistics the scheduler records for a microprocess, whilst
+   recording is switched on (see scheduler.recordStats()). Times are in seconds.
+   """
+   __slots__ = [ "timeslices", "runtime", "maxruntime", "wakeups", "pausedtime", "pausedsince", "wokensince" ]
+   def __init__(self):
+      self.timeslices = 0     # number of times next() has been called
+      self.runtime = 0.0      # total wall clock time spent in next()
+      self.maxruntime = 0.0   # longest single call to next()
+      self.wakeups = 0        # number of times woken after being paused
+      self.pausedtime = 0.0   # total time spent paused (not counting now)
+      self.pausedsince = None # when last paused, if paused now
+      self.wokensince = None  # when last woken, if not run since
+
+   def snapshot(self, mprocess, now):
+      """Returns the statistics as a dictionary, including those counted by mprocess itself"""
+      pausedtime = self.pausedtime
+      if self.pausedsince is not None:
+         pausedtime += now - self.pausedsince
+      return { "name"       : mprocess.name,
+               "timeslices" : self.timeslices,
+               "runtime"    : self.runtime,
+               "maxruntime" : self.maxruntime,
+               "wakeups"    : self.wakeups,
+               "pausedtime" : pausedtime,
+               "paused"     : self.pausedsince is not None,
+               "priority"   : getattr(mprocess, "priority", 0),
+               "sent"       : getattr(mprocess, "messagesSent", 0),
+               "received"   : getattr(mprocess, "messagesReceived", 0),
+               "inboxbytes" : _inboxBytes(getattr(mprocess, "inboxes", {})),
+             }
+
+class priorityStats(object):
+   """\
+   priorityStats() -> new priorityStats object.
+
+   Runtime statistics the scheduler records for all the microprocesses run at
+   a priority level, whilst recording is switched on (see
+   scheduler.recordStats()). Times are in seconds.
+   """
+   __slots__ = [ "timeslices", "runtime", "maxruntime", "wakeups", "latency", "maxlatency" ]
+   def __init__(self):
+      self.timeslices = 0     # number of times next() has been called
+      self.runtime = 0.0      # total wall clock time spent in next()
+      self.maxruntime = 0.0   # longest single call to next()
+      self.wakeups = 0        # number of times a microprocess was run after being woken
+      self.latency = 0.0      # total time from being woken to being run
+      self.maxlatency = 0.0   # longest time from being woken to being run
+
+   def snapshot(self):
+      """Returns the statistics as a dictionary"""
+      return { "timeslices" : self.timeslices,
+               "runtime"    : self.runtime,
+               "maxruntime" : self.maxruntime,
+               "wakeups"    : self.wakeups,
+               "latency"    : self.latency,
+               "maxlatency" : self.maxlatency,
+             }
+
 _ACTIVE       = object()     # microprocess is active (is in the runqueue)
 _SLEEPING     = object()     # microprocess is paused (is not in the runqueue)
 _GOINGTOSLEEP = object()     # microprocess to be paused (should be removed from the runqueue)
@@ -299,6 +471,17 @@ class scheduler(microprocess):
    """Scheduler - runs microthreads of control."""
    run = None
    wait_for_one = False
+
+   # priority levels; higher priority run queues are run first in each cycle
+   HIGH = 1
+   NORMAL = 0
+   LOW = -1
+   tracer = None         # Axon.Trace.TraceRecorder, whilst tracing (see Axon.Trace)
+   _current = None       # microprocess being run, whilst tracing
+   _currentThread = None # thread running it
+
+   # methods that Axon.Trace swaps for _trace_... versions whilst tracing
+   _tracingHooks = [ "wakeThread", "pauseThread" ]
    def __init__(self, **argd):
       """Creates a scheduler object. If scheduler.run has not been set, sets it.
       Class initialisation ensures that this object/class attribute is initialised - client
@@ -318,11 +501,19 @@ class scheduler(microprocess):
       self.time = time.time()
       
       self.threads = {}    # current set of threads and their states (whether sleeping, or running)
-      self.stopRequests = queue.Queue()
-      self.wakeRequests = queue.Queue()
-      self.pauseRequests = queue.Queue()
+      self.stopRequests = deque()
+      self.wakeRequests = deque()
+      self.pauseRequests = deque()
+      self.blocked = False  # True whilst main() is blocked waiting for a wake request
+      self.blockCondition = threading.Condition()
       self.exception_caught = StopIteration
       self.debuggingon = False
+      self.timers = TimerWheel(now=self.time)
+      self.timedWaits = {}  # microprocess -> handle for its timer in self.timers
+      self.loop = None      # asyncio event loop, whilst running in one (see runInLoop())
+      self.mpstats = None   # microprocess -> microprocessStats, whilst recording (see recordStats())
+      self.prioritystats = {}   # priority -> priorityStats, used whilst recording
+      self.quotas = { scheduler.LOW : 10 }  # priority -> most timeslices run per cycle (see setQuota())
       if self.wait_for_one:
          self.extra = 1
       else:
@@ -349,7 +540,53 @@ class scheduler(microprocess):
       If the microprocess is not running yet then it will be woken if (and only if)
       canActivate is set to True (the default is False).
       """
-      self.wakeRequests.put( (mprocess, canActivate) )
+      self.wakeRequests.append( (mprocess, canActivate) )
+      if self.blocked:
+         self._notifyBlocked()
+
+   def _notifyBlocked(self):
+      """Wakes main() if it is blocked waiting for a wake request"""
+      loop = self.loop
+      if loop is not None:
+         loop.call_soon_threadsafe(self._resumeInLoop)
+         return
+      self.blockCondition.acquire()
+      try:
+         self.blockCondition.notify()
+      finally:
+         self.blockCondition.release()
+
+   def _block(self):
+      """\
+      Blocks until a wake or stop request arrives, or until the next timer is
+      due. Doesn't block at all if there are requests already waiting.
+
+      Whilst running in an asyncio event loop, this returns straight away,
+      leaving self.blocked set, and runInLoop() stops stepping main() until
+      _resumeInLoop() is called.
+      """
+      if self.loop is not None:
+         self.blocked = True
+         # checked after setting the flag, for the same reason as below
+         if self.wakeRequests or self.stopRequests:
+            self.blocked = False
+         return
+      deadline = self.timers.nextDeadline()
+      self.blockCondition.acquire()
+      try:
+         self.blocked = True
+         # checked *after* setting the flag, so a request made just before
+         # will be seen, and one made just after will notify us
+         if not self.wakeRequests and not self.stopRequests:
+            if deadline is None:
+               self.blockCondition.wait()
+            else:
+               timeout = deadline - time.time()
+               if timeout > 0:
+                  self.blockCondition.wait(timeout)
+      finally:
+         self.blocked = False
+         self.blockCondition.release()
       
    def pauseThread(self, mprocess):
        """\
@@ -358,7 +595,34 @@ class scheduler(microprocess):
        If active, or already sleeping, the specified microprocess will be put
        to leep on the next cycle through the scheduler.
        """
-       self.pauseRequests.put( mprocess )
+       self.pauseRequests.append( mprocess )
+
+   # Axon.Trace swaps the _trace_... versions of these in (the originals are
+   # kept as _notrace_wakeThread and _notrace_pauseThread)
+   _notrace_wakeThread = wakeThread
+   _notrace_pauseThread = pauseThread
+
+   def _trace_wakeThread(self, mprocess, canActivate=False):
+      tracer = self.tracer
+      if tracer is not None:
+         tracer.wake(mprocess, self._waker())
+      scheduler._notrace_wakeThread(self, mprocess, canActivate)
+
+   def _trace_pauseThread(self, mprocess):
+      tracer = self.tracer
+      if tracer is not None:
+         tracer.pause(mprocess)
+      scheduler._notrace_pauseThread(self, mprocess)
+
+   def _waker(self):
+      """\
+      Returns the microprocess running in this scheduler, if called from its
+      thread whilst tracing, otherwise the current thread.
+      """
+      thread = threading.current_thread()
+      if thread is self._currentThread and self._current is not None:
+         return self._current
+      return thread
 
    def isThreadPaused(self, mprocess):
        """\
@@ -368,6 +632,195 @@ class scheduler(microprocess):
        return self.threads.get(mprocess, _SLEEPING) == _SLEEPING
        # doesn't include _GOINGTOSLEEP (inference is the thread isn't asleep yet!)
    
+   def _waitUntil(self, mprocess, when):
+       """\
+       Sets a timer to wake the specified microprocess at the specified time,
+       replacing any timer it already had.
+       """
+       timer = self.timedWaits.get(mprocess, None)
+       if timer is not None:
+           timer.cancel()
+       self.timedWaits[mprocess] = self.timers.add(when, mprocess)
+
+   def _waitFuture(self, mprocess, waitfor):
+       """\
+       Arranges for the specified microprocess to be woken when the future
+       in the WaitFuture ipc message is done. If given a coroutine (or other
+       awaitable) rather than a future, it is first wrapped in an asyncio task.
+
+       Returns False, without arranging anything, if it is already done.
+       """
+       future = waitfor.future
+       if not hasattr(future, "add_done_callback"):
+           import asyncio
+           future = waitfor.future = asyncio.ensure_future(future, loop=self.loop)
+       if future.done():
+           return False
+       future.add_done_callback(lambda future : self.wakeThread(mprocess))
+       return True
+
+   def _wakeTimedOut(self):
+       """\
+       Submits requests to wake microprocesses whose timers have expired.
+       Returns True if there were any.
+       """
+       expired = self.timers.expire(time.time())
+       for mprocess in expired:
+           del self.timedWaits[mprocess]
+           self.wakeRequests.append( (mprocess, False) )
+       return len(expired) > 0
+
+   def recordStats(self, recording=True):
+       """\
+       Switches recording of runtime statistics for each microprocess on (or
+       off). Also switches counting of messages sent and received by
+       components on (or off) - see Axon.Component.component.setMessageCounting().
+
+       Switching it off discards the statistics recorded so far.
+       """
+       import Axon.Component
+       if recording:
+           if self.mpstats is None:
+               self.prioritystats = {}
+               self.mpstats = {}
+       else:
+           self.mpstats = None
+       Axon.Component.component.setMessageCounting(recording)
+
+   def stats(self, mprocess=None):
+       """\
+       Returns the runtime statistics recorded for the specified microprocess,
+       as a dictionary (or None if there aren't any). If no microprocess is
+       specified, returns a dictionary mapping each microprocess to its
+       statistics. Thread safe.
+
+       The statistics are:
+
+       - name        -- the microprocess's name
+       - timeslices  -- number of timeslices it has been given
+       - runtime     -- total time spent running them (seconds)
+       - maxruntime  -- longest time spent running a single one (seconds)
+       - wakeups     -- number of times it has been woken after being paused
+       - pausedtime  -- total time spent paused (seconds)
+       - paused      -- True if it is paused now
+       - priority    -- the priority it is run at
+       - sent        -- number of messages it has sent (if a component)
+       - received    -- number of messages it has received (if a component)
+       - inboxbytes  -- bytes waiting in its inboxes, or None if they are not counting them (see Axon.Box.postbox.accountBytes())
+
+       Only microprocesses that have run since recording was switched on, and
+       have not yet terminated, have statistics.
+       """
+       mpstats = self.mpstats
+       if mpstats is None:
+           return {} if mprocess is None else None
+       now = _clock()
+       if mprocess is not None:
+           stats = mpstats.get(mprocess)
+           return stats and stats.snapshot(mprocess, now)
+       return dict( (mp, stats.snapshot(mp, now)) for mp, stats in list(mpstats.items()) )
+
+   def statsByPriority(self):
+       """\
+       Returns the runtime statistics recorded for each priority level, as a
+       dictionary mapping each priority to a dictionary of statistics. Thread
+       safe.
+
+       The statistics are for all microprocesses run at that priority:
+
+       - timeslices  -- number of timeslices they have been given
+       - runtime     -- total time spent running them (seconds)
+       - maxruntime  -- longest time spent running a single one (seconds)
+       - wakeups     -- number of times one has been run after being woken
+       - latency     -- total time from being woken to being run (seconds)
+       - maxlatency  -- longest time from being woken to being run (seconds)
+       """
+       if self.mpstats is None:
+           return {}
+       return dict( (priority, stats.snapshot()) for priority, stats in list(self.prioritystats.items()) )
+
+   def setQuota(self, priority, timeslices=None):
+       """\
+       Limits how many microprocesses at the specified priority are run in each
+       cycle. Any others wait until the next cycle. None means no limit.
+
+       So that no priority level can be starved, the limit must be at least 1.
+       """
+       if timeslices is None:
+           self.quotas.pop(priority, None)
+       elif timeslices < 1:
+           raise ValueError("Quota must be at least 1 timeslice per cycle")
+       else:
+           self.quotas[priority] = timeslices
+
+   def _enqueue(self, runqueues, mprocess):
+       """Adds the specified microprocess to the back of the run queue for its priority"""
+       priority = getattr(mprocess, "priority", 0)
+       runqueue = runqueues.get(priority)
+       if runqueue is None:
+           runqueue = runqueues[priority] = deque()
+       runqueue.append(mprocess)
+
+   def _instrumentedNext(self, mprocess, priority):
+       """\
+       Runs a timeslice of the specified microprocess, recording how long it
+       took in its statistics (if recording them) and in the trace (if tracing).
+       """
+       mpstats = self.mpstats
+       stats = None
+       if mpstats is not None:
+           stats = mpstats.get(mprocess)
+           if stats is None:
+               stats = mpstats[mprocess] = microprocessStats()
+           levelstats = self.prioritystats.get(priority)
+           if levelstats is None:
+               levelstats = self.prioritystats[priority] = priorityStats()
+       tracer = self.tracer
+       if tracer is not None:
+           self._current = mprocess
+           self._currentThread = threading.current_thread()
+       start = _clock()
+       try:
+           return next(mprocess)
+       finally:
+           end = _clock()
+           self._current = None
+           if stats is not None:
+               elapsed = end - start
+               stats.timeslices += 1
+               stats.runtime += elapsed
+               if elapsed > stats.maxruntime:
+                   stats.maxruntime = elapsed
+               levelstats.timeslices += 1
+               levelstats.runtime += elapsed
+               if elapsed > levelstats.maxruntime:
+                   levelstats.maxruntime = elapsed
+               if stats.wokensince is not None:
+                   latency = start - stats.wokensince
+                   stats.wokensince = None
+                   levelstats.wakeups += 1
+                   levelstats.latency += latency
+                   if latency > levelstats.maxlatency:
+                       levelstats.maxlatency = latency
+           if tracer is not None:
+               tracer.timeslice(mprocess, start, end)
+
+   def _statsPaused(self, mprocess, mpstats):
+       """Records that the specified microprocess has been paused"""
+       stats = mpstats.get(mprocess)
+       if stats is not None:
+           stats.pausedsince = _clock()
+
+   def _statsWoken(self, mprocess, mpstats):
+       """Records that the specified microprocess has been woken"""
+       stats = mpstats.get(mprocess)
+       if stats is not None and stats.pausedsince is not None:
+           now = _clock()
+           stats.wakeups += 1
+           stats.pausedtime += now - stats.pausedsince
+           stats.pausedsince = None
+           stats.wokensince = now
+
    def listAllThreads(self):
        """Returns a list of all microprocesses (both active and sleeping)"""
        self.debuggingon = True
@@ -439,14 +892,15 @@ class scheduler(microprocess):
        slowmo specifies a delay (in seconds) before the main loop is run.
        slowmo defaults to 0.
        
-       If canblock is True, this generator will briefly) block if there are
-       no active microprocesses, otherwise it will return immediately (default).
+       If canblock is True, this generator will block if there are no active
+       microprocesses (until one is woken, or the next WaitUntil/Sleep deadline),
+       otherwise it will return immediately (default).
        
        This generator terminates when there are no microprocesses left (either
        sleeping or awake) because they've all terminated. (or because there were
        none to begin with!)
        """
-       nextrunqueue = []
+       runqueues = {}   # priority -> deque of microprocesses to be run
        running = True
        exception_caught = self.exception_caught
        
@@ -463,49 +917,74 @@ class scheduler(microprocess):
            
            self.time = now   # set "time" attribute for benefit for microprocesses
            
-           runqueue = nextrunqueue
-           nextrunqueue = []
+           mpstats = self.mpstats
+           instrumented = mpstats is not None or self.tracer is not None
            
-           # run microprocesses in the runqueue
-#           if self.debuggingon:
-#               print("-->", [ x.name for x in self.threads], [ x.name for x in runqueue])
-           for mprocess in runqueue:
+           # run microprocesses in the runqueues, highest priority first. Only
+           # those queued at the start of the cycle are run (up to the quota for
+           # that priority); those still active go back on the end of the queue
+           for priority in sorted(runqueues, reverse=True):
+               runqueue = runqueues[priority]
+               torun = len(runqueue)
+               quota = self.quotas.get(priority)
+               if quota is not None and quota < torun:
+                   torun = quota
 #               if self.debuggingon:
-#                   print("Before Run", mprocess)
+#                   print("-->", [ x.name for x in self.threads], [ x.name for x in runqueue])
+               for _ in vrange(torun):
+                   mprocess = runqueue.popleft()
+#                   if self.debuggingon:
+#                       print("Before Run", mprocess)
 
-               yield 1
+                   yield 1
                
-               if self.threads[mprocess] == _ACTIVE:
-                   try:
-#                       result = mprocess.next()
-                       result = next(mprocess)
+                   if self.threads[mprocess] == _ACTIVE:
+                       try:
+#                           result = mprocess.next()
+                           if not instrumented:
+                               result = next(mprocess)
+                           else:
+                               result = self._instrumentedNext(mprocess, priority)
                        
-                       if isinstance(result, newComponent):
-                           for c in result.components():
-                               c.activate()
-                       if isinstance(result, WaitComplete):
-                           tag = result.argd.get("tag","")
-                           if tag == "":
-                              tag = "__" + mprocess.name[-10:] # So we have a clue of parentage(!)
-                           newThread = microprocess(result.args[0], reactivate(mprocess), tag = tag )
-                           newThread.activate()
+                           if isinstance(result, newComponent):
+                               for c in result.components():
+                                   c.activate()
+                           if isinstance(result, WaitUntil):
+                               if result.when > time.time():
+                                   self._waitUntil(mprocess, result.when)
+                                   self.threads[mprocess] = _SLEEPING
+                                   if mpstats is not None:
+                                       self._statsPaused(mprocess, mpstats)
+                                   mprocess = None
+                           if isinstance(result, WaitFuture):
+                               if self._waitFuture(mprocess, result):
+                                   self.threads[mprocess] = _SLEEPING
+                                   if mpstats is not None:
+                                       self._statsPaused(mprocess, mpstats)
+                                   mprocess = None
+#                           if self.debuggingon:
+#                               print("After Run", mprocess)
+                           if mprocess:
+                               runqueue.append(mprocess)
+                       except exception_caught:
                            del self.threads[mprocess]
-                           mprocess = None
-                           
-#                       if self.debuggingon:
-#                           print("After Run", mprocess)
-                       if mprocess:
-                           nextrunqueue.append(mprocess)
-                   except exception_caught:
-                       del self.threads[mprocess]
-                       mprocess.stop()
-                       knockon = mprocess._closeDownMicroprocess()
-                       self.handleMicroprocessShutdownKnockon(knockon)
-               else:
-                   # state is _GOINGTOSLEEP or _SLEEPING
-                   # so should *not* execute this one and leave it out of the
-                   # next run queue
-                   self.threads[mprocess] = _SLEEPING
+                           timer = self.timedWaits.pop(mprocess, None)
+                           if timer is not None:
+                               timer.cancel()
+                           if mpstats is not None:
+                               mpstats.pop(mprocess, None)
+                           mprocess.stop()
+                           knockon = mprocess._closeDownMicroprocess()
+                           self.handleMicroprocessShutdownKnockon(knockon)
+                           if _Topology.changes.subscribers:
+                               _Topology.changes.emit(_Topology.TERMINATED, mprocess)
+                   else:
+                       # state is _GOINGTOSLEEP or _SLEEPING
+                       # so should *not* execute this one and leave it out of the
+                       # next run queue
+                       self.threads[mprocess] = _SLEEPING
+                       if mpstats is not None:
+                           self._statsPaused(mprocess, mpstats)
 
            # make sure, even if there weren't any micprocesses active, we yield
            # control at least once
@@ -513,55 +992,66 @@ class scheduler(microprocess):
            
            # process pause requests first - to prevent deadlock, we do
            # wakeup requests second - safer to leave a thread awake than asleep
-           while not self.pauseRequests.empty():
-               mprocess = self.pauseRequests.get()
+           while self.pauseRequests:
+               mprocess = self.pauseRequests.popleft()
                # only sleep if we're actually in the set of threads(!)
                # otherwise it inadvertently gets added!
 #               if self.threads.has_key(mprocess):
-               if mprocess in self.threads:
+               # and only if awake - marking one that is already asleep as
+               # going to sleep would mean a later wake request is ignored
+               if self.threads.get(mprocess) is _ACTIVE:
                    self.threads[mprocess] = _GOINGTOSLEEP
                # marked as going to sleep, rather than asleep since mprocess
                # is still in runqueue (more efficient to leave it to be
                # removed when we iterate through the runqueue)
            
-           allsleeping = len(self.threads) > 0 and len(nextrunqueue) == 0
+           # wake microprocesses whose WaitUntil/Sleep has expired
+           if self.timedWaits:
+               self._wakeTimedOut()
+
+           allsleeping = len(self.threads) > 0 and not any(runqueues.values())
            
-           while (allsleeping and canblock) or not self.wakeRequests.empty():
+           while (allsleeping and canblock) or self.wakeRequests:
                
                # process requests to wake threads
-               try:
-                    # wait for wakeup requests, blocks but with a
-                    # modest timeout so we still regularly yield (in case this
-                    # is a microprocess running in another scheduler)
-                    mprocess, canActivate = self.wakeRequests.get(True,0.01)
+               if self.wakeRequests:
+                    mprocess, canActivate = self.wakeRequests.popleft()
                     self.extra = 0   # Fix for race hazard regarding wait_for_one, esp problem with threaded components
                     try:
                         currentstate = self.threads[mprocess]
                         if currentstate == _SLEEPING:
-                            nextrunqueue.append(mprocess)
+                            self._enqueue(runqueues, mprocess)
+                            if mpstats is not None:
+                                self._statsWoken(mprocess, mpstats)
                         allsleeping = False
                         self.threads[mprocess] = _ACTIVE
                     except KeyError:
                         # not activated, can we?
                         if canActivate:
-                            nextrunqueue.append(mprocess)
+                            self._enqueue(runqueues, mprocess)
                             self.threads[mprocess] = _ACTIVE
                             allsleeping = False
-
-               except queue.Empty:
-                    # catch timeout
-                    pass
-               if not self.stopRequests.empty():
+                            if _Topology.changes.subscribers:
+                                _Topology.changes.emit(_Topology.ACTIVATED, mprocess)
+               else:
+                    # nothing to do until another thread wakes something, or
+                    # a WaitUntil/Sleep is due
+                    self._block()
+                    # lets runInLoop() return control to the event loop
+                    yield 1
+                    if self.timedWaits:
+                        self._wakeTimedOut()
+               if self.stopRequests:
 #                   print("Do we get here? 1")
                    break
 
-           if not self.stopRequests.empty():
+           if self.stopRequests:
 #               print("Do we get here? 2")
                break
 #           print("len(self.threads), wakeRequests" , len(self.threads), self.wakeRequests)
            running = len(self.threads) + self.extra
 
-       if not self.stopRequests.empty():
+       if self.stopRequests:
 #           print("WE GOT HERE! :-)")
            for X in self.threads:
 #               print("We now call .stop() on ", X.name, type(X))
@@ -570,7 +1060,9 @@ class scheduler(microprocess):
 
    def stop(self):
 #       print("ADDING STOP REQUEST")
-       self.stopRequests.put( self )
+       self.stopRequests.append( self )
+       if self.blocked:
+           self._notifyBlocked()   # interrupt any blocking wait
        super(scheduler, self).stop()
 
    def runThreads(self,slowmo=0):
@@ -587,6 +1079,79 @@ class scheduler(microprocess):
       """
       for i in self.main(slowmo,canblock=True): pass
 
+   def runInLoop(self, loop=None, slicesize=100):
+      """\
+      Runs the scheduler inside an asyncio event loop, taking turns with
+      everything else the loop is doing, until there are no activated
+      microprocesses left (they've all terminated).
+
+      Returns an asyncio future that is done when the scheduler finishes (or
+      has the exception that stopped it). So from a coroutine::
+
+          await scheduler.run.runInLoop()
+
+      Keyword arguments:
+
+      - loop       -- Optional. The asyncio event loop to run in. (default=the running loop)
+      - slicesize  -- Optional. How many steps to run the scheduler for, before letting the loop run other callbacks (default=100)
+      """
+      import asyncio
+      if loop is None:
+         loop = asyncio.get_running_loop()
+      if self.loop is not None:
+         raise RuntimeError("Scheduler is already running in an event loop")
+      self.loop = loop
+      self._slice = self.main(canblock=True)
+      self._slicesize = slicesize
+      self._resumeTimer = None
+      self._finished = loop.create_future()
+      loop.call_soon(self._runSlice)
+      return self._finished
+
+   def _runSlice(self):
+      """\
+      Called by the event loop to run up to self._slicesize steps of main().
+      Asks to be called again straight away if there is more to do. If all
+      microprocesses are paused (main() has called _block()) then it is left
+      to _resumeInLoop() to start things again - when a microprocess is woken,
+      or at the next WaitUntil/Sleep deadline.
+      """
+      try:
+         for i in vrange(self._slicesize):
+            next(self._slice)
+            if self.blocked:
+               deadline = self.timers.nextDeadline()
+               if deadline is not None:
+                  self._resumeTimer = self.loop.call_later(max(0, deadline - time.time()), self._resumeInLoop)
+               return
+      except StopIteration:
+         self._finishInLoop(None)
+         return
+      except Exception as e:
+         self._finishInLoop(e)
+         return
+      self.loop.call_soon(self._runSlice)
+
+   def _resumeInLoop(self):
+      """Called by the event loop to start running main() again when idle"""
+      if not self.blocked:
+         return     # already running, or asked more than once
+      self.blocked = False
+      if self._resumeTimer is not None:
+         self._resumeTimer.cancel()
+         self._resumeTimer = None
+      self._runSlice()
+
+   def _finishInLoop(self, exception):
+      """Finishes running in the event loop, completing the future runInLoop() returned"""
+      self.loop = None
+      self.blocked = False
+      self._slice = None
+      if exception is None:
+         self._finished.set_result(None)
+      else:
+         self._finished.set_exception(exception)
+
 microprocess.setSchedulerClass(scheduler)
 scheduler() # Initialise the class.
 
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+"""\
+==========================================
+Reporting runtime statistics of components
+==========================================
+
+The StatsReporter component switches on the recording of runtime statistics
+by its scheduler (see Axon.Scheduler.scheduler.recordStats()) and regularly
+sends out what has been recorded for every microprocess - how many timeslices
+each has been given and how long they took, how often it has been woken and
+how long it has spent paused, and how many messages it has sent and received.
+
+
+
+Example Usage
+-------------
+
+Print statistics every 5 seconds::
+
+    MyComplexSystem().activate()
+
+    Pipeline( StatsReporter(interval=5.0),
+              ConsoleEchoer(),
+            ).run()
+
+
+
+More detail
+-----------
+
+Every interval seconds, a list of dictionaries is sent out of the "outbox"
+outbox - one per microprocess, sorted by name. The keys are those returned
+by Axon.Scheduler.scheduler.stats(): "name", "timeslices", "runtime",
+"maxruntime", "wakeups", "pausedtime", "paused", "priority", "sent",
+"received" and "inboxbytes". All values (except "paused", "priority" and
+"inboxbytes", which are as they are now) are totals since recording started,
+or since the microprocess was activated if that was later.
+
+Recording is left switched on when this component terminates.
+
+This component ignores anything arriving at its "inbox" inbox.
+
+If a shutdownMicroprocess or producerFinished message is received on the
+"control" inbox, it is sent on to the "signal" outbox and the component will
+terminate.
+"""
+
+import time
+
+import Axon.Component as Component
+import Axon.Scheduler as Scheduler
+import Axon.Ipc as Ipc
+
+class StatsReporter(Component.component):
+    """\
+    StatsReporter([interval]) -> new StatsReporter component.
+
+    Regularly outputs the runtime statistics recorded by the scheduler for
+    each microprocess.
+
+    Keyword arguments:
+
+    - interval  -- seconds between each output (default=1.0)
+    """
+
+    Inboxes  = { "inbox"   : "NOT USED",
+                 "control" : "Shutdown signalling",
+               }
+    Outboxes = { "outbox" : "Lists of statistics, one dictionary per microprocess",
+                 "signal" : "Shutdown signalling",
+               }
+
+    def __init__(self, interval=1.0):
+        super(StatsReporter, self).__init__()
+        self.interval = interval
+
+    def main(self):
+        """Main loop."""
+        if isinstance(self.scheduler, Scheduler.scheduler):
+            self.scheduler.recordStats()
+        nextreport = time.time() + self.interval
+        while 1:
+            while self.dataReady("control"):
+                msg = self.recv("control")
+                if isinstance(msg, (Ipc.shutdownMicroprocess, Ipc.producerFinished)):
+                    self.send(msg, "signal")
+                    return
+
+            if time.time() >= nextreport:
+                nextreport += self.interval
+                stats = list(self.scheduler.stats().values())
+                stats.sort(key=lambda stat : stat["name"])
+                self.send(stats, "outbox")
+
+            yield Ipc.WaitUntil(nextreport)
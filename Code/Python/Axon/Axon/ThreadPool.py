@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+"""\
+=============================================
+ThreadPool - a bounded pool of shared threads
+=============================================
+
+A ThreadPool runs tasks (callables) on a limited number of threads, which are
+shared between them. Threaded components can be asked to run their main()
+method on a ThreadPool, rather than on a thread of their own - see
+Axon.ThreadedComponent.
+
+
+
+Example Usage
+-------------
+
+::
+
+    pool = ThreadPool(maxthreads=16)
+
+    for request in requests:
+        RequestHandler(request, threadpool=pool).activate()
+
+or, to use the default pool, shared by everything in the process::
+
+    RequestHandler(request, threadpool=True).activate()
+
+
+
+Behaviour
+---------
+
+submit(task) queues a task (a callable that takes no arguments) to be run. If
+all the pool's threads are busy, and there are fewer than 'maxthreads' of them,
+another thread is started to run it. Otherwise it waits until a thread is free.
+Tasks are started in the order they were submitted.
+
+Threads that have been idle for 'idletimeout' seconds exit, so a pool only
+holds on to as many threads as it has recently needed.
+
+An exception raised by a task is printed (to stderr) and otherwise ignored -
+the thread goes on to run the next task.
+
+Because the number of threads is limited, a task that blocks waiting for
+another task that has not yet started may wait forever. Don't run things that
+depend on each other in the same pool, unless it has enough threads for all of
+them.
+
+threads() returns the number of threads in the pool; waiting() the number of
+tasks that have been submitted but not yet started.
+
+getDefaultPool() returns the default ThreadPool (with DefaultPoolSize threads),
+creating it if need be.
+"""
+
+import sys
+import threading
+import traceback
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+DefaultPoolSize = 32
+DefaultIdleTimeout = 30.0
+
+class ThreadPool(object):
+    """\
+    ThreadPool([maxthreads][,idletimeout]) -> new ThreadPool object.
+
+    Runs tasks submitted to it on up to 'maxthreads' shared threads.
+
+    Keyword arguments:
+
+    - maxthreads   -- maximum number of threads (default=DefaultPoolSize)
+    - idletimeout  -- seconds a thread waits for a task before exiting (default=DefaultIdleTimeout)
+    """
+    def __init__(self, maxthreads=DefaultPoolSize, idletimeout=DefaultIdleTimeout):
+        super(ThreadPool, self).__init__()
+        if maxthreads < 1:
+            raise ValueError("A ThreadPool needs at least one thread")
+        self.maxthreads = maxthreads
+        self.idletimeout = idletimeout
+        self.tasks = queue.Queue()
+        self.lock = threading.Lock()
+        self.workers = 0     # threads in the pool
+        self.idle = 0        # threads waiting for a task
+        self.pending = 0     # tasks submitted but not yet taken by a thread
+
+    def submit(self, task):
+        """Queues a task (a callable taking no arguments) to be run by a thread in the pool"""
+        with self.lock:
+            self.pending += 1
+            if self.pending > self.idle and self.workers < self.maxthreads:
+                self.workers += 1
+                worker = threading.Thread(target=self._worker)
+                worker.daemon = True
+                worker.start()
+        self.tasks.put(task)
+
+    def threads(self):
+        """Returns the number of threads currently in the pool"""
+        return self.workers
+
+    def waiting(self):
+        """Returns the number of tasks submitted but not yet started"""
+        return self.pending
+
+    def _worker(self):
+        """Runs tasks, until idle for too long"""
+        while 1:
+            with self.lock:
+                self.idle += 1
+            try:
+                task = self.tasks.get(True, self.idletimeout)
+            except queue.Empty:
+                with self.lock:
+                    self.idle -= 1
+                    # a task may have been submitted after the get() timed
+                    # out, counting on us to run it
+                    if not self.pending:
+                        self.workers -= 1
+                        return
+                continue
+            with self.lock:
+                self.idle -= 1
+                self.pending -= 1
+            try:
+                task()
+            except:
+                traceback.print_exc(file=sys.stderr)
+            del task
+
+
+_defaultPool = None
+_defaultPoolLock = threading.Lock()
+
+def getDefaultPool():
+    """Returns the default ThreadPool, creating it if it doesn't exist yet"""
+    global _defaultPool
+    with _defaultPoolLock:
+        if _defaultPool is None:
+            _defaultPool = ThreadPool()
+        return _defaultPool
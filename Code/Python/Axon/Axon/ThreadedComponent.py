@@ -164,6 +164,36 @@ The secret is to choose a sensible queue size to balance between it being able
 to buffer enough messages without generating errors whilst not being so large as
 to render a size limited inbox pointless!
 
+Outgoing messages do not always go through the queue. Once an outbox is linked
+to an inbox, main() delivers messages straight into that inbox (which is made
+thread safe for the purpose - see Axon.Box), waking the component that owns it,
+without the threaded component itself having to be woken to pass them on. The
+queue is still used whilst the outbox isn't linked, whilst the inbox is full
+(or has reached its high watermark), and whilst earlier messages are still
+queued - so messages still arrive in the order they were sent, and the
+buffering described above still applies.
+
+
+Running on a shared pool of threads
+-----------------------------------
+
+Each threaded component normally starts a thread of its own. If lots of them
+are created - for example, one per request a server receives - that is a lot
+of threads. Instead, main() can be run on a thread from a pool, shared with
+other threaded components, by specifying a threadpool when creating it::
+
+    RequestHandler(request, threadpool=True)    # the default pool
+
+    pool = Axon.ThreadPool.ThreadPool(maxthreads=8)
+    RequestHandler(request, threadpool=pool)
+
+The pool has a limited number of threads. Once they are all busy, further
+components wait for one to become free before their main() method starts.
+So this suits components whose main() does a job and then returns, rather than
+ones that run for as long as the system does (which would hold onto a pool
+thread for ever). See Axon.ThreadPool for more details.
+
+
 
 Regulating speed
 ----------------
@@ -231,8 +261,9 @@ Internal state:
 * **_threadrunning** - flag, cleared by the thread when it terminates
 * **queuelengths** - size to be used for internal queues between thread and
   inboxes and outboxes
+* **threadpool** - None, or the Axon.ThreadPool.ThreadPool main() is run on
 * **_threadmainmethod** - the main method to be run as a thread
-* **_thethread** - the thread object itself
+* **_thethread** - the thread object itself (if not using a threadpool)
 
 Internal to _localmain():
 
@@ -289,6 +320,13 @@ Similarly, when the thread wants to send to an outbox; self.send() is overridden
 so that it is actually sent to a thread safe queue self.outqueues[boxname] from
 which _localmain() collects it and sends it on.
 
+When _localmain() does so, it also calls makeThreadSafe() on the outbox. If
+the destination is an inbox, its storage is then protected by a lock, and
+from then on send() appends straight to it (self.outboxes[boxname].sink) when
+there's space and nothing is left in the queue. self._sendlock is held by
+send() and by _localmain() whilst it empties the queue, so a message can't
+overtake one queued before it.
+
 Because all queues have a size limit (specified in at initialisation of the
 threaded component) this enables the effects of size limited inboxes to
 propagate up to the separate thread, via the queue. The implementation of
@@ -346,6 +384,7 @@ XXX *TODO*: Thread shutdown - no true support for killing threads in python
 
 
 import Axon.Component as Component
+import Axon.ThreadPool as ThreadPool
 from Axon.AdaptiveCommsComponent import _AdaptiveCommsable as _AC
 from Axon.AxonExceptions import noSpaceInBox
 import threading
@@ -374,6 +413,11 @@ class threadedcomponent(Component.component):
    outboxes of the component. Set the default queue length at initialisation
    (default=1000).
 
+   Keyword arguments:
+
+   - queuelengths  -- size of the internal queues (default=1000)
+   - threadpool    -- None for a thread of its own, True for the default Axon.ThreadPool, or a ThreadPool to run main() on (default=None)
+
    A simple example::
 
       class IncrementByN(Axon.ThreadedComponent.threadedcomponent):
@@ -400,11 +444,14 @@ class threadedcomponent(Component.component):
                       self.pause()
    """
 
-   def __init__(self,queuelengths=DefaultQueueSize, **argd):
+   def __init__(self,queuelengths=DefaultQueueSize, threadpool=None, **argd):
       super(threadedcomponent,self).__init__(**argd)
       
       self._threadrunning = False
       
+      if threadpool is True:
+         threadpool = ThreadPool.getDefaultPool()
+      self.threadpool = threadpool
       self.queuelengths = queuelengths
       self.inqueues = dict()
       self.outqueues = dict()
@@ -415,11 +462,12 @@ class threadedcomponent(Component.component):
 
       self.threadtoaxonqueue = queue.Queue()
       self.axontothreadqueue = queue.Queue()
+      self._sendlock = threading.Lock()     # see send()
 
       self.threadWakeUp = threading.Event()
 
 
-   def activate(self, Scheduler=None, Tracker=None, mainmethod="main"):
+   def activate(self, Scheduler=None, Tracker=None, mainmethod="main", priority=None):
        """\
        Call to activate this microprocess, so it can start to be executed by a
        scheduler. Usual usage is to simply call x.activate().
@@ -429,10 +477,11 @@ class threadedcomponent(Component.component):
        self._threadId = numId()
        self._localThreadId = threading.currentThread().getName()
        self._threadmainmethod = self.__getattribute__(mainmethod)
-       self._thethread = threading.Thread(name=self._threadId, target=self._threadmain)
-       self._thethread.setDaemon(True) # means the thread is stopped if the main thread stops.
+       if self.threadpool is None:
+           self._thethread = threading.Thread(name=self._threadId, target=self._threadmain)
+           self._thethread.setDaemon(True) # means the thread is stopped if the main thread stops.
    
-       return super(threadedcomponent,self).activate(Scheduler,Tracker,"_localmain")
+       return super(threadedcomponent,self).activate(Scheduler,Tracker,"_localmain",priority)
    
    def _threadmain(self):
         """\
@@ -526,14 +575,20 @@ class threadedcomponent(Component.component):
        to the threads, and state management.
        """
 
-       # start the thread
+       # start the thread (or queue main() to be run by the pool)
        self._threadrunning = True
-       self._thethread.start()
+       if self.threadpool is None:
+           self._thethread.start()
+       else:
+           self.threadpool.submit(self._threadmain)
        running = True
        stuffWaiting = False
        while running or stuffWaiting:
           # decide if we need to stop...
-          running = self._thethread.isAlive()
+          if self.threadpool is None:
+              running = self._thethread.is_alive()
+          else:
+              running = self._threadrunning
           # ...but we'll still flush queue's through:
           # (must make sure we flush ALL messages from each queue)
           
@@ -561,19 +616,26 @@ class threadedcomponent(Component.component):
                   
           for box in self.outboxes:
               
-              while not self.outqueues[box].empty():
-                  if not self.outboxes[box].isFull():
-                      msg = self.outqueues[box].get()
-                      # wake *after* item is taken from queue, otherwise thread
-                      # might get there first and still think its full!
-                      self.threadWakeUp.set() # wake thread, just like we would be if something we've sent is collected
-                      try:
-                          self._nonthread_send(msg, box)
-                      except noSpaceInBox as e:
-                          raise RuntimeError("Box delivery failed despite box (earlier) reporting being not full. Is more than one thread directly accessing boxes?")
-                  else:
-                      stuffWaiting = True
-                      break
+              if self.outqueues[box].empty():
+                  continue
+              # the thread can deliver straight to the destination from now on
+              self.outboxes[box].makeThreadSafe()
+              # hold the lock so the thread doesn't send directly whilst
+              # messages it queued earlier are still on their way
+              with self._sendlock:
+                  while not self.outqueues[box].empty():
+                      if not self.outboxes[box].isFull():
+                          msg = self.outqueues[box].get()
+                          # wake *after* item is taken from queue, otherwise thread
+                          # might get there first and still think its full!
+                          self.threadWakeUp.set() # wake thread, just like we would be if something we've sent is collected
+                          try:
+                              self._nonthread_send(msg, box)
+                          except noSpaceInBox as e:
+                              raise RuntimeError("Box delivery failed despite box (earlier) reporting being not full. Is more than one thread directly accessing boxes?")
+                      else:
+                          stuffWaiting = True
+                          break
 
           # we've already decided earlier how many we are handling. We don't
           # change our minds now, for reasons given above
@@ -647,6 +709,34 @@ class threadedcomponent(Component.component):
        # collect message from queue.
        return self.inqueues[boxname].get()
 
+   def recvAll(self,boxname="inbox"):
+       """\
+       returns a list of all the data waiting in the requested inbox.
+
+       Equivalent to calling recv() until dataReady() returns False, but
+       _localmain() is only woken once.
+       """
+       return self.recvUpTo(boxname, None)
+
+   def recvUpTo(self,boxname="inbox",n=1):
+       """\
+       returns a list of up to n items of data from the requested inbox (or
+       all of them, if n is None).
+
+       Equivalent to calling recv() up to n times while dataReady() returns
+       True, but _localmain() is only woken once.
+       """
+       inqueue = self.inqueues[boxname]
+       messages = []
+       while n is None or len(messages) < n:
+           try:
+               messages.append(inqueue.get_nowait())
+           except queue.Empty:
+               break
+       if messages:
+           Component.component.unpause(self)
+       return messages
+
    def send(self,message, boxname="outbox"):
        """\
        appends message to the requested outbox.
@@ -662,12 +752,94 @@ class threadedcomponent(Component.component):
 
        You are unlikely to want to override this method.
        """
-       try:
-           self.outqueues[boxname].put_nowait(message)
-           # wake up _localmain() so it can collect the message and send it on
-           Component.component.unpause(self)        # FIXME: Fragile
-       except queue.Full:
-           raise noSpaceInBox(self.outqueues[boxname].qsize(), self.queuelengths)
+       with self._sendlock:
+           sink = self._directSink(boxname)
+           if sink is not None:
+               try:
+                   sink.append(message)
+                   return
+               except noSpaceInBox:
+                   pass
+           try:
+               self.outqueues[boxname].put_nowait(message)
+           except queue.Full:
+               raise noSpaceInBox(self.outqueues[boxname].qsize(), self.queuelengths)
+       # wake up _localmain() so it can collect the message and send it on
+       Component.component.unpause(self)        # FIXME: Fragile
+
+   def _directSink(self, boxname):
+       """\
+       Returns the storage the thread can deliver messages for the outbox to
+       directly, or None if they must go via the outqueue (because the
+       storage isn't thread safe, or messages sent earlier are still queued).
+
+       Call holding self._sendlock.
+       """
+       box = dict.get(self.outboxes, boxname)
+       if box is None or not self.outqueues[boxname].empty():
+           return None
+       sink = box.sink
+       if sink.lock is None or sink.congested:
+           return None
+       return sink
+
+   def sendMany(self,messages, boxname="outbox"):
+       """\
+       appends each message, from an iterable, to the requested outbox.
+
+       Returns the number of messages sent. This will be less than the number
+       supplied if the outbox's queue fills up; the remaining messages are not
+       taken from the iterable. Unlike send(), no noSpaceInBox exception is
+       raised.
+
+       _localmain() is only woken once.
+       """
+       outqueue = self.outqueues[boxname]
+       messages = iter(messages)
+       count = 0
+       with self._sendlock:
+           sink = self._directSink(boxname)
+           if sink is not None:
+               count = sink.extend(messages)
+           queued = 0
+           while not outqueue.full():
+               try:
+                   message = next(messages)
+               except StopIteration:
+                   break
+               outqueue.put_nowait(message)
+               queued += 1
+       if queued:
+           Component.component.unpause(self)
+       return count + queued
+
+   # counting versions, for when messages are being counted - see
+   # Axon.Component.component.setMessageCounting(). recvAll() isn't swapped
+   # because it uses recvUpTo().
+   _countingHooks = [ "send", "sendMany", "recv", "recvUpTo" ]
+   _nocounting_send = send
+   _nocounting_sendMany = sendMany
+   _nocounting_recv = recv
+   _nocounting_recvUpTo = recvUpTo
+
+   def _counting_send(self, message, boxname="outbox"):
+       threadedcomponent._nocounting_send(self, message, boxname)
+       self.messagesSent += 1
+
+   def _counting_sendMany(self, messages, boxname="outbox"):
+       count = threadedcomponent._nocounting_sendMany(self, messages, boxname)
+       self.messagesSent += count
+       return count
+
+   def _counting_recv(self, boxname="inbox"):
+       message = threadedcomponent._nocounting_recv(self, boxname)
+       self.messagesReceived += 1
+       return message
+
+   def _counting_recvUpTo(self, boxname="inbox", n=1):
+       messages = threadedcomponent._nocounting_recvUpTo(self, boxname, n)
+       self.messagesReceived += len(messages)
+       return messages
 
    def link(self, source,sink,passthrough=0):
         """\
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+"""\
+===========================================
+TimerWheel - efficiently tracking deadlines
+===========================================
+
+A hierarchical timer wheel, used by the scheduler to wake microprocesses that
+have yielded Axon.Ipc.WaitUntil or Axon.Ipc.Sleep at (or just after) their
+deadlines.
+
+
+
+Example Usage
+-------------
+
+::
+
+    wheel = TimerWheel()
+    wheel.add(time.time()+0.5, "half a second")
+    wheel.add(time.time()+60, "a minute")
+
+    ...
+
+    for item in wheel.expire(time.time()):
+        print(item, "is due")
+
+add() returns a handle; call cancel() on it if the item should no longer be
+returned.
+
+
+
+How does it work?
+-----------------
+
+Time is divided into ticks (of 'resolution' seconds; 1ms by default). There
+are several wheels, each of 256 slots. A slot in the first wheel holds items
+due in a particular tick; a slot in the second wheel holds items due within a
+particular span of 256 ticks; a slot in the third a span of 65536 ticks; and so
+on. Items further in the future than the last wheel covers are kept in an
+overflow list.
+
+Adding an item is therefore O(1): it goes in the slot for its deadline, in the
+first wheel that can reach that far ahead.
+
+As time advances, expire() steps through the slots of the first wheel,
+returning the items it finds. Each time the first wheel completes a revolution,
+the next slot of the second wheel is emptied and its items are re-added (which
+puts them into the first wheel); and so on up the hierarchy. Spans of time in
+which the lower wheels are empty are skipped over, so a long gap between calls
+to expire() costs very little.
+
+nextDeadline() returns the time at which expire() should next be called, which
+the scheduler uses to decide how long it can block waiting for something to
+do. If the earliest item is still in a higher wheel, this is the time at which
+it will be moved down a wheel, so the scheduler simply wakes, finds nothing
+due, and waits again.
+"""
+
+import math
+
+class _Timer(object):
+    """Handle for an item in a TimerWheel"""
+    __slots__ = [ "when", "tick", "item", "cancelled" ]
+
+    def __init__(self, when, tick, item):
+        self.when = when
+        self.tick = tick
+        self.item = item
+        self.cancelled = False
+
+    def cancel(self):
+        """Stops the item being returned by TimerWheel.expire()"""
+        self.cancelled = True
+
+
+class TimerWheel(object):
+    """\
+    TimerWheel([resolution][,levels]) -> new TimerWheel object.
+
+    Tracks items to be returned once their deadlines have passed.
+
+    Keyword arguments:
+
+    - resolution  -- length of a tick, in seconds (default=0.001)
+    - levels      -- number of wheels (default=4)
+    """
+    SLOTBITS = 8
+    SLOTS = 1 << SLOTBITS
+
+    def __init__(self, resolution=0.001, levels=4, now=0.0):
+        super(TimerWheel, self).__init__()
+        self.resolution = resolution
+        self.levels = levels
+        self.wheels = [ [ [] for _ in range(self.SLOTS) ] for _ in range(levels) ]
+        self.counts = [ 0 ] * levels
+        self.overflow = []
+        self.current = int(now / resolution)
+        self.count = 0
+
+    def __len__(self):
+        """Returns the number of items (including cancelled ones not yet discarded)"""
+        return self.count
+
+    def _place(self, timer):
+        delta = timer.tick - self.current
+        for level in range(self.levels):
+            if delta < (1 << (self.SLOTBITS * (level+1))):
+                slot = (timer.tick >> (self.SLOTBITS * level)) & (self.SLOTS - 1)
+                self.wheels[level][slot].append(timer)
+                self.counts[level] += 1
+                return
+        self.overflow.append(timer)
+
+    def add(self, when, item):
+        """\
+        Adds an item to be returned by expire() once time 'when' has passed.
+        Returns a handle with a cancel() method.
+        """
+        tick = int(math.ceil(when / self.resolution))
+        timer = _Timer(when, max(tick, self.current+1), item)
+        self._place(timer)
+        self.count += 1
+        return timer
+
+    def _cascade(self, level):
+        """Empties the current slot of the given wheel, re-adding its items"""
+        slot = (self.current >> (self.SLOTBITS * level)) & (self.SLOTS - 1)
+        timers = self.wheels[level][slot]
+        if timers:
+            self.wheels[level][slot] = []
+            self.counts[level] -= len(timers)
+            for timer in timers:
+                self._place(timer)
+
+    def expire(self, now):
+        """\
+        Advances the wheel to time 'now' and returns a list of the items whose
+        deadlines have passed (in order of deadline, to the resolution of a
+        tick). Cancelled items are discarded.
+        """
+        target = int(now / self.resolution)
+        expired = []
+        mask = self.SLOTS - 1
+        while self.current < target and self.count:
+            # skip ahead over spans in which the lower wheels hold nothing
+            level = 0
+            while level < self.levels and self.counts[level] == 0:
+                level += 1
+            span = 1 << (self.SLOTBITS * level)
+            step = ((self.current // span) + 1) * span
+            if level == self.levels:
+                # only items in the overflow list, so go straight to the span
+                # containing the earliest of them
+                earliest = min([ timer.tick for timer in self.overflow ])
+                step = max(step, (earliest // span) * span)
+            step = min(target, step)
+            if level > 0:
+                self.current = step
+            else:
+                self.current += 1
+            # cascade down from higher wheels when lower wheels wrap round
+            if self.current & ((1 << (self.SLOTBITS * self.levels)) - 1) == 0 and self.overflow:
+                overflow = self.overflow
+                self.overflow = []
+                for timer in overflow:
+                    self._place(timer)
+            for higher in range(self.levels-1, 0, -1):
+                if self.current & ((1 << (self.SLOTBITS * higher)) - 1) == 0:
+                    self._cascade(higher)
+            slot = self.current & mask
+            timers = self.wheels[0][slot]
+            if timers:
+                self.wheels[0][slot] = []
+                self.counts[0] -= len(timers)
+                self.count -= len(timers)
+                expired.extend([ timer.item for timer in timers if not timer.cancelled ])
+        if self.current < target:
+            self.current = target
+        return expired
+
+    def nextDeadline(self):
+        """\
+        Returns the time at which expire() should next be called, or None if
+        there are no items.
+
+        This is at most a tick after the earliest deadline. It may be earlier,
+        if that item is still held in one of the higher wheels.
+        """
+        if not self.count:
+            return None
+        mask = self.SLOTS - 1
+        tick = None
+        for level in range(self.levels):
+            if self.counts[level]:
+                shift = self.SLOTBITS * level
+                base = self.current >> shift
+                wheel = self.wheels[level]
+                for i in range(1, self.SLOTS+1):
+                    if wheel[(base + i) & mask]:
+                        tick = (base + i) << shift
+                        break
+                break
+        if tick is None:
+            # only items in the overflow list
+            shift = self.SLOTBITS * self.levels
+            tick = ((self.current >> shift) + 1) << shift
+        # half a tick later, so that expire() definitely reaches that tick
+        return (tick + 0.5) * self.resolution
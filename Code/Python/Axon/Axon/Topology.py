@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+"""\
+=======================================
+Watching the topology of an Axon system
+=======================================
+
+A stream of events describing how the topology of a running Axon system
+changes - microprocesses being activated and terminating, and linkages being
+made and removed - as they happen. Anything interested can subscribe to it,
+rather than repeatedly examining the whole system to find out what changed.
+
+
+
+Example Usage
+-------------
+
+Print each change::
+
+    import Axon.Topology
+
+    def changed(event, subject):
+        print(event, subject)
+
+    Axon.Topology.changes.subscribe(changed)
+    MySystem().run()
+
+Axon.Introspector.Introspector uses this to describe the changes to the
+topology as they happen.
+
+
+
+More detail
+-----------
+
+The callback given to subscribe() is called as callback(event, subject), where
+event is one of:
+
+* ACTIVATED - subject is a microprocess that the scheduler has just added to
+  the microprocesses it runs.
+
+* TERMINATED - subject is a microprocess that has finished, and that the
+  scheduler has removed (after it has closed down - so after any linkages it
+  made have been unlinked).
+
+* LINKED - subject is an Axon.Linkage.linkage that has just been made by a
+  postoffice.
+
+* UNLINKED - subject is an Axon.Linkage.linkage that has just been removed.
+
+Callbacks are made in whatever thread made the change - normally the thread
+running the scheduler - as part of making it, so they must be quick and must
+not fail. A callback that needs to do more (such as a component) should just
+note the event, and deal with it later.
+
+Whilst nobody is subscribed, each change costs just one test. Subscribing and
+unsubscribing are thread safe, and can be done at any time.
+"""
+
+import threading
+
+ACTIVATED  = "ACTIVATED"
+TERMINATED = "TERMINATED"
+LINKED     = "LINKED"
+UNLINKED   = "UNLINKED"
+
+class TopologyStream(object):
+    """\
+    TopologyStream() -> new TopologyStream object.
+
+    Calls each subscribed callback whenever the topology changes. There is one
+    of these for the whole process: Axon.Topology.changes
+    """
+    __slots__ = [ "subscribers", "lock" ]
+
+    def __init__(self):
+        """x.__init__(...) initializes x; see x.__class__.__doc__ for signature."""
+        super(TopologyStream,self).__init__()
+        self.subscribers = ()     # replaced, never changed, so emit() needn't lock
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Arranges for callback(event, subject) to be called for each change"""
+        with self.lock:
+            self.subscribers = self.subscribers + (callback,)
+
+    def unsubscribe(self, callback):
+        """Stops callback being called"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+            subscribers.remove(callback)
+            self.subscribers = tuple(subscribers)
+
+    def emit(self, event, subject):
+        """Calls every subscribed callback with the event and its subject"""
+        for callback in self.subscribers:
+            callback(event, subject)
+
+changes = TopologyStream()
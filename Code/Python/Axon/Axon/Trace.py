@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+"""\
+=============================================
+Tracing what the scheduler and postboxes do
+=============================================
+
+Records a timeline of what is happening inside a running Axon system - which
+microprocess the scheduler was running and for how long, which microprocesses
+woke or paused which others, and how many messages were waiting in each inbox
+- into a bounded in-memory buffer. This can be written out in the Chrome
+trace event format, and opened in a standard viewer (such as Perfetto,
+https://ui.perfetto.dev, or chrome://tracing) to see exactly where a system
+stalled.
+
+
+
+Example Usage
+-------------
+
+Trace part of a run of a system, then save the trace::
+
+    import Axon.Trace
+
+    MySystem().activate()
+    Axon.Trace.startTracing()
+    ...
+    recorder = Axon.Trace.stopTracing()
+    recorder.dump(open("trace.json", "w"))
+
+Tracing can be started and stopped at any time, from any thread, including
+whilst the scheduler is running.
+
+
+
+What is recorded?
+-----------------
+
+* every timeslice the scheduler gives a microprocess - shown as a slice, named
+  after the microprocess, on the timeline of the thread running the scheduler.
+
+* every request to wake or pause a microprocess (for example, by a message
+  being delivered to it, or by it calling self.pause()) - shown as instant
+  events, naming the microprocess that was woken or paused. Wakes also name the
+  microprocess (or the thread, if not the scheduler's) that asked.
+
+* the number of messages waiting in an inbox, each time one is delivered to it
+  or collected from it - shown as a counter, named after the component and
+  inbox.
+
+Events are kept in a ring buffer of limited capacity (DefaultCapacity events,
+unless specified), so when it is full the oldest are discarded, and memory use
+stays bounded however long tracing is left on.
+
+
+
+How does it work?
+-----------------
+
+Whilst not tracing, nothing at all is recorded and none of the code here is
+run: the hooks are swapped in and out, rather than being checked for on every
+call.
+
+startTracing() sets scheduler.tracer, which the scheduler checks once per
+cycle through its run queue, swaps in versions of scheduler.wakeThread() and
+scheduler.pauseThread() that record events (microprocess pause() and unpause()
+calls go through these), and changes the storage of inboxes (realsink and
+lockedsink objects - see Axon.Box) to subclasses that record the number of
+messages waiting whenever messages are appended or popped. This is done to the
+inboxes of components the scheduler already knows about, and to all inboxes
+created whilst tracing. stopTracing() reverses all of this.
+
+Inboxes of components that are created but not yet activated when tracing
+starts are not traced.
+"""
+
+import os
+import json
+import threading
+import weakref
+from collections import deque
+
+import Axon.Box as Box
+from Axon.Box import realsink, lockedsink
+from Axon.Scheduler import scheduler, _clock
+
+DefaultCapacity = 100000
+
+class TraceRecorder(object):
+    """\
+    TraceRecorder([capacity]) -> new TraceRecorder object.
+
+    Records trace events in a ring buffer, holding at most capacity of them
+    (the oldest are discarded first). Use startTracing() rather than creating
+    one yourself.
+
+    Keyword arguments:
+
+    - capacity  -- the maximum number of events to keep (default=DefaultCapacity)
+    """
+    def __init__(self, capacity=DefaultCapacity):
+        super(TraceRecorder, self).__init__()
+        self.events = deque(maxlen=capacity)
+        self.boxnames = {}   # id(storage) -> ( weakref to storage, name of inbox )
+
+    def timeslice(self, mprocess, start, end):
+        """Records that mprocess was run from time start to end"""
+        self.events.append( ("X", start, mprocess.name, end - start, threading.current_thread()) )
+
+    def wake(self, mprocess, by):
+        """Records a request, by a microprocess or thread, to wake mprocess"""
+        self.events.append( ("wake", _clock(), mprocess.name, getattr(by, "name", None), threading.current_thread()) )
+
+    def pause(self, mprocess):
+        """Records a request to pause mprocess"""
+        self.events.append( ("pause", _clock(), mprocess.name, None, threading.current_thread()) )
+
+    def queued(self, storage):
+        """Records the number of messages waiting in the storage of an inbox"""
+        self.events.append( ("C", _clock(), self.boxName(storage), len(storage), threading.current_thread()) )
+
+    def boxName(self, storage):
+        """\
+        Returns a name for the inbox using storage, made from the names of the
+        component that owns it and of the inbox.
+        """
+        key = id(storage)
+        ref, name = self.boxnames.get(key, (None, None))
+        if ref is None or ref() is not storage:
+            owner = getattr(storage.notify, "__self__", None)
+            name = getattr(owner, "name", "?")
+            for boxname, box in dict.items(getattr(owner, "inboxes", {})):
+                if box.storage is storage:
+                    name = name + "." + boxname
+                    break
+            # storage is unhashable, so is keyed by id - which may be reused
+            # once it is freed, so the entry goes with it
+            boxnames = self.boxnames
+            def forget(ref):
+                if boxnames.get(key, (None,))[0] is ref:
+                    boxnames.pop(key, None)
+            self.boxnames[key] = (weakref.ref(storage, forget), name)
+        return name
+
+    def chromeEvents(self):
+        """\
+        Returns the events recorded, as a list of dictionaries in the Chrome
+        trace event format. Times are in microseconds.
+        """
+        pid = os.getpid()
+        threads = {}
+        result = []
+        for kind, when, name, value, thread in list(self.events):
+            tid = threads.setdefault(thread, len(threads) + 1)
+            event = { "name" : name, "ph" : kind, "ts" : when * 1000000.0, "pid" : pid, "tid" : tid }
+            if kind == "X":
+                event["cat"] = "timeslice"
+                event["dur"] = value * 1000000.0
+            elif kind == "C":
+                event["cat"] = "inbox"
+                event["args"] = { "queued" : value }
+            else:
+                event["ph"] = "i"
+                event["s"] = "t"
+                event["cat"] = kind
+                event["name"] = kind + " " + name
+                if value is not None:
+                    event["args"] = { "by" : value }
+            result.append(event)
+        for thread, tid in threads.items():
+            result.append( { "name" : "thread_name", "ph" : "M", "pid" : pid, "tid" : tid,
+                             "args" : { "name" : thread.name } } )
+        return result
+
+    def dump(self, file):
+        """Writes the events recorded to file, as Chrome trace event JSON"""
+        json.dump( { "traceEvents" : self.chromeEvents(), "displayTimeUnit" : "ms" }, file)
+
+
+class tracedsink(realsink):
+    """A realsink that records the number of messages waiting whenever they're appended or popped"""
+    __slots__ = []
+
+    def append(self, data):
+        realsink.append(self, data)
+        _queued(self)
+
+    def extend(self, items):
+        count = realsink.extend(self, items)
+        _queued(self)
+        return count
+
+    def pop(self, index=-1):
+        item = realsink.pop(self, index)
+        _queued(self)
+        return item
+
+    def popmany(self, n=None):
+        items = realsink.popmany(self, n)
+        _queued(self)
+        return items
+
+
+class tracedlockedsink(lockedsink):
+    """A lockedsink that records the number of messages waiting whenever they're appended or popped"""
+    __slots__ = []
+
+    def append(self, data):
+        lockedsink.append(self, data)
+        _queued(self)
+
+    def extend(self, items):
+        count = lockedsink.extend(self, items)
+        _queued(self)
+        return count
+
+    def pop(self, index=-1):
+        item = lockedsink.pop(self, index)
+        _queued(self)
+        return item
+
+    def popmany(self, n=None):
+        items = lockedsink.popmany(self, n)
+        _queued(self)
+        return items
+
+def _queued(storage):
+    recorder = scheduler.tracer
+    if recorder is not None:
+        recorder.queued(storage)
+
+Box._threadSafeStorage[tracedsink] = tracedlockedsink
+Box._spillStorage[tracedsink] = Box.spillsink
+Box._spillStorage[tracedlockedsink] = Box.lockedspillsink
+
+_traced = { realsink : tracedsink, lockedsink : tracedlockedsink }
+_untraced = dict( (traced, untraced) for untraced, traced in _traced.items() )
+
+_lock = threading.Lock()
+
+def _swapStorage(sched, swaps):
+    """\
+    Changes the class of the storage of the inboxes of the microprocesses the
+    scheduler knows about (or has been asked to activate), as specified by
+    swaps, and rebinds the postboxes that deliver to them.
+    """
+    mprocesses = set(sched.threads.keys())
+    mprocesses.update( mprocess for mprocess, canActivate in list(sched.wakeRequests) )
+    for mprocess in mprocesses:
+        for box in list(dict.values(getattr(mprocess, "inboxes", {}))):
+            storage = box.storage
+            swapped = swaps.get(storage.__class__)
+            if swapped is not None:
+                storage.__class__ = swapped
+                box._retarget(box.target)
+
+def startTracing(capacity=DefaultCapacity, sched=None):
+    """\
+    Starts tracing, recording into a new TraceRecorder. Returns the recorder.
+    If already tracing, carries on with the recorder already in use.
+
+    Keyword arguments:
+
+    - capacity  -- the maximum number of events to keep (default=DefaultCapacity)
+    - sched     -- scheduler whose microprocesses' inboxes are to be traced (default=scheduler.run)
+    """
+    with _lock:
+        if scheduler.tracer is not None:
+            return scheduler.tracer
+        recorder = TraceRecorder(capacity)
+        for method in scheduler._tracingHooks:
+            setattr(scheduler, method, scheduler.__dict__["_trace_" + method])
+        Box._inboxStorage = tracedsink
+        _swapStorage(sched or scheduler.run, _traced)
+        scheduler.tracer = recorder
+        return recorder
+
+def stopTracing(sched=None):
+    """\
+    Stops tracing. Returns the TraceRecorder that was in use (or None if not
+    tracing), so the trace can be written out.
+
+    Keyword arguments:
+
+    - sched  -- scheduler given to startTracing() (default=scheduler.run)
+    """
+    with _lock:
+        recorder = scheduler.tracer
+        scheduler.tracer = None
+        for method in scheduler._tracingHooks:
+            setattr(scheduler, method, scheduler.__dict__["_notrace_" + method])
+        Box._inboxStorage = realsink
+        _swapStorage(sched or scheduler.run, _untraced)
+        return recorder
+
+def isTracing():
+    """Returns True if tracing is switched on"""
+    return scheduler.tracer is not None
@@ -90,6 +90,11 @@ Services, statistics, Instrospection
   - outputs live topology data describing what components there are in a
     running axon system and how they are linked together.
 
+* **Axon.StatsReporter**
+
+  - outputs the runtime statistics (timeslices, time spent running and paused,
+    messages sent and received) the scheduler records for each microprocess.
+
 
         
 Exceptions, Messages and Misc
@@ -150,6 +155,12 @@ Internals for implementing inboxes, outboxes and linkages
 
   - handles used to describe linkages from one postbox to another
 
+* **Axon.Topology**
+
+  - a stream of events, that anything can subscribe to, announcing
+    microprocesses being activated and terminating and linkages being made
+    and removed.
+
 What, no Postman? Optimisations made to Axon have dropped the Postman.
 Inboxes and outboxes handle the delivery of messages themselves now.
 
@@ -170,6 +181,12 @@ Debugging support
 * **Axon.debugConfigDefaults**
 
   - defines a method that supplies a default debugging configuration.
+
+* **Axon.Trace**
+
+  - records a timeline of what the scheduler runs, who wakes whom, and how many
+    messages are waiting in inboxes, for viewing in a Chrome/Perfetto trace
+    viewer.
 """
 import Axon.Component as Component
 import Axon.Ipc as Ipc
@@ -186,6 +203,9 @@ import Axon.debugConfigFile as debugConfigFile
 import Axon.Box as Box
 import Axon.ThreadedComponent as ThreadedComponent
 import Axon.Introspector as Introspector
+import Axon.StatsReporter as StatsReporter
+import Axon.Trace as Trace
+import Axon.Topology as Topology
 
 from Axon.Base import AxonObject, AxonType
 
@@ -114,6 +114,17 @@ Or you can replace the entire set::
                           }
                           
     debugger.addDebug(**replacementSections)
+
+
+
+Switching debugging off entirely
+--------------------------------
+
+A nulldebug object has the same methods as a debug object, but they do nothing
+(areDebugging() always returns False). Microprocesses share a single nulldebug
+object as their debugger unless debugging has been switched on with
+Axon.Microprocess.microprocess.setDebugging() - see Axon.Microprocess for
+details.
 """
 
 
@@ -329,6 +340,43 @@ class debug(object):
 
    note = debug
 
+class nulldebug(object):
+   """\
+   nulldebug() -> new nulldebug object.
+
+   Stands in for a debug object when debugging is switched off. Has the same
+   methods, but they do nothing. areDebugging() always returns False; debug()
+   and note() always return True.
+   """
+   def useConfig(self, filename="debug.conf"):
+      pass
+
+   def addDebugSection(self, section, level):
+      pass
+
+   def addDebug(self, **debugSections):
+      pass
+
+   def increaseDebug(self, section):
+      pass
+
+   def decreaseDebug(self, section):
+      pass
+
+   def setDebugSections(self,**debugSections):
+      pass
+
+   def areDebugging(self,section,level):
+      return False
+
+   def debugmessage(self, section, *message):
+      pass
+
+   def debug(self,section, level, *message):
+      return True
+
+   note = debug
+
 if __name__=="__main__":
    class debugTestClass:
       def __init__(self):
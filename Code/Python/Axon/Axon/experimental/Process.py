@@ -1,314 +1,662 @@
-#!/usr/bin/python
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+"""\
+=======================================================================
+ProcessPipeline and ProcessGraphline - components in separate processes
+=======================================================================
+
+ProcessPipeline and ProcessGraphline behave like the Pipeline and Graphline
+chassis in Kamaelia, except that each child component runs in a worker process
+of its own, with its own scheduler. Messages between them are carried between
+the processes automatically.
+
+
+
+Example Usage
+-------------
+
+A pipeline of components, each running in a separate process::
+
+    ProcessPipeline(
+        Textbox(position=(20, 340)),
+        TextDisplayer(position=(20, 90)),
+    ).run()
+
+A graphline, where "self" refers to the ProcessGraphline component itself::
+
+    ProcessGraphline(
+        SOURCE = Producer(),
+        WORKER = Transformer(),
+        linkages = {
+            ("SOURCE", "outbox") : ("WORKER", "inbox"),
+            ("SOURCE", "signal") : ("WORKER", "control"),
+            ("WORKER", "outbox") : ("self", "outbox"),
+            ("WORKER", "signal") : ("self", "signal"),
+        }
+    )
+
+Either can be used like any other component - in a Pipeline with ordinary
+components, or run on its own.
+
+Large bytes payloads can be passed through shared memory instead, by giving
+the linkages that carry them a ring buffer (sized in bytes)::
+
+    ProcessPipeline(
+        FileReader("video.ts"),
+        Demuxer(),
+        Decoder(),
+        ringbuffer = 64*1024*1024,
+    )
+
+    ProcessGraphline(
+        SOURCE = FileReader("video.ts"),
+        DEMUX = Demuxer(),
+        linkages = { ("SOURCE", "outbox") : ("DEMUX", "inbox"), ... },
+        ringbuffers = { ("SOURCE", "outbox") : 64*1024*1024 },
+    )
+
+
+
+Behaviour
+---------
+
+The child components are given to the ProcessGraphline by name, as keyword
+arguments, alongside a "linkages" dictionary, mapping (name, boxname) pairs for
+sources to (name, boxname) pairs for sinks. As for Graphline, use "self" to
+refer to the inboxes and outboxes of the ProcessGraphline itself. A
+ProcessPipeline is a ProcessGraphline with the linkages of a Pipeline: from
+"inbox" and "control" to the first component, between "outbox" and "signal"
+of each component and "inbox" and "control" of the next, and from the last
+one to "outbox" and "signal".
+
+When activated, a worker process is started for each child component, which is
+then activated within it. Do not activate the children yourself.
+
+Shutdown is propagated as it is by Graphline:
+
+* If nothing is linked from the "control" inbox, anything arriving there (such
+  as producerFinished or shutdownMicroprocess) is sent to the "control" inbox
+  of every child component that does not have something else linked to it.
+
+* The ProcessGraphline terminates once all the child components have
+  terminated. If nothing is linked to the "signal" outbox, it then sends the
+  shutdownMicroprocess message it received (if there was one), or otherwise
+  producerFinished, out of "signal".
+
+All messages sent between processes, including those to and from the
+ProcessGraphline itself, must be picklable. Messages that refer to components
+(eg. producerFinished(self)) send them by name; on arrival these refer to the
+receiving process's copy of the child component (or the ProcessGraphline) with
+that name, or None if it isn't one of them. Such a reference is good for
+identifying the sender, but not for talking to it.
+
+
+
+How does it work?
+-----------------
+
+Each process - the workers, and the one the ProcessGraphline runs in - has a
+multiprocessing.Queue through which all messages destined for it arrive.
+A receiver (a threaded component) blocks waiting on this queue, and delivers
+the messages to the right inboxes. Messages sent out of a linked outbox go to a
+sender component, which is woken as they arrive, and puts them, pickled in
+batches, onto the queue of the destination process. Nothing polls: when there
+is nothing to do, every process is blocked waiting for a message. This is the
+same transport used by Axon.experimental.ShardedScheduler.
+
+Messages along each linkage arrive in order. Messages for "control" inboxes
+are passed on after any sent earlier to other inboxes, so, for example, a
+producerFinished does not overtake the data that preceded it.
+
+Each worker process runs its child component under a small host component.
+When the child terminates, the host tells the ProcessGraphline (along the same
+route as any other message, so after everything the child sent beforehand).
+Once all children have terminated, the ProcessGraphline tells the workers to
+finish and waits for them to exit.
+
+A threaded component in the ProcessGraphline's process blocks waiting for the
+worker processes to exit. If one exits with a nonzero exit code - because its
+child component raised an exception, or the process was killed - the other
+workers are terminated and the ProcessGraphline raises RuntimeError, much as an
+exception in a child of an ordinary Graphline stops the scheduler.
+
+Worker processes are created by forking (the multiprocessing module's "fork"
+start method), so the components do not need to be picklable. This is only
+available on platforms that support it; elsewhere, activating a
+ProcessGraphline raises NotImplementedError.
+
+
+
+Shared memory ring buffers
+--------------------------
+
+Every message sent along a linkage given a ring buffer, that is a bytes,
+bytearray or (contiguous) memoryview object, is copied into a shared memory
+ring buffer belonging to that linkage, and only its position is sent through
+the queue. The receiving component gets a read-only memoryview of it, in the
+ring buffer itself, without it being copied again.
+
+Space in the ring buffer is reused once nothing refers to the payload any
+more - neither the memoryview given to the component, nor any slice of it,
+memoryview made from it, or other object using its buffer. So a component
+should simply drop a payload once it has finished with it, or take a copy
+(eg. bytes(data)) if it needs to keep it. Space is reused in the order
+payloads were sent, so one held onto for a long time stops the space after it
+being reused.
+
+A payload that is too large, or arrives when the ring buffer is too full,
+is sent through the queue as normal (but still arrives as a memoryview).
+The sender is never blocked waiting for space. Other messages, such as
+producerFinished, are always sent through the queue, and still arrive in order
+relative to the payloads.
+
+The ring buffers are anonymous shared memory mappings (mmap) created before the
+worker processes are forked, so nothing needs cleaning up afterwards.
+"""
 
 import Axon
-from Axon.Scheduler import scheduler
-import Axon.experimental._pprocess_support
-import pprocess
-import time
-import pprint
-
-# --- Support code, this will go back into the library. ---------------------------------------------------------
-class ProcessWrapComponent(object):
-    def __init__(self, somecomponent):
-#        print ("somecomponent.name",somecomponent.name)
-        self.exchange = pprocess.Exchange()
-        self.channel = None
-        self.inbound = []
-        self.thecomponent = somecomponent
-        self.ce = None
-        self.tick = time.time()
-
-    def ticking(self):
-        if time.time() - self.tick > 1:
-#            print ("TICK", self.thecomponent.name)
-            self.tick = time.time()
-
-    def run(self, channel):
-        self.exchange.add(channel)
-        self.channel = channel
-#        print ("ZZZZZZZZ")
-        from Axon.experimental._pprocess_support import likefile, background
-#        print ("Hi",scheduler.run.threads)
-        background(zap=True).start()
-        time.sleep(0.1)
-#        print ("Bye",scheduler.run.threads)
-#        print ("Here???")
-
-        self.ce = likefile(self.thecomponent)
-        for i in self.main():
-            pass
-
-    def activate(self):
-#        print ("XXXXXXX")
-        channel = pprocess.start(self.run)
-#        print ("YYYYYYY")
-        return channel
+from Axon.Component import component
+from Axon.ThreadedComponent import threadedcomponent
+from Axon.Ipc import producerFinished, shutdownMicroprocess
+from Axon.experimental.ShardedScheduler import _dumps, _ShardSender, _ShardReceiver
+import Axon.Scheduler
+
+import mmap
+import ctypes
+import weakref
+import threading
+import multiprocessing
+import multiprocessing.connection
+from collections import deque
+
+
+class _RingSlot(object):
+    """Stands in for a payload placed in a ring buffer, when sent through the queue"""
+    __slots__ = [ "start", "length" ]
+
+    def __init__(self, start, length):
+        self.start = start
+        self.length = length
+
+    def __getstate__(self):
+        return (self.start, self.length)
+
+    def __setstate__(self, state):
+        self.start, self.length = state
+
+
+class _RingBuffer(object):
+    """\
+    _RingBuffer(size) -> new _RingBuffer object.
+
+    A ring buffer of 'size' bytes in shared memory, written (with put()) in one
+    process and read (with get()) in another.
+
+    Positions are counted in bytes written since the start, so a payload at
+    position p is at offset p % size. A payload is never split across the end
+    of the buffer; the space left over is skipped. The reader records, in the
+    shared header, the position up to which it has finished with the payloads,
+    so the writer knows how much space is free.
+    """
+    def __init__(self, size):
+        super(_RingBuffer, self).__init__()
+        self.size = size
+        self.mmap = mmap.mmap(-1, 8 + size)
+        view = memoryview(self.mmap)
+        self.tail = view[:8].cast("Q")     # shared: reader has finished with everything before this
+        self.data = view[8:]
+        self.head = 0                      # writer only: position of the end of the last payload
+        self.pending = deque()             # reader only: end positions of payloads not yet released
+        self.released = set()
+        self.lock = threading.Lock()
+
+    def put(self, payload):
+        """\
+        Copies a bytes-like payload into the buffer, returning a _RingSlot
+        describing where it is. If it can't be (it isn't bytes-like, is too
+        large, or there isn't space), the payload itself is returned.
+        """
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            return payload
+        view = memoryview(payload)
+        length = view.nbytes
+        start = self.head
+        offset = start % self.size
+        if offset + length > self.size:
+            start += self.size - offset
+            offset = 0
+        if length == 0 or length > self.size or not view.c_contiguous or start + length - self.tail[0] > self.size:
+            # memoryviews can't be pickled
+            if isinstance(payload, memoryview):
+                return view.tobytes()
+            return payload
+        self.data[offset:offset+length] = view.cast("B")
+        self.head = start + length
+        return _RingSlot(start, length)
+
+    def get(self, slot):
+        """\
+        Returns a read-only memoryview of the payload described by the slot.
+
+        The memoryview is of a ctypes array over the space in the buffer, and
+        so are any slices or memoryviews made from it - they all keep it
+        alive. The space is released once the array is no longer referred to.
+        """
+        owner = (ctypes.c_char * slot.length).from_buffer(self.mmap, 8 + slot.start % self.size)
+        end = slot.start + slot.length
+        with self.lock:
+            self.pending.append(end)
+        weakref.finalize(owner, self._release, end)
+        return memoryview(owner).cast("B").toreadonly()
+
+    def _release(self, end):
+        with self.lock:
+            self.released.add(end)
+            while self.pending and self.pending[0] in self.released:
+                end = self.pending.popleft()
+                self.released.remove(end)
+                self.tail[0] = end
+
+
+class _RingSender(_ShardSender):
+    """\
+    _RingSender(routes, rings) -> new _RingSender component.
+
+    A _ShardSender that puts bytes-like messages, for routes with a ring
+    buffer, into the ring buffer.
+
+    Keyword arguments:
+
+    - routes  -- list of (linkid, destination multiprocessing.Queue)
+    - rings   -- dictionary mapping linkids to _RingBuffer objects
+    """
+    def __init__(self, routes, rings):
+        super(_RingSender, self).__init__(routes)
+        self.rings = rings
+
+    def pack(self, linkid, messages):
+        ring = self.rings.get(linkid, None)
+        if ring is not None:
+            messages = [ ring.put(message) for message in messages ]
+        return super(_RingSender, self).pack(linkid, messages)
+
+
+class _RingReceiver(_ShardReceiver):
+    """\
+    _RingReceiver(inbound, linkids, known, rings) -> new _RingReceiver component.
+
+    A _ShardReceiver that replaces messages that were put into a ring buffer
+    with memoryviews of them.
+    """
+    def __init__(self, inbound, linkids, known, rings):
+        super(_RingReceiver, self).__init__(inbound, linkids, known)
+        self.rings = rings
+
+    def unpack(self, data):
+        linkid, messages = super(_RingReceiver, self).unpack(data)
+        ring = self.rings.get(linkid, None)
+        if ring is not None:
+            messages = [ self.payload(ring, message) for message in messages ]
+        return linkid, messages
+
+    def payload(self, ring, message):
+        if isinstance(message, _RingSlot):
+            return ring.get(message)
+        if isinstance(message, (bytes, bytearray)):
+            # one that didn't fit in the ring buffer
+            return memoryview(message).toreadonly()
+        return message
+
+
+class _ProcessHost(component):
+    """\
+    _ProcessHost(child) -> new _ProcessHost component.
+
+    Runs the child component, in a worker process. Once it terminates, sends
+    the name of the child out of "_finished", then producerFinished out of
+    "signal".
+    """
+    Inboxes = { "inbox"   : "NOT USED",
+                "control" : "NOT USED",
+              }
+    Outboxes = { "outbox"    : "NOT USED",
+                 "signal"    : "producerFinished once the child has terminated",
+                 "_finished" : "Name of the child, once it has terminated",
+               }
+
+    def __init__(self, child):
+        super(_ProcessHost, self).__init__()
+        self.child = child
 
     def main(self):
-#        print ("Running?")
-        t = 0
-        while 1:
-#            self.ticking()
-            if time.time() - t > 0.2:
-                t = time.time()
-
-            if self.exchange.ready(0):
-                chan = self.exchange.ready(0)[0]
-                D = chan._receive()
-#                print ("pwc:- SEND", D, "TO", self.thecomponent.name, ".",".", )
-                self.ce.put(*D)
-#                print (".","SENT")
-
-            D = self.ce.anyReady()
-            if D:
-                for boxname in D:
-#                    print ("DUM, DUM DUM! 1 ",D)
-                    D = self.ce.get(boxname)
-#                    print ("DUM, DUM DUM! 2 ",D)
-                    self.channel._send((D, boxname))
-#                    print ("DUM, DUM DUM! 3 ",D)
-#                print ("GAH!")
+        self.addChildren(self.child)
+        self.child.activate()
+        # as it is our child, we are woken when it terminates
+        while not self.child._isStopped():
+            self.pause()
             yield 1
-#            if self.channel.closed:
-#                print (self.channel.closed)
-#                pass
-
-def ProcessPipeline(*components):
-    exchange = pprocess.Exchange()
-    debug = False
-    chans = []
-#    print ("TESTING ME")
-    for comp in components:
-        A = ProcessWrapComponent( comp )
-        chan = A.activate()
-        chans.append( chan )
-        exchange.add(chan )
-
-    mappings = {}
-    for i in range(len(components)-1):
-         mappings[ (chans[i], "outbox") ] = (chans[i+1], "inbox")
-         mappings[ (chans[i], "signal") ] = (chans[i+1], "control")
-
-    while 1:
-        for chan in exchange.ready(0):
-            D = chan._receive()
-            try:
-                dest = mappings[ ( chan, D[1] ) ]
-                dest[0]._send( (D[0], dest[1] ) )
-#                print ("FORWARDED", D)
-            except KeyError:
-                # This error means that some component in the graphline spat out some data,
-                # but the outbox it was sent to isn't linked anyway. This may be an error,
-                # but generally speaking is not likely to be. 
-                #
-                # As a result, we suppress this error.
-                # This would be nicer to make conditional, but at present we don't have a
-                # naming mechanism in general to do this. Though __debug=1 as a parameter
-                # seems reasonable.
-                #
-                # If someone needs to debug this, they can enable this:
-                #
-                if debug:
-                    print ("WARNING: Data sent to outbox not linked to anywhere. Error?")
-                    print ("chan, D[1] D[0]", chan, D[1], repr(D[0]))
-                    pprint.pprint( mappings )
-
-        time.sleep(0.1)
-
-
-def ProcessGraphline(**graphline_spec):
-    chans = []
-    count = 0
-    component_to_chan = {}
-    mappings = {}
-    debug = graphline_spec.get("__debug", False)
-
-    chan_to_compname = {}
-    exchange = pprocess.Exchange()
-    for comp in graphline_spec:
-        if comp != "linkages" and comp[:2] != "__":
-            A = ProcessWrapComponent( graphline_spec[comp] )
-            chan = A.activate()
-            chans.append( chan )
-            chan_to_compname[ chan ] = comp
-            exchange.add(chan )
-            component_to_chan[comp] = chan
-#            print (comp, chan)
-            count += 1
-
-    linkages = graphline_spec.get("linkages", {})
-    for source in linkages:
-        sink = linkages[source]
-        mappings[ component_to_chan[source[0]], source[1] ] = component_to_chan[sink[0]], sink[1]
-
-    while 1:
-        for chan in exchange.ready(0):
-#            print ("CHAN", chan, chan_to_compname[ chan ])
-            D = chan._receive()
-#            print ("DO WE EVEN GET HERE", D)
-            try:
-                dest = mappings[ ( chan, D[1] ) ]
-                dest[0]._send( (D[0], dest[1] ) )
-            except KeyError:
-                # This error means that some component in the graphline spat out some data,
-                # but the outbox it was sent to isn't linked anyway. This may be an error,
-                # but generally speaking is not likely to be. 
-                #
-                # As a result, we suppress this error.
-                # This would be nicer to make conditional, but at present we don't have a
-                # naming mechanism in general to do this. Though __debug=1 as a parameter
-                # seems reasonable.
-                #
-                # If someone needs to debug this, they can enable this:
-                #
-                if debug:
-                    print ("WARNING: Data sent to outbox not linked to anywhere. Error?")
-                    print ("chan, D[1] D[0]", chan, D[1], repr(D[0]))
-                    pprint.pprint( mappings )
-        time.sleep(0.001)
-
-
-class ProcessPipelineComponent(Axon.Component.component):
-    def __init__(self, *components, **argd):
-        super(ProcessPipelineComponent,self).__init__(**argd)
-        self.components = components
+        self.removeChild(self.child)
+        self.send(self.child.name, "_finished")
+        self.send(producerFinished(self), "signal")
+
+
+class _WorkerWatcher(threadedcomponent):
+    """\
+    _WorkerWatcher(workers) -> new _WorkerWatcher component.
+
+    Blocks waiting for worker processes to exit. Sends (name, exitcode) out of
+    "outbox" as each one does, and terminates once they all have.
+
+    Keyword arguments:
+
+    - workers  -- dictionary mapping names to multiprocessing.Process objects
+    """
+    Inboxes = { "inbox"   : "NOT USED",
+                "control" : "NOT USED",
+              }
+    Outboxes = { "outbox" : "(name, exitcode) for each worker process, as it exits",
+                 "signal" : "NOT USED",
+               }
+
+    def __init__(self, workers):
+        super(_WorkerWatcher, self).__init__()
+        self.workers = workers
 
     def main(self):
-        exchange = pprocess.Exchange()
-        chans = []
-        for comp in self.components:
-            A = ProcessWrapComponent( comp )
-            chan = A.activate()
-            chans.append( chan )
-            exchange.add(chan )
-
-        mappings = {}
-        for i in range(len(self.components)-1):
-             mappings[ (chans[i], "outbox") ] = (chans[i+1], "inbox")
-             mappings[ (chans[i], "signal") ] = (chans[i+1], "control")
-
-        while 1:
-            for chan in exchange.ready(0):
-                D = chan._receive()
-                dest = mappings[ ( chan, D[1] ) ]
-                if chan != chans[-1]:
-                    dest[0]._send( (D[0], dest[1] ) )
+        waiting = dict([ (worker.sentinel, name) for (name, worker) in self.workers.items() ])
+        while waiting:
+            for sentinel in multiprocessing.connection.wait(list(waiting)):
+                name = waiting.pop(sentinel)
+                self.workers[name].join()
+                self.send( (name, self.workers[name].exitcode), "outbox")
+
+
+class ProcessGraphline(component):
+    """\
+    ProcessGraphline(linkages,**components) -> new ProcessGraphline component
+
+    Like a Graphline, but each of the named child components runs in a worker
+    process of its own.
+
+    Keyword arguments:
+
+    - linkages     -- dictionary mapping ("componentname","boxname") to ("componentname","boxname")
+    - ringbuffers  -- dictionary mapping ("componentname","boxname") of the source of a linkage to the size, in bytes, of a shared memory ring buffer for it (default is none)
+    - components   -- dictionary mapping names to component instances (default is nothing)
+    """
+    Inboxes = { "inbox"     : "",
+                "control"   : "",
+                "_finished" : "Names of child components that have terminated",
+                "_exited"   : "(name, exitcode) for worker processes that have exited",
+              }
+    Outboxes = { "outbox"   : "",
+                 "signal"   : "",
+                 "_cs"      : "For signalling to child components' control inboxes",
+                 "_shutdown": "For shutting down the sender",
+               }
+
+    def __init__(self, linkages=None, ringbuffers=None, **components):
+        super(ProcessGraphline, self).__init__()
+        if linkages is None:
+            linkages = {}
+        if ringbuffers is None:
+            ringbuffers = {}
+        self.layout = linkages
+        self.ringbuffers = ringbuffers
+        self.rings = {}
+        self.components = dict([ (name, components[name]) for name in components if name[:2] != "__" ])
+
+    def _routes(self):
+        """\
+        Returns a list of (linkid, sourcename, sourcebox, sinkname, sinkbox)
+        for every route messages take between processes. "self" is the name of
+        the ProcessGraphline.
+
+        These are the linkages, plus one from each child's host to "_finished",
+        plus (if nothing is linked from "control") one from "_cs" to each
+        child's "control" inbox that isn't already linked to.
+        """
+        # the sender flushes routes in order, so ones to "control" inboxes come
+        # after the others - eg. so that producerFinished follows the data
+        for source in self.ringbuffers:
+            if source not in self.layout:
+                raise ValueError("Ring buffer given for a box that isn't linked: " + repr(source))
+        routes = []
+        for (source, sourcebox) in sorted(self.layout, key=lambda X: (self.layout[X][1] == "control", X)):
+            sink, sinkbox = self.layout[(source, sourcebox)]
+            for name in (source, sink):
+                if name != "self" and name not in self.components:
+                    raise ValueError("Linkage refers to unknown component " + repr(name))
+            routes.append( (len(routes), source, sourcebox, sink, sinkbox) )
+
+        linkedcontrols = set([ sink for (linkid, source, sourcebox, sink, sinkbox) in routes if sinkbox == "control" ])
+        controlpassthru = [ linkid for (linkid, source, sourcebox, sink, sinkbox) in routes if (source, sourcebox) == ("self", "control") ]
+        for name in sorted(self.components):
+            routes.append( (len(routes), name, "_finished", "self", "_finished") )
+            if not controlpassthru and name not in linkedcontrols:
+                routes.append( (len(routes), "self", "_cs", name, "control") )
+        return routes
+
+    def _setupProcess(self, name, thecomponent, routes, queues, known):
+        """\
+        Creates the sender and receiver for the process with the given name,
+        and links them to the component (the child's host, or this
+        ProcessGraphline). Returns (sender, receiver).
+        """
+        sender = _RingSender([ (linkid, queues[sink]) for (linkid, source, sourcebox, sink, sinkbox) in routes if source == name ], self.rings)
+        receiver = _RingReceiver(queues[name], [ linkid for (linkid, source, sourcebox, sink, sinkbox) in routes if sink == name ], known, self.rings)
+
+        for (linkid, source, sourcebox, sink, sinkbox) in routes:
+            if source == name and sourcebox != "_cs":
+                if name == "self":
+                    self.link( (self, sourcebox), (sender, "link%d" % linkid), passthrough=1)
+                elif sourcebox == "_finished":
+                    thecomponent.link( (thecomponent, sourcebox), (sender, "link%d" % linkid) )
                 else:
-                    self.send(D[0], D[1]) # Pass through outbound
-            while self.dataReady("inbox"):
-                D = self.recv("inbox")
-                chans[0]._send( (D, "inbox") ) # Pass through inbound
-
-            while self.dataReady("control"):
-                D = self.recv("inbox")
-                chans[0]._send( (D, "control") ) # Pass through inbound
+                    thecomponent.link( (thecomponent.child, sourcebox), (sender, "link%d" % linkid) )
+            if sink == name:
+                if name == "self" and sinkbox != "_finished":
+                    self.link( (receiver, "link%d" % linkid), (self, sinkbox), passthrough=2)
+                elif name == "self":
+                    self.link( (receiver, "link%d" % linkid), (self, sinkbox) )
+                else:
+                    receiver.link( (receiver, "link%d" % linkid), (thecomponent.child, sinkbox) )
+        return sender, receiver
+
+    def _runChild(self, name, routes, queues, known):
+        """Runs in the worker process for the named child component"""
+        Axon.Scheduler.scheduler.run = None
+        sched = Axon.Scheduler.scheduler()
+
+        host = _ProcessHost(self.components[name])
+        sender, receiver = self._setupProcess(name, host, routes, queues, known)
+        host.link( (host, "signal"), (sender, "control") )
+
+        host.activate()
+        sender.activate()
+        receiver.activate()
+        try:
+            sched.runThreads()
+        except:
+            # make sure the ProcessGraphline doesn't wait for us forever
+            for (linkid, source, sourcebox, sink, sinkbox) in routes:
+                if source == name and sourcebox == "_finished":
+                    queues["self"].put(_dumps((linkid, [ self.components[name].name ])))
+            # ...which means flushing it to the pipe before the join threads
+            # are cancelled below
+            queues["self"].close()
+            queues["self"].join_thread()
+            raise
+        finally:
+            # anything still to be sent can only be for processes that have
+            # finished, so don't wait for it to be collected before exiting
+            for q in queues.values():
+                q.cancel_join_thread()
+
+    def main(self):
+        """Main loop."""
+        try:
+            context = multiprocessing.get_context("fork")
+        except (AttributeError, ValueError):
+            raise NotImplementedError("ProcessGraphline needs processes to be started by forking")
+
+        routes = self._routes()
+        for (linkid, source, sourcebox, sink, sinkbox) in routes:
+            if (source, sourcebox) in self.ringbuffers:
+                self.rings[linkid] = _RingBuffer(self.ringbuffers[(source, sourcebox)])
+        queues = {}
+        for name in list(self.components) + [ "self" ]:
+            queues[name] = context.Queue()
+        known = { self.name : self }
+        for child in self.components.values():
+            known[child.name] = child
+
+        workers = {}
+        for name in sorted(self.components):
+            worker = context.Process(target=self._runChild, args=(name, routes, queues, known))
+            worker.daemon = True
+            worker.start()
+            workers[name] = worker
+
+        sender, receiver = self._setupProcess("self", self, routes, queues, known)
+        self.link( (self, "_shutdown"), (sender, "control") )
+        watcher = _WorkerWatcher(workers)
+        self.link( (watcher, "outbox"), (self, "_exited") )
+        self.addChildren(sender, receiver, watcher)
+        sender.activate()
+        receiver.activate()
+        watcher.activate()
+
+        fanout = [ linkid for (linkid, source, sourcebox, sink, sinkbox) in routes if sourcebox == "_cs" ]
+        noSignalPassthru = not [ linkid for (linkid, source, sourcebox, sink, sinkbox) in routes if (sink, sinkbox) == ("self", "signal") ]
+        shutdownMessage = None
+        finished = set()
+
+        while len(finished) < len(self.components):
+            finished.update(self.recvAll("_finished"))
+            self._checkExited(workers, queues)
+
+            while fanout and self.dataReady("control"):
+                msg = self.recv("control")
+                for linkid in fanout:
+                    L = self.link( (self, "_cs"), (sender, "link%d" % linkid) )
+                    self.send(msg, "_cs")
+                    self.unlink(thelinkage=L)
+                if isinstance(msg, shutdownMicroprocess) or (msg==shutdownMicroprocess):
+                    shutdownMessage = msg
+
+            if len(finished) < len(self.components) and not self.anyReady():
+                self.pause()
             yield 1
 
+        # everything the children sent has been queued before they finished, so
+        # stop the workers' receivers, and our own once it has caught up
+        self.send(producerFinished(self), "_shutdown")
+        for name in self.components:
+            queues[name].put(None)
+        queues["self"].put(None)
+        while not (sender._isStopped() and receiver._isStopped()):
+            self.pause()
+            yield 1
+        self.removeChild(sender)
+        self.removeChild(receiver)
+
+        # the workers exit promptly once their receivers have stopped
+        while not watcher._isStopped():
+            self._checkExited(workers, queues)
+            self.pause()
+            yield 1
+        self._checkExited(workers, queues)
+        self.removeChild(watcher)
+
+        if noSignalPassthru:
+            if shutdownMessage:
+                self.send(shutdownMessage, "signal")
+            else:
+                self.send(producerFinished(self), "signal")
+
+
+    def _checkExited(self, workers, queues):
+        """\
+        Raises RuntimeError if a worker process has exited with a nonzero exit
+        code (eg. its child component raised an exception), having terminated
+        the other workers.
+        """
+        for (name, exitcode) in self.recvAll("_exited"):
+            if exitcode != 0:
+                for worker in workers.values():
+                    worker.terminate()
+                # stop our receiver, so its thread doesn't outlive us
+                queues["self"].put(None)
+                raise RuntimeError("Worker process for %r exited with code %s" % (name, exitcode))
+
+
+def ProcessPipeline(*components, **argd):
+    """\
+    ProcessPipeline(*components[,ringbuffer]) -> new ProcessGraphline component
+
+    Like a Pipeline, but each of the components runs in a worker process of
+    its own.
+
+    Keyword arguments:
+
+    - ringbuffer  -- None, or size in bytes of a shared memory ring buffer for each linkage to an "inbox" (default=None)
+    """
+    ringbuffer = argd.get("ringbuffer", None)
+    names = [ "component%d" % i for i in range(len(components)) ]
+    linkages = {}
+    if components:
+        linkages[("self", "inbox")] = (names[0], "inbox")
+        linkages[("self", "control")] = (names[0], "control")
+        for source, sink in zip(names[:-1], names[1:]):
+            linkages[(source, "outbox")] = (sink, "inbox")
+            linkages[(source, "signal")] = (sink, "control")
+        linkages[(names[-1], "outbox")] = ("self", "outbox")
+        linkages[(names[-1], "signal")] = ("self", "signal")
+    ringbuffers = {}
+    if ringbuffer is not None:
+        for source in linkages:
+            if linkages[source][1] == "inbox":
+                ringbuffers[source] = ringbuffer
+    return ProcessGraphline(linkages=linkages, ringbuffers=ringbuffers, **dict(zip(names, components)))
+
+# Older name, from when ProcessPipeline was not a component
+ProcessPipelineComponent = ProcessPipeline
 
-# --- End Support code ---------------------------------------------------------
 
 if __name__ == "__main__":
     from Kamaelia.UI.Pygame.Text import TextDisplayer, Textbox
 
-    if 0:
-        from Kamaelia.Chassis.Pipeline import Pipeline
-        ProcessGraphline(
-                    component_one = Textbox(position=(20, 340),
-                                     text_height=36,
-                                     screen_width=900,
-                                     screen_height=200,
-                                     background_color=(130,0,70),
-                                     text_color=(255,255,255)),
-                    component_two = Pipeline(
-                                        TextDisplayer(position=(20, 90),
-                                            text_height=36,
-                                            screen_width=900,
-                                            screen_height=200,
-                                            background_color=(130,0,70),
-                                            text_color=(255,255,255)),
-                                        Textbox(position=(20, 340),
-                                             text_height=36,
-                                             screen_width=900,
-                                             screen_height=200,
-                                             background_color=(130,0,70),
-                                             text_color=(255,255,255)),
-                                    ),
-                    linkages = {
-                        ("component_one", "outbox") : ("component_two", "inbox"),
-                        ("component_one", "signal") : ("component_two", "control"),
-                    },
-                    __debug = True,
-        )
-
-    if 0:
-        ProcessGraphline(
-                    component_one = Textbox(position=(20, 340),
-                                     text_height=36,
-                                     screen_width=900,
-                                     screen_height=200,
-                                     background_color=(130,0,70),
-                                     text_color=(255,255,255)),
-                    component_two = TextDisplayer(position=(20, 90),
-                                            text_height=36,
-                                            screen_width=900,
-                                            screen_height=200,
-                                            background_color=(130,0,70),
-                                            text_color=(255,255,255)),
-                    linkages = {
-                        ("component_one", "outbox") : ("component_two", "inbox"),
-                        ("component_one", "signal") : ("component_two", "control"),
-                    }
-        )
-    if 0:
-        ProcessPipeline(
-                    Textbox(position=(20, 340),
-                                     text_height=36,
-                                     screen_width=900,
-                                     screen_height=200,
-                                     background_color=(130,0,70),
-                                     text_color=(255,255,255)),
-                    TextDisplayer(position=(20, 90),
-                                            text_height=36,
-                                            screen_width=900,
-                                            screen_height=200,
-                                            background_color=(130,0,70),
-                                            text_color=(255,255,255))
-        )#.run()
-
-    if 1:
-        ProcessPipelineComponent(
-                    Textbox(position=(20, 340),
-                                     text_height=36,
-                                     screen_width=900,
-                                     screen_height=200,
-                                     background_color=(130,0,70),
-                                     text_color=(255,255,255)),
-                    TextDisplayer(position=(20, 90),
-                                            text_height=36,
-                                            screen_width=900,
-                                            screen_height=200,
-                                            background_color=(130,0,70),
-                                            text_color=(255,255,255))
-        ).run()
-
-    if 0:
-        from Kamaelia.Chassis.Pipeline import Pipeline
-        Pipeline(
-#            ProcessPipelineComponent(
-                    Textbox(position=(20, 340),
-                                     text_height=36,
-                                     screen_width=900,
-                                     screen_height=200,
-                                     background_color=(130,0,70),
-                                     text_color=(255,255,255)),
-#            ),
-            ProcessPipelineComponent(
-                    TextDisplayer(position=(20, 90),
-                                            text_height=36,
-                                            screen_width=900,
-                                            screen_height=200,
-                                            background_color=(130,0,70),
-                                            text_color=(255,255,255))
-            ),
-        ).run()
-
+    ProcessPipeline(
+                Textbox(position=(20, 340),
+                                 text_height=36,
+                                 screen_width=900,
+                                 screen_height=200,
+                                 background_color=(130,0,70),
+                                 text_color=(255,255,255)),
+                TextDisplayer(position=(20, 90),
+                                        text_height=36,
+                                        screen_width=900,
+                                        screen_height=200,
+                                        background_color=(130,0,70),
+                                        text_color=(255,255,255))
+    ).run()
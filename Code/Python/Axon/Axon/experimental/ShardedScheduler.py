@@ -0,0 +1,565 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+"""\
+===========================================================
+ShardedScheduler - running components across several cores
+===========================================================
+
+The normal Axon scheduler runs every microprocess, round robin, in a single
+thread - so a Kamaelia system never uses more than one CPU core. A
+ShardedScheduler runs a number of ordinary schedulers ("shards"), each in its
+own worker process. Components are placed onto a shard, and linkages between
+components on different shards are carried between processes automatically.
+
+
+
+Example Usage
+-------------
+
+Build the system as normal, but instead of activating the top level components,
+place them onto the shards of a ShardedScheduler, then run it::
+
+    from Axon.experimental.ShardedScheduler import ShardedScheduler
+
+    producer = Producer()
+    transform = Transformer()
+    consumer = Consumer()
+
+    producer.link( (producer, "outbox"), (transform, "inbox") )
+    transform.link( (transform, "outbox"), (consumer, "inbox") )
+
+    S = ShardedScheduler(shards=2)
+    S.place(producer, shard=0)
+    S.place(transform)           # goes to the least loaded shard
+    S.place(consumer, shard=0)
+
+    for stats in S.run():
+        print (stats)
+
+Alternatively, links between placed components can be made with the
+ShardedScheduler's own link() method - this is equivalent.
+
+
+
+Placement
+---------
+
+place(component[, shard][, weight]) assigns a component to a shard. If no shard
+is specified, the component goes to the shard with the smallest total weight of
+components placed on it so far. The weight defaults to 1; give heavier
+components a larger weight to get a better spread.
+
+Components are not activated until the worker processes start. Each one is
+then activated in the scheduler of the shard it was placed on. Any child
+components it activates (for example, those inside a Pipeline or Graphline)
+run on the same shard as their parent.
+
+shardOf(component) tells you which shard a component was placed on.
+
+
+
+Linkages between shards
+-----------------------
+
+When run() is called, the linkages made by placed components (and by the
+ShardedScheduler's link() method) are inspected. Where the source and sink are
+on the same shard, the linkage is left alone. Where they are on different
+shards, the linkage is replaced in each worker by a transport:
+
+* in the source's shard, messages sent are collected by a sender component,
+  which pickles them and passes them, in batches, through a
+  multiprocessing.Queue to the sink's shard.
+
+* in the sink's shard, a receiver (a threaded component) unpickles them and
+  delivers them, in order, to the sink's inbox.
+
+Messages therefore must be picklable. A message that cannot be pickled causes
+an exception in the sending shard, much as if send() had failed. Messages often
+refer to components (eg. producerFinished(self)); these references are not
+pickled, but are sent by name. On arrival they refer to the receiving shard's
+copy of that component if it existed when run() was called, or None if not.
+Either way, such a reference is good for identifying the sender, but not for
+talking to it.
+
+Only ordinary linkages (outbox to inbox) can cross shards - passthrough
+linkages are between parents and their children, which share a shard anyway.
+A component that has not been placed, but which a placed component has linked
+to, is assumed to be a child that will run on the same shard.
+
+
+
+Shutting down and statistics
+----------------------------
+
+A shard finishes once all the components placed on it have terminated, and
+run() returns once all the shards have finished.
+
+Each shard reports statistics, every 'interval' seconds and when it finishes.
+These are dictionaries containing:
+
+* "shard"          - the shard number
+* "pid"            - process id of the worker
+* "components"     - number of components placed on the shard
+* "weight"         - total weight of components placed on the shard
+* "microprocesses" - number of microprocesses currently in the shard's scheduler
+* "cpu"            - CPU time (seconds) used by the worker process so far
+* "elapsed"        - wall clock time (seconds) the worker has been running
+* "sent"           - number of messages sent to other shards
+* "received"       - number of messages received from other shards
+* "finished"       - True if this is the final report from the shard
+
+The latest report from each shard is available from the stats() method (this
+may be called from another thread whilst run() is running) and run() returns
+the final reports. Comparing "cpu" across shards shows any load imbalance.
+
+
+
+How does it work?
+-----------------
+
+Worker processes are created by forking (the multiprocessing module's "fork"
+start method), so the components do not need to be picklable - each worker
+inherits the whole system as built in the parent, and simply activates the
+components placed on its shard. The parent does not run any of them.
+
+Each worker replaces the default scheduler (scheduler.run) with a fresh one,
+removes cross-shard linkages, creates the sender, receiver and a monitor, then
+runs its scheduler until nothing is left to run. The monitor is woken when a
+placed component terminates, or by the scheduler's timer when a report is due,
+and sends its reports to the parent down a pipe.
+
+Meanwhile, run() blocks in the parent (using multiprocessing.connection.wait)
+until a report arrives, a worker process exits, or a message arrives for a
+shard that has already finished (which it discards). If a worker exits with a
+nonzero exit code, the other workers are terminated and run() raises
+RuntimeError.
+
+Because fork is required, ShardedScheduler is only available on platforms that
+support it; elsewhere, run() raises NotImplementedError.
+"""
+
+import os
+import time
+import pickle
+import multiprocessing
+import multiprocessing.connection
+from io import BytesIO
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from Axon.Microprocess import microprocess
+from Axon.Component import component
+from Axon.ThreadedComponent import threadedcomponent
+from Axon.Postoffice import postoffice
+from Axon.Ipc import producerFinished, WaitUntil
+import Axon.Scheduler
+
+def _dumps(data):
+    """Pickles data, substituting the names of any microprocesses it refers to"""
+    f = BytesIO()
+    pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    def persistent_id(obj):
+        if isinstance(obj, microprocess):
+            return obj.name
+        return None
+    pickler.persistent_id = persistent_id
+    pickler.dump(data)
+    return f.getvalue()
+
+def _loads(data, known):
+    """Unpickles data, looking up the names of microprocesses in the dictionary 'known'"""
+    unpickler = pickle.Unpickler(BytesIO(data))
+    unpickler.persistent_load = known.get
+    return unpickler.load()
+
+class _ShardSender(component):
+    """\
+    _ShardSender(routes) -> new _ShardSender component.
+
+    Collects messages arriving at an inbox per cross-shard linkage, and passes
+    them, pickled in batches, to the queue of the destination shard. Each time
+    it is woken, it does this for each route in turn, in the order given.
+
+    Keyword arguments:
+
+    - routes  -- list of (linkid, destination multiprocessing.Queue)
+    """
+    Outboxes = { "outbox" : "NOT USED",
+                 "signal" : "NOT USED",
+               }
+
+    def __init__(self, routes):
+        self.Inboxes = { "control" : "producerFinished to flush and stop" }
+        for linkid, dest in routes:
+            self.Inboxes["link%d" % linkid] = "Messages to send along cross-shard linkage %d" % linkid
+        super(_ShardSender, self).__init__()
+        self.routes = [ ("link%d" % linkid, linkid, dest) for linkid, dest in routes ]
+        self.sent = 0
+
+    def pack(self, linkid, messages):
+        """Returns the data to put onto the destination queue for a batch of messages"""
+        return _dumps((linkid, messages))
+
+    def flush(self):
+        for boxname, linkid, dest in self.routes:
+            messages = self.recvAll(boxname)
+            if messages:
+                dest.put(self.pack(linkid, messages))
+                self.sent += len(messages)
+
+    def main(self):
+        while not self.dataReady("control"):
+            self.flush()
+            if not self.anyReady():
+                self.pause()
+            yield 1
+        self.flush()
+
+
+class _ShardReceiver(threadedcomponent):
+    """\
+    _ShardReceiver(inbound, linkids, known) -> new _ShardReceiver component.
+
+    Takes batches of messages from this shard's queue and sends them out of an
+    outbox per cross-shard linkage. Stops when finish() is called, or when it
+    receives None.
+
+    Keyword arguments:
+
+    - inbound  -- this shard's multiprocessing.Queue
+    - linkids  -- ids of the cross-shard linkages that end in this shard
+    - known    -- dictionary mapping names to components that messages may refer to
+    """
+    Inboxes = { "inbox"   : "NOT USED",
+                "control" : "NOT USED",
+              }
+
+    def __init__(self, inbound, linkids, known):
+        self.Outboxes = { "outbox" : "NOT USED",
+                          "signal" : "NOT USED",
+                        }
+        for linkid in linkids:
+            self.Outboxes["link%d" % linkid] = "Messages arriving along cross-shard linkage %d" % linkid
+        super(_ShardReceiver, self).__init__()
+        self.inbound = inbound
+        self.known = known
+        self.received = 0
+        # stopping doesn't go through the queue, as the ShardedScheduler takes
+        # anything left in it once the shard has finished
+        self.stopreader, self.stopwriter = multiprocessing.Pipe(duplex=False)
+
+    def finish(self):
+        """Stops the receiver (may be called from any thread)"""
+        self.stopwriter.send(None)
+
+    def unpack(self, data):
+        """Returns (linkid, messages) from data taken from the queue"""
+        return _loads(data, self.known)
+
+    def main(self):
+        lastboxname = None
+        while 1:
+            ready = multiprocessing.connection.wait([ self.inbound._reader, self.stopreader ])
+            if self.stopreader in ready:
+                break
+            try:
+                data = self.inbound.get_nowait()
+            except queue.Empty:
+                continue
+            if data is None:
+                break
+            linkid, messages = self.unpack(data)
+            boxname = "link%d" % linkid
+            if boxname != lastboxname:
+                # messages for other outboxes must be delivered first (eg. data
+                # before a producerFinished that followed it)
+                self.sync()
+                lastboxname = boxname
+            self.received += len(messages)
+            while messages:
+                messages = messages[self.sendMany(messages, boxname):]
+                if messages:
+                    # woken once _localmain() has taken some from the queue
+                    self.pause()
+        self.stopreader.close()
+
+
+class _ShardMonitor(component):
+    """\
+    _ShardMonitor(shard, placed, weight, sched, sender, receiver, statspipe, interval)
+
+    Reports statistics for a shard, and shuts down the sender and receiver once
+    all the components placed on the shard have terminated.
+
+    It is woken when a placed component terminates, and by the scheduler's
+    timer when the next report is due - it does not poll.
+    """
+    def __init__(self, shard, placed, weight, sched, sender, receiver, statspipe, interval):
+        super(_ShardMonitor, self).__init__()
+        self.shard = shard
+        self.placed = placed
+        self.weight = weight
+        self.sched = sched
+        self.sender = sender
+        self.receiver = receiver
+        self.statspipe = statspipe
+        self.interval = interval
+        self.started = time.time()
+        self.cpustarted = time.process_time()
+        for C in placed:
+            if isinstance(C, component):
+                C._callOnCloseDown.append(self.unpause)
+
+    def report(self, finished=False):
+        self.statspipe.send( { "shard"          : self.shard,
+                               "pid"            : os.getpid(),
+                               "components"     : len(self.placed),
+                               "weight"         : self.weight,
+                               "microprocesses" : len(self.sched.threads),
+                               "cpu"            : time.process_time() - self.cpustarted,
+                               "elapsed"        : time.time() - self.started,
+                               "sent"           : self.sender.sent,
+                               "received"       : self.receiver.received,
+                               "finished"       : finished,
+                             } )
+
+    def main(self):
+        nextreport = time.time() + self.interval
+        while [ c for c in self.placed if not c._isStopped() ]:
+            if time.time() >= nextreport:
+                self.report()
+                nextreport = time.time() + self.interval
+            yield WaitUntil(nextreport)
+        self.send(producerFinished(self), "signal")
+        self.receiver.finish()
+        self.report(finished=True)
+
+
+class ShardedScheduler(object):
+    """\
+    ShardedScheduler([shards][,interval]) -> new ShardedScheduler object.
+
+    Runs components across a number of worker processes ("shards"), each
+    running its own scheduler. Place components onto shards with place(), then
+    call run().
+
+    Keyword arguments:
+
+    - shards    -- number of worker processes (default=number of CPUs)
+    - interval  -- seconds between statistics reports from each shard (default=1.0)
+    """
+    def __init__(self, shards=None, interval=1.0):
+        super(ShardedScheduler, self).__init__()
+        if shards is None:
+            shards = multiprocessing.cpu_count()
+        self.shards = shards
+        self.interval = interval
+        self.placement = {}
+        self.placed = [ [] for _ in range(shards) ]
+        self.weights = [ 0 ] * shards
+        self.postoffice = postoffice("ShardedScheduler")
+        self.shardstats = [ None ] * shards
+
+    def place(self, thecomponent, shard=None, weight=1):
+        """\
+        Places a component onto a shard, returning the shard number.
+
+        If shard is None, the shard with the lowest total weight is chosen.
+        The component must not already have been activated or placed.
+        """
+        if thecomponent in self.placement:
+            raise ValueError("Component already placed on shard %d" % self.placement[thecomponent])
+        if shard is None:
+            shard = self.weights.index(min(self.weights))
+        if not (0 <= shard < self.shards):
+            raise ValueError("No such shard: %d" % shard)
+        self.placement[thecomponent] = shard
+        self.placed[shard].append(thecomponent)
+        self.weights[shard] += weight
+        return shard
+
+    def shardOf(self, thecomponent):
+        """Returns the shard a component has been placed on, or None"""
+        return self.placement.get(thecomponent, None)
+
+    def link(self, source, sink, *optionalargs, **kwoptionalargs):
+        """\
+        Creates a linkage between boxes of placed components.
+
+        Takes the same arguments as Axon.Postoffice.postoffice.link(). The
+        components may be on different shards.
+        """
+        return self.postoffice.link(source, sink, *optionalargs, **kwoptionalargs)
+
+    def stats(self):
+        """Returns a list containing the most recent statistics reported by each shard (None if not reported yet)"""
+        return list(self.shardstats)
+
+    def _crossShardLinks(self):
+        """\
+        Returns a list of (postoffice, linkage, sourceshard, sinkshard) for all
+        linkages that cross between shards.
+
+        A component that hasn't been placed is assumed to be on the same shard
+        as the placed component that linked to it (eg. it is a child). Raises
+        ValueError if a linkage made by the ShardedScheduler's link() method
+        involves a component that hasn't been placed.
+        """
+        postoffices = [ (self.postoffice, None) ]
+        for C in self.placement:
+            postoffices.append( (C.postoffice, self.placement[C]) )
+        crossing = []
+        for po, ownershard in postoffices:
+            for L in po.linkages:
+                src = self.placement.get(L.source, ownershard)
+                dst = self.placement.get(L.sink, ownershard)
+                if src is None or dst is None:
+                    raise ValueError("Linkage "+str(L)+" involves a component that has not been placed")
+                if src != dst:
+                    if L.passthrough != 0:
+                        raise ValueError("Passthrough linkage "+str(L)+" cannot cross between shards")
+                    crossing.append( (po, L, src, dst) )
+        # the sender flushes linkages in this order, so ones to "control"
+        # inboxes go last - eg. so that producerFinished follows the data
+        crossing.sort(key=lambda X: X[1].sinkbox == "control")
+        return crossing
+
+    def _knownComponents(self, crossing):
+        """Returns a dictionary mapping names to components, for those that messages crossing shards may refer to"""
+        known = {}
+        for C in self.placement:
+            known[C.name] = C
+        for po, L, src, dst in crossing:
+            known[L.source.name] = L.source
+            known[L.sink.name] = L.sink
+        return known
+
+    def _runShard(self, shard, crossing, queues, statspipe):
+        """Runs in the worker process for a shard"""
+        Axon.Scheduler.scheduler.run = None
+        sched = Axon.Scheduler.scheduler()
+
+        routes = []
+        incoming = []
+        for linkid, (po, L, src, dst) in enumerate(crossing):
+            po.unlink(thelinkage=L)
+            if src == shard:
+                routes.append( (linkid, queues[dst]) )
+            if dst == shard:
+                incoming.append( (linkid, L) )
+
+        sender = _ShardSender(routes)
+        receiver = _ShardReceiver(queues[shard], [ linkid for linkid, L in incoming ], self._knownComponents(crossing))
+        for linkid, (po, L, src, dst) in enumerate(crossing):
+            if src == shard:
+                L.source.link( (L.source, L.sourcebox), (sender, "link%d" % linkid) )
+        for linkid, L in incoming:
+            receiver.link( (receiver, "link%d" % linkid), (L.sink, L.sinkbox) )
+
+        monitor = _ShardMonitor(shard, self.placed[shard], self.weights[shard], sched,
+                                sender, receiver, statspipe, self.interval)
+        monitor.link( (monitor, "signal"), (sender, "control") )
+
+        for C in self.placed[shard]:
+            C.activate()
+        sender.activate()
+        receiver.activate()
+        monitor.activate()
+        sched.runThreads()
+
+    def run(self):
+        """\
+        Starts a worker process per shard and runs until all of them have
+        finished. Returns a list of the final statistics from each shard.
+        """
+        try:
+            context = multiprocessing.get_context("fork")
+        except (AttributeError, ValueError):
+            raise NotImplementedError("ShardedScheduler needs processes to be started by forking")
+
+        crossing = self._crossShardLinks()
+        queues = [ context.Queue() for _ in range(self.shards) ]
+        workers = []
+        statspipes = []
+        for shard in range(self.shards):
+            reader, writer = context.Pipe(duplex=False)
+            worker = context.Process(target=self._runShard, args=(shard, crossing, queues, writer))
+            worker.daemon = True
+            worker.start()
+            writer.close()
+            workers.append(worker)
+            statspipes.append(reader)
+
+        # block until there's a report, a worker exits, or a message arrives
+        # for a shard that has finished (which must be discarded, else its
+        # sender can't exit)
+        running = set(range(self.shards))
+        finished = set()
+        while running:
+            waitingfor = [ statspipes[shard] for shard in running ]
+            waitingfor.extend( workers[shard].sentinel for shard in running )
+            waitingfor.extend( queues[shard]._reader for shard in finished )
+            ready = multiprocessing.connection.wait(waitingfor)
+            for shard in list(running):
+                if statspipes[shard] in ready:
+                    self._collectStats(statspipes[shard], finished)
+                if workers[shard].sentinel in ready:
+                    self._collectStats(statspipes[shard], finished)
+                    workers[shard].join()
+                    if workers[shard].exitcode != 0:
+                        for other in workers:
+                            other.terminate()
+                        raise RuntimeError("Shard %d exited with code %s" % (shard, workers[shard].exitcode))
+                    running.discard(shard)
+                    finished.add(shard)
+            self._discardMessagesFor(finished, queues)
+
+        for reader in statspipes:
+            reader.close()
+        return self.stats()
+
+    def _collectStats(self, reader, finished):
+        """Stores any statistics waiting to be read from a shard's pipe"""
+        try:
+            while reader.poll():
+                stats = reader.recv()
+                self.shardstats[stats["shard"]] = stats
+                if stats["finished"]:
+                    finished.add(stats["shard"])
+        except EOFError:
+            pass
+
+    def _discardMessagesFor(self, finished, queues):
+        """\
+        Discards messages sent to shards that have already finished, so that
+        the processes sending them don't block on exit waiting for them to be
+        collected.
+        """
+        for shard in finished:
+            try:
+                while 1:
+                    queues[shard].get_nowait()
+            except queue.Empty:
+                pass
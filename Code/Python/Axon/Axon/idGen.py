@@ -147,6 +147,7 @@ newId = idGen().strId
 strId=idGen().strId
 numId=idGen().numId
 tupleId=idGen().tupleId
+idToString=idGen().idToString
 
 if __name__ == '__main__':
    class foo: pass
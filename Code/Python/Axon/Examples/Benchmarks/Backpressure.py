@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of high/low watermark backpressure on a linkage.
+#
+# A producer sends bursts of messages to a consumer that only collects a few
+# each time it runs. Without watermarks the backlog in the consumer's
+# inbox grows without bound; with them the producer is paused whenever the
+# backlog reaches the high watermark, so it stays bounded, at little cost in
+# throughput.
+#
+# Usage:
+#
+#    python Backpressure.py
+#
+
+import time
+
+import Axon
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+
+MESSAGES = 100000
+BURST = 10
+
+class Producer(component):
+    def main(self):
+        for i in range(0, MESSAGES, BURST):
+            for j in range(i, i+BURST):
+                self.send(j, "outbox")
+            yield 1
+        self.send(Axon.Ipc.producerFinished(), "signal")
+
+class SlowConsumer(component):
+    def __init__(self):
+        super(SlowConsumer,self).__init__()
+        self.peak = 0
+        self.received = 0
+    def main(self):
+        while 1:
+            self.peak = max(self.peak, len(self.inboxes["inbox"]))
+            self.received += len(self.recvUpTo("inbox", 2))
+            if self.dataReady("control") and not self.dataReady("inbox"):
+                return
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+def run(**watermarks):
+    """Runs producer into slow consumer, returns (seconds, peak backlog)"""
+    sched = scheduler()
+    producer, consumer = Producer(), SlowConsumer()
+    producer.link((producer,"outbox"), (consumer,"inbox"), **watermarks)
+    producer.link((producer,"signal"), (consumer,"control"))
+    producer.activate(Scheduler=sched)
+    consumer.activate(Scheduler=sched)
+    start = time.time()
+    sched.runThreads()
+    assert consumer.received == MESSAGES
+    return time.time() - start, consumer.peak
+
+if __name__ == "__main__":
+    print ("%20s %10s %14s" % ("watermarks", "seconds", "peak backlog"))
+    for high, low in ((None, None), (1000, 500), (100, 50), (10, 5)):
+        seconds, peak = run(highwater=high, lowwater=low)
+        print ("%20s %10.2f %14d" % ("none" if high is None else "%d/%d" % (high, low), seconds, peak))
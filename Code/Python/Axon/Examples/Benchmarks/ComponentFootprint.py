@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Micro-benchmark of component creation time and memory footprint.
+#
+# Creates (and keeps alive) many components, then reports how long each took
+# to create and how much memory each is using. This is done for components
+# that are just created, and for pairs that are linked together and activated
+# (roughly what a server does for each connection).
+#
+# Usage:
+#
+#    python ComponentFootprint.py [count]
+#
+
+import sys
+import time
+import tracemalloc
+
+import Axon
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+
+def measure(make, count):
+    """\
+    Calls make() count times, returns (microseconds, bytes) per call. The
+    time and the memory are measured on separate runs, as tracing memory
+    allocation slows things down.
+    """
+    start = time.time()
+    keep = [ make() for _ in range(count) ]
+    elapsed = time.time() - start
+    del keep
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [ make() for _ in range(count) ]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return elapsed * 1e6 / count, used / float(count)
+
+def bare():
+    return component()
+
+def linkedPair(sched=scheduler()):
+    handler, adapter = component(), component()
+    handler.link((handler,"outbox"), (adapter,"inbox"))
+    handler.link((adapter,"outbox"), (handler,"inbox"))
+    handler.activate(Scheduler=sched)
+    adapter.activate(Scheduler=sched)
+    return handler, adapter
+
+if __name__ == "__main__":
+    count = 100000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    print ("%-28s %14s %14s" % ("", "us each", "bytes each"))
+    print ("%-28s %14.1f %14.0f" % (("%d components" % count,) + measure(bare, count)))
+    print ("%-28s %14.1f %14.0f" % (("%d linked, active pairs" % (count//2),) + measure(linkedPair, count//2)))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Micro-benchmark of the cost of microprocess debugging hooks.
+#
+# Measures how quickly components can be created, and how quickly a
+# microprocess can be woken and paused, with debugging switched off (the
+# default) and on (Axon.Microprocess.microprocess.setDebugging(True)).
+#
+# Usage:
+#
+#    python DebugOverhead.py
+#
+
+import time
+
+import Axon
+from Axon.Microprocess import microprocess
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+
+def creationRate(n=20000):
+    """Returns components created per second"""
+    start = time.time()
+    for i in range(n):
+        component()
+    return n / (time.time() - start)
+
+def wakeRate(n=200000):
+    """Returns unpause()+pause() pairs per second, for an activated microprocess"""
+    sched = scheduler()
+    C = component().activate(Scheduler=sched)
+    start = time.time()
+    for i in range(n):
+        C.unpause()
+        C.pause()
+    elapsed = time.time() - start
+    sched.wakeRequests.clear()
+    sched.pauseRequests.clear()
+    return n / elapsed
+
+if __name__ == "__main__":
+    print ("%10s %16s %16s" % ("debugging", "components/s", "wake+pause/s"))
+    for debugging in (False, True):
+        microprocess.setDebugging(debugging)
+        print ("%10s %16.0f %16.0f" % (debugging, creationRate(), wakeRate()))
+    microprocess.setDebugging(False)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Micro-benchmark of scheduler wake-up latency.
+#
+# A pair of components bounce a message back and forth, each pausing until the
+# other replies, and the round trip times are shown as a histogram. This is
+# done for a pair in the scheduler's thread, and for a threadedcomponent
+# paired with an ordinary component (so every wake crosses threads).
+#
+# Finally, it measures how much CPU time the scheduler uses whilst every
+# component is paused, which should be close to zero.
+#
+# Usage:
+#
+#    python PingPongLatency.py
+#
+
+import os
+import time
+import threading
+
+import Axon
+from Axon.Component import component
+from Axon.ThreadedComponent import threadedcomponent
+from Axon.Scheduler import scheduler
+
+ROUNDTRIPS = 2000
+BUCKETS = [ 10e-6, 20e-6, 50e-6, 100e-6, 200e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3, 20e-3 ]
+
+class Ping(component):
+    def __init__(self, times):
+        super(Ping,self).__init__()
+        self.times = times
+    def main(self):
+        for i in range(ROUNDTRIPS):
+            start = time.time()
+            self.send(i, "outbox")
+            while not self.dataReady("inbox"):
+                self.pause()
+                yield 1
+            self.recv("inbox")
+            self.times.append(time.time() - start)
+        self.send(Axon.Ipc.producerFinished(), "signal")
+
+class ThreadedPing(threadedcomponent):
+    def __init__(self, times):
+        super(ThreadedPing,self).__init__()
+        self.times = times
+    def main(self):
+        for i in range(ROUNDTRIPS):
+            start = time.time()
+            self.send(i, "outbox")
+            while not self.dataReady("inbox"):
+                self.pause()
+            self.recv("inbox")
+            self.times.append(time.time() - start)
+        self.send(Axon.Ipc.producerFinished(), "signal")
+
+class Pong(component):
+    def main(self):
+        while not self.dataReady("control"):
+            for msg in self.recvAll("inbox"):
+                self.send(msg, "outbox")
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+def roundtrips(pingclass):
+    """Runs a ping-pong pair in a new scheduler, returns the round trip times"""
+    times = []
+    sched = scheduler()
+    ping, pong = pingclass(times), Pong()
+    ping.link((ping,"outbox"), (pong,"inbox"))
+    ping.link((ping,"signal"), (pong,"control"))
+    pong.link((pong,"outbox"), (ping,"inbox"))
+    ping.activate(Scheduler=sched)
+    pong.activate(Scheduler=sched)
+    sched.runThreads()
+    return times
+
+def idlecpu(seconds=2.0):
+    """Returns CPU seconds used per second by the scheduler whilst everything is paused"""
+    sched = scheduler()
+    sleeper = Pong()
+    sleeper.activate(Scheduler=sched)
+    threading.Timer(seconds, lambda : sleeper._deliver(Axon.Ipc.producerFinished(), "control")).start()
+    start = os.times()
+    sched.runThreads()
+    end = os.times()
+    return ((end[0]-start[0]) + (end[1]-start[1])) / seconds
+
+def histogram(title, times):
+    times = sorted(times)
+    print ("%s: %d round trips, median %.1fus, 99th percentile %.1fus, max %.1fus" %
+           (title, len(times), times[len(times)//2]*1e6, times[int(len(times)*0.99)]*1e6, times[-1]*1e6))
+    lower = 0.0
+    for upper in BUCKETS + [ float("inf") ]:
+        n = len([ t for t in times if lower <= t < upper ])
+        label = "< %gus" % (upper*1e6) if upper != float("inf") else ">= %gus" % (lower*1e6)
+        print ("    %12s %6d %s" % (label, n, "#" * int(60.0 * n / len(times))))
+        lower = upper
+
+if __name__ == "__main__":
+    histogram("same thread", roundtrips(Ping))
+    histogram("cross thread", roundtrips(ThreadedPing))
+    print ("idle scheduler CPU usage: %.3f%%" % (idlecpu()*100))
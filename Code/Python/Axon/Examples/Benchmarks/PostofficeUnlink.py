@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Micro-benchmark of link and unlink times against the number of linkages a
+# postoffice is looking after.
+#
+# A long lived parent (like a server) accumulates linkages to and from its
+# children. This fills a postoffice with the given numbers of linkages, then
+# times making a linkage, removing a linkage, and removing all the linkages
+# for a component (as happens when a connection closes), for a sample of 1000
+# of them.
+#
+# Usage:
+#
+#    python PostofficeUnlink.py
+#
+
+import random
+import time
+
+import Axon
+from Axon.Component import component
+from Axon.Postoffice import postoffice
+
+SAMPLE = 1000
+
+def timings(count):
+    """Returns microseconds per link, unlink(thelinkage), unlink(thecomponent)"""
+    po = postoffice()
+    parent = component()
+    children = [ component() for _ in range(count + 2*SAMPLE) ]
+    for child in children[:count]:
+        po.link((child,"outbox"), (child,"inbox"))
+    extra = children[count:]
+
+    start = time.time()
+    links = [ po.link((child,"outbox"), (child,"inbox")) for child in extra ]
+    linktime = (time.time() - start) / len(extra)
+
+    links = links[:SAMPLE]
+    random.shuffle(links)
+    start = time.time()
+    for L in links:
+        po.unlink(thelinkage=L)
+    unlinktime = (time.time() - start) / SAMPLE
+
+    start = time.time()
+    for child in extra[SAMPLE:]:
+        po.unlink(thecomponent=child)
+    componenttime = (time.time() - start) / SAMPLE
+
+    return linktime*1e6, unlinktime*1e6, componenttime*1e6
+
+if __name__ == "__main__":
+    print ("%10s %12s %20s %22s" % ("linkages", "link (us)", "unlink linkage (us)", "unlink component (us)"))
+    for count in (1000, 10000, 50000):
+        print ("%10d %12.1f %20.1f %22.1f" % ((count,) + timings(count)))
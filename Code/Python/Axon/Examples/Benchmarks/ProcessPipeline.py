@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of ProcessPipeline against the in-process Pipeline.
+#
+# Throughput: a stream of messages is sent through a pipeline of pass-through
+# components and collected at the other end.
+#
+# Latency: a single message at a time is sent into the pipeline, and the next
+# one only once it has come out of the other end.
+#
+# Each is done with Kamaelia's Pipeline (everything in one process) and with
+# Axon.experimental.Process.ProcessPipeline (each component in a process of its
+# own).
+#
+# Usage:
+#
+#    python ProcessPipeline.py
+#
+
+import time
+
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+from Axon.Ipc import producerFinished
+from Axon.experimental.Process import ProcessPipeline
+from Kamaelia.Chassis.Pipeline import Pipeline
+
+STAGES = 3
+MESSAGES = 20000
+ROUNDTRIPS = 500
+
+class PassThrough(component):
+    def main(self):
+        while 1:
+            self.sendMany(self.recvAll("inbox"), "outbox")
+            if self.dataReady("control"):
+                self.send(self.recv("control"), "signal")
+                return
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+class Source(component):
+    def main(self):
+        for i in range(MESSAGES):
+            self.send(i, "outbox")
+            if i % 100 == 0:
+                yield 1
+        self.send(producerFinished(self), "signal")
+
+class Sink(component):
+    def __init__(self):
+        super(Sink,self).__init__()
+        self.received = 0
+    def main(self):
+        while not self.dataReady("control"):
+            self.received += len(self.recvAll("inbox"))
+            if not self.anyReady():
+                self.pause()
+            yield 1
+        self.received += len(self.recvAll("inbox"))
+
+class Pinger(component):
+    def __init__(self, times):
+        super(Pinger,self).__init__()
+        self.times = times
+    def main(self):
+        for i in range(ROUNDTRIPS):
+            start = time.time()
+            self.send(i, "outbox")
+            while not self.dataReady("inbox"):
+                self.pause()
+                yield 1
+            self.recv("inbox")
+            self.times.append(time.time() - start)
+        self.send(producerFinished(self), "signal")
+        while not self.dataReady("control"):
+            self.pause()
+            yield 1
+
+def throughput(chassis):
+    """Returns messages per second through a pipeline of STAGES pass-through components"""
+    scheduler.run = scheduler()
+    source, sink = Source(), Sink()
+    Pipeline(source, chassis(*[ PassThrough() for _ in range(STAGES) ]), sink).activate()
+    start = time.time()
+    scheduler.run.runThreads()
+    assert sink.received == MESSAGES
+    return MESSAGES / (time.time() - start)
+
+def latency(chassis):
+    """Returns sorted round trip times through a pipeline of STAGES pass-through components"""
+    scheduler.run = scheduler()
+    times = []
+    pinger = Pinger(times)
+    P = chassis(*[ PassThrough() for _ in range(STAGES) ])
+    pinger.link((pinger,"outbox"), (P,"inbox"))
+    pinger.link((pinger,"signal"), (P,"control"))
+    P.link((P,"outbox"), (pinger,"inbox"))
+    P.link((P,"signal"), (pinger,"control"))
+    pinger.activate()
+    P.activate()
+    scheduler.run.runThreads()
+    return sorted(times)
+
+if __name__ == "__main__":
+    print ("%d stages of pass-through components" % STAGES)
+    print ("%16s %14s %14s %14s" % ("", "messages/s", "median rtt", "99% rtt"))
+    for title, chassis in (("Pipeline", Pipeline), ("ProcessPipeline", ProcessPipeline)):
+        rate = throughput(chassis)
+        times = latency(chassis)
+        print ("%16s %14.0f %12.1fus %12.1fus" % (title, rate, times[len(times)//2]*1e6, times[int(len(times)*0.99)]*1e6))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Micro-benchmark of recv() throughput against inbox backlog depth.
+#
+# A burst of messages is delivered to a component's inbox, then the component
+# drains it with recv(). If collecting a message costs the same however many
+# are waiting, then the rate stays flat as the backlog grows.
+#
+# Usage:
+#
+#    python RecvBacklog.py
+#
+
+import time
+
+import Axon
+
+def drain(depth):
+    """Fills an inbox with depth messages, returns messages collected per second"""
+    C = Axon.Component.component()
+    inbox = C.inboxes["inbox"]
+    for i in range(depth):
+        inbox.append(i)
+    start = time.time()
+    while C.dataReady("inbox"):
+        C.recv("inbox")
+    return depth / (time.time() - start)
+
+if __name__ == "__main__":
+    print ("%10s %14s" % ("backlog", "recv/s"))
+    for depth in (1000, 10000, 100000, 1000000):
+        print ("%10d %14.0f" % (depth, drain(depth)))
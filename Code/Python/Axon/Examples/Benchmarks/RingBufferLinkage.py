@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of ProcessPipeline shared memory ring buffers.
+#
+# A stream of bytes payloads, of various sizes, is sent from a producer through
+# a pass-through component to a consumer, each in a process of its own. This is
+# done with the payloads pickled through the queues as normal, and with them
+# copied into a ring buffer for each linkage instead.
+#
+# Usage:
+#
+#    python RingBufferLinkage.py
+#
+
+import time
+
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+from Axon.Ipc import producerFinished
+from Axon.experimental.Process import ProcessPipeline
+
+TOTALBYTES = 64 * 1024 * 1024
+SIZES = [ 1024, 16*1024, 256*1024, 1024*1024 ]
+RINGBUFFER = 8 * 1024 * 1024
+
+class Source(component):
+    def __init__(self, size):
+        super(Source,self).__init__()
+        self.size = size
+    def main(self):
+        payload = b"x" * self.size
+        for i in range(TOTALBYTES // self.size):
+            self.send(payload, "outbox")
+            yield 1
+        self.send(producerFinished(self), "signal")
+
+class PassThrough(component):
+    def main(self):
+        while 1:
+            self.sendMany(self.recvAll("inbox"), "outbox")
+            if self.dataReady("control"):
+                self.send(self.recv("control"), "signal")
+                return
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+class Sink(component):
+    def main(self):
+        while not self.dataReady("control"):
+            for payload in self.recvAll("inbox"):
+                payload[-1]   # touch it, as a real consumer would
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+def throughput(size, ringbuffer):
+    """Returns megabytes per second through the pipeline, for payloads of the given size"""
+    scheduler.run = scheduler()
+    ProcessPipeline(Source(size), PassThrough(), Sink(), ringbuffer=ringbuffer).activate()
+    start = time.time()
+    scheduler.run.runThreads()
+    return (TOTALBYTES // size) * size / (time.time() - start) / (1024*1024)
+
+if __name__ == "__main__":
+    print ("%d MB of payloads through 3 processes" % (TOTALBYTES // (1024*1024)))
+    print ("%12s %16s %16s" % ("payload", "queue MB/s", "ringbuffer MB/s"))
+    for size in SIZES:
+        print ("%10dkB %16.0f %16.0f" % (size // 1024, throughput(size, None), throughput(size, RINGBUFFER)))
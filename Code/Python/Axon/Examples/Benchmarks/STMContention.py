@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of contention for an Axon.STM.Store between threads.
+#
+# THREADS threads between them commit TRANSACTIONS updates, each to one of
+# KEYS values in a shared store, picked at random. Each value is a dictionary
+# of ENTRIES items, so copying it is not free. This is done with the whole
+# store behind a single lock (stripes=1), retrying straight away or after
+# backing off; with the keys spread across the default number of locks; and
+# with that and values shared rather than deep copied (immutable=True).
+#
+# For each, the rate of commits and the number of BusyRetry and
+# ConcurrentUpdate failures per commit are shown.
+#
+# Usage:
+#
+#    python STMContention.py
+#
+
+import time
+import random
+import threading
+
+from Axon.STM import Store, BusyRetry, ConcurrentUpdate, backoff, DefaultStripes
+
+THREADS = [ 2, 4, 8, 16, 32 ]
+TRANSACTIONS = 8000
+KEYS = 64
+ENTRIES = 100
+
+def makeStore(stripes, immutable):
+    store = Store(stripes=stripes, immutable=immutable)
+    for key in range(KEYS):
+        V = store.usevar(key)
+        V.set(dict( (i, 0) for i in range(ENTRIES) ))
+        V.commit()
+    return store
+
+def worker(store, count, wait, failures):
+    busy = conflicts = 0
+    for _ in range(count):
+        key = random.randrange(KEYS)
+        waits = backoff(attempts=1000000)
+        while True:
+            try:
+                D = store.using(key)
+                D[key].writable()[0] += 1
+                D.commit()
+                break
+            except BusyRetry:
+                busy += 1
+            except ConcurrentUpdate:
+                conflicts += 1
+            if wait:
+                time.sleep(next(waits))
+    failures.append( (busy, conflicts) )
+
+def run(nthreads, stripes, immutable, wait):
+    """Returns commits/second, and BusyRetry and ConcurrentUpdate failures per commit"""
+    store = makeStore(stripes, immutable)
+    failures = []
+    threads = [ threading.Thread(target=worker, args=(store, TRANSACTIONS // nthreads, wait, failures))
+                for _ in range(nthreads) ]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    commits = (TRANSACTIONS // nthreads) * nthreads
+    assert commits == sum(store.usevar(key).value[0] for key in range(KEYS))
+    busy = sum(b for b, c in failures)
+    conflicts = sum(c for b, c in failures)
+    return commits/elapsed, float(busy)/commits, float(conflicts)/commits
+
+MODES = [ ("one lock, spinning",           1, False, False),
+          ("one lock, backing off",        1, False, True),
+          ("striped, backing off",      DefaultStripes, False, True),
+          ("striped, immutable values", DefaultStripes, True,  True),
+        ]
+
+if __name__ == "__main__":
+    print ("%d transactions over %d keys, each a dictionary of %d items" % (TRANSACTIONS, KEYS, ENTRIES))
+    print ("%28s %8s %14s %10s %10s" % ("", "threads", "commits/s", "busy", "conflicts"))
+    for title, stripes, immutable, wait in MODES:
+        for nthreads in THREADS:
+            rate, busy, conflicts = run(nthreads, stripes, immutable, wait)
+            print ("%28s %8d %14.0f %10.3f %10.3f" % (title, nthreads, rate, busy, conflicts))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of the memory used by a backlog of messages in an inbox, with and
+# without spilling to disk.
+#
+# A bursty producer delivers a large backlog of 10KB messages to an inbox
+# before the consumer starts collecting them. Each run is done in a separate
+# process, and its peak memory use (maximum resident set size) is reported
+# along with the rate messages were delivered and collected at.
+#
+# Usage:
+#
+#    python SpillBacklog.py
+#
+
+import sys
+import time
+import resource
+import subprocess
+
+import Axon
+
+MESSAGES = 20000
+MESSAGESIZE = 10240
+
+def run(memsize):
+    """Delivers then collects the backlog, returns (delivered/s, collected/s)"""
+    C = Axon.Component.component()
+    if memsize:
+        C.spillInboxToDisk("inbox", memsize=memsize)
+    inbox = C.inboxes["inbox"]
+    start = time.time()
+    for i in range(MESSAGES):
+        inbox.append(b"x" * MESSAGESIZE)
+    delivered = time.time()
+    while C.dataReady("inbox"):
+        C.recv("inbox")
+    collected = time.time()
+    return MESSAGES / (delivered - start), MESSAGES / (collected - delivered)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        memsize = int(sys.argv[1])
+        delivered, collected = run(memsize)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        print ("%14s %14.0f %14.0f %14.1f" % (memsize or "in memory", delivered, collected, maxrss))
+    else:
+        print ("%d messages of %d bytes" % (MESSAGES, MESSAGESIZE))
+        print ("%14s %14s %14s %14s" % ("memsize", "deliver/s", "collect/s", "peak MB"))
+        sys.stdout.flush()
+        for memsize in (0, 10000, 1000, 100):
+            subprocess.call([sys.executable, sys.argv[0], str(memsize)])
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of the overhead of recording runtime statistics in the scheduler.
+#
+# A chain of components passes messages along, each sending one message and
+# receiving one per timeslice. The rate at which timeslices are run is
+# measured with recording of statistics switched off (the default) and on.
+#
+# Usage:
+#
+#    python StatsOverhead.py
+#
+
+import time
+
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+
+COMPONENTS = 100
+MESSAGES = 2000
+
+class Source(component):
+    def main(self):
+        for i in range(MESSAGES):
+            self.send(i, "outbox")
+            yield 1
+
+class Relay(component):
+    def main(self):
+        count = 0
+        while count < MESSAGES:
+            if self.dataReady("inbox"):
+                self.send(self.recv("inbox"), "outbox")
+                count += 1
+            else:
+                self.pause()
+            yield 1
+
+def run(recording):
+    """Runs the chain, returns timeslices per second"""
+    scheduler.run = scheduler()
+    chain = [ Source() ] + [ Relay() for i in range(COMPONENTS) ]
+    for source, sink in zip(chain, chain[1:]):
+        source.link( (source,"outbox"), (sink,"inbox") )
+    for c in chain:
+        c.activate()
+    scheduler.run.recordStats(recording)
+    start = time.time()
+    timeslices = 0
+    for _ in scheduler.run.main(canblock=True):
+        timeslices += 1
+    elapsed = time.time() - start
+    scheduler.run.recordStats(False)
+    return timeslices / elapsed
+
+if __name__ == "__main__":
+    print ("%d components relaying %d messages" % (COMPONENTS, MESSAGES))
+    print ("%20s %14s" % ("", "timeslices/s"))
+    for title, recording in [ ("stats off", False), ("stats on", True), ("stats off", False), ("stats on", True) ]:
+        print ("%20s %14.0f" % (title, run(recording)))
@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Micro-benchmark suite for the core of Axon.
+#
+# Runs a set of small benchmarks of the parts of Axon that most often affect
+# performance - Box, Scheduler, Postoffice and ThreadedComponent - so that the
+# effect of a change can be measured:
+#
+#    pipeline.depthN     messages/s through a pipeline of N relaying components
+#    fanout.splitter     messages/s delivered by a Splitter to 10 destinations
+#    fanout.backplane    messages/s delivered through a Backplane to 10
+#                        subscribers
+#    wake.latency        median time for a message to go there and back between
+#                        two components, each pausing until the other replies
+#    wake.latency.busy   the same, with 100 busy components running alongside
+#    wake.latency.priority
+#                        the same, with the two at high priority and the busy
+#                        components at low priority
+#    lifecycle           components/s created, activated and run to completion
+#    link.unlink         linkages/s created and removed
+#    waitcomplete        WaitComplete detours/s taken by a component
+#    introspector.changes
+#                        topology changes/s described by an Introspector, with
+#                        10000 idle components running
+#    threaded.roundtrip  median round trip time between a threadedcomponent and
+#                        an ordinary component
+#
+# The fanout benchmarks need Kamaelia, and are skipped if it cannot be
+# imported. Each benchmark is run several times and the median is reported.
+# Results can be written to a JSON file and later compared against the
+# results from another commit.
+#
+# Usage:
+#
+#    python Suite.py [options] [benchmark name prefix ...]
+#
+#    -j, --json FILE      write results to FILE as JSON
+#    -c, --compare FILE   compare results against those in FILE
+#    -r, --repeat N       run each benchmark N times (default 3)
+#    -q, --quick          run shorter benchmarks, for a quick check
+#    -l, --list           list the benchmarks and exit
+#
+# For example:
+#
+#    python Suite.py --json before.json
+#    ... change something ...
+#    python Suite.py --json after.json --compare before.json
+#
+
+import os
+import sys
+import time
+import json
+import getopt
+import platform
+import subprocess
+
+from Axon.Component import component
+from Axon.ThreadedComponent import threadedcomponent
+from Axon.Scheduler import scheduler
+from Axon.Ipc import producerFinished, WaitComplete
+from Axon.Introspector import Introspector
+
+try:
+    from Kamaelia.Util.Splitter import Splitter, addsink
+    from Kamaelia.Util.Backplane import Backplane, PublishTo, SubscribeTo
+except ImportError:
+    Splitter = None
+
+clock = getattr(time, "perf_counter", time.time)
+
+# Scales the amount of work each benchmark does. --quick reduces it.
+SCALE = 1.0
+
+FANOUT = 10
+
+BENCHMARKS = []
+
+def benchmark(name, unit, higherIsBetter=True):
+    """Registers a function as a benchmark, returning a single measurement"""
+    def register(function):
+        BENCHMARKS.append( (name, unit, higherIsBetter, function) )
+        return function
+    return register
+
+def scaled(n):
+    return max(1, int(n * SCALE))
+
+def newScheduler():
+    """Makes a new scheduler the default one, so components activated by other components run in it too"""
+    scheduler.run = scheduler()
+    return scheduler.run
+
+def runUntil(running, done, check=100):
+    """Steps a running scheduler until done() returns true (checked every 'check' steps) or it has nothing left to run"""
+    for n, _ in enumerate(running):
+        if n % check == 0 and done():
+            return
+
+class Source(component):
+    def __init__(self, count):
+        super(Source,self).__init__()
+        self.count = count
+    def main(self):
+        for i in range(self.count):
+            self.send(i, "outbox")
+            yield 1
+
+class Relay(component):
+    def __init__(self, count):
+        super(Relay,self).__init__()
+        self.count = count
+    def main(self):
+        received = 0
+        while received < self.count:
+            for msg in self.recvAll("inbox"):
+                self.send(msg, "outbox")
+                received += 1
+            if received < self.count:
+                self.pause()
+            yield 1
+
+class Sink(component):
+    def __init__(self, count):
+        super(Sink,self).__init__()
+        self.count = count
+        self.received = 0
+    def main(self):
+        while self.received < self.count:
+            self.received += len(self.recvAll("inbox"))
+            if self.received < self.count:
+                self.pause()
+            yield 1
+
+class Ping(component):
+    def __init__(self, roundtrips, times):
+        super(Ping,self).__init__()
+        self.roundtrips = roundtrips
+        self.times = times
+    def main(self):
+        for i in range(self.roundtrips):
+            start = clock()
+            self.send(i, "outbox")
+            while not self.dataReady("inbox"):
+                self.pause()
+                yield 1
+            self.recv("inbox")
+            self.times.append(clock() - start)
+        self.send(producerFinished(), "signal")
+
+class ThreadedPing(threadedcomponent):
+    def __init__(self, roundtrips, times):
+        super(ThreadedPing,self).__init__()
+        self.roundtrips = roundtrips
+        self.times = times
+    def main(self):
+        for i in range(self.roundtrips):
+            start = clock()
+            self.send(i, "outbox")
+            while not self.dataReady("inbox"):
+                self.pause()
+            self.recv("inbox")
+            self.times.append(clock() - start)
+        self.send(producerFinished(), "signal")
+
+class Pong(component):
+    def main(self):
+        while not self.dataReady("control"):
+            for msg in self.recvAll("inbox"):
+                self.send(msg, "outbox")
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+class Delegator(component):
+    def __init__(self, count):
+        super(Delegator,self).__init__()
+        self.count = count
+    def main(self):
+        for i in range(self.count):
+            yield WaitComplete(self.detour())
+    def detour(self):
+        yield 1
+
+class Nothing(component):
+    def main(self):
+        yield 1
+
+def pipeline(depth):
+    count = scaled(20000 // depth + 1000)
+    sched = newScheduler()
+    chain = [ Source(count) ] + [ Relay(count) for i in range(depth) ] + [ Sink(count) ]
+    for source, sink in zip(chain, chain[1:]):
+        source.link( (source,"outbox"), (sink,"inbox") )
+    for c in chain:
+        c.activate(Scheduler=sched)
+    start = clock()
+    sched.runThreads()
+    return count / (clock() - start)
+
+for depth in (1, 10, 100):
+    benchmark("pipeline.depth%d" % depth, "messages/s")(lambda depth=depth : pipeline(depth))
+
+@benchmark("fanout.splitter", "messages/s")
+def fanoutSplitter():
+    if Splitter is None:
+        return None
+    count = scaled(5000)
+    sched = newScheduler()
+    source, splitter = Source(count), Splitter()
+    sinks = [ Sink(count) for i in range(FANOUT) ]
+    source.link( (source,"outbox"), (splitter,"inbox") )
+    for sink in sinks:
+        splitter.createsink(sink)
+    for c in [ source, splitter ] + sinks:
+        c.activate(Scheduler=sched)
+    running = sched.main()
+    start = clock()
+    runUntil(running, lambda : all([ sink._isStopped() for sink in sinks ]))
+    return count * FANOUT / (clock() - start)
+
+backplanes = 0
+
+@benchmark("fanout.backplane", "messages/s")
+def fanoutBackplane():
+    if Splitter is None:
+        return None
+    global backplanes
+    backplanes += 1
+    name = "Suite%d" % backplanes
+    count = scaled(5000)
+    sched = newScheduler()
+    backplane = Backplane(name)
+    splitter = backplane.splitter
+    backplane.activate(Scheduler=sched)
+    sinks = []
+    for i in range(FANOUT):
+        subscriber, sink = SubscribeTo(name), Sink(count)
+        subscriber.link( (subscriber,"outbox"), (sink,"inbox") )
+        subscriber.activate(Scheduler=sched)
+        sink.activate(Scheduler=sched)
+        sinks.append(sink)
+    running = sched.main()
+    runUntil(running, lambda : len(splitter.outboxsinks) == FANOUT, check=1)
+    publisher, source = PublishTo(name), Source(count)
+    source.link( (source,"outbox"), (publisher,"inbox") )
+    publisher.activate(Scheduler=sched)
+    source.activate(Scheduler=sched)
+    start = clock()
+    runUntil(running, lambda : all([ sink._isStopped() for sink in sinks ]))
+    return count * FANOUT / (clock() - start)
+
+class Busy(component):
+    def __init__(self, ping):
+        super(Busy,self).__init__()
+        self.ping = ping
+    def main(self):
+        while not self.ping._isStopped():
+            sum(range(200))
+            yield 1
+
+def roundtrips(pingclass, busy=0, priority=False):
+    """\
+    Runs a ping-pong pair, alongside a number of busy components, returns the
+    median round trip time in microseconds. If priority is true, the pair are
+    run at high priority and the busy components at low priority.
+    """
+    times = []
+    sched = newScheduler()
+    ping, pong = pingclass(scaled(5000), times), Pong()
+    ping.link( (ping,"outbox"), (pong,"inbox") )
+    ping.link( (ping,"signal"), (pong,"control") )
+    pong.link( (pong,"outbox"), (ping,"inbox") )
+    ping.activate(Scheduler=sched, priority=scheduler.HIGH if priority else None)
+    pong.activate(Scheduler=sched, priority=scheduler.HIGH if priority else None)
+    for i in range(busy):
+        Busy(ping).activate(Scheduler=sched, priority=scheduler.LOW if priority else None)
+    sched.runThreads()
+    times.sort()
+    return times[len(times)//2] * 1e6
+
+benchmark("wake.latency", "us", higherIsBetter=False)(lambda : roundtrips(Ping))
+benchmark("wake.latency.busy", "us", higherIsBetter=False)(lambda : roundtrips(Ping, busy=100))
+benchmark("wake.latency.priority", "us", higherIsBetter=False)(lambda : roundtrips(Ping, busy=100, priority=True))
+
+@benchmark("lifecycle", "components/s")
+def lifecycle():
+    count = scaled(20000)
+    start = clock()
+    sched = newScheduler()
+    for i in range(count):
+        Nothing().activate(Scheduler=sched)
+    sched.runThreads()
+    return count / (clock() - start)
+
+@benchmark("link.unlink", "linkages/s")
+def linkUnlink():
+    count = scaled(50000)
+    source, sink = component(), component()
+    start = clock()
+    for i in range(count):
+        source.unlink(thelinkage=source.link( (source,"outbox"), (sink,"inbox") ))
+    return count / (clock() - start)
+
+@benchmark("waitcomplete", "detours/s")
+def waitComplete():
+    count = scaled(50000)
+    sched = newScheduler()
+    Delegator(count).activate(Scheduler=sched)
+    start = clock()
+    sched.runThreads()
+    return count / (clock() - start)
+
+class Idle(component):
+    def main(self):
+        while 1:
+            self.recvAll("inbox")
+            self.pause()
+            yield 1
+
+@benchmark("introspector.changes", "changes/s")
+def introspectorChanges():
+    count = scaled(5000)
+    idle = scaled(10000)
+    sched = newScheduler()
+    for i in range(idle):
+        Idle().activate()
+    introspector = Introspector()
+    discard = Idle()
+    introspector.link( (introspector,"outbox"), (discard,"inbox") )
+    discard.activate()
+    introspector.activate()
+    running = sched.main()
+    runUntil(running, lambda : len(getattr(introspector, "boxes", ())) >= idle)
+    source, sink = component(), component()
+    start = clock()
+    for i in range(count):
+        source.unlink(thelinkage=source.link( (source,"outbox"), (sink,"inbox") ))
+        runUntil(running, lambda : not introspector.events, check=1)
+    return 2*count / (clock() - start)
+
+benchmark("threaded.roundtrip", "us", higherIsBetter=False)(lambda : roundtrips(ThreadedPing))
+
+def commit():
+    """Returns the git commit being benchmarked, if known"""
+    try:
+        p = subprocess.Popen(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        out = p.communicate()[0]
+        if p.returncode == 0:
+            return out.decode("ascii").strip()
+    except OSError:
+        pass
+    return None
+
+def median(values):
+    values = sorted(values)
+    return values[len(values)//2]
+
+def run(prefixes=[], repeat=3):
+    """Runs the benchmarks whose names start with any of the prefixes (or all of them), returns the results"""
+    results = {}
+    for name, unit, higherIsBetter, function in BENCHMARKS:
+        if prefixes and not [ p for p in prefixes if name.startswith(p) ]:
+            continue
+        values = []
+        for i in range(repeat):
+            value = function()
+            if value is None:
+                break
+            values.append(value)
+        if not values:
+            print ("%-20s %14s" % (name, "skipped"))
+            continue
+        results[name] = { "unit" : unit,
+                          "higherIsBetter" : higherIsBetter,
+                          "values" : values,
+                          "median" : median(values),
+                        }
+        print ("%-20s %14.1f %s" % (name, results[name]["median"], unit))
+        sys.stdout.flush()
+    return results
+
+def compare(old, new):
+    """Prints how each result in new differs from the same one in old"""
+    print ("")
+    print ("%-20s %14s %14s %9s" % ("", "before", "after", "change"))
+    for name, unit, higherIsBetter, function in BENCHMARKS:
+        if name not in old or name not in new:
+            continue
+        before, after = old[name]["median"], new[name]["median"]
+        change = (after - before) / before * 100.0
+        better = (change > 0) == higherIsBetter
+        print ("%-20s %14.1f %14.1f %+8.1f%% %s" % (name, before, after, change, "better" if better else "worse"))
+
+if __name__ == "__main__":
+    try:
+        opts, prefixes = getopt.getopt(sys.argv[1:], "j:c:r:ql", ["json=", "compare=", "repeat=", "quick", "list"])
+    except getopt.GetoptError:
+        print (sys.exc_info()[1])
+        sys.exit(2)
+    jsonfile, comparefile, repeat = None, None, 3
+    for opt, value in opts:
+        if opt in ("-j", "--json"):
+            jsonfile = value
+        elif opt in ("-c", "--compare"):
+            comparefile = value
+        elif opt in ("-r", "--repeat"):
+            repeat = int(value)
+        elif opt in ("-q", "--quick"):
+            SCALE = 0.1
+        elif opt in ("-l", "--list"):
+            for name, unit, higherIsBetter, function in BENCHMARKS:
+                print ("%-20s %s" % (name, unit))
+            sys.exit(0)
+
+    results = run(prefixes, repeat)
+    if jsonfile:
+        f = open(jsonfile, "w")
+        json.dump({ "commit" : commit(),
+                    "time" : time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "python" : platform.python_version(),
+                    "platform" : platform.platform(),
+                    "repeat" : repeat,
+                    "scale" : SCALE,
+                    "results" : results,
+                  }, f, indent=2, sort_keys=True)
+        f.close()
+    if comparefile:
+        f = open(comparefile)
+        compare(json.load(f)["results"], results)
+        f.close()
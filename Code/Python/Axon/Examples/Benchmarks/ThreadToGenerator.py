@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of throughput from a threadedcomponent to a generator component.
+#
+# A threaded component sends MESSAGES messages, one at a time, to an ordinary
+# component that collects them. This is done with the thread delivering
+# straight into the destination inbox, and with it forced to always go via
+# its outqueue (as all messages did before), where they wait for the
+# scheduler to run the threaded component so it can pass them on.
+#
+# Usage:
+#
+#    python ThreadToGenerator.py
+#
+
+import time
+
+from Axon.Component import component
+from Axon.ThreadedComponent import threadedcomponent
+from Axon.Scheduler import scheduler
+from Axon.AxonExceptions import noSpaceInBox
+
+MESSAGES = 200000
+
+class Sender(threadedcomponent):
+    def main(self):
+        for i in range(MESSAGES):
+            while 1:
+                try:
+                    self.send(i, "outbox")
+                    break
+                except noSpaceInBox:
+                    self.pause()
+
+class QueueingSender(Sender):
+    def _directSink(self, boxname):
+        return None
+
+class Receiver(component):
+    def __init__(self):
+        super(Receiver,self).__init__()
+        self.count = 0
+    def main(self):
+        while self.count < MESSAGES:
+            self.count += len(self.recvAll("inbox"))
+            if self.count < MESSAGES and not self.anyReady():
+                self.pause()
+            yield 1
+
+def run(sendertype):
+    """Sends MESSAGES messages from a thread to a generator, returns messages per second"""
+    scheduler.run = scheduler()
+    receiver = Receiver().activate()
+    sender = sendertype()
+    sender.link( (sender,"outbox"), (receiver,"inbox") )
+    sender.activate()
+    start = time.time()
+    scheduler.run.runThreads()
+    return MESSAGES / (time.time() - start)
+
+if __name__ == "__main__":
+    print ("%d messages from a thread to a generator" % MESSAGES)
+    print ("%20s %14s" % ("", "messages/s"))
+    for title, sendertype in [ ("via outqueue", QueueingSender), ("direct", Sender) ]:
+        print ("%20s %14.0f" % (title, run(sendertype)))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of threads and memory used by lots of concurrent threadedcomponents.
+#
+# REQUESTS threaded components - like the per-request handlers a web server
+# creates - are activated at once. Each blocks for a while (as if waiting on a
+# database or file), then sends a response. This is done with each component
+# having a thread of its own, and with them sharing a ThreadPool.
+#
+# Each run is done in a fresh process, so that peak memory use (maximum
+# resident set size) can be compared. The peak number of threads is sampled.
+#
+# Usage:
+#
+#    python ThreadedRequests.py
+#
+
+import time
+import threading
+import resource
+import multiprocessing
+
+from Axon.Component import component
+from Axon.ThreadedComponent import threadedcomponent
+from Axon.ThreadPool import ThreadPool
+from Axon.Scheduler import scheduler
+
+REQUESTS = 5000
+BLOCKFOR = 0.05
+POOLSIZES = [ 16, 64, 256 ]
+
+class Handler(threadedcomponent):
+    def main(self):
+        time.sleep(BLOCKFOR)
+        self.send("response", "outbox")
+
+class Responses(component):
+    def __init__(self):
+        super(Responses,self).__init__()
+        self.count = 0
+    def main(self):
+        while self.count < REQUESTS:
+            self.count += len(self.recvAll("inbox"))
+            if self.count < REQUESTS and not self.anyReady():
+                self.pause()
+            yield 1
+
+def run(poolsize, results):
+    """Runs REQUESTS handlers, on a pool of poolsize threads (or threads of their own if None)"""
+    pool = poolsize and ThreadPool(maxthreads=poolsize)
+    peak = [ threading.active_count() ]
+    done = threading.Event()
+    def sample():
+        while not done.wait(0.005):
+            peak[0] = max(peak[0], threading.active_count())
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+
+    scheduler.run = scheduler()
+    responses = Responses()
+    responses.activate()
+    start = time.time()
+    for i in range(REQUESTS):
+        handler = Handler(threadpool=pool)
+        handler.link( (handler,"outbox"), (responses,"inbox") )
+        handler.activate()
+    scheduler.run.runThreads()
+    elapsed = time.time() - start
+    done.set()
+    sampler.join()
+    results.put( (peak[0], resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, elapsed) )
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context("fork")
+    print ("%d concurrent requests, each blocking for %.0fms" % (REQUESTS, BLOCKFOR*1000))
+    print ("%20s %12s %14s %10s" % ("", "peak threads", "peak RSS", "time"))
+    for poolsize in [ None ] + POOLSIZES:
+        results = context.Queue()
+        worker = context.Process(target=run, args=(poolsize, results))
+        worker.start()
+        threads, maxrss, elapsed = results.get()
+        worker.join()
+        title = poolsize and ("pool of %d" % poolsize) or "thread per component"
+        print ("%20s %12d %12.1fMB %9.2fs" % (title, threads, maxrss/1024.0, elapsed))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Benchmark of the Selector service - select() versus epoll, and one-shot
+# versus persistent registrations.
+#
+# For each connection count a set of socket pairs is registered with the
+# selector, and a Pinger component keeps a number of them busy: whenever one
+# end is reported readable it reads the byte and writes another into the far
+# end, then asks to be notified again.
+#
+# * idle   - all connections registered, none of them busy. Reports the CPU
+#            time the process burns per second of wall clock time.
+# * active - reports notifications handled per second with the given number of
+#            connections kept busy.
+#
+# Each measurement runs in a fresh python process. Usage:
+#
+#    python SelectorBenchmark.py [duration]
+#
+
+import sys
+import time
+import socket
+import subprocess
+
+import Axon
+from Axon.Scheduler import scheduler
+from Axon.Ipc import shutdown
+import Kamaelia.Internet.Selector as SelectorModule
+from Kamaelia.IPC import newReader, removeReader
+
+class Pinger(Axon.Component.component):
+    Inboxes = { "inbox"   : "NOT USED",
+                "control" : "NOT USED",
+                "ready"   : "Readable sockets, from the selector",
+              }
+    Outboxes = { "outbox"          : "NOT USED",
+                 "signal"          : "NOT USED",
+                 "_selectorSignal" : "Requests to the selector",
+                 "_selectorShutdown" : "Shutdown for the selector",
+               }
+
+    def __init__(self, selector, pairs, active, persistent, duration):
+        super(Pinger, self).__init__()
+        self.selector = selector
+        self.pairs = pairs
+        self.active = active
+        self.persistent = persistent
+        self.duration = duration
+        self.events = 0
+
+    def register(self, sock):
+        self.send(newReader(self, ((self, "ready"), sock), persistent=self.persistent), "_selectorSignal")
+
+    def handleReady(self, peers):
+        """Reads each readable socket, makes its peer write again, and re-registers"""
+        count = 0
+        while self.dataReady("ready"):
+            sock = self.recv("ready")
+            try:
+                sock.recv(16)
+            except socket.error:
+                pass
+            peers[sock].send(b"x")
+            self.register(sock)
+            count += 1
+        return count
+
+    def main(self):
+        self.link((self, "_selectorSignal"), (self.selector, "notify"))
+        self.link((self, "_selectorShutdown"), (self.selector, "control"))
+        peers = {}
+        for ours, theirs in self.pairs:
+            peers[ours] = theirs
+            self.register(ours)
+            yield 1
+        for ours, theirs in self.pairs[:self.active]:
+            theirs.send(b"x")
+
+        # give the selector a moment to take on all the registrations
+        settle = time.time() + 1.0
+        while time.time() < settle:
+            self.handleReady(peers)
+            yield 1
+
+        self.start = time.time()
+        self.cpustart = time.process_time()
+        until = self.start + self.duration
+        while time.time() < until:
+            self.events += self.handleReady(peers)
+            if not self.anyReady():
+                self.pause()
+            yield 1
+        self.elapsed = time.time() - self.start
+        self.cpu = time.process_time() - self.cpustart
+
+        for ours, theirs in self.pairs:
+            self.send(removeReader(self, ours), "_selectorSignal")
+        self.send(shutdown(), "_selectorShutdown")
+        scheduler.run.stop()
+
+def measure(selectorname, connections, active, persistent, duration):
+    """Runs one measurement in this process, printing the result."""
+    SelectorModule.timeout = 0
+    selector = getattr(SelectorModule, selectorname)().activate()
+    pairs = []
+    for i in range(connections):
+        a, b = socket.socketpair()
+        a.setblocking(0)
+        pairs.append((a, b))
+    p = Pinger(selector, pairs, active, persistent, duration).activate()
+    scheduler.run.runThreads()
+    print("%s %d %d %d %f %f" % (selectorname, connections, active, persistent, p.events/p.elapsed, p.cpu/p.elapsed))
+
+def run(selectorname, connections, active, persistent, duration):
+    """Runs one measurement in a separate process, returning (events/s, cpu/s)"""
+    output = subprocess.check_output([ sys.executable, __file__, "--one", selectorname,
+                                       str(connections), str(active), str(int(persistent)), str(duration) ])
+    fields = output.decode().split()[-2:]
+    return float(fields[0]), float(fields[1])
+
+def main(duration):
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        fdlimit = hard
+    except (ImportError, ValueError):
+        fdlimit = 1024
+
+    selectors = ["Selector"]
+    if hasattr(SelectorModule, "EpollSelector"):
+        selectors.append("EpollSelector")
+    print("%-14s %-10s %7s %7s %12s %10s" % ("selector", "mode", "conns", "active", "events/s", "cpu/s"))
+    for connections in (100, 1000, 5000, 10000):
+        if 2*connections + 100 > fdlimit:
+            print("(skipping %d connections - file descriptor limit is %d)" % (connections, fdlimit))
+            continue
+        for active in (0, 100):
+            for selectorname in selectors:
+                if selectorname == "Selector" and connections > 1000:
+                    continue # select() is limited to FD_SETSIZE descriptors
+                for persistent in (False, True):
+                    rate, cpu = run(selectorname, connections, active, persistent, duration)
+                    print("%-14s %-10s %7d %7d %12.1f %10.3f" % (selectorname, persistent and "persistent" or "one-shot",
+                                                            connections, active, rate, cpu))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--one":
+        selectorname, connections, active, persistent, duration = sys.argv[2:7]
+        measure(selectorname, int(connections), int(active), bool(int(persistent)), float(duration))
+    else:
+        duration = 5.0
+        if len(sys.argv) > 1:
+            duration = float(sys.argv[1])
+        main(duration)
@@ -194,6 +194,10 @@ class _WsgiHandler(threadedcomponent):
      
     Any other signals that this component may receive may result in undefined
     behavior, but this component will most likely ignore them.
+
+    By default, the application is run on a thread from Axon's default
+    ThreadPool, rather than one of its own. Pass threadpool=None for a thread of
+    its own, or threadpool=<ThreadPool> to use a particular pool.
     """
     Inboxes = {
         'inbox' : 'Used to receive the body of requests from the HTTPParser',
@@ -211,6 +215,9 @@ class _WsgiHandler(threadedcomponent):
         log_writable - a LogWritable object to be passed as a wsgi.errors object.
         WsgiConfig - General configuration about the WSGI server.
         """
+        # one of these is created per request, so share a pool of threads
+        # rather than starting one each
+        argd.setdefault("threadpool", True)
         super(_WsgiHandler, self).__init__(**argd)
         self.environ = request
 
@@ -82,10 +82,10 @@ to all the subcomponents. When they exit, this component exits. This enables it
 to shutdown entire systems cleanly. For example, the above example using PAR can be shutdown
 after 15 seconds using this code::
 
-    class timedShutdown(Axon.ThreadedComponent.threadedcomponent):
+    class timedShutdown(Axon.Component.component):
         TTL = 1
         def main(self):
-            time.sleep(self.TTL)
+            yield Axon.Ipc.Sleep(self.TTL)
             self.send(Axon.Ipc.shutdownMicroprocess(), "signal")
 
     Pipeline(
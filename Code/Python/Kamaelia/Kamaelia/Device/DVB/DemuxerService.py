@@ -129,8 +129,7 @@ class DemuxerService(AdaptiveCommsComponent):
                 cmd = self.recv("request")
                 self.handleCommand(cmd)
                 
-            while self.dataReady("inbox"):
-                buffers.append(self.recv("inbox"))
+            buffers.extend(self.recvAll("inbox"))
                 
             while len(buffers)>0:
                 
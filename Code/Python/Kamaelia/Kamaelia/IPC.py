@@ -68,28 +68,37 @@ class newServer(notify):
 # This may get simplified further at some point to simply add in a newExceptionalReader
 # message (indeed I'm in two minds right now about that!)
 #
+# persistent asks the selector to keep the registration (and the linkage to
+# the component being notified) in place after a notification has been sent,
+# rather than tearing it down. Sending the same newReader/newWriter/
+# newExceptional again re-arms the notification. The registration only goes
+# away when the matching removeReader/removeWriter/removeExceptional arrives.
+#
 
 
 class newWriter(notify):
     """Helper class to notify of new CSAs as they are created.  newCSA.object
     will return the CSA."""
-    def __init__(self, caller, CSA):
+    def __init__(self, caller, CSA, persistent=False):
         super(newWriter, self).__init__(caller, CSA)
         self.hasOOB = False 
+        self.persistent = persistent
 
 class newReader(notify):
    """Helper class to notify of new CSAs as they are created.  newCSA.object
    will return the CSA."""
-   def __init__(self, caller, CSA):
+   def __init__(self, caller, CSA, persistent=False):
       super(newReader, self).__init__(caller, CSA)
       self.hasOOB = False
+      self.persistent = persistent
 
 class newExceptional(notify):
    """Helper class to notify of new CSAs as they are created.  newCSA.object
    will return the CSA."""
-   def __init__(self, caller, CSA):
+   def __init__(self, caller, CSA, persistent=False):
       super(newExceptional, self).__init__(caller, CSA)
       self.hasOOB = False
+      self.persistent = persistent
 
 class removeReader(notify):
    """Helper class to notify of new CSAs as they are created.  newCSA.object
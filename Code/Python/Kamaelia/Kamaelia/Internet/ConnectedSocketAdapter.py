@@ -277,7 +277,7 @@ class ConnectedSocketAdapter(component):
               raise ex
        self.sending = False
        if self.connectionSENDLive:
-           self.send(newWriter(self, ((self, "SendReady"), sock)), "_selectorSignal")
+           self.send(newWriter(self, ((self, "SendReady"), sock), persistent=True), "_selectorSignal")
        return bytes_sent
    
    def flushSendQueue(self):
@@ -314,7 +314,7 @@ class ConnectedSocketAdapter(component):
               # Print( "Oh No! Socket Died - receiving!", e)
        self.receiving = False
        if self.connectionRECVLive:
-           self.send(newReader(self, ((self, "ReadReady"), sock)), "_selectorSignal")
+           self.send(newReader(self, ((self, "ReadReady"), sock), persistent=True), "_selectorSignal")
        return None  # Explicit rather than implicit.
 
    def handleReceive(self):
@@ -340,13 +340,11 @@ class ConnectedSocketAdapter(component):
              successful = False
 
    def checkSocketStatus(self):
-       if self.dataReady("ReadReady"):
+       if self.recvAll("ReadReady"):
            self.receiving = True
-           self.recv("ReadReady")
 
-       if self.dataReady("SendReady"):
+       if self.recvAll("SendReady"):
            self.sending = True
-           self.recv("SendReady")
 
    def canDoSomething(self):
        if self.sending and ( (len(self.data_to_send) > 0) or self.dataReady("inbox") ):
@@ -384,8 +382,8 @@ class ConnectedSocketAdapter(component):
              self.isSSL = True
              self.socket.setblocking(False)
 
-             self.send(newReader(self, ((self, "ReadReady"), self.socket)), "_selectorSignal")
-             self.send(newWriter(self, ((self, "SendReady"), self.socket)), "_selectorSignal")
+             self.send(newReader(self, ((self, "ReadReady"), self.socket), persistent=True), "_selectorSignal")
+             self.send(newWriter(self, ((self, "SendReady"), self.socket), persistent=True), "_selectorSignal")
 
              self.send('', 'sslready')
 #             print ("****************************************************** SSL IS READY ******************************************************")
@@ -109,39 +109,99 @@ Selector:
 It is advisable to send a deregister message when the corresponding file
 descriptor closes, in case you registered for a notification, but it has not
 occurred.
+
+
+
+Persistent registrations
+------------------------
+
+Tearing down the outbox and linkage after every notification, only for the
+requesting component to ask for them to be set up again, is expensive when
+there are many busy connections. A component can therefore ask for a
+persistent registration instead::
+
+    newReader(caller, (component,inboxname), descriptor, persistent=True)
+
+When the descriptor becomes ready the notification is sent as usual, but the
+outbox and linkage are left in place. The descriptor is simply not watched
+until the same newReader (or newWriter/newExceptional) request is sent again,
+which re-arms it cheaply. Components written for one-shot notifications
+already re-send their request after each notification, so they can switch to
+persistent registrations without any other changes.
+
+A persistent registration stays in place until it is explicitly removed with
+removeReader/removeWriter/removeExceptional. You *must* do this when closing
+the descriptor.
+
+
+
+Using epoll
+-----------
+
+On Linux, EpollSelector is a drop in replacement for Selector that uses an
+epoll object rather than calling select() over lists of descriptors on every
+cycle. Registrations are handed to the kernel as they arrive, so the cost of
+waiting no longer grows with the number of (mostly idle) descriptors being
+watched.
+
+Where the platform provides select.epoll, Selector.getSelectorServices(...)
+creates an EpollSelector when it needs to create a new selector service. To use
+the select() based Selector instead, set the module level DefaultSelector
+before any selector service is created::
+
+    import Kamaelia.Internet.Selector as Selector
+    Selector.DefaultSelector = Selector.Selector
+
+EpollSelector is only defined where the platform provides select.epoll.
+
+
+
+Running in an asyncio event loop
+--------------------------------
+
+When the scheduler is running inside an asyncio event loop (see
+Axon.Scheduler.scheduler.runInLoop()), Selector.getSelectorServices(...)
+creates an AsyncioSelector instead. This is an ordinary (not threaded)
+component that hands descriptors to the event loop to watch, with
+loop.add_reader() and loop.add_writer(), so sockets used by Kamaelia components
+are served by the same selector as the asyncio code in the process, and no
+extra thread is needed.
+
+It accepts the same requests, and sends the same notifications, as Selector.
+The one exception is that event loops don't watch for exceptional conditions,
+so newExceptional requests are accepted but never notified.
+
+AsyncioSelector is only defined where asyncio is available.
 """
 
 
 import Axon
-from Axon.Ipc import shutdown
-import select, socket
+from Axon.Ipc import shutdown, WaitUntil
+import select, socket, errno
 from Kamaelia.IPC import newReader, removeReader, newWriter, removeWriter, newExceptional, removeExceptional
 import Axon.CoordinatingAssistantTracker as cat
 from Axon.ThreadedComponent import threadedadaptivecommscomponent
+from Axon.AdaptiveCommsComponent import AdaptiveCommsComponent
+from Axon.Scheduler import scheduler
 import time
+import sys
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
 #import sys,traceback
 
 READERS,WRITERS, EXCEPTIONALS = 0, 1, 2
 FAILHARD = False
 timeout = 5
 
-class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.AdaptiveCommsComponent): # SmokeTests_Selector.test_SmokeTest
+class _Registrations(object):
     """\
-    Selector() -> new Selector component
-
-    Use Selector.getSelectorService(...) in preference as it returns an
-    existing instance, or automatically creates a new one.
+    Handles the requests to add and remove file descriptors (selectables) sent
+    to a selector's "notify" inbox - keeping track of the outboxes and linkages
+    to the components to be notified, and adding and removing the selectables
+    from the collections being watched. Shared by Selector and AsyncioSelector.
     """
-    Inboxes = {
-         "control" : "Recieving a Axon.Ipc.shutdown() message here causes shutdown",
-         "inbox" : "Not used at present",
-         "notify" : "Used to be notified about things to select"
-    }
-
-    def __init__(self):
-        super(Selector, self).__init__()
-        self.trackedby = None
-            
     def removeLinks(self, selectable, meta, selectables):
         """\
         Removes a file descriptor (selectable).
@@ -155,9 +215,10 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
 #        print "REMOVING LINK"
 #        pprint.pprint((selectable, meta))
         try:
-            replyService, outbox, Linkage = meta[selectable]
+            replyService, outbox, Linkage, persistent = meta[selectable]
             self.unlink(thelinkage=Linkage)
-            selectables.remove(selectable)
+            if selectable in selectables:  # a fired persistent one won't be
+                selectables.remove(selectable)
             self.deleteOutbox(outbox)
             del meta[selectable]
             Linkage = None
@@ -165,6 +226,14 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
             pass
 
     def stop(self):
+        self.deregisterServices()
+        super(_Registrations, self).stop()
+
+    def deregisterServices(self):
+        """\
+        Removes the "selector" and "selectorshutdown" services from the
+        tracker we were registered with (if any).
+        """
         if self.trackedby is not None:
             try:
                 self.trackedby.deRegisterService("selector")
@@ -174,25 +243,32 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
                 self.trackedby.deRegisterService("selectorshutdown")
             except Axon.AxonExceptions.MultipleServiceDeletion:
                 pass  
-        super(Selector, self).stop()
 
-    def addLinks(self, replyService, selectable, meta, selectables, boxBase):
+    def addLinks(self, replyService, selectable, meta, selectables, boxBase, persistent=False):
         """\
         Adds a file descriptor (selectable).
 
         Creates a corresponding outbox, with name based on boxBase; links it to
         the component that wants to be notified; adds the file descriptor to the
         set of selectables; and records the box and linkage info in meta.
+
+        If the file descriptor is already known (a persistent registration that
+        has already fired), it is simply put back into the set of selectables,
+        and whether it is persistent is updated to match this request.
         """
 #        print "ADDING LINK", replyService, selectable, meta
         if selectable not in meta:
             outbox = self.addOutbox(boxBase)
             L = self.link((self, outbox), replyService)
-            meta[selectable] = replyService, outbox, L
+            meta[selectable] = replyService, outbox, L, persistent
             selectables.append(selectable)
             return L
         else:
-            return meta[selectable][2]
+            oldReplyService, outbox, L, oldPersistent = meta[selectable]
+            meta[selectable] = oldReplyService, outbox, L, persistent
+            if selectable not in selectables:
+                selectables.append(selectable)   # re-arm
+            return L
 
     def handleNotify(self, meta, readers,writers, exceptionals):
         """\
@@ -220,7 +296,7 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
 
             if isinstance(message, newReader):
                 replyService, selectable = message.object
-                L = self.addLinks(replyService, selectable, meta[READERS], readers, "readerNotify")
+                L = self.addLinks(replyService, selectable, meta[READERS], readers, "readerNotify", message.persistent)
 #                print [str(x) for x in replyService], selectable
 #                print "new reader",selectable
 #                L.showtransit = 0
@@ -228,22 +304,55 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
 
             if isinstance(message, newWriter):
                 replyService, selectable = message.object
-                L = self.addLinks(replyService, selectable, meta[WRITERS], writers, "writerNotify")
-                L.showtransit = 0
+                L = self.addLinks(replyService, selectable, meta[WRITERS], writers, "writerNotify", message.persistent)
                 message.object = None
 
             if isinstance(message, newExceptional):
                 replyService, selectable = message.object
-                self.addLinks(replyService, selectable, meta[EXCEPTIONALS], exceptionals, "exceptionalNotify")
+                self.addLinks(replyService, selectable, meta[EXCEPTIONALS], exceptionals, "exceptionalNotify", message.persistent)
                 message.object = None
 
     def trackedBy(self, tracker):
         self.trackedby = tracker
 
+
+class Selector(_Registrations, threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.AdaptiveCommsComponent): # SmokeTests_Selector.test_SmokeTest
+    """\
+    Selector() -> new Selector component
+
+    Use Selector.getSelectorService(...) in preference as it returns an
+    existing instance, or automatically creates a new one.
+    """
+    Inboxes = {
+         "control" : "Recieving a Axon.Ipc.shutdown() message here causes shutdown",
+         "inbox" : "Not used at present",
+         "notify" : "Used to be notified about things to select"
+    }
+
+    def __init__(self):
+        super(Selector, self).__init__()
+        self.trackedby = None
+            
+    def makeSelections(self):
+        """\
+        Returns the three collections (readers, writers, exceptionals) of
+        file descriptors being watched. They need to support append(), remove(),
+        len() and 'in'.
+        """
+        return [], [], []
+
+    def waitReady(self, readers, writers, exceptionals):
+        """\
+        Waits (briefly) for any of the watched file descriptors to become ready.
+        Returns a tuple of three lists - those ready for reading, for writing and
+        those with exceptional conditions.
+        """
+        return select.select(readers, writers, exceptionals,0.05) #0.05
+
     def main(self):
         """Main loop"""
         global timeout
-        readers,writers, exceptionals = [],[], []
+        readers,writers, exceptionals = self.makeSelections()
         selections = [readers,writers, exceptionals]
         meta = [ {}, {}, {} ]
         if not self.anyReady():
@@ -261,18 +370,8 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
                    shutdownStart = time.time()
                    timeWithNooneUsing = 0
                    shuttingDown = True
-                   if self.trackedby is not None:
-#                       print "we are indeed tracked"
-                       try:
-                           self.trackedby.deRegisterService("selector")
-                       except Axon.AxonExceptions.MultipleServiceDeletion:
-                           pass
-                            
-                       try:
-                           self.trackedby.deRegisterService("selectorshutdown")
-                       except Axon.AxonExceptions.MultipleServiceDeletion:
-                           pass
-                       self.trackedby = None
+                   self.deregisterServices()
+                   self.trackedby = None
             if shuttingDown:
 #               print "we're shutting down"
                if len(readers) + len(writers) + len(exceptionals) == 0:
@@ -293,19 +392,22 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
             if len(readers) + len(writers) + len(exceptionals) > 0:
                 timewithNone = 0
                 try:
-                    read_write_except = select.select(readers, writers, exceptionals,0.05) #0.05
+                    read_write_except = self.waitReady(readers, writers, exceptionals)
 #                    print "RWE", readers, writers, exceptionals
                     numberOfFailedSelectsDueToBadFileDescriptor  = 0
 
-                    for i in xrange(3):
+                    for i in range(3):
                         for selectable in read_write_except[i]:
 #                            try:
-                                replyService, outbox, linkage = meta[i][selectable]
+                                replyService, outbox, linkage, persistent = meta[i][selectable]
                                 self.send(selectable, outbox)
 #                                print "sent",selectable,"to",outbox
                                 replyService, outbox, linkage = None, None, None
                                 # Note we remove the selectable until we know the reason for it being here has cleared.
-                                self.removeLinks(selectable, meta[i], selections[i]) 
+                                if persistent:
+                                    selections[i].remove(selectable) # stays linked, until re-armed
+                                else:
+                                    self.removeLinks(selectable, meta[i], selections[i]) 
 #                            except KeyError:
 #                                k = sys.exc_info()[1]
 #                                pass
@@ -351,26 +453,8 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
             if timewithNone > 6: # XXXX replace with STM code
                 break	
 
-        if self.trackedby is not None:
-               try:
-                   self.trackedby.deRegisterService("selector")
-               except Axon.AxonExceptions.MultipleServiceDeletion:
-                   pass
-               try:
-                   self.trackedby.deRegisterService("selectorshutdown")
-               except Axon.AxonExceptions.MultipleServiceDeletion:
-                   pass
-
-        if self.trackedby is not None:
-           try:
-                self.trackedby.deRegisterService("selector")
-           except Axon.AxonExceptions.MultipleServiceDeletion:
-               pass
-           try:
-                self.trackedby.deRegisterService("selectorshutdown")
-           except Axon.AxonExceptions.MultipleServiceDeletion:
-               pass
-           self.trackedby = None
+        self.deregisterServices()
+        self.trackedby = None
 #        print "SELECTOR HAS EXITTED"
 
 
@@ -392,7 +476,9 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
     def getSelectorServices(tracker=None): # STATIC METHOD
       """\
       Returns any live selector registered with the specified (or default) tracker,
-      or creates one for the system to use.
+      or creates one for the system to use. The one created is an
+      AsyncioSelector if the scheduler is running in an asyncio event loop,
+      otherwise a DefaultSelector.
 
       (static method)
       """
@@ -403,7 +489,10 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
          shutdownservice = tracker.retrieveService("selectorshutdown")
          return service, shutdownservice, None
       except KeyError:
-         selector = Selector()
+         if AsyncioSelector is not None and scheduler.run.loop is not None:
+            selector = AsyncioSelector()    # the event loop can do the work
+         else:
+            selector = DefaultSelector()
          Selector.setSelectorServices(selector, tracker)
          service=(selector,"notify")
          shutdownservice=(selector,"control")
@@ -411,4 +500,349 @@ class Selector(threadedadaptivecommscomponent): #Axon.AdaptiveCommsComponent.Ada
     getSelectorServices = staticmethod(getSelectorServices)
 
 
-__kamaelia_components__  = ( Selector, )
+DefaultSelector = Selector   # What getSelectorServices() creates when it needs a new one
+
+
+class _EpollSelection(object):
+    """\
+    _EpollSelection(poller, masks, eventmask) -> new _EpollSelection object
+
+    Stands in for one of the lists of selectables (readers, writers or
+    exceptionals) kept by the Selector, keeping the registrations with the epoll
+    object in step as selectables are added and removed.
+
+    Keyword arguments:
+
+    - poller     -- the epoll object
+    - masks      -- dictionary, shared by all selections using this poller, mapping file numbers to the event mask registered
+    - eventmask  -- the epoll event(s) this selection watches for
+    """
+    def __init__(self, poller, masks, eventmask):
+        super(_EpollSelection, self).__init__()
+        self.poller = poller
+        self.masks = masks
+        self.eventmask = eventmask
+        self.filenos = {}    # selectable -> file number
+        self.byfileno = {}   # file number -> selectable
+
+    def __len__(self):
+        return len(self.filenos)
+
+    def __contains__(self, selectable):
+        return selectable in self.filenos
+
+    def append(self, selectable):
+        """Start watching selectable for this selection's event(s)"""
+        fileno = selectable.fileno()
+        if fileno < 0:
+            if FAILHARD:
+                raise ValueError("Can't watch a closed file descriptor")
+            return
+        previous = self.byfileno.get(fileno)
+        if previous is not None:
+            # The file number has been reused (or rewrapped) without the old
+            # registration being removed. The newest registration wins.
+            del self.filenos[previous]
+        self.filenos[selectable] = fileno
+        self.byfileno[fileno] = selectable
+        # if reused, the kernel may have dropped the old registration when the
+        # old descriptor was closed, so hand it over again even if unchanged
+        reused = previous is not None and previous is not selectable
+        self._update(fileno, self.masks.get(fileno, 0) | self.eventmask, reused)
+
+    def remove(self, selectable):
+        """Stop watching selectable for this selection's event(s)"""
+        try:
+            fileno = self.filenos.pop(selectable)
+        except KeyError:
+            raise ValueError("selectable not in selection")
+        if self.byfileno.get(fileno) is selectable:
+            del self.byfileno[fileno]
+            self._update(fileno, self.masks.get(fileno, 0) & ~self.eventmask)
+
+    def _update(self, fileno, mask, force=False):
+        """Bring the epoll registration of fileno in line with mask"""
+        oldmask = self.masks.get(fileno, 0)
+        if mask == oldmask and not force:
+            return
+        try:
+            if mask == 0:
+                del self.masks[fileno]
+                self.poller.unregister(fileno)
+                return
+            self.masks[fileno] = mask
+            if oldmask == 0:
+                self.poller.register(fileno, mask)
+            else:
+                self.poller.modify(fileno, mask)
+        except (IOError, OSError):
+            e = sys.exc_info()[1]
+            if e.errno == errno.ENOENT and mask != 0:
+                # The kernel quietly drops descriptors from the epoll set when
+                # they are closed - so this is a reused file number.
+                self.poller.register(fileno, mask)
+            elif e.errno == errno.EEXIST:
+                self.poller.modify(fileno, mask)
+            elif e.errno == errno.EBADF or e.errno == errno.ENOENT:
+                # Closed underneath us. Nothing to do until the owner removes it.
+                self.masks.pop(fileno, None)
+                if FAILHARD:
+                    raise e
+            else:
+                raise e
+
+if hasattr(select, "epoll"):
+    _EPOLL_READERS = select.EPOLLIN | select.EPOLLERR | select.EPOLLHUP
+    _EPOLL_WRITERS = select.EPOLLOUT | select.EPOLLERR | select.EPOLLHUP
+    _EPOLL_EXCEPTIONALS = select.EPOLLPRI
+
+    class EpollSelector(Selector):
+        """\
+        EpollSelector() -> new EpollSelector component
+
+        A drop in replacement for Selector that waits on a Linux epoll object
+        instead of calling select() on lists of file descriptors. Accepts the
+        same newReader/newWriter/newExceptional and removeReader/removeWriter/
+        removeExceptional requests, including persistent registrations.
+
+        Use Selector.getSelectorService(...) in preference - it creates an
+        EpollSelector (the DefaultSelector) where select.epoll is available.
+        """
+        def __init__(self):
+            super(EpollSelector, self).__init__()
+            self.poller = None
+            self.waker = None
+            self.wakee = None
+
+        def makeSelections(self):
+            """\
+            Creates the epoll object, and returns (readers, writers, exceptionals)
+            collections that keep it up to date as things are added and removed.
+
+            Also sets up a socket pair used to interrupt the wait on the epoll
+            object when new requests arrive, so that they're acted on straight
+            away rather than after the wait times out.
+            """
+            self.poller = select.epoll()
+            wakee, waker = socket.socketpair()
+            wakee.setblocking(0)
+            waker.setblocking(0)
+            self.poller.register(wakee.fileno(), select.EPOLLIN)
+            self.wakee, self.waker = wakee, waker
+            masks = {}
+            return ( _EpollSelection(self.poller, masks, select.EPOLLIN),
+                     _EpollSelection(self.poller, masks, select.EPOLLOUT),
+                     _EpollSelection(self.poller, masks, select.EPOLLPRI),
+                   )
+
+        def waitReady(self, readers, writers, exceptionals):
+            """\
+            Waits (briefly) on the epoll object. Returns a tuple of three lists -
+            those ready for reading, for writing and those with exceptional
+            conditions. Only file descriptors currently being watched for each
+            kind of event are included.
+            """
+            ready = [], [], []
+            wakeefileno = self.wakee.fileno()
+            for fileno, event in self.poller.poll(0.05):
+                if fileno == wakeefileno:
+                    try:
+                        while self.wakee.recv(4096):
+                            pass
+                    except socket.error:
+                        pass
+                    continue
+                if event & _EPOLL_READERS and fileno in readers.byfileno:
+                    ready[READERS].append(readers.byfileno[fileno])
+                if event & _EPOLL_WRITERS and fileno in writers.byfileno:
+                    ready[WRITERS].append(writers.byfileno[fileno])
+                if event & _EPOLL_EXCEPTIONALS and fileno in exceptionals.byfileno:
+                    ready[EXCEPTIONALS].append(exceptionals.byfileno[fileno])
+            return ready
+
+        def main(self):
+            """Main loop"""
+            try:
+                super(EpollSelector, self).main()
+            finally:
+                if self.poller is not None:
+                    self.poller.close()
+                    self.poller = None
+                if self.waker is not None:
+                    waker, wakee = self.waker, self.wakee
+                    self.waker, self.wakee = None, None
+                    waker.close()
+                    wakee.close()
+
+        def forwardInboxToThread(self, box):
+            """\
+            Passes messages on to the thread, as usual, then wakes the thread if
+            it is waiting on the epoll object.
+            """
+            forwarding = self._nonthread_dataReady(box)
+            super(EpollSelector, self).forwardInboxToThread(box)
+            waker = self.waker
+            if forwarding and waker is not None:
+                try:
+                    waker.send(b"x")
+                except socket.error:
+                    pass # buffer full, so a wake up is already pending
+
+    DefaultSelector = EpollSelector
+
+    __kamaelia_components__  = ( Selector, EpollSelector, )
+
+else:
+    __kamaelia_components__  = ( Selector, )
+
+
+class _LoopSelection(object):
+    """\
+    _LoopSelection(add, remove, ready) -> new _LoopSelection object
+
+    Stands in for one of the lists of selectables (readers or writers) kept by
+    the AsyncioSelector, asking the event loop to watch each selectable as it
+    is added and to stop when it is removed.
+
+    Keyword arguments:
+
+    - add     -- the loop's add_reader or add_writer method
+    - remove  -- the loop's remove_reader or remove_writer method
+    - ready   -- called by the loop with the selectable, when it is ready
+    """
+    def __init__(self, add, remove, ready):
+        super(_LoopSelection, self).__init__()
+        self.add = add
+        self.discard = remove
+        self.ready = ready
+        self.filenos = {}    # selectable -> file number
+        self.byfileno = {}   # file number -> selectable
+
+    def __len__(self):
+        return len(self.filenos)
+
+    def __contains__(self, selectable):
+        return selectable in self.filenos
+
+    def append(self, selectable):
+        """Start watching selectable"""
+        fileno = selectable.fileno()
+        if fileno < 0:
+            if FAILHARD:
+                raise ValueError("Can't watch a closed file descriptor")
+            return
+        previous = self.byfileno.get(fileno)
+        if previous is not None:
+            # The file number has been reused (or rewrapped) without the old
+            # registration being removed. The newest registration wins.
+            del self.filenos[previous]
+        self.filenos[selectable] = fileno
+        self.byfileno[fileno] = selectable
+        self.add(fileno, self.ready, selectable)
+
+    def remove(self, selectable):
+        """Stop watching selectable"""
+        try:
+            fileno = self.filenos.pop(selectable)
+        except KeyError:
+            raise ValueError("selectable not in selection")
+        if self.byfileno.get(fileno) is selectable:
+            del self.byfileno[fileno]
+            self.discard(fileno)
+
+    def clear(self):
+        """Stop watching everything"""
+        for fileno in self.byfileno:
+            self.discard(fileno)
+        self.filenos.clear()
+        self.byfileno.clear()
+
+if asyncio is not None:
+
+    class AsyncioSelector(_Registrations, AdaptiveCommsComponent):
+        """\
+        AsyncioSelector() -> new AsyncioSelector component
+
+        A replacement for Selector, for when the scheduler is running inside an
+        asyncio event loop (see Axon.Scheduler.scheduler.runInLoop()). It asks
+        the loop to watch file descriptors (with add_reader/add_writer), so no
+        thread of its own is needed. Accepts the same newReader/newWriter/
+        newExceptional and removeReader/removeWriter/removeExceptional
+        requests, including persistent registrations. Event loops can't watch
+        for exceptional conditions, so newExceptional requests are accepted
+        but never notified.
+
+        Use Selector.getSelectorService(...) in preference - it creates an
+        AsyncioSelector when the scheduler is running in an event loop.
+        """
+        Inboxes = Selector.Inboxes
+
+        def __init__(self):
+            super(AsyncioSelector, self).__init__()
+            self.trackedby = None
+            self.meta = [ {}, {}, {} ]
+            self.selections = None
+
+        def makeSelections(self):
+            """\
+            Returns (readers, writers, exceptionals) collections that ask the
+            running event loop to watch selectables as they are added.
+            """
+            loop = asyncio.get_running_loop()
+            readers = _LoopSelection(loop.add_reader, loop.remove_reader, lambda selectable : self.notifyReady(READERS, selectable))
+            writers = _LoopSelection(loop.add_writer, loop.remove_writer, lambda selectable : self.notifyReady(WRITERS, selectable))
+            return readers, writers, []
+
+        def notifyReady(self, kind, selectable):
+            """\
+            Called by the event loop when a selectable is ready. Sends the
+            notification, then stops watching the selectable (and, unless the
+            registration is persistent, removes it).
+            """
+            meta = self.meta[kind]
+            replyService, outbox, linkage, persistent = meta[selectable]
+            self.send(selectable, outbox)
+            if persistent:
+                self.selections[kind].remove(selectable) # stays linked, until re-armed
+            else:
+                self.removeLinks(selectable, meta, self.selections[kind])
+
+        def main(self):
+            """\
+            Main loop. Acts on requests as they arrive. Finishes once nothing
+            has been watched for timeout seconds, like Selector does.
+            """
+            readers, writers, exceptionals = self.makeSelections()
+            self.selections = [readers, writers, exceptionals]
+            idlesince = None
+            try:
+                while 1:
+                    if self.dataReady("control"):
+                        message = self.recv("control")
+                        if isinstance(message,shutdown):
+                            self.deregisterServices()
+                            self.trackedby = None
+                    self.handleNotify(self.meta, readers, writers, exceptionals)
+                    if len(readers) + len(writers) + len(exceptionals) > 0:
+                        idlesince = None
+                    elif idlesince is None:
+                        idlesince = time.time()
+                    elif time.time() - idlesince > timeout:
+                        break
+                    if self.anyReady():
+                        yield 1
+                    elif idlesince is None:
+                        self.pause()
+                        yield 1
+                    else:
+                        yield WaitUntil(idlesince + timeout)
+            finally:
+                readers.clear()
+                writers.clear()
+                self.deregisterServices()
+                self.trackedby = None
+
+    __kamaelia_components__  = __kamaelia_components__ + ( AsyncioSelector, )
+
+else:
+    AsyncioSelector = None
@@ -194,8 +194,8 @@ class TCPClient(Axon.Component.component):
 
       self.link((self, "control"), (CSA, "control"), passthrough=1)  # propagate shutdown msgs
 
-      self.send(newReader(CSA, ((CSA, "ReadReady"), sock)), "_selectorSignal")            
-      self.send(newWriter(CSA, ((CSA, "SendReady"), sock)), "_selectorSignal")            
+      self.send(newReader(CSA, ((CSA, "ReadReady"), sock), persistent=True), "_selectorSignal")            
+      self.send(newWriter(CSA, ((CSA, "SendReady"), sock), persistent=True), "_selectorSignal")            
       self.CSA = CSA # We need this for shutdown later
 
       return self.childComponents()
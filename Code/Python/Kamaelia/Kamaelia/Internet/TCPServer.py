@@ -168,7 +168,7 @@ class TCPServer(Axon.Component.component):
       maxretries = 10
       gotsock=False
       newsock, addr = sock.accept()  # <===== THIS IS THE PROBLEM
-      self.send(newReader(self, ((self, "newconnection"), self.listener)), "_selectorSignal")
+      self.send(newReader(self, ((self, "newconnection"), self.listener), persistent=True), "_selectorSignal")
 
       gotsock = True
       newsock.setblocking(0)
@@ -270,8 +270,8 @@ class TCPServer(Axon.Component.component):
              self.socket_handlers[newsock] = CSA
 
              self.send(_ki.newCSA(self, CSA, newsock), "protocolHandlerSignal")
-             self.send(newReader(CSA, ((CSA, "ReadReady"), newsock)), "_selectorSignal")            
-             self.send(newWriter(CSA, ((CSA, "SendReady"), newsock)), "_selectorSignal")            
+             self.send(newReader(CSA, ((CSA, "ReadReady"), newsock), persistent=True), "_selectorSignal")            
+             self.send(newWriter(CSA, ((CSA, "SendReady"), newsock), persistent=True), "_selectorSignal")            
              self.addChildren(CSA)
              self.link((CSA, "CreatorFeedback"),(self,"_feedbackFromCSA"))
 #             return CSA
@@ -291,7 +291,7 @@ class TCPServer(Axon.Component.component):
        self.link((self, "_selectorShutdownSignal"),selectorShutdownService)
        self.selectorService = selectorService
        self.selectorShutdownService = selectorShutdownService
-       self.send(newReader(self, ((self, "newconnection"), self.listener)), "_selectorSignal")
+       self.send(newReader(self, ((self, "newconnection"), self.listener), persistent=True), "_selectorSignal")
        yield 1
        while 1:
            if not self.anyReady():
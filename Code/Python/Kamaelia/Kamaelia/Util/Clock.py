@@ -35,29 +35,35 @@ when they are sent a message).
 
 Why is it "cheap and cheerful"?
 
-...Because it uses a thread just for itself. All clocks could share a
-single thread if some services kung-fu was pulled.
-Opening lots of threads is a bad thing - they have much greater
-overhead than normal generator-based components. However, the 
-one-thread-per-clock approach used here is many times shorter
-and simpler than one using services.
+...Because it is very simple. It used to use a thread just for itself, but now
+yields Axon.Ipc.WaitUntil to the scheduler, which pauses it until the next
+message is due. So lots of clocks can run at once without costing any CPU
+time in between messages.
+
+As before, the interval is measured from when each message is sent - so if the
+system is too busy to send a message on time, the next one is still a whole
+interval later, rather than there being a burst of messages to catch up. And,
+as before, the clock never terminates.
 """
 
 import time
 
-from Axon.ThreadedComponent import threadedcomponent
+from Axon.Component import component
+from Axon.Ipc import WaitUntil
 
-# threadedcomponent so we can sleep without pausing other components
-class CheapAndCheerfulClock(threadedcomponent):
+class CheapAndCheerfulClock(component):
     """Outputs the message True every interval seconds"""
     def __init__(self, interval):
         super(CheapAndCheerfulClock, self).__init__()
         self.interval = interval
 
     def main(self):
+        nexttick = time.time()
         while 1:
-            self.send(True, "outbox")
-            time.sleep(self.interval) # wait self.interval seconds
+            if time.time() >= nexttick:
+                self.send(True, "outbox")
+                nexttick = time.time() + self.interval
+            yield WaitUntil(nexttick) # paused until self.interval seconds have passed
             
 __kamaelia_components__  = ( CheapAndCheerfulClock, )
 
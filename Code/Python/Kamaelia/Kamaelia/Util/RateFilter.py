@@ -211,7 +211,7 @@ terminate.
 
 
 from Axon.Component import component
-from Axon.Ipc import shutdownMicroprocess, producerFinished
+from Axon.Ipc import shutdownMicroprocess, producerFinished, WaitUntil
 import time
 
 #
@@ -296,7 +296,7 @@ class MessageRateLimit(component):
 #                        self.send(msg,"signal")
 #                        if isinstance(msg,(producerFinished,shutdownMicroprocess)):
 #                            return
-                    yield 1
+                    yield WaitUntil(last + interval)
                 c = c+1
                 last = self.scheduler.time
                 if last - start > 1:
@@ -376,7 +376,7 @@ class ByteRate_RequestControl(component):
             for chunk in self.getChunksToSend():
                 self.send( chunk, "outbox" )
 
-            yield 1
+            yield WaitUntil(self.nextTime)
 
     def shutdown(self):
         """Returns True if shutdown message received."""
@@ -479,7 +479,7 @@ class VariableByteRate_RequestControl(component):
             for chunk in self.getChunksToSend( now ):
                 self.send( chunk, "outbox" )
 
-            yield 1
+            yield WaitUntil(self.nextTime)
 
 
     def shutdown(self):
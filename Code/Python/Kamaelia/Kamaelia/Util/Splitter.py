@@ -335,7 +335,7 @@ class Splitter(Axon.AdaptiveCommsComponent.AdaptiveCommsComponent):
       it in self.outlist.
       """
       name = self.addOutbox(sink.name + '-' + sinkbox)
-      lnk = linkage(source = self, sourcebox = name, sink = sink, sinkbox = sinkbox, postoffice = self.postoffice, passthrough=passthrough)
+      lnk = self.link( (self, name), (sink, sinkbox), passthrough=passthrough)
       self.outlist[(sink,sinkbox)] = (name, lnk)
    
    def deletesink(self, oldsink):
@@ -0,0 +1,465 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of the storage behind postboxes in the Box module
+#
+
+import unittest
+import threading
+
+import Axon.Box
+from Axon.Box import realsink, lockedsink, spillsink, lockedspillsink, makeInbox, makeOutbox, boxdict, postbox
+from Axon.AxonExceptions import noSpaceInBox
+
+class realsink_Test(unittest.TestCase):
+    def setUp(self):
+        self.notified = []
+        self.popped = []
+
+    def test_appendNotifies(self):
+        "append() - stores the item and calls the notify callback."
+        S = realsink(notify=lambda : self.notified.append(True))
+        S.append("hello")
+        self.assertEqual(1, len(S))
+        self.assertEqual([True], self.notified)
+
+    def test_popFromFrontIsInOrder(self):
+        "pop(0) - returns items in the order they were appended."
+        S = realsink(notify=lambda : None)
+        for i in range(5):
+            S.append(i)
+        self.assertEqual([0,1,2,3,4], [S.pop(0) for i in range(5)])
+        self.assertRaises(IndexError, S.pop, 0)
+
+    def test_popOtherIndices(self):
+        "pop(index) - removes and returns the item at any index, like a list."
+        S = realsink(notify=lambda : None)
+        for i in range(5):
+            S.append(i)
+        self.assertEqual(4, S.pop(-1))
+        self.assertEqual(2, S.pop(2))
+        self.assertEqual([0,1,3], list(S))
+
+    def test_popWakes(self):
+        "pop() - calls every callback in wakeOnPop."
+        S = realsink(notify=lambda : None)
+        S.wakeOnPop.append(lambda : self.popped.append(1))
+        S.wakeOnPop.append(lambda : self.popped.append(2))
+        S.append("x")
+        S.pop(0)
+        self.assertEqual([1,2], self.popped)
+
+    def test_sizeLimit(self):
+        "append() - raises noSpaceInBox once the size limit is reached, and accepts more after a pop."
+        S = realsink(notify=lambda : None, size=2)
+        S.append(1)
+        S.append(2)
+        self.assertRaises(noSpaceInBox, S.append, 3)
+        S.pop(0)
+        S.append(3)
+        self.assertEqual([2,3], list(S))
+
+    def test_extendNotifiesOnce(self):
+        "extend() - stores all the items, calls the notify callback once, and returns how many were stored."
+        S = realsink(notify=lambda : self.notified.append(True))
+        self.assertEqual(3, S.extend(["a","b","c"]))
+        self.assertEqual(["a","b","c"], list(S))
+        self.assertEqual([True], self.notified)
+        self.assertEqual(0, S.extend([]))
+        self.assertEqual([True], self.notified)
+
+    def test_extendStopsAtSizeLimit(self):
+        "extend() - stops once the size limit is reached, without taking further items from the iterable."
+        S = realsink(notify=lambda : None, size=3)
+        S.append(0)
+        source = iter(range(1,10))
+        self.assertEqual(2, S.extend(source))
+        self.assertEqual([0,1,2], list(S))
+        self.assertEqual(3, next(source))
+        self.assertEqual(0, S.extend(source))
+
+    def test_popmanyWakesOnce(self):
+        "popmany() - removes and returns up to n items (or all of them) in order, calling wakeOnPop callbacks once."
+        S = realsink(notify=lambda : None)
+        S.wakeOnPop.append(lambda : self.popped.append(1))
+        S.extend(range(5))
+        self.assertEqual([0,1], S.popmany(2))
+        self.assertEqual([1], self.popped)
+        self.assertEqual([2,3,4], S.popmany())
+        self.assertEqual([1,1], self.popped)
+        self.assertEqual([], S.popmany())
+        self.assertEqual([1,1], self.popped)
+
+    def test_congestedAtHighWatermark(self):
+        "append(), extend() - reaching the high watermark marks the storage as congested, but more can still be stored."
+        S = realsink(notify=lambda : None)
+        S.setWatermarks(3)
+        self.assertEqual((3,1), (S.highwater, S.lowwater))
+        S.extend([1,2])
+        self.assertFalse(S.congested)
+        S.append(3)
+        self.assertTrue(S.congested)
+        S.append(4)
+        self.assertEqual(4, len(S))
+
+    def test_wakeSuppressedUntilLowWatermark(self):
+        "pop(), popmany() - whilst congested, wakeOnPop callbacks are only called once the low watermark is reached."
+        S = realsink(notify=lambda : None)
+        S.setWatermarks(4, 1)
+        S.wakeOnPop.append(lambda : self.popped.append(1))
+        S.extend(range(5))
+        S.pop(0)
+        S.popmany(2)
+        self.assertEqual([], self.popped)
+        self.assertTrue(S.congested)
+        S.pop(0)
+        self.assertEqual([1], self.popped)
+        self.assertFalse(S.congested)
+        S.pop(0)
+        self.assertEqual([1,1], self.popped)
+
+    def test_retargetFlushesInOrder(self):
+        "addsource() - messages waiting in the source are delivered to the new target in order."
+        src = makeInbox(notify=lambda : None)
+        dst = makeInbox(notify=lambda : None)
+        for i in range(5):
+            src.append(i)
+        dst.addsource(src)
+        self.assertEqual(0, src.local_len())
+        self.assertEqual([0,1,2,3,4], [dst.pop(0) for i in range(5)])
+
+    def test_popThroughLinkWakesOutbox(self):
+        "pop() - collecting from an inbox calls the notify callback of outboxes linked to it."
+        out = makeOutbox(notify=lambda : self.popped.append("out"))
+        inbox = makeInbox(notify=lambda : None)
+        inbox.addsource(out)
+        out.append("x")
+        inbox.pop(0)
+        self.assertEqual(["out"], self.popped)
+
+    def test_makeThreadSafe(self):
+        "makeThreadSafe() - locks the storage at the end of the chain, and the boxes in the chain use it; an unlinked outbox can't be made thread safe."
+        out = makeOutbox(notify=lambda : None)
+        middle = makeInbox(notify=lambda : None)
+        inbox = makeInbox(notify=lambda : self.notified.append(True))
+        middle.addsource(out)
+        inbox.addsource(middle)
+        self.assertEqual(None, inbox.storage.lock)
+        self.assertEqual(False, makeOutbox(notify=lambda : None).makeThreadSafe())
+        self.assertEqual(True, out.makeThreadSafe())
+        self.assert_(isinstance(inbox.storage, lockedsink))
+        self.assertNotEqual(None, inbox.storage.lock)
+        self.assert_(out.sink is inbox.storage)
+        out.append("x")
+        out.sink.extend(["y","z"])
+        self.assertEqual([True, True], self.notified)
+        self.assertEqual(["x"], [ inbox.pop(0) ])
+        self.assertEqual(["y","z"], inbox.popmany())
+        self.assertEqual(True, out.makeThreadSafe())
+
+    def test_lockedsinkFromThreads(self):
+        "lockedsink - messages appended by several threads whilst being collected are neither lost nor duplicated."
+        out = makeOutbox(notify=lambda : None)
+        inbox = makeInbox(notify=lambda : None)
+        inbox.addsource(out)
+        out.makeThreadSafe()
+        def sender(base):
+            for i in range(2000):
+                out.sink.append(base+i)
+        threads = [ threading.Thread(target=sender, args=(base,)) for base in (0, 10000, 20000) ]
+        for t in threads:
+            t.start()
+        received = []
+        while [ t for t in threads if t.is_alive() ] or len(inbox):
+            received.extend(inbox.popmany())
+        self.assertEqual(sorted(list(range(2000))+list(range(10000,12000))+list(range(20000,22000))), sorted(received))
+        self.assertEqual(list(range(10000,12000)), [ x for x in received if 10000 <= x < 20000 ])
+
+class spillsink_Test(unittest.TestCase):
+    def setUp(self):
+        self.notified = []
+        self.out = makeOutbox(notify=lambda : None)
+        self.inbox = makeInbox(notify=lambda : self.notified.append(True))
+        self.inbox.addsource(self.out)
+
+    def test_spillsAndReadsBackInOrder(self):
+        "spillToDisk() - messages beyond memsize go to disk, still count in len(), and are collected in order; the files are closed once read."
+        self.assertEqual(False, makeOutbox(notify=lambda : None).spillToDisk())
+        self.assertEqual(True, self.out.spillToDisk(memsize=5))
+        storage = self.inbox.storage
+        self.assert_(isinstance(storage, spillsink))
+        self.assert_(self.out.sink is storage)
+        for i in range(100):
+            self.out.append( (i, "x"*i) )
+        self.assertEqual(100, len(self.out))
+        self.assertEqual(100, self.inbox.local_len())
+        self.assertEqual(100, len(self.notified))
+        self.assertEqual(95, storage.spill.count)
+        self.assert_(storage.spill.bytes > 0)
+        received = [ self.inbox.pop(0) for i in range(10) ]
+        received.extend(self.inbox.popmany(40))
+        received.extend(self.inbox.popmany())
+        self.assertEqual([ (i, "x"*i) for i in range(100) ], received)
+        self.assertEqual(0, len(self.inbox))
+        self.assertEqual((0, 0), (storage.spill.count, storage.spill.bytes))
+        self.assertEqual(0, len(storage.spill.segments))
+        self.assertRaises(IndexError, self.inbox.pop, 0)
+
+    def test_segments(self):
+        "spillToDisk() - spilled messages are split across several files, each closed once it has all been read back, whilst more are appended."
+        segmentsize = Axon.Box.SpillSegmentSize
+        Axon.Box.SpillSegmentSize = 100
+        try:
+            self.inbox.spillToDisk(memsize=2)
+            storage = self.inbox.storage
+            self.out.extend( "%040d" % i for i in range(20) )
+            self.assert_(len(storage.spill.segments) > 3)
+            first = storage.spill.segments[0][0]
+            received = self.inbox.popmany(5)
+            self.assert_(first.closed)
+            self.out.extend( "%040d" % i for i in range(20,30) )
+            while len(self.inbox):
+                received.append(self.inbox.pop(0))
+            self.assertEqual([ "%040d" % i for i in range(30) ], received)
+            self.assertEqual(0, len(storage.spill.segments))
+        finally:
+            Axon.Box.SpillSegmentSize = segmentsize
+
+    def test_budget(self):
+        "spillToDisk() - once the budget of bytes on disk is used, append() raises noSpaceInBox and extend() stops early, until messages are collected."
+        self.out.spillToDisk(memsize=2, budget=100)
+        self.out.extend(["a","b"])
+        count = self.out.extend( "%020d" % i for i in range(100) )
+        self.assert_(0 < count < 100)
+        self.assertRaises(noSpaceInBox, self.out.append, "c")
+        self.assertEqual(2 + count, len(self.inbox))
+        self.assertEqual(["a","b"], self.inbox.popmany(2))
+        self.assertEqual("%020d" % 0, self.inbox.pop(0))
+        while self.inbox.storage.spill.count:
+            self.inbox.pop(0)
+        self.out.append("c")
+        self.assertEqual("c", self.inbox.popmany()[-1])
+
+    def test_watermarksCountSpilled(self):
+        "spillsink - watermarks and size limits count the messages on disk as well as those in memory."
+        self.inbox.spillToDisk(memsize=3)
+        self.inbox.setWatermarks(10, 2)
+        self.inbox.setSize(12)
+        self.out.extend(range(9))
+        self.assertFalse(self.out.isFull())
+        self.out.append(9)
+        self.assert_(self.out.isFull())
+        self.assertEqual(2, self.out.extend(range(10,20)))
+        self.assertRaises(noSpaceInBox, self.out.append, 12)
+        self.assertEqual(list(range(10)), self.inbox.popmany(10))
+        self.assertFalse(self.out.isFull())
+
+    def test_threadSafe(self):
+        "spillToDisk(), makeThreadSafe() - either order gives a lockedspillsink; messages from several threads are neither lost nor reordered."
+        self.out.makeThreadSafe()
+        self.out.spillToDisk(memsize=50)
+        self.assert_(isinstance(self.inbox.storage, lockedspillsink))
+        other = makeInbox(notify=lambda : None)
+        other.spillToDisk()
+        other.makeThreadSafe()
+        self.assert_(isinstance(other.storage, lockedspillsink))
+        def sender(base):
+            for i in range(2000):
+                self.out.sink.append(base+i)
+        threads = [ threading.Thread(target=sender, args=(base,)) for base in (0, 10000, 20000) ]
+        for t in threads:
+            t.start()
+        received = []
+        while [ t for t in threads if t.is_alive() ] or len(self.inbox):
+            received.extend(self.inbox.popmany(100))
+        self.assertEqual(sorted(list(range(2000))+list(range(10000,12000))+list(range(20000,22000))), sorted(received))
+        self.assertEqual(list(range(10000,12000)), [ x for x in received if 10000 <= x < 20000 ])
+
+class byteAccount_Test(unittest.TestCase):
+    def setUp(self):
+        self.woken = []
+        self.out = makeOutbox(notify=lambda : self.woken.append(True))
+        self.inbox = makeInbox(notify=lambda : None)
+        self.inbox.addsource(self.out)
+        self.processBytes = Axon.Box.processBudget.bytes
+
+    def tearDown(self):
+        self.inbox.stopAccountingBytes()
+        Axon.Box.setProcessBudget(None)
+        self.assertEqual(self.processBytes, Axon.Box.processBudget.bytes)
+
+    def test_countsBytes(self):
+        "accountBytes() - the bytes of messages waiting are counted, by len() or a given sizer, in the box and the process, and start afresh once it is empty."
+        self.assertEqual(None, self.out.bytesWaiting())
+        self.assertEqual(False, makeOutbox(notify=lambda : None).accountBytes())
+        self.out.append("abc")
+        self.assertEqual(True, self.out.accountBytes())
+        self.assertEqual(3, self.out.bytesWaiting())
+        self.out.append("defg")
+        self.assertEqual(3, self.out.extend(["hi", 12, b"jklmn"]))
+        self.assertEqual(14, self.inbox.bytesWaiting())
+        self.assertEqual(self.processBytes + 14, Axon.Box.processBudget.bytes)
+        self.assertEqual("abc", self.inbox.pop(0))
+        self.assertEqual(["defg","hi"], self.inbox.popmany(2))
+        self.assertEqual(5, self.inbox.bytesWaiting())
+        self.inbox.popmany()
+        self.assertEqual(0, self.inbox.bytesWaiting())
+        self.inbox.accountBytes(sizer=lambda message : 100)
+        self.out.extend([1,2])
+        self.assertEqual(200, self.inbox.bytesWaiting())
+        self.inbox.stopAccountingBytes()
+        self.assertEqual(None, self.inbox.bytesWaiting())
+        self.assertEqual(self.processBytes, Axon.Box.processBudget.bytes)
+
+    def test_backpressure(self):
+        "accountBytes() - once the byte budget is reached senders are told the box is full, and are woken once it drains to the low budget."
+        self.inbox.accountBytes(budget=100, lowbudget=20)
+        self.out.append("x"*60)
+        self.assertFalse(self.out.isFull())
+        self.out.append("x"*60)
+        self.assert_(self.out.isFull())
+        self.assertEqual(2, self.out.extend(["x"*10, "x"*10]))
+        self.inbox.pop(0)
+        self.assert_(self.out.isFull())
+        self.assertEqual([], self.woken)
+        self.inbox.pop(0)
+        self.assertFalse(self.out.isFull())
+        self.assertEqual(1, len(self.woken))
+
+    def test_dropPolicies(self):
+        "accountBytes() - once the byte budget is used, DropNewest discards the new message, DropOldest discards from the front, and Refuse raises noSpaceInBox."
+        self.inbox.accountBytes(budget=10, policy=Axon.Box.DropNewest)
+        self.assertEqual(3, self.out.extend(["aaaaa", "bbbbbbb", "ccc"]))
+        self.out.append("ddd")
+        self.assertEqual(["aaaaa", "bbbbbbb"], list(self.inbox.storage))
+        self.assertEqual(2, self.out.bytesDropped())
+        self.assertFalse(self.out.isFull())
+
+        self.inbox.accountBytes(budget=10, policy=Axon.Box.DropOldest)
+        self.out.append("ccc")
+        self.assertEqual(["bbbbbbb", "ccc"], list(self.inbox.storage))
+        self.out.extend(["dddd", "eeee", "ff"])
+        self.assertEqual(["dddd", "eeee", "ff"], list(self.inbox.storage))
+        self.assertEqual(10, self.inbox.bytesWaiting())
+
+        self.inbox.accountBytes(budget=10, policy=Axon.Box.Refuse)
+        self.assertRaises(noSpaceInBox, self.out.append, "g")
+        items = iter(["h", "i"])
+        self.assertEqual(0, self.out.extend(items))
+        self.assertEqual("h", next(items))
+        self.assertEqual("dddd", self.inbox.pop(0))
+        self.out.append("jjjjj")
+        self.assertRaises(noSpaceInBox, self.out.append, "k")
+        self.assertEqual(11, self.inbox.bytesWaiting())
+
+    def test_processBudget(self):
+        "setProcessBudget() - the budget applies to the bytes waiting in all boxes counting them, each box applying its own policy."
+        other = makeInbox(notify=lambda : None)
+        other.accountBytes(policy=Axon.Box.DropNewest)
+        self.inbox.accountBytes()
+        try:
+            Axon.Box.setProcessBudget(Axon.Box.processBudget.bytes + 100)
+            other.append("x"*100)
+            other.append("y")
+            self.assertEqual(["x"*100], list(other.storage))
+            self.out.append("z")
+            self.assert_(self.out.isFull())
+            other.pop(0)
+            self.assertFalse(Axon.Box.processBudget.full())
+            self.out.append("z")
+            self.assert_(self.out.isFull())
+            self.inbox.pop(0)
+            self.assertFalse(self.out.isFull())
+        finally:
+            other.stopAccountingBytes()
+
+    def test_spilled(self):
+        "accountBytes() - messages spilled to disk are counted, including those already spilled, and dropped in order."
+        self.inbox.spillToDisk(memsize=2)
+        self.out.extend(["aa", "bb", "cc", "dd"])
+        self.inbox.accountBytes(budget=8, policy=Axon.Box.DropOldest)
+        self.assertEqual(8, self.inbox.bytesWaiting())
+        self.out.extend(["ee", "ff", "gg"])
+        self.assertEqual(["dd", "ee", "ff", "gg"], self.inbox.popmany())
+        self.assertEqual(0, self.inbox.bytesWaiting())
+
+    def test_spilledLeftOnDisk(self):
+        "accountBytes() - messages already spilled to disk are counted without reading them back, using any sizer."
+        self.inbox.spillToDisk(memsize=2)
+        self.out.extend(["aa", "bb", "cc", "dddd"])
+        self.inbox.accountBytes(sizer=lambda data: 2*len(data))
+        self.assertEqual(20, self.inbox.bytesWaiting())
+        self.assertEqual(2, self.inbox.storage.spill.count)
+        self.inbox.accountBytes()
+        self.assertEqual(10, self.inbox.bytesWaiting())
+        self.assertEqual(2, self.inbox.storage.spill.count)
+        self.assertEqual(["aa", "bb", "cc", "dddd"], self.inbox.popmany())
+        self.assertEqual(0, self.inbox.bytesWaiting())
+
+class Owner(object):
+    def unpause(self):
+        pass
+
+class boxdict_Test(unittest.TestCase):
+    def test_boxesCreatedWhenFirstUsed(self):
+        "[] - creates the postbox for a name the first time it is looked up, then returns the same one."
+        D = boxdict(["inbox","control"], makeInbox, Owner())
+        self.assertEqual(0, dict.__len__(D))
+        self.assertTrue("inbox" in D)
+        self.assertEqual(0, dict.__len__(D))
+        box = D["inbox"]
+        self.assertTrue(isinstance(box, postbox))
+        self.assertTrue(box is D["inbox"])
+        self.assertEqual(["inbox"], list(dict.keys(D)))
+
+    def test_unknownNameFails(self):
+        "[] - raises KeyError for names that weren't specified or added."
+        D = boxdict(["inbox"], makeInbox, Owner())
+        self.assertRaises(KeyError, D.__getitem__, "nonsuch")
+        self.assertFalse("nonsuch" in D)
+        self.assertEqual(None, D.get("nonsuch"))
+
+    def test_iteratingCreatesAll(self):
+        "iterating, len(), keys(), values(), items() - behave as if all the boxes exist."
+        D = boxdict(["inbox","control"], makeInbox, Owner())
+        self.assertEqual(["control","inbox"], sorted(D))
+        self.assertEqual(2, len(D))
+        self.assertEqual(2, len(list(D.values())))
+
+    def test_addAndDelete(self):
+        "del, []= - boxes can be added and deleted, including ones not yet created, and deleted ones aren't recreated."
+        D = boxdict(["inbox","control"], makeInbox, Owner())
+        del D["control"]
+        self.assertFalse("control" in D)
+        self.assertRaises(KeyError, D.__getitem__, "control")
+        D["inbox"]
+        del D["inbox"]
+        self.assertFalse("inbox" in D)
+        self.assertRaises(KeyError, D.__delitem__, "inbox")
+        D["extra"] = makeInbox(lambda : None)
+        self.assertEqual(["extra"], list(D))
+
+def suite():
+   return unittest.TestSuite([unittest.makeSuite(realsink_Test), unittest.makeSuite(spillsink_Test), unittest.makeSuite(byteAccount_Test), unittest.makeSuite(boxdict_Test)])
+
+if __name__=='__main__':
+   unittest.main()
@@ -108,6 +108,19 @@ class Component_Test(unittest.TestCase):
         self.failUnless(len(testcomponent.outboxes[x])==0,"Unexpected outbox data structure for "+x+".")
       self.failUnless(testcomponent.children==[], "The children component should be an empty list.")
 
+   def test_leanConstruction(self):
+      "__init__ - Postboxes, the postoffice and the name are only created when first used."
+      c = component()
+      self.failUnless(dict.__len__(c.inboxes)==0 and dict.__len__(c.outboxes)==0, "No postboxes should have been created yet.")
+      self.failIf("_postoffice" in c.__dict__, "The postoffice should not have been created yet.")
+      self.failIf("_name" in c.__dict__, "The name should not have been worked out yet.")
+      c.send("hello","outbox")
+      self.failUnless(list(dict.keys(c.outboxes))==["outbox"], "Only the outbox used should have been created.")
+      self.failUnless(isinstance(c.postoffice, postoffice))
+      self.failUnless(c.name.endswith("component_"+str(c.id)), "Name should be made from the class name and id.")
+      c.name = "renamed"
+      self.failUnless(c.name == "renamed")
+
    def test___str__strict(self):
       "__str__ - Returns a string representation of the component- consisting of Component,representation of inboxes, representation of outboxes."
       #First test against an expected string.  Strict test, may have to change.
@@ -267,6 +280,38 @@ class Component_Test(unittest.TestCase):
           tcomp.tc1.send(x)
           self.failUnless(tcomp.tc1.outboxes["outbox"].pop(0)==x, "Failed while sending lots without clearing box.")
 
+   def test_recvAll(self):
+      "recvAll - Takes all items waiting in the specified inbox, and returns them as a list, in order."
+      a, b = component(), component()
+      a.link((a,"outbox"), (b,"inbox"))
+      self.failUnless(b.recvAll()==[], "Empty inbox should give an empty list")
+      for x in range(5):
+          a.send(x)
+      self.failUnless(b.recvAll("inbox")==[0,1,2,3,4], "Messages not all received, in order")
+      self.failIf(b.dataReady("inbox"), "Messages left in inbox after recvAll")
+
+   def test_recvUpTo(self):
+      "recvUpTo - Takes up to the specified number of items from the specified inbox, and returns them as a list, in order."
+      a, b = component(), component()
+      a.link((a,"signal"), (b,"control"))
+      for x in range(5):
+          a.send(x, "signal")
+      self.failUnless(b.recvUpTo("control", 3)==[0,1,2], "First 3 messages not received, in order")
+      self.failUnless(b.recvUpTo("control", 3)==[3,4], "Remaining messages not received")
+      self.failUnless(b.recvUpTo("control", 3)==[], "Empty inbox should give an empty list")
+
+   def test_sendMany(self):
+      "sendMany - Sends each item, returning how many were accepted, and stops taking items once the destination inbox is full."
+      a, b = component(), component()
+      a.link((a,"outbox"), (b,"inbox"))
+      self.failUnless(a.sendMany(["a","b"])==2, "Should report both messages sent")
+      self.failUnless(b.recvAll()==["a","b"], "Messages not delivered in order")
+      b.setInboxSize("inbox", 3)
+      source = iter(range(5))
+      self.failUnless(a.sendMany(source)==3, "Should report only 3 messages accepted by a size 3 inbox")
+      self.failUnless(next(source)==3, "Messages that weren't accepted should not be taken from the iterable")
+      self.failUnless(b.recvAll()==[0,1,2], "Accepted messages not delivered in order")
+
 #   def test_passthrough_       
       
    def test_main_smokeTest(self):
@@ -349,6 +394,58 @@ class Component_Test(unittest.TestCase):
        self.assert_(d.dataReady("inbox"))
        a.send(msg,"outbox")
        self.assert_(not b.dataReady("inbox"))
+
+   def test_spillInboxToDisk(self):
+       "spillInboxToDisk() - keeps only the first few messages waiting in the inbox in memory, the rest being collected from disk in order."
+       a=component()
+       b=component()
+       a.link((a,"outbox"),(b,"inbox"))
+       self.assertEqual(True, b.spillInboxToDisk("inbox", memsize=10))
+       for i in vrange(100):
+           a.send(i,"outbox")
+       self.assertEqual(10, len(b.inboxes["inbox"].storage) - b.inboxes["inbox"].storage.spill.count)
+       self.assertEqual(list(vrange(50)), [ b.recv("inbox") for i in vrange(50) ])
+       self.assertEqual(list(vrange(50,100)), b.recvAll("inbox"))
+       self.assert_(not b.dataReady("inbox"))
+
+   def test_accountInboxBytes(self):
+       "accountInboxBytes() - counts the bytes of messages waiting in the inbox, pausing the sender once its budget is used."
+       a=component()
+       b=component()
+       a.link((a,"outbox"),(b,"inbox"))
+       self.assertEqual(True, b.accountInboxBytes("inbox", budget=10))
+       a.send("abcde","outbox")
+       self.assertEqual(5, b.inboxes["inbox"].bytesWaiting())
+       self.assert_(not a.outboxes["outbox"].isFull())
+       a.send("fghij","outbox")
+       self.assert_(a.outboxes["outbox"].isFull())
+       self.assertEqual(["abcde","fghij"], b.recvAll("inbox"))
+       self.assertEqual(0, b.inboxes["inbox"].bytesWaiting())
+       b.inboxes["inbox"].stopAccountingBytes()
+
+   def test_setMessageCounting(self):
+      "setMessageCounting(True) - components count the messages they send and receive, however they do it. setMessageCounting(False) stops them counting."
+      a = component()
+      b = component()
+      a.link((a,"outbox"),(b,"inbox"))
+      try:
+         component.setMessageCounting(True)
+         for method in component._countingHooks:
+            self.assert_(component.__dict__[method] is component.__dict__["_counting_"+method])
+         a.send("x","outbox")
+         self.assertEqual(4, a.sendMany([1,2,3,4],"outbox"))
+         self.assertEqual("x", b.recv("inbox"))
+         self.assertEqual([1,2], b.recvUpTo("inbox",2))
+         self.assertEqual([3,4], b.recvAll("inbox"))
+         self.assertEqual((5,0), (a.messagesSent, a.messagesReceived))
+         self.assertEqual((0,5), (b.messagesSent, b.messagesReceived))
+      finally:
+         component.setMessageCounting(False)
+      for method in component._countingHooks:
+         self.assert_(component.__dict__[method] is component.__dict__["_nocounting_"+method])
+      a.send("y","outbox")
+      b.recv("inbox")
+      self.assertEqual((5,5), (a.messagesSent, b.messagesReceived))
        
        
        
@@ -362,6 +459,16 @@ class UnpauseDetectionComponent(component):
             yield 1
             self.unpaused += 1
 
+class FloodingComponent(component):
+    def __init__(self):
+        super(FloodingComponent,self).__init__()
+        self.sent=0
+    def main(self):
+        while 1:
+            self.send(self.sent,"outbox")
+            self.sent += 1
+            yield 1
+
 class MessageDeliveryNotifications_Test(unittest.TestCase):
     """\
     Tests to check notification callbacks are correctly established and used for
@@ -421,6 +528,48 @@ class MessageDeliveryNotifications_Test(unittest.TestCase):
         self.runForAWhile()
         self.assert_(a.unpaused==1)
     
+    def test_ProducerWokenByBatchCollection(self):
+        """A paused component is unpaused when a consumer picks up a batch of messages it has sent."""
+        a,b = self.initComponents(2)
+        a.link( (a,"outbox"), (b,"inbox") )
+        
+        self.runForAWhile()
+        a.sendMany([object(), object(), object()], "outbox")
+        self.runForAWhile()
+        self.assert_(b.unpaused==1)
+        self.assert_(len(b.recvAll("inbox"))==3)
+        self.runForAWhile()
+        self.assert_(a.unpaused==1)
+    
+    def test_ProducerPausedAtHighWatermark(self):
+        """A running component sending to an inbox that reaches its high watermark is paused."""
+        a,b = self.initComponents(2)
+        f = FloodingComponent().activate()
+        f.link( (f,"outbox"), (b,"inbox"), highwater=5 )
+
+        self.runForAWhile()
+        self.assert_(f.sent==5)
+        self.assert_(len(b.inboxes["inbox"])==5)
+        self.assert_(b.outboxes["outbox"].isFull()==False)
+        self.assert_(f.outboxes["outbox"].isFull())
+
+    def test_ProducerWokenAtLowWatermark(self):
+        """A component paused at the high watermark is only unpaused once the inbox is drained to the low watermark."""
+        a,b = self.initComponents(2)
+        a.link( (a,"outbox"), (b,"inbox"), highwater=4, lowwater=1 )
+
+        self.runForAWhile()
+        a.sendMany([object() for _ in range(4)], "outbox")
+        self.runForAWhile()
+        b.recv("inbox")
+        b.recvUpTo("inbox",1)
+        self.runForAWhile()
+        self.assert_(a.unpaused==0)
+        b.recv("inbox")
+        self.runForAWhile()
+        self.assert_(a.unpaused==1)
+        self.assert_(not a.outboxes["outbox"].isFull())
+
     def test_ChainOnlyFinalDestinationNotified(self):
         """In a chain of linkages with more than one inbox, only the final destination is woken when a message is sent."""
         a,b,c,d = self.initComponents(4)
@@ -201,5 +201,38 @@ class MicroProcess_Test(str_Test):
       self.failUnless(0 == mp._closeDownMicroprocess())
 
 
+   def test_debuggingOffByDefault(self):
+      "By default, microprocesses share a single nulldebug object as their debugger, and pause/unpause/stop do no debugging checks."
+      from Axon.debug import nulldebug
+      a, b = microprocess(), microprocess()
+      self.failIf(microprocess.debugging)
+      self.failUnless(isinstance(a.debugger, nulldebug))
+      self.failUnless(a.debugger is b.debugger)
+      self.failIf("debugger" in a.__dict__)
+      self.failUnless(microprocess.__dict__["pause"] is microprocess.__dict__["_nodebug_pause"])
+
+   def test_setDebugging(self):
+      "setDebugging(True) - microprocesses created afterwards get their own debugger, and the debugging versions of pause, stop etc are used. setDebugging(False) reverses this."
+      from Axon.debug import debug
+      try:
+         microprocess.setDebugging(True)
+         mp = microprocess()
+         self.failUnless(isinstance(mp.debugger, debug))
+         for method in microprocess._debugHooks:
+            self.failUnless(microprocess.__dict__[method] is microprocess.__dict__["_debug_"+method.lstrip("_")])
+         mp.activate(self.DummySched())
+         mp.pause()
+         self.failIf(mp._isRunnable())
+         mp.unpause()
+         self.failUnless(mp._isRunnable())
+         mp.stop()
+         self.failUnless(mp._isStopped())
+      finally:
+         microprocess.setDebugging(False)
+      for method in microprocess._debugHooks:
+         self.failUnless(microprocess.__dict__[method] is microprocess.__dict__["_nodebug_"+method.lstrip("_")])
+      self.failIf("debugger" in microprocess().__dict__)
+
+
 if __name__=='__main__':
    unittest.main()
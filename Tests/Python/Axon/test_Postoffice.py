@@ -183,6 +183,24 @@ class postoffice_Test(unittest.TestCase):
                      l4 in p.linkages,
                      "linkages deregister when you unlink specifying a component")
         
+    def test_linkagesInOrderAfterUnlinks(self):
+        p = postoffice()
+        c1 = DummyComponent()
+        c2 = DummyComponent()
+        c3 = DummyComponent()
+        l1 = p.link( (c1,"outbox"), (c2,"inbox") )
+        l2 = p.link( (c2,"outbox"), (c3,"inbox") )
+        l3 = p.link( (c1,"signal"), (c2,"control") )
+        l4 = p.link( (c3,"outbox"), (c1,"inbox") )
+        p.unlink(thelinkage=l1)
+        p.unlink(thelinkage=l1)
+        self.assert_(p.linkages == [l2,l3,l4], "remaining linkages are listed in the order they were made")
+        p.unlink(thecomponent=c3)
+        self.assert_(p.linkages == [l3], "unlinking a component removes linkages at either end of it")
+        self.assert_(p.islinkageregistered(l3) and not p.islinkageregistered(l2))
+        p.unlinkAll()
+        self.assert_(p.linkages == [])
+
     def test_linkdisengages(self):
         p = postoffice()
         c1 = DummyComponent()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of running components in worker processes with ProcessPipeline and ProcessGraphline
+#
+
+
+import unittest
+import os
+
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+from Axon.Ipc import producerFinished, shutdownMicroprocess
+from Axon.experimental.Process import ProcessPipeline, ProcessGraphline, _RingBuffer, _RingSlot
+
+class Producer(component):
+    def __init__(self, count):
+        super(Producer,self).__init__()
+        self.count = count
+    def main(self):
+        for i in range(self.count):
+            self.send(i, "outbox")
+            yield 1
+        self.send(producerFinished(self), "signal")
+
+class Doubler(component):
+    def main(self):
+        while 1:
+            for x in self.recvAll("inbox"):
+                self.send(x*2, "outbox")
+            if self.dataReady("control"):
+                self.send(self.recv("control"), "signal")
+                return
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+class BytesProducer(Producer):
+    def main(self):
+        for i in range(self.count):
+            self.send(bytes([i % 256]) * 1000, "outbox")
+            yield 1
+        self.send(producerFinished(self), "signal")
+
+class ViewChecker(component):
+    """Sends (is a read-only memoryview?, a doubled copy) for each payload"""
+    def main(self):
+        while 1:
+            for x in self.recvAll("inbox"):
+                self.send((isinstance(x, memoryview) and x.readonly, bytes(x)*2), "outbox")
+            if self.dataReady("control"):
+                self.send(self.recv("control"), "signal")
+                return
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+class Collector(component):
+    def __init__(self):
+        super(Collector,self).__init__()
+        self.received = []
+        self.signal = None
+    def main(self):
+        while not self.dataReady("control"):
+            self.received.extend(self.recvAll("inbox"))
+            if not self.anyReady():
+                self.pause()
+            yield 1
+        self.received.extend(self.recvAll("inbox"))
+        self.signal = self.recv("control")
+
+class Crasher(component):
+    def main(self):
+        while not self.dataReady("inbox"):
+            self.pause()
+            yield 1
+        raise ValueError("crash")
+
+class Killer(component):
+    def main(self):
+        yield 1
+        os._exit(3)
+
+def runWithCollector(P, *messages):
+    """Runs P with a Collector linked to its outputs (and messages delivered to its inboxes), returns the Collector"""
+    scheduler.run = scheduler()
+    C = Collector()
+    P.link((P,"outbox"), (C,"inbox"))
+    P.link((P,"signal"), (C,"control"))
+    for message, boxname in messages:
+        P._deliver(message, boxname)
+    P.activate()
+    C.activate()
+    scheduler.run.runThreads()
+    return C
+
+class ProcessGraphline_Test(unittest.TestCase):
+    def test_routes(self):
+        "_routes() - include the linkages (those to 'control' last), a route to report each child finishing, and routes for control messages to children whose control inbox isn't linked."
+        G = ProcessGraphline(A=component(), B=component(),
+                             linkages = { ("A","outbox") : ("B","inbox"),
+                                          ("A","signal") : ("B","control"),
+                                          ("self","inbox") : ("A","inbox"),
+                                        } )
+        self.assertEqual([ (0, "A", "outbox", "B", "inbox"),
+                           (1, "self", "inbox", "A", "inbox"),
+                           (2, "A", "signal", "B", "control"),
+                           (3, "A", "_finished", "self", "_finished"),
+                           (4, "self", "_cs", "A", "control"),
+                           (5, "B", "_finished", "self", "_finished"),
+                         ], G._routes())
+
+    def test_unknownComponentFails(self):
+        "_routes() - raises ValueError if a linkage refers to a component that wasn't given."
+        G = ProcessGraphline(A=component(), linkages = { ("A","outbox") : ("B","inbox") })
+        self.assertRaises(ValueError, G._routes)
+
+    def test_pipelineDeliversInOrder(self):
+        "ProcessPipeline - messages pass through each component in order, as does producerFinished, which is then sent on out of 'signal'."
+        C = runWithCollector(ProcessPipeline(Producer(200), Doubler(), Doubler()))
+        self.assertEqual([ x*4 for x in range(200) ], C.received)
+        self.assert_(isinstance(C.signal, producerFinished))
+
+    def test_pipelinePassesInboxesThrough(self):
+        "ProcessPipeline - messages sent to 'inbox' and 'control' go to the first component."
+        C = runWithCollector(ProcessPipeline(Doubler()), (1,"inbox"), (2,"inbox"), (producerFinished(),"control"))
+        self.assertEqual([2,4], C.received)
+        self.assert_(isinstance(C.signal, producerFinished))
+
+    def test_controlFannedOutAndShutdownSignalled(self):
+        "ProcessGraphline - if 'control' isn't linked, shutdownMicroprocess goes to every child, and is sent out of 'signal' once they've all finished."
+        G = ProcessGraphline(A=Doubler(), B=Doubler(),
+                             linkages = { ("self","inbox") : ("A","inbox"),
+                                          ("A","outbox") : ("self","outbox"),
+                                        } )
+        C = runWithCollector(G, (5,"inbox"), (shutdownMicroprocess(),"control"))
+        self.assertEqual([10], C.received)
+        self.assert_(isinstance(C.signal, shutdownMicroprocess))
+
+    def test_childExceptionRaises(self):
+        "ProcessGraphline - if a child component raises an exception, the other workers are stopped and RuntimeError is raised."
+        self.assertRaises(RuntimeError, runWithCollector, ProcessPipeline(Producer(5), Crasher(), Doubler()))
+
+    def test_killedWorkerRaises(self):
+        "ProcessGraphline - if a worker process dies without reporting its child finished, RuntimeError is raised rather than waiting forever."
+        self.assertRaises(RuntimeError, runWithCollector, ProcessPipeline(Killer(), Doubler()))
+
+    def test_ringBufferForUnlinkedBoxFails(self):
+        "_routes() - raises ValueError if a ring buffer is given for a box that isn't linked."
+        G = ProcessGraphline(A=component(), linkages = {}, ringbuffers = { ("A","outbox") : 1000 })
+        self.assertRaises(ValueError, G._routes)
+
+    def test_pipelineWithRingBuffers(self):
+        "ProcessPipeline - with ring buffers, bytes payloads arrive in order as read-only memoryviews, including when the ring buffer is full."
+        C = runWithCollector(ProcessPipeline(BytesProducer(100), ViewChecker(), ringbuffer=20000))
+        self.assertEqual([ (True, bytes([i]) * 2000) for i in range(100) ], C.received)
+        self.assert_(isinstance(C.signal, producerFinished))
+
+class RingBuffer_Test(unittest.TestCase):
+    def test_putAndGet(self):
+        "put(), get() - a bytes-like payload is placed in the buffer, and a memoryview of it can be got back; anything else is returned unchanged."
+        R = _RingBuffer(100)
+        slot = R.put(b"hello")
+        self.assert_(isinstance(slot, _RingSlot))
+        self.assertEqual(b"hello", bytes(R.get(slot)))
+        self.assertEqual(b"world", bytes(R.get(R.put(memoryview(bytearray(b"world"))))))
+        self.assertEqual("hello", R.put("hello"))
+
+    def test_fullOrTooLarge(self):
+        "put() - returns the payload (as bytes, if it was a memoryview) if it is too large, or there isn't space."
+        R = _RingBuffer(100)
+        self.assertEqual(b"x"*101, R.put(b"x"*101))
+        R.put(b"x"*60)
+        self.assertEqual(b"y"*50, R.put(memoryview(b"y"*50)))
+        self.assertEqual(bytes, type(R.put(memoryview(b"y"*50))))
+
+    def test_spaceReleasedInOrder(self):
+        "get() - space is released once the memoryviews returned are no longer referred to, in the order the payloads were put."
+        R = _RingBuffer(100)
+        first = R.get(R.put(b"a"*40))
+        second = R.get(R.put(b"b"*40))
+        del second
+        self.assertEqual(0, R.tail[0])
+        del first
+        self.assertEqual(80, R.tail[0])
+
+    def test_wrapsRound(self):
+        "put() - a payload that won't fit before the end of the buffer goes at the start, once there is space."
+        R = _RingBuffer(100)
+        R.get(R.put(b"a"*70))
+        slot = R.put(b"b"*40)
+        self.assertEqual(100, slot.start)
+        self.assertEqual(b"b"*40, bytes(R.get(slot)))
+
+    def test_sliceKeepsSpace(self):
+        "get() - slices of the memoryview returned, and memoryviews made from it, keep the space from being reused."
+        R = _RingBuffer(100)
+        view = R.get(R.put(b"a"*40))
+        part = view[10:20]
+        whole = memoryview(view)
+        del view
+        self.assertEqual(0, R.tail[0])
+        self.assertEqual(b"b"*70, R.put(b"b"*70))   # no space to overwrite it
+        del part
+        self.assertEqual(0, R.tail[0])
+        self.assertEqual(b"a"*40, bytes(whole))
+        del whole
+        self.assertEqual(40, R.tail[0])
+
+def suite():
+   return unittest.TestSuite([unittest.makeSuite(ProcessGraphline_Test), unittest.makeSuite(RingBuffer_Test)])
+
+if __name__=='__main__':
+   unittest.main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of the software transactional memory store
+#
+
+import unittest
+import threading
+import time
+
+from Axon.STM import Store, ConcurrentUpdate, BusyRetry, Retry, backoff
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+from Axon.Ipc import WaitFuture
+
+class STM_Test(unittest.TestCase):
+    def test_usevarCommit(self):
+        "usevar() - a Value can be committed if nobody else has committed it since it was got, otherwise ConcurrentUpdate is raised."
+        S = Store()
+        greeting = S.usevar("hello")
+        self.assertEqual((0, None), (greeting.version, greeting.value))
+        greeting.set("Hello World")
+        greeting.commit()
+        other = S.usevar("hello")
+        self.assertEqual((1, "Hello World"), (other.version, other.value))
+        other.set("Woo")
+        other.commit()
+        greeting.set("Hello again")
+        self.assertRaises(ConcurrentUpdate, greeting.commit)
+        self.assertEqual("Woo", S.usevar("hello").value)
+
+    def test_usingCommit(self):
+        "using() - a Collection is committed all or nothing."
+        S = Store()
+        D = S.using("account_one", "account_two")
+        D["account_one"].set(50)
+        D["account_two"].set(100)
+        D.commit()
+        D = S.using("account_one", "account_two")
+        E = S.using("account_one")
+        E["account_one"].set(0)
+        E.commit()
+        D["account_one"].set(1)
+        D["account_two"].set(2)
+        self.assertRaises(ConcurrentUpdate, D.commit)
+        self.assertEqual((0, 100), (S.usevar("account_one").value, S.usevar("account_two").value))
+
+    def test_copying(self):
+        "Store() - values are copied when got and committed, so changing them in place doesn't change the store."
+        S = Store()
+        V = S.usevar("list")
+        value = [1]
+        V.set(value)
+        V.commit()
+        value.append(2)
+        got = S.usevar("list")
+        self.assertEqual([1], got.value)
+        got.value.append(3)
+        self.assertEqual([1], S.usevar("list").value)
+
+    def test_stripes(self):
+        "Store() - only the locks for the keys involved are needed, so another thread holding a different one doesn't cause a BusyRetry."
+        S = Store(stripes=2)
+        S.using(0, 1)
+        S.locks[1].acquire()
+        try:
+            self.assertEqual(None, S.usevar(0).value)
+            self.assertEqual(None, S.usevar(1).value)
+            V = S.usevar(0)
+            V.set("a")
+            V.commit()
+            self.assertEqual("a", S.using(0, 2)[0].value)
+            self.assertRaises(BusyRetry, S.using, 0, 1)
+            self.assertRaises(BusyRetry, S.usevar, 3)
+            W = S.usevar(1)
+            self.assertRaises(BusyRetry, W.commit)
+            self.assertFalse(S.locks[0].locked())
+        finally:
+            S.locks[1].release()
+        W.commit()
+
+    def test_immutable(self):
+        "Store(immutable=True) - values are shared rather than copied; writable() copies a shared value, once, to change it in place."
+        S = Store(immutable=True)
+        V = S.usevar("counts")
+        counts = {"apples" : 1}
+        V.set(counts)
+        V.commit()
+        got = S.usevar("counts")
+        self.assert_(got.value is counts)
+        writable = got.writable()
+        self.assert_(writable is not counts)
+        self.assert_(got.writable() is writable)
+        writable["apples"] = 2
+        self.assertEqual({"apples" : 1}, S.usevar("counts").value)
+        got.commit()
+        self.assertEqual({"apples" : 2}, S.usevar("counts").value)
+        self.assert_(got.writable() is not writable)
+
+    def test_backoff(self):
+        "backoff() - yields attempts-1 randomised waits, doubling up to the maximum."
+        waits = list(backoff(attempts=10, delay=0.01, maxdelay=0.1))
+        self.assertEqual(9, len(waits))
+        self.assert_(0.005 <= waits[0] <= 0.01)
+        self.assert_(0.04 <= waits[3] <= 0.08)
+        self.assert_(0.05 <= waits[8] <= 0.1)
+        self.assertEqual([], list(backoff(attempts=1)))
+
+    def test_transactionRetries(self):
+        "transaction() - is retried if another thread commits first, returning what the update returned; the last failure is raised once all attempts fail."
+        S = Store()
+        calls = []
+        def update(D):
+            calls.append(D["count"].value)
+            if len(calls) == 1:
+                other = S.usevar("count")
+                other.set(10)
+                other.commit()
+            D["count"].set((D["count"].value or 0) + 1)
+            return len(calls)
+        self.assertEqual(2, S.transaction(["count"], update, delay=0))
+        self.assertEqual([None, 10], calls)
+        self.assertEqual(11, S.usevar("count").value)
+        def clash(D):
+            other = S.usevar("count")
+            other.set(0)
+            other.commit()
+            D["count"].set(1)
+        self.assertRaises(ConcurrentUpdate, S.transaction, ["count"], clash, attempts=3, delay=0)
+
+    def test_threads(self):
+        "transaction() - concurrent increments from several threads are none of them lost."
+        S = Store(stripes=4)
+        def increment(D):
+            for key in D:
+                D[key].set((D[key].value or 0) + 1)
+        def worker(n):
+            for i in range(200):
+                S.transaction([ "k%d" % ((n+i) % 6), "k%d" % ((n+i+1) % 6) ], increment, delay=0.00001)
+        threads = [ threading.Thread(target=worker, args=(n,)) for n in range(4) ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(4*200*2, sum(S.usevar("k%d" % i).value for i in range(6)))
+
+def commitLater(S, key, value, delay=0.05):
+    def commit():
+        time.sleep(delay)
+        V = S.usevar(key)
+        V.set(value)
+        V.commit()
+    thread = threading.Thread(target=commit)
+    thread.start()
+    return thread
+
+class Waiter(component):
+    def __init__(self, store):
+        super(Waiter, self).__init__()
+        self.store = store
+        self.seen = []
+        self.slices = 0
+    def main(self):
+        while True:
+            self.slices += 1
+            D = self.store.using("flag")
+            if not D["flag"].value:
+                yield WaitFuture(self.store.changed(D))
+                continue
+            self.seen.append(D["flag"].value)
+            return
+
+class ChangeNotification_Test(unittest.TestCase):
+    def test_waitForChange(self):
+        "wait_for_change() - blocks until one of the keys is committed by another thread, returning the keys that changed, or an empty list on timeout."
+        S = Store()
+        self.assertEqual([], S.wait_for_change(["a", "b"], timeout=0.01))
+        thread = commitLater(S, "b", 1)
+        self.assertEqual(["b"], S.wait_for_change(["a", "b"], timeout=10))
+        thread.join()
+        self.assertEqual({}, S.watchers)
+
+    def test_changedSinceGot(self):
+        "changed() - given a Collection, is done straight away if a value has been committed since it was got."
+        S = Store()
+        D = S.using("a", "b")
+        V = S.usevar("a")
+        V.set(1)
+        V.commit()
+        future = S.changed(D)
+        self.assert_(future.done())
+        self.assertEqual(["a"], future.result())
+        self.assertEqual([], S.wait_for_change(S.using("a", "b"), timeout=0))
+
+    def test_cancel(self):
+        "changed() - cancelling the future stops the store watching; later commits are unaffected."
+        S = Store()
+        future = S.changed(["a"])
+        self.assertEqual(1, len(S.watchers["a"]))
+        self.assert_(future.cancel())
+        self.assertEqual({}, S.watchers)
+        V = S.usevar("a")
+        V.set(1)
+        V.commit()
+        self.assert_(future.cancelled())
+
+    def test_transactionRetry(self):
+        "transaction() - an update raising Retry is run again once one of its values changes."
+        S = Store()
+        def take(D):
+            if not D["jobs"].value:
+                raise Retry
+            D["jobs"].set(D["jobs"].value[1:])
+            return D["jobs"].value
+        thread = commitLater(S, "jobs", ["x", "y"])
+        self.assertEqual(["y"], S.transaction(["jobs"], take))
+        thread.join()
+
+    def test_wakesComponent(self):
+        "changed() - a component yielding WaitFuture for it is paused until another thread commits one of the values."
+        S = Store()
+        sched = scheduler()
+        waiter = Waiter(S)
+        waiter.activate(Scheduler=sched)
+        thread = commitLater(S, "flag", "set", delay=0.1)
+        for _ in sched.main(slowmo=0, canblock=True):
+            pass
+        thread.join()
+        self.assertEqual(["set"], waiter.seen)
+        self.assertEqual(2, waiter.slices)
+
+def suite():
+   return unittest.TestSuite([unittest.makeSuite(STM_Test), unittest.makeSuite(ChangeNotification_Test)])
+
+if __name__=='__main__':
+   unittest.main()
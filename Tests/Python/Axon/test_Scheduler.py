@@ -25,6 +25,7 @@
 
 # Test the module loads
 import unittest
+import sys
 
 # import preconditions record values
 import Axon.Scheduler
@@ -635,6 +636,326 @@ class scheduler_Test(unittest.TestCase):
        self.assert_(endtime-starttime <= 0.01*seconds, "Time consumed should have been <1% of CPU time")
 
 
+   def test_blockedSchedulerWokenPromptlyByOtherThread(self):
+       """If run using the runThreads method, a scheduler blocked because all microprocesses are paused is woken promptly by a wake request from another thread."""
+       import time
+       import threading
+       import Axon.Microprocess
+
+       s = Axon.Scheduler.scheduler()
+       class Pauser(Axon.Microprocess.microprocess):
+           def main(self):
+               self.pause()
+               yield 1
+       mp = Pauser()
+       mp.activate(Scheduler=s)
+       woken = []
+       def causeCompletion():
+           woken.append(time.time())
+           s.wakeThread(mp)
+       timer = threading.Timer(1.0, causeCompletion)
+       timer.start()
+       s.runThreads()
+       self.assert_(s.blocked == False)
+       self.assert_(time.time() - woken[0] < 0.1, "Scheduler should have been woken promptly")
+
+   def test_sleepingMicroprocessWokenAfterDeadline(self):
+       """A microprocess that yields Sleep(delay) is not run again until the delay has passed, and the scheduler does not busy-wait meanwhile."""
+       import os,time
+       import Axon.Microprocess
+       from Axon.Ipc import Sleep
+
+       s = Axon.Scheduler.scheduler()
+       woken = []
+       class Sleeper(Axon.Microprocess.microprocess):
+           def main(self):
+               start = time.time()
+               yield Sleep(0.5)
+               woken.append(time.time() - start)
+
+       Sleeper().activate(Scheduler=s)
+       starttime = os.times()
+       s.runThreads()
+       endtime = os.times()
+
+       self.assertEqual(1, len(woken))
+       self.assert_(woken[0] >= 0.5, "Should not have been woken before the deadline")
+       self.assert_(woken[0] < 0.6, "Should have been woken promptly after the deadline")
+       cpu = (endtime[0]-starttime[0]) + (endtime[1]-starttime[1])
+       self.assert_(cpu < 0.1, "Should not have busy-waited whilst sleeping")
+
+   def test_waitUntilInThePastDoesNotPause(self):
+       """A microprocess that yields WaitUntil with a time already passed carries on running."""
+       import time
+       import Axon.Microprocess
+       from Axon.Ipc import WaitUntil
+
+       s = Axon.Scheduler.scheduler()
+       steps = []
+       class Waiter(Axon.Microprocess.microprocess):
+           def main(self):
+               for i in range(3):
+                   steps.append(i)
+                   yield WaitUntil(time.time() - 1)
+
+       Waiter().activate(Scheduler=s)
+       for _ in s.main():
+           if len(steps) == 3:
+               break
+       self.assertEqual([0,1,2], steps)
+
+   def test_waitCompleteRunsInline(self):
+       """A microprocess that yields WaitComplete(generator) runs that generator itself, nested if need be, without any new microprocess being activated, then carries on from where it was."""
+       import Axon.Microprocess
+       from Axon.Ipc import WaitComplete
+
+       s = Axon.Scheduler.scheduler()
+       steps = []
+       class Delegator(Axon.Microprocess.microprocess):
+           def main(self):
+               steps.append("start")
+               yield WaitComplete(self.inner(2))
+               steps.append("end")
+               yield 1
+           def inner(self, n):
+               steps.append(("inner", n, len(s.listAllThreads())))
+               yield 1
+               if n > 1:
+                   yield WaitComplete(self.inner(n-1))
+               steps.append(("done", n))
+
+       Delegator().activate(Scheduler=s)
+       s.runThreads()
+       self.assertEqual(["start", ("inner",2,1), ("inner",1,1), ("done",1), ("done",2), "end"], steps)
+
+   def test_waitCompleteRunsInlineForGivenThread(self):
+       """A microprocess created with a thread= generator also runs any WaitComplete generator it yields, before carrying on."""
+       import Axon.Microprocess
+       from Axon.Ipc import WaitComplete
+
+       s = Axon.Scheduler.scheduler()
+       steps = []
+       def inner():
+           steps.append("inner")
+           yield 1
+       def outer():
+           steps.append("start")
+           yield WaitComplete(inner())
+           steps.append("end")
+           yield 1
+
+       Axon.Microprocess.microprocess(thread=outer()).activate(Scheduler=s)
+       s.runThreads()
+       self.assertEqual(["start", "inner", "end"], steps)
+
+   def test_waitCompletePausesWholeStack(self):
+       """Pausing a microprocess whilst it waits for a WaitComplete generator pauses that generator, until the microprocess is unpaused."""
+       import Axon.Microprocess
+       from Axon.Ipc import WaitComplete
+
+       s = Axon.Scheduler.scheduler()
+       steps = []
+       class Delegator(Axon.Microprocess.microprocess):
+           def main(self):
+               yield WaitComplete(self.inner())
+               steps.append("end")
+           def inner(self):
+               steps.append("pausing")
+               self.pause()
+               yield 1
+               steps.append("unpaused")
+       class Waker(Axon.Microprocess.microprocess):
+           def __init__(self, other):
+               super(Waker,self).__init__()
+               self.other = other
+           def main(self):
+               for i in range(5):
+                   yield 1
+               steps.append("waking")
+               self.other.unpause()
+
+       d = Delegator().activate(Scheduler=s)
+       Waker(d).activate(Scheduler=s)
+       s.runThreads()
+       self.assertEqual(["pausing", "waking", "unpaused", "end"], steps)
+
+   def test_waitCompleteExceptionRaisedInCaller(self):
+       """If a WaitComplete generator fails with an exception, it is raised where the microprocess yielded the WaitComplete."""
+       import Axon.Microprocess
+       from Axon.Ipc import WaitComplete
+
+       s = Axon.Scheduler.scheduler()
+       caught = []
+       class Delegator(Axon.Microprocess.microprocess):
+           def main(self):
+               try:
+                   yield WaitComplete(self.inner())
+               except ValueError:
+                   caught.append(str(sys.exc_info()[1]))
+               yield 1
+           def inner(self):
+               yield 1
+               raise ValueError("oops")
+
+       Delegator().activate(Scheduler=s)
+       s.runThreads()
+       self.assertEqual(["oops"], caught)
+
+   def test_priorityOrder(self):
+       """Microprocesses activated with a higher priority are run before those with a lower priority in each cycle. The priority defaults to the class's priority attribute."""
+       import Axon.Microprocess
+       Scheduler = Axon.Scheduler.scheduler
+
+       s = Scheduler()
+       steps = []
+       class Stepper(Axon.Microprocess.microprocess):
+           def __init__(self, label):
+               super(Stepper,self).__init__()
+               self.label = label
+           def main(self):
+               for i in range(2):
+                   steps.append(self.label)
+                   yield 1
+       class Urgent(Stepper):
+           priority = Scheduler.HIGH
+
+       low = Stepper("low").activate(Scheduler=s, priority=Scheduler.LOW)
+       normal = Stepper("normal").activate(Scheduler=s)
+       high = Urgent("high").activate(Scheduler=s)
+       self.assertEqual((Scheduler.LOW, Scheduler.NORMAL, Scheduler.HIGH), (low.priority, normal.priority, high.priority))
+       s.runThreads()
+       self.assertEqual(["high","normal","low"]*2, steps)
+
+   def test_quota(self):
+       """setQuota() limits how many microprocesses at a priority are run each cycle; the others take their turn in later cycles. It must be at least 1."""
+       import Axon.Microprocess
+       Scheduler = Axon.Scheduler.scheduler
+
+       s = Scheduler()
+       self.assertRaises(ValueError, s.setQuota, Scheduler.LOW, 0)
+       s.setQuota(Scheduler.LOW, 2)
+       steps = []
+       class Stepper(Axon.Microprocess.microprocess):
+           def __init__(self, label, count):
+               super(Stepper,self).__init__()
+               self.label = label
+               self.count = count
+           def main(self):
+               for i in range(self.count):
+                   steps.append(self.label)
+                   yield 1
+
+       for i in range(3):
+           Stepper(i, 2).activate(Scheduler=s, priority=Scheduler.LOW)
+       Stepper("high", 4).activate(Scheduler=s, priority=Scheduler.HIGH)
+       s.runThreads()
+       self.assertEqual(["high", 0, 1, "high", 2, 0, "high", 1, 2, "high"], steps)
+
+       s.setQuota(Scheduler.LOW, None)
+       del steps[:]
+       for i in range(3):
+           Stepper(i, 1).activate(Scheduler=s, priority=Scheduler.LOW)
+       s.runThreads()
+       self.assertEqual([0, 1, 2], steps)
+
+   def test_statsByPriority(self):
+       """Whilst recording statistics, statsByPriority() returns the timeslices run and the latency from being woken to being run for each priority level."""
+       import Axon.Microprocess
+       Scheduler = Axon.Scheduler.scheduler
+
+       s = Scheduler()
+       class Pauser(Axon.Microprocess.microprocess):
+           def main(self):
+               yield 1
+               self.pause()
+               yield 1
+       class Waker(Axon.Microprocess.microprocess):
+           def __init__(self, other):
+               super(Waker,self).__init__()
+               self.other = other
+           def main(self):
+               for i in range(3):
+                   yield 1
+               self.other.unpause()
+
+       self.assertEqual({}, s.statsByPriority())
+       p = Pauser().activate(Scheduler=s, priority=Scheduler.HIGH)
+       Waker(p).activate(Scheduler=s)
+       try:
+           s.recordStats()
+           s.runThreads()
+           stats = s.statsByPriority()
+       finally:
+           s.recordStats(False)
+       self.assertEqual([Scheduler.NORMAL, Scheduler.HIGH], sorted(stats.keys()))
+       self.assertEqual(3, stats[Scheduler.HIGH]["timeslices"])
+       self.assertEqual(4, stats[Scheduler.NORMAL]["timeslices"])
+       self.assertEqual(1, stats[Scheduler.HIGH]["wakeups"])
+       self.assert_(0 <= stats[Scheduler.HIGH]["maxlatency"] <= stats[Scheduler.HIGH]["latency"])
+       self.assertEqual(0, stats[Scheduler.NORMAL]["wakeups"])
+       self.assertEqual({}, s.statsByPriority())
+
+   def test_waitFutureInThreads(self):
+       """WaitFuture works with concurrent.futures futures when run with runThreads(); one already done doesn't pause."""
+       import threading
+       import concurrent.futures
+       import Axon.Microprocess
+       from Axon.Ipc import WaitFuture
+
+       s = Axon.Scheduler.scheduler()
+       done = concurrent.futures.Future()
+       done.set_result(1)
+       later = concurrent.futures.Future()
+       results = []
+       class Waiter(Axon.Microprocess.microprocess):
+           def main(self):
+               yield WaitFuture(done)
+               results.append(s.isThreadPaused(self))
+               threading.Timer(0.1, lambda : later.set_result(2)).start()
+               yield WaitFuture(later)
+               results.append(later.result())
+       Waiter().activate(Scheduler=s)
+       s.runThreads()
+       self.assertEqual([False, 2], results)
+
+   def test_recordStats(self):
+       """recordStats() - whilst switched on, the scheduler records the timeslices each microprocess is given, how long they took, and how often and long it was paused. Statistics are discarded when it terminates."""
+       import time
+       import Axon.Microprocess
+       from Axon.Ipc import Sleep
+
+       s = Axon.Scheduler.scheduler()
+       self.assertEqual({}, s.stats())
+       snapshots = []
+       class Worker(Axon.Microprocess.microprocess):
+           def main(self):
+               time.sleep(0.05)
+               yield 1
+               yield 1
+               yield Sleep(0.2)
+               snapshots.append(s.stats(self))
+               snapshots.append(s.stats())
+       w = Worker()
+       w.activate(Scheduler=s)
+       try:
+           s.recordStats()
+           s.runThreads()
+       finally:
+           s.recordStats(False)
+       stats, allstats = snapshots
+       self.assertEqual({ w : stats }, allstats)
+       self.assertEqual(w.name, stats["name"])
+       self.assertEqual(3, stats["timeslices"])
+       self.assert_(stats["runtime"] >= 0.05)
+       self.assert_(0.05 <= stats["maxruntime"] <= stats["runtime"])
+       self.assertEqual(1, stats["wakeups"])
+       self.assert_(0.2 <= stats["pausedtime"] < 0.3)
+       self.assertEqual(False, stats["paused"])
+       self.assertEqual((0,0), (stats["sent"], stats["received"]))
+       self.assertEqual({}, s.stats())
+       self.assertEqual(None, s.stats(w))
+
+
 
 if __name__=='__main__':
    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Full coverage testing of running the scheduler in an asyncio event loop
+#
+# Kept apart from test_Scheduler, as it uses Python 3 only syntax (async def)
+#
+
+import unittest
+
+import Axon.Scheduler
+
+
+class schedulerAsyncio_Test(unittest.TestCase):
+   def test_runInLoopTakesTurnsWithLoop(self):
+       """runInLoop() runs microprocesses in timeslices between other asyncio callbacks, and its future is done when they have all finished."""
+       import asyncio
+       import Axon.Microprocess
+
+       s = Axon.Scheduler.scheduler()
+       steps = []
+       class Counter(Axon.Microprocess.microprocess):
+           def main(self):
+               for i in range(1000):
+                   steps.append("axon")
+                   yield 1
+       async def other():
+           while 1:
+               steps.append("asyncio")
+               await asyncio.sleep(0)
+       async def run():
+           Counter().activate(Scheduler=s)
+           task = asyncio.ensure_future(other())
+           await s.runInLoop(slicesize=10)
+           task.cancel()
+       asyncio.run(run())
+       self.assertEqual(1000, steps.count("axon"))
+       self.assert_(steps.count("asyncio") > 10, "Loop should have run other callbacks in between")
+       self.assertEqual(None, s.loop)
+
+   def test_runInLoopIdlesUntilWoken(self):
+       """runInLoop() - whilst all microprocesses are paused the scheduler isn't run, until one is woken from another thread or a deadline arrives."""
+       import asyncio
+       import os,time
+       import threading
+       import Axon.Microprocess
+       from Axon.Ipc import Sleep
+
+       s = Axon.Scheduler.scheduler()
+       woken = []
+       class Pauser(Axon.Microprocess.microprocess):
+           def main(self):
+               self.pause()
+               yield 1
+               woken.append(time.time())
+       class Sleeper(Axon.Microprocess.microprocess):
+           def main(self):
+               yield Sleep(0.3)
+               woken.append(time.time())
+       mp = Pauser()
+       async def run():
+           mp.activate(Scheduler=s)
+           Sleeper().activate(Scheduler=s)
+           threading.Timer(0.6, lambda : s.wakeThread(mp)).start()
+           await s.runInLoop()
+       start = time.time()
+       starttime = os.times()
+       asyncio.run(run())
+       endtime = os.times()
+       self.assertEqual(2, len(woken))
+       self.assert_(0.3 <= woken[0]-start < 0.4, "Sleeper should have been woken promptly after its deadline")
+       self.assert_(0.6 <= woken[1]-start < 0.7, "Pauser should have been woken promptly by the other thread")
+       cpu = (endtime[0]-starttime[0]) + (endtime[1]-starttime[1])
+       self.assert_(cpu < 0.1, "Should not have busy-waited whilst idle")
+
+   def test_runInLoopPassesOnExceptions(self):
+       """runInLoop() - an exception raised by a microprocess is raised by the future it returned."""
+       import asyncio
+       import Axon.Microprocess
+
+       s = Axon.Scheduler.scheduler()
+       class Crasher(Axon.Microprocess.microprocess):
+           def main(self):
+               yield 1
+               raise ValueError("crashed")
+       async def run():
+           Crasher().activate(Scheduler=s)
+           await s.runInLoop()
+       self.assertRaises(ValueError, asyncio.run, run())
+       self.assertEqual(None, s.loop)
+
+   def test_waitFutureInLoop(self):
+       """A microprocess that yields WaitFuture(coroutine) is paused until the coroutine has finished, and can then collect its result."""
+       import asyncio
+       import Axon.Microprocess
+       from Axon.Ipc import WaitFuture
+
+       s = Axon.Scheduler.scheduler()
+       results = []
+       class Waiter(Axon.Microprocess.microprocess):
+           def main(self):
+               response = WaitFuture(asyncio.sleep(0.1, "done"))
+               while not response.done():
+                   results.append("waiting")
+                   yield response
+               results.append(response.result())
+       async def run():
+           Waiter().activate(Scheduler=s)
+           await s.runInLoop()
+       asyncio.run(run())
+       self.assertEqual(["waiting", "done"], results)
+
+
+if __name__=='__main__':
+   unittest.main()
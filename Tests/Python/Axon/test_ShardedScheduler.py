@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of placement, and running across shards, for ShardedScheduler
+#
+
+import unittest
+import time
+import multiprocessing
+
+from Axon.Component import component
+from Axon.Ipc import producerFinished, Sleep
+from Axon.experimental.ShardedScheduler import ShardedScheduler
+
+class Producer(component):
+    def __init__(self, count):
+        super(Producer,self).__init__()
+        self.count = count
+    def main(self):
+        for i in range(self.count):
+            self.send(i, "outbox")
+            yield 1
+        self.send(producerFinished(self), "signal")
+
+class Doubler(component):
+    def main(self):
+        while 1:
+            for x in self.recvAll("inbox"):
+                self.send(x*2, "outbox")
+            if self.dataReady("control"):
+                self.send(self.recv("control"), "signal")
+                return
+            if not self.anyReady():
+                self.pause()
+            yield 1
+
+class Collector(component):
+    def __init__(self, results):
+        super(Collector,self).__init__()
+        self.results = results
+    def main(self):
+        received = []
+        while not self.dataReady("control"):
+            received.extend(self.recvAll("inbox"))
+            if not self.anyReady():
+                self.pause()
+            yield 1
+        received.extend(self.recvAll("inbox"))
+        self.results.put(received)
+
+class Crasher(component):
+    def main(self):
+        yield 1
+        raise ValueError("crash")
+
+class Idler(component):
+    def __init__(self, delay):
+        super(Idler,self).__init__()
+        self.delay = delay
+    def main(self):
+        yield Sleep(self.delay)
+
+class ShardedScheduler_Test(unittest.TestCase):
+    def test_placeOnLeastLoadedShard(self):
+        "place() - with no shard specified, puts the component on the shard with the lowest total weight."
+        S = ShardedScheduler(shards=3)
+        a, b, c, d = component(), component(), component(), component()
+        self.assertEqual(0, S.place(a, weight=5))
+        self.assertEqual(1, S.place(b))
+        self.assertEqual(2, S.place(c))
+        self.assertEqual(1, S.place(d))
+        self.assertEqual(1, S.shardOf(d))
+        self.assertEqual(None, S.shardOf(component()))
+
+    def test_placeTwiceOrBadShardFails(self):
+        "place() - raises ValueError if the component is already placed, or the shard doesn't exist."
+        S = ShardedScheduler(shards=2)
+        a = component()
+        S.place(a, shard=1)
+        self.assertRaises(ValueError, S.place, a)
+        self.assertRaises(ValueError, S.place, component(), shard=2)
+
+    def test_crossShardLinksFound(self):
+        "run() - only linkages between components on different shards are carried between shards. Unplaced components are on their linker's shard."
+        S = ShardedScheduler(shards=2)
+        a, b, c, child = component(), component(), component(), component()
+        a.link((a,"outbox"), (b,"inbox"))
+        L = S.link((b,"outbox"), (c,"inbox"))
+        c.link((c,"outbox"), (child,"inbox"))
+        S.place(a, shard=0)
+        S.place(b, shard=0)
+        S.place(c, shard=1)
+        crossing = S._crossShardLinks()
+        self.assertEqual([ (L, 0, 1) ], [ (X[1], X[2], X[3]) for X in crossing ])
+
+    def test_unplacedInSchedulerLinkFails(self):
+        "run() - raises ValueError if a linkage made with link() involves a component that hasn't been placed."
+        S = ShardedScheduler(shards=2)
+        a, b = component(), component()
+        S.link((a,"outbox"), (b,"inbox"))
+        S.place(a)
+        self.assertRaises(ValueError, S.run)
+
+    def test_messagesCrossShards(self):
+        "run() - messages are delivered, in order, across shards, and each shard reports final statistics."
+        results = multiprocessing.Queue()
+        p, d, c = Producer(100), Doubler(), Collector(results)
+        p.link((p,"outbox"), (d,"inbox"))
+        p.link((p,"signal"), (d,"control"))
+        d.link((d,"outbox"), (c,"inbox"))
+        d.link((d,"signal"), (c,"control"))
+        S = ShardedScheduler(shards=2)
+        S.place(p, shard=0)
+        S.place(d, shard=1)
+        S.place(c, shard=0)
+        stats = S.run()
+        self.assertEqual([ x*2 for x in range(100) ], results.get(timeout=10))
+        self.assertEqual([0,1], [ s["shard"] for s in stats ])
+        self.assertEqual([True,True], [ s["finished"] for s in stats ])
+        self.assertEqual([2,1], [ s["components"] for s in stats ])
+        self.assertEqual(101, stats[0]["sent"])
+        self.assertEqual(101, stats[1]["received"])
+
+    def test_failedShardRaises(self):
+        "run() - raises RuntimeError if a shard's worker process fails, rather than waiting forever."
+        S = ShardedScheduler(shards=2)
+        S.place(Crasher(), shard=0)
+        S.place(Idler(30), shard=1)
+        start = time.time()
+        self.assertRaises(RuntimeError, S.run)
+        self.assert_(time.time() - start < 10)
+
+    def test_periodicReports(self):
+        "run() - shards report statistics every 'interval' seconds whilst running, and finish promptly once their components terminate."
+        reports = []
+        class RecordingScheduler(ShardedScheduler):
+            def _collectStats(self, reader, finished):
+                super(RecordingScheduler, self)._collectStats(reader, finished)
+                reports.append(self.stats()[0])
+        S = RecordingScheduler(shards=1, interval=0.05)
+        S.place(Idler(0.3), shard=0)
+        start = time.time()
+        stats = S.run()
+        self.assert_(time.time() - start < 5)
+        self.assertEqual(True, stats[0]["finished"])
+        self.assert_(len([ r for r in reports if r and not r["finished"] ]) >= 2)
+
+    def test_receiverStoppedApartFromQueue(self):
+        "_ShardReceiver.finish() - stops the receiver without anything being put in its queue, which run() empties once the shard has finished."
+        from Axon.Scheduler import scheduler
+        from Axon.experimental.ShardedScheduler import _ShardReceiver
+        inbound = multiprocessing.Queue()
+        sched = scheduler()
+        receiver = _ShardReceiver(inbound, [], {})
+        receiver.activate(Scheduler=sched)
+        receiver.finish()
+        start = time.time()
+        sched.runThreads()
+        self.assert_(time.time() - start < 5)
+        self.assert_(receiver._isStopped())
+        self.assert_(inbound.empty())
+
+def suite():
+   return unittest.makeSuite(ShardedScheduler_Test)
+
+if __name__=='__main__':
+   unittest.main()
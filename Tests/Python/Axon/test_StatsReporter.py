@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of periodically reporting scheduler statistics with StatsReporter
+#
+
+import unittest
+
+from Axon.StatsReporter import StatsReporter
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+from Axon.Ipc import producerFinished
+
+class Collector(component):
+    """Collects the first n messages it receives, then asks for shutdown"""
+    def __init__(self, n):
+        super(Collector, self).__init__()
+        self.n = n
+        self.collected = []
+    def main(self):
+        while len(self.collected) < self.n:
+            self.collected.extend(self.recvAll("inbox"))
+            if len(self.collected) < self.n:
+                self.pause()
+            yield 1
+        self.send(producerFinished(), "signal")
+
+class StatsReporter_Test(unittest.TestCase):
+    def test_reportsStats(self):
+        "main() - switches on recording, then regularly sends a list of the statistics for each microprocess, sorted by name, until told to shut down."
+        s = scheduler()
+        reporter = StatsReporter(interval=0.05)
+        collector = Collector(2)
+        reporter.link((reporter,"outbox"), (collector,"inbox"))
+        collector.link((collector,"signal"), (reporter,"control"))
+        reporter.activate(Scheduler=s)
+        collector.activate(Scheduler=s)
+        try:
+            s.runThreads()
+        finally:
+            s.recordStats(False)
+        first, second = collector.collected
+        self.assertEqual(sorted([reporter.name, collector.name]), [ stat["name"] for stat in second ])
+        stats = dict( (stat["name"], stat) for stat in second )
+        self.assertEqual(1, stats[reporter.name]["sent"])
+        self.assertEqual(1, stats[collector.name]["received"])
+        self.assert_(stats[reporter.name]["wakeups"] >= 1)
+
+def suite():
+   return unittest.makeSuite(StatsReporter_Test)
+
+if __name__=='__main__':
+   unittest.main()
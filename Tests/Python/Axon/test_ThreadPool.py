@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of running tasks on a bounded number of shared threads with ThreadPool
+#
+
+import unittest
+import sys
+import io
+import threading
+import time
+
+from Axon.ThreadPool import ThreadPool, getDefaultPool
+
+class ThreadPool_Test(unittest.TestCase):
+    def test_runsTasks(self):
+        "submit() - each task submitted is run, on a thread other than the caller's."
+        pool = ThreadPool(maxthreads=4)
+        done = []
+        for i in range(10):
+            pool.submit(lambda i=i: done.append( (i, threading.current_thread()) ))
+        deadline = time.time() + 5
+        while len(done) < 10 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(list(range(10)), sorted([ i for (i, t) in done ]))
+        self.assert_(threading.current_thread() not in [ t for (i, t) in done ])
+
+    def test_threadsBounded(self):
+        "submit() - no more than maxthreads threads are started; other tasks wait until one is free."
+        pool = ThreadPool(maxthreads=3)
+        release = threading.Event()
+        started = []
+        for i in range(8):
+            pool.submit(lambda: (started.append(1), release.wait(5)))
+        time.sleep(0.1)
+        self.assertEqual(3, pool.threads())
+        self.assertEqual(3, len(started))
+        self.assertEqual(5, pool.waiting())
+        release.set()
+        deadline = time.time() + 5
+        while pool.waiting() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(0, pool.waiting())
+        self.assertEqual(3, pool.threads())
+
+    def test_idleThreadReused(self):
+        "submit() - a new thread is not started if one is idle."
+        pool = ThreadPool(maxthreads=4)
+        for i in range(5):
+            finished = threading.Event()
+            pool.submit(finished.set)
+            self.assert_(finished.wait(5))
+            time.sleep(0.01)
+        self.assertEqual(1, pool.threads())
+
+    def test_idleThreadsExit(self):
+        "threads() - threads that are idle for idletimeout seconds exit."
+        pool = ThreadPool(maxthreads=2, idletimeout=0.05)
+        release = threading.Event()
+        pool.submit(lambda: release.wait(5))
+        pool.submit(lambda: release.wait(5))
+        release.set()
+        deadline = time.time() + 5
+        while pool.threads() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(0, pool.threads())
+        finished = threading.Event()
+        pool.submit(finished.set)
+        self.assert_(finished.wait(5))
+
+    def test_exceptionDoesNotStopThread(self):
+        "submit() - a task raising an exception doesn't stop the thread running later tasks."
+        pool = ThreadPool(maxthreads=1)
+        finished = threading.Event()
+        def fails():
+            raise ValueError("expected by the test")
+        stderr, sys.stderr = sys.stderr, io.StringIO()
+        try:
+            pool.submit(fails)
+            pool.submit(finished.set)
+            self.assert_(finished.wait(5))
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(1, pool.threads())
+
+    def test_atLeastOneThread(self):
+        "__init__ - raises ValueError if maxthreads is less than 1."
+        self.assertRaises(ValueError, ThreadPool, 0)
+
+    def test_defaultPool(self):
+        "getDefaultPool() - returns the same ThreadPool each time."
+        self.assert_(getDefaultPool() is getDefaultPool())
+
+def suite():
+   return unittest.makeSuite(ThreadPool_Test)
+
+if __name__=='__main__':
+   unittest.main()
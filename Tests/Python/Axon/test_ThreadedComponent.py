@@ -24,9 +24,10 @@
 import unittest
 import sys
 from Axon.ThreadedComponent import threadedcomponent, threadedadaptivecommscomponent
+from Axon.ThreadPool import ThreadPool
 # import thread,Queue,threading
 import threading
-from Axon.util import next
+from Axon.util import next, vrange
 
 try:
     import Queue as queue
@@ -77,7 +78,7 @@ class ThreadedSender(threadedcomponent):
                 return
             else:
                 try:
-                    for i in xrange(qty):
+                    for i in vrange(qty):
                         self.send(i,"outbox")
                         if self.delay!=None:
                             self.pause(self.delay)
@@ -128,6 +129,23 @@ class threadedcomponent_Test(unittest.TestCase):
         """__init__ - accepts one argument"""
         self.assert_(threadedcomponent(10))
         
+    def test_recvAllAndUpTo(self):
+        """recvAll() and recvUpTo() take waiting messages from the thread's inbound queue, in order, as a list."""
+        c = threadedcomponent()
+        for i in range(5):
+            c.inqueues["inbox"].put(i)
+        self.assert_(c.recvUpTo("inbox", 2) == [0,1])
+        self.assert_(c.recvAll("inbox") == [2,3,4])
+        self.assert_(c.recvAll("inbox") == [])
+        
+    def test_sendManyStopsWhenQueueFull(self):
+        """sendMany() queues messages until the outbound queue is full, returning how many were sent, and takes no more from the iterable."""
+        c = threadedcomponent(3)
+        source = iter(range(5))
+        self.assert_(c.sendMany(source, "outbox") == 3)
+        self.assert_(next(source) == 3)
+        self.assert_([c.outqueues["outbox"].get() for _ in range(3)] == [0,1,2])
+        
     def test_localprocessterminates(self):
         """_localmain() microprocess also terminates when the thread terminates"""
         class Test(threadedcomponent):
@@ -502,6 +520,129 @@ class threadedcomponent_Test(unittest.TestCase):
         self.assert_(t._isStopped(), "Thread component should have finished by now")
         
 
+    def test_sendsDirectlyOnceLinked(self):
+        """send() - once _localmain() has passed on a message, later ones are delivered straight to the destination inbox, in order, without _localmain() running."""
+        class Test(threadedcomponent):
+            def __init__(self):
+                super(Test,self).__init__()
+                self.go = queue.Queue()
+                self.done = queue.Queue()
+            def main(self):
+                while 1:
+                    n = self.go.get()
+                    if n is None:
+                        return
+                    for i in range(n):
+                        self.send(i, "outbox")
+                    self.done.put(True)
+
+        sched=scheduler()
+        t=Test()
+        d=DoesNothingComponent()
+        t.link((t,"outbox"),(d,"inbox"))
+        t.activate(Scheduler=sched)
+        try:
+            next(t)                  # starts the thread
+            t.go.put(3)
+            t.done.get()
+            self.assertEqual(0, len(d.inboxes["inbox"]))    # queued
+            next(t)
+            self.assertEqual([0,1,2], d.recvAll("inbox"))
+            t.go.put(3)
+            t.done.get()
+            self.assertEqual([0,1,2], d.recvAll("inbox"))   # without next(t)
+        finally:
+            t.go.put(None)
+
+    def test_sendManyDirectlyThenQueues(self):
+        """sendMany() - delivers straight to the destination inbox until it is full, then queues the rest, which arrive in order as space is made."""
+        class Test(threadedcomponent):
+            def __init__(self):
+                super(Test,self).__init__(queuelengths=10)
+                self.go = queue.Queue()
+                self.done = queue.Queue()
+            def main(self):
+                while 1:
+                    messages = self.go.get()
+                    if messages is None:
+                        return
+                    self.done.put(self.sendMany(messages, "outbox"))
+
+        sched=scheduler()
+        t=Test()
+        d=DoesNothingComponent()
+        d.inboxes["inbox"].setSize(5)
+        t.link((t,"outbox"),(d,"inbox"))
+        t.activate(Scheduler=sched)
+        try:
+            next(t)
+            t.go.put(["a"])
+            t.done.get()
+            next(t)
+            self.assertEqual(["a"], d.recvAll("inbox"))
+            t.go.put(range(20))
+            self.assertEqual(15, t.done.get())    # 5 in the inbox, 10 queued
+            self.assertEqual([0,1,2,3,4], d.recvAll("inbox"))
+            received = []
+            for _ in range(10):
+                next(t)
+                received.extend(d.recvAll("inbox"))
+            self.assertEqual(list(range(5,15)), received)
+        finally:
+            t.go.put(None)
+
+    def test_messageCounting(self):
+        """Messages sent and received by main() are counted (once each) whilst message counting is switched on."""
+        t = threadedcomponent()
+        try:
+            component.setMessageCounting(True)
+            t.send("a", "outbox")
+            t.sendMany(["b","c"], "outbox")
+            for msg in (1,2,3):
+                t.inqueues["inbox"].put(msg)
+            self.assertEqual(1, t.recv("inbox"))
+            self.assertEqual([2,3], t.recvAll("inbox"))
+        finally:
+            component.setMessageCounting(False)
+        self.assertEqual((3,3), (t.messagesSent, t.messagesReceived))
+        self.assert_(threadedcomponent.__dict__["recv"] is threadedcomponent.__dict__["_nocounting_recv"])
+
+    def test_pooledMainRunsOnPoolThreads(self):
+        """main() - with a threadpool, is run on one of the pool's threads, which are shared, and the component terminates as usual."""
+        pool = ThreadPool(maxthreads=2)
+        lock = threading.Lock()
+        running = [0, 0]    # now, most at once
+        class Test(threadedcomponent):
+            def __init__(self, n):
+                super(Test,self).__init__(threadpool=pool)
+                self.n = n
+            def main(self):
+                with lock:
+                    running[0] += 1
+                    running[1] = max(running)
+                time.sleep(0.02)
+                self.send( (self.n, thread.get_ident()), "outbox")
+                with lock:
+                    running[0] -= 1
+
+        sched=scheduler()
+        components = [ Test(n) for n in range(6) ]
+        collector = DoesNothingComponent()
+        for c in components:
+            c.link( (c,"outbox"), (collector,"inbox") )
+            c.activate(Scheduler=sched)
+        start = time.time()
+        for _ in sched.main():
+            self.assert_(time.time() - start < 5, "Pooled components should have terminated by now")
+            if not [ c for c in components if not c._isStopped() ]:
+                break
+            time.sleep(0.001)
+        results = collector.recvAll("inbox")
+        self.assertEqual(list(range(6)), sorted([ n for (n, ident) in results ]))
+        self.assert_(len(set([ ident for (n, ident) in results ])) <= 2)
+        self.assert_(running[1] <= 2, "No more main() methods running at once than the pool has threads")
+        self.assert_(pool.threads() <= 2)
+
 class threadedadaptivecommscomponent_Test(unittest.TestCase):
     
     def test_smoketest_init(self):
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of adding, expiring and cancelling items in TimerWheel
+#
+
+import unittest
+import random
+
+from Axon.TimerWheel import TimerWheel
+
+class TimerWheel_Test(unittest.TestCase):
+    def test_nothingExpiresEarly(self):
+        "expire() - returns nothing before an item's deadline, then returns it once."
+        W = TimerWheel(now=0.0)
+        W.add(0.5, "x")
+        self.assertEqual([], W.expire(0.499))
+        self.assertEqual(["x"], W.expire(0.501))
+        self.assertEqual([], W.expire(1.0))
+        self.assertEqual(0, len(W))
+
+    def test_expiresInDeadlineOrder(self):
+        "expire() - returns items in order of deadline, whatever order they were added in."
+        W = TimerWheel(now=0.0)
+        for when in [0.3, 0.1, 70.0, 0.2, 2.0]:
+            W.add(when, when)
+        self.assertEqual([0.1, 0.2, 0.3, 2.0, 70.0], W.expire(100.0))
+
+    def test_pastDeadlineExpiresNextTick(self):
+        "add() - an item whose deadline has already passed is returned by the next expire()."
+        W = TimerWheel(now=10.0)
+        W.add(5.0, "late")
+        self.assertEqual(["late"], W.expire(10.002))
+
+    def test_cancelledNotReturned(self):
+        "cancel() - a cancelled item is not returned by expire()."
+        W = TimerWheel(now=0.0)
+        handle = W.add(0.1, "cancelled")
+        W.add(0.1, "kept")
+        handle.cancel()
+        self.assertEqual(["kept"], W.expire(0.2))
+
+    def test_nextDeadline(self):
+        "nextDeadline() - is None with nothing added, otherwise no later than a tick after the earliest deadline."
+        W = TimerWheel(now=0.0)
+        self.assertEqual(None, W.nextDeadline())
+        W.add(1.0, "a")
+        W.add(0.25, "b")
+        deadline = W.nextDeadline()
+        self.assertTrue(deadline <= 0.25 + W.resolution)
+        self.assertEqual(["b"], W.expire(0.25 + W.resolution))
+
+    def test_nextDeadlineReachesFarItems(self):
+        "nextDeadline() - repeatedly expiring at nextDeadline() eventually returns items far beyond the last wheel."
+        W = TimerWheel(resolution=0.001, levels=2, now=0.0)
+        W.add(1000.0, "far")
+        expired = []
+        steps = 0
+        while not expired:
+            expired = W.expire(W.nextDeadline())
+            steps += 1
+        self.assertEqual(["far"], expired)
+        self.assertTrue(steps < 50)
+
+    def test_randomisedAgainstSort(self):
+        "expire() - over many irregular steps, returns exactly the items due, none early and none twice."
+        rng = random.Random(1)
+        W = TimerWheel(resolution=0.01, levels=2, now=0.0)
+        pending = []
+        now = 0.0
+        for step in range(300):
+            for i in range(rng.randint(0,5)):
+                when = now + rng.choice([0.005, 0.5, 3.0, 80.0, 900.0]) * rng.random()
+                W.add(when, (when, step, i))
+                pending.append((when, step, i))
+            now += rng.choice([0.001, 0.05, 2.0, 40.0])
+            expired = W.expire(now)
+            due = [ p for p in pending if p[0] <= now - W.resolution ]
+            for item in expired:
+                self.assertTrue(item[0] <= now + W.resolution)
+                pending.remove(item)
+            for item in due:
+                self.assertTrue(item not in pending)
+
+def suite():
+   return unittest.makeSuite(TimerWheel_Test)
+
+if __name__=='__main__':
+   unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of the topology change events, and the Introspector using them
+#
+
+import unittest
+
+import Axon.Topology as Topology
+from Axon.Topology import TopologyStream, ACTIVATED, TERMINATED, LINKED, UNLINKED
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+from Axon.Introspector import Introspector
+from Axon.Ipc import shutdownMicroprocess
+
+class Finisher(component):
+    def main(self):
+        yield 1
+
+class Collector(component):
+    def __init__(self):
+        super(Collector,self).__init__()
+        self.received = []
+    def main(self):
+        while 1:
+            self.received.extend(self.recvAll("inbox"))
+            if self.dataReady("control"):
+                return
+            yield 1
+
+class Topology_Test(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        Topology.changes.subscribe(self.changed)
+
+    def tearDown(self):
+        Topology.changes.unsubscribe(self.changed)
+
+    def changed(self, event, subject):
+        self.events.append( (event, subject) )
+
+    def test_stream(self):
+        "TopologyStream - each subscribed callback is called with every event until it unsubscribes."
+        stream = TopologyStream()
+        self.assertEqual((), stream.subscribers)
+        received = []
+        callback = lambda event, subject : received.append( (event, subject) )
+        stream.subscribe(callback)
+        stream.emit(LINKED, 1)
+        stream.unsubscribe(callback)
+        stream.emit(LINKED, 2)
+        self.assertEqual([ (LINKED, 1) ], received)
+
+    def test_linkUnlink(self):
+        "postoffice - announces each linkage made and removed."
+        a = component()
+        b = component()
+        link = a.link((a,"outbox"), (b,"inbox"))
+        a.unlink(thelinkage=link)
+        a.unlink(thelinkage=link)
+        self.assertEqual([ (LINKED, link), (UNLINKED, link) ], self.events)
+
+    def test_activateTerminate(self):
+        "scheduler - announces each microprocess it activates, and each that terminates after it has unlinked its linkages."
+        sched = scheduler()
+        a = Finisher()
+        b = component()
+        link = a.link((a,"outbox"), (b,"inbox"))
+        del self.events[:]
+        a.activate(Scheduler=sched)
+        for _ in sched.main():
+            pass
+        self.assertEqual([ (ACTIVATED, a), (UNLINKED, link), (TERMINATED, a) ], self.events)
+
+class Introspector_Test(unittest.TestCase):
+    def run_until(self, sched, running, condition):
+        for _ in range(1000):
+            next(running)
+            if condition():
+                return
+        self.fail("condition not met")
+
+    def test_deltas(self):
+        "Introspector - outputs the existing topology, then each change as it happens, and stops watching once shut down."
+        sched = scheduler()
+        collector = Collector()
+        introspector = Introspector()
+        introspector.link((introspector,"outbox"), (collector,"inbox"))
+        collector.activate(Scheduler=sched)
+        introspector.activate(Scheduler=sched)
+        running = sched.main()
+        received = collector.received
+        self.run_until(sched, running, lambda : len(received) >= 2)
+        self.assertEqual("DEL ALL\n", received[0])
+        initial = received[1]
+        self.assert_('ADD NODE "%s" "%s" randompos component\n' % (collector.id, collector.name) in initial)
+        self.assert_('ADD NODE "%s" "inbox" randompos inbox\n' % str((collector.id, "i", "inbox")) in initial)
+        self.assert_('ADD LINK "%s" "%s"\n' % ((introspector.id, "o", "outbox"), (collector.id, "i", "inbox")) in initial)
+
+        slices = len(received)
+        for _ in range(20):
+            next(running)
+        self.assertEqual(slices, len(received))
+
+        a = Finisher()
+        b = component()
+        link = a.link((a,"outbox"), (b,"inbox"))
+        a.activate(Scheduler=sched)
+        self.run_until(sched, running, lambda : 'DEL NODE "%s"\n' % a.id in "".join(received[slices:]))
+        changes = "".join(received[slices:]).splitlines()
+        outbox = str((a.id, "o", "outbox"))
+        inbox = str((b.id, "i", "inbox"))
+        self.assert_(changes.index('ADD NODE "%s" "outbox" randompos outbox' % outbox) < changes.index('ADD LINK "%s" "%s"' % (outbox, inbox)))
+        self.assert_(changes.index('ADD LINK "%s" "%s"' % (outbox, inbox)) < changes.index('DEL LINK "%s" "%s"' % (outbox, inbox)))
+        self.assert_(changes.index('DEL LINK "%s" "%s"' % (outbox, inbox)) < changes.index('DEL NODE "%s"' % a.id))
+        self.assert_('DEL NODE "%s"' % b.id in changes)
+        self.assertEqual(1, changes.count('ADD NODE "%s" "%s" randompos component' % (a.id, a.name)))
+
+        introspector._deliver(shutdownMicroprocess(), "control")
+        self.run_until(sched, running, lambda : introspector._isStopped())
+        self.assertFalse(introspector._topologyChanged in Topology.changes.subscribers)
+
+def suite():
+   return unittest.TestSuite([unittest.makeSuite(Topology_Test), unittest.makeSuite(Introspector_Test)])
+
+if __name__=='__main__':
+   unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+# Aim: Testing of recording and exporting traces of the scheduler and inboxes
+#
+
+import unittest
+import io
+import json
+
+import Axon.Trace as Trace
+from Axon.Trace import TraceRecorder, tracedsink, tracedlockedsink, startTracing, stopTracing, isTracing
+from Axon.Box import realsink, lockedsink
+from Axon.Component import component
+from Axon.Scheduler import scheduler
+
+class Producer(component):
+    def main(self):
+        for i in range(3):
+            self.send(i, "outbox")
+            yield 1
+
+class Consumer(component):
+    def main(self):
+        received = 0
+        while received < 3:
+            received += len(self.recvAll("inbox"))
+            if received < 3:
+                self.pause()
+            yield 1
+
+class Trace_Test(unittest.TestCase):
+    def setUp(self):
+        self.sched = scheduler()
+        self.producer = Producer()
+        self.consumer = Consumer()
+        self.producer.link((self.producer,"outbox"), (self.consumer,"inbox"))
+        self.producer.activate(Scheduler=self.sched)
+        self.consumer.activate(Scheduler=self.sched)
+
+    def tearDown(self):
+        stopTracing(self.sched)
+
+    def test_startAndStop(self):
+        "startTracing() - swaps in the tracing versions of wakeThread/pauseThread and of the storage of inboxes. stopTracing() swaps them back, and returns the recorder."
+        self.assert_(not isTracing())
+        recorder = startTracing(sched=self.sched)
+        self.assert_(isTracing())
+        self.assert_(recorder is startTracing(sched=self.sched))
+        self.assert_(scheduler.tracer is recorder)
+        self.assert_(scheduler.__dict__["wakeThread"] is scheduler.__dict__["_trace_wakeThread"])
+        self.assertEqual(tracedsink, self.consumer.inboxes["inbox"].storage.__class__)
+        self.assertEqual(tracedsink, component().inboxes["inbox"].storage.__class__)
+        self.assert_(self.producer.outboxes["outbox"].sink is self.consumer.inboxes["inbox"].storage)
+        self.assert_(recorder is stopTracing(self.sched))
+        self.assert_(not isTracing())
+        self.assert_(scheduler.__dict__["wakeThread"] is scheduler.__dict__["_notrace_wakeThread"])
+        self.assertEqual(realsink, self.consumer.inboxes["inbox"].storage.__class__)
+        self.assertEqual(realsink, component().inboxes["inbox"].storage.__class__)
+        self.assertEqual(None, stopTracing(self.sched))
+
+    def test_threadSafeInboxesStayTraced(self):
+        "makeThreadSafe() - turns traced storage into tracedlockedsink, which becomes a lockedsink when tracing stops."
+        startTracing(sched=self.sched)
+        self.assert_(self.producer.outboxes["outbox"].makeThreadSafe())
+        self.assertEqual(tracedlockedsink, self.consumer.inboxes["inbox"].storage.__class__)
+        stopTracing(self.sched)
+        self.assertEqual(lockedsink, self.consumer.inboxes["inbox"].storage.__class__)
+
+    def test_chromeTrace(self):
+        "dump() - writes Chrome trace event JSON with a slice for each timeslice, instant events for wakes and pauses, and counters of messages waiting in inboxes."
+        recorder = startTracing(sched=self.sched)
+        self.sched.runThreads()
+        stopTracing(self.sched)
+        out = io.StringIO()
+        recorder.dump(out)
+        events = json.loads(out.getvalue())["traceEvents"]
+        slices = [ e["name"] for e in events if e["ph"] == "X" ]
+        self.assert_(slices.count(self.producer.name) >= 3)
+        self.assert_(self.consumer.name in slices)
+        wakes = [ e for e in events if e["ph"] == "i" and e["cat"] == "wake" and e["name"] == "wake " + self.consumer.name ]
+        self.assert_(wakes)
+        self.assertEqual(self.producer.name, wakes[0]["args"]["by"])
+        self.assert_([ e for e in events if e["ph"] == "i" and e["cat"] == "pause" ])
+        counts = [ e["args"]["queued"] for e in events if e["ph"] == "C" and e["name"] == self.consumer.name + ".inbox" ]
+        self.assert_(1 in counts)
+        self.assertEqual(0, counts[-1])
+        for e in events:
+            if e["ph"] == "X":
+                self.assert_(e["dur"] >= 0)
+        self.assert_([ e for e in events if e["ph"] == "M" and e["name"] == "thread_name" ])
+
+    def test_bounded(self):
+        "TraceRecorder - only keeps the most recent events, up to its capacity."
+        recorder = startTracing(capacity=5, sched=self.sched)
+        self.sched.runThreads()
+        self.assertEqual(5, len(recorder.events))
+        self.assertEqual(5, len([ e for e in recorder.chromeEvents() if e["ph"] != "M" ]))
+
+    def test_boxNameForgottenWithStorage(self):
+        "boxName() - names the inbox using a piece of storage, and forgets it once that storage has gone, so it isn't given to other storage later in the same place."
+        import gc
+        recorder = TraceRecorder()
+        c = component()
+        storage = c.inboxes["inbox"].storage
+        self.assertEqual(c.name + ".inbox", recorder.boxName(storage))
+        self.assertEqual(1, len(recorder.boxnames))
+        del c, storage
+        gc.collect()
+        self.assertEqual({}, recorder.boxnames)
+
+def suite():
+   return unittest.makeSuite(Trace_Test)
+
+if __name__=='__main__':
+   unittest.main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+#
+# test suite for Selector and EpollSelector registrations
+
+import unittest
+import select
+import socket
+
+import Axon.CoordinatingAssistantTracker as cat
+import Kamaelia.Internet.Selector as SELECTORMODULE
+from Kamaelia.Internet.Selector import Selector, READERS, WRITERS
+
+from Axon.Component import component
+
+class Client(component):
+    Inboxes = { "inbox" : "", "control" : "", "ready" : "Selector notifications" }
+
+class Test_SelectorLinks(unittest.TestCase):
+    def setUp(self):
+        self.S = Selector()
+        self.client = Client()
+        self.a, self.b = socket.socketpair()
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+
+    def test_rearmKeepsLinkage(self):
+        "addLinks() - re-arming a fired persistent registration reuses its outbox and linkage."
+        meta, readers = {}, []
+        L = self.S.addLinks((self.client,"ready"), self.a, meta, readers, "readerNotify", True)
+        readers.remove(self.a)   # as when it fires
+        self.assertTrue(L is self.S.addLinks((self.client,"ready"), self.a, meta, readers, "readerNotify", True))
+        self.assertEqual([self.a], readers)
+        self.assertEqual(1, len(meta))
+
+    def test_rearmUpdatesPersistence(self):
+        "addLinks() - re-arming with a different persistent flag changes whether the registration is persistent."
+        meta, readers = {}, []
+        self.S.addLinks((self.client,"ready"), self.a, meta, readers, "readerNotify", True)
+        readers.remove(self.a)
+        self.S.addLinks((self.client,"ready"), self.a, meta, readers, "readerNotify", False)
+        self.assertEqual(False, meta[self.a][3])
+        self.S.addLinks((self.client,"ready"), self.a, meta, readers, "readerNotify", True)
+        self.assertEqual(True, meta[self.a][3])
+        self.assertEqual([self.a], readers)
+
+    def test_removeLinks(self):
+        "removeLinks() - stops watching the selectable, and removes its outbox and record."
+        meta, readers = {}, []
+        self.S.addLinks((self.client,"ready"), self.a, meta, readers, "readerNotify", True)
+        outbox = meta[self.a][1]
+        self.S.removeLinks(self.a, meta, readers)
+        self.assertEqual({}, meta)
+        self.assertEqual([], readers)
+        self.assertFalse(outbox in self.S.outboxes)
+
+if hasattr(select, "epoll"):
+    from Kamaelia.Internet.Selector import EpollSelector
+
+    class Test_EpollSelector(unittest.TestCase):
+        def setUp(self):
+            self.S = EpollSelector()
+            self.readers, self.writers, self.exceptionals = self.S.makeSelections()
+            self.a, self.b = socket.socketpair()
+
+        def tearDown(self):
+            self.a.close()
+            self.b.close()
+            self.S.poller.close()
+            self.S.waker.close()
+            self.S.wakee.close()
+
+        def test_isDefault(self):
+            "getSelectorServices() - creates an EpollSelector where epoll is available."
+            self.assertTrue(SELECTORMODULE.DefaultSelector is EpollSelector)
+            service, shutdownservice, selector = Selector.getSelectorServices(cat.coordinatingassistanttracker())
+            self.assertTrue(isinstance(selector, EpollSelector))
+
+        def test_readyOnlyWhenWatched(self):
+            "waitReady() - reports a descriptor as ready only for the events it is being watched for."
+            self.b.send(b"x")
+            self.readers.append(self.a)
+            ready = self.S.waitReady(self.readers, self.writers, self.exceptionals)
+            self.assertEqual([self.a], ready[READERS])
+            self.assertEqual([], ready[WRITERS])
+
+        def test_removalUnregisters(self):
+            "remove() - removing the last selection watching a descriptor unregisters it; other selections are unaffected."
+            self.readers.append(self.a)
+            self.writers.append(self.a)
+            self.readers.remove(self.a)
+            self.assertEqual(select.EPOLLOUT, self.readers.masks[self.a.fileno()])
+            ready = self.S.waitReady(self.readers, self.writers, self.exceptionals)
+            self.assertEqual([self.a], ready[WRITERS])
+            self.writers.remove(self.a)
+            self.assertFalse(self.a.fileno() in self.readers.masks)
+            self.assertRaises(ValueError, self.writers.remove, self.a)
+            self.assertEqual(0, len(self.writers))
+
+        def test_fileNumberReuse(self):
+            "append() - a new descriptor reusing the file number of a closed one that wasn't removed replaces it."
+            self.readers.append(self.a)
+            fileno = self.a.fileno()
+            self.a.close()
+            self.a, c = socket.socketpair()
+            try:
+                if self.a.fileno() != fileno:
+                    self.a, c = c, self.a
+                if self.a.fileno() != fileno:
+                    self.skipTest("file number not reused")
+                c.send(b"x")
+                self.readers.append(self.a)
+                self.assertEqual(1, len(self.readers))
+                ready = self.S.waitReady(self.readers, self.writers, self.exceptionals)
+                self.assertEqual([self.a], ready[READERS])
+            finally:
+                c.close()
+
+if SELECTORMODULE.AsyncioSelector is not None:
+    import asyncio
+    from Axon.Scheduler import scheduler
+    from Axon.Ipc import newComponent
+    from Kamaelia.IPC import newReader, removeReader
+    from Kamaelia.Internet.Selector import AsyncioSelector
+
+    class Test_AsyncioSelector(unittest.TestCase):
+        def setUp(self):
+            self.a, self.b = socket.socketpair()
+            self.timeout = SELECTORMODULE.timeout
+            SELECTORMODULE.timeout = 0.1
+
+        def tearDown(self):
+            SELECTORMODULE.timeout = self.timeout
+            self.a.close()
+            self.b.close()
+
+        def test_servedByLoop(self):
+            "getSelectorServices() - creates an AsyncioSelector when running in an event loop, which notifies readiness (also for re-armed persistent registrations), then finishes once nothing is watched."
+            a, b = self.a, self.b
+            results = []
+            class Reader(Client):
+                Outboxes = { "outbox" : "", "signal" : "", "selector" : "Requests to the selector" }
+                def main(self):
+                    (service, shutdownservice, selector) = Selector.getSelectorServices(cat.coordinatingassistanttracker())
+                    results.append(type(selector))
+                    yield newComponent(selector)
+                    self.link((self, "selector"), service)
+                    for data in (b"x", b"y"):
+                        self.send(newReader(self, ((self, "ready"), a), persistent=True), "selector")
+                        b.send(data)
+                        while not self.dataReady("ready"):
+                            self.pause()
+                            yield 1
+                        results.append(self.recv("ready").recv(10))
+                    self.send(removeReader(self, a), "selector")
+                    yield 1
+
+            async def run():
+                s = scheduler()
+                Reader().activate(Scheduler=s)
+                saved, scheduler.run = scheduler.run, s
+                try:
+                    await asyncio.wait_for(s.runInLoop(), 5)
+                finally:
+                    scheduler.run = saved
+            asyncio.run(run())
+            self.assertEqual([AsyncioSelector, b"x", b"y"], results)
+
+def suite():
+    tests = [ unittest.makeSuite(Test_SelectorLinks) ]
+    if hasattr(select, "epoll"):
+        tests.append(unittest.makeSuite(Test_EpollSelector))
+    if SELECTORMODULE.AsyncioSelector is not None:
+        tests.append(unittest.makeSuite(Test_AsyncioSelector))
+    return unittest.TestSuite(tests)
+
+if __name__=='__main__':
+    unittest.main()
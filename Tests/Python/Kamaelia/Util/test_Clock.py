@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 British Broadcasting Corporation and Kamaelia Contributors(1)
+#
+# (1) Kamaelia Contributors are listed in the AUTHORS file and at
+#     http://www.kamaelia.org/AUTHORS - please extend this file,
+#     not this notice.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -------------------------------------------------------------------------
+#
+#
+# test suite for CheapAndCheerfulClock
+
+import unittest
+import time
+
+from Axon.Component import component
+from Axon.Ipc import WaitUntil, producerFinished
+from Kamaelia.Util.Clock import CheapAndCheerfulClock
+
+class Test_CheapAndCheerfulClock(unittest.TestCase):
+    def setUp(self):
+        self.clock = CheapAndCheerfulClock(0.05)
+        self.sink = component()
+        self.clock.link((self.clock,"outbox"), (self.sink,"inbox"))
+        self.clock.link((self.clock,"signal"), (self.sink,"control"))
+        self.gen = self.clock.main()
+
+    def test_waitsForInterval(self):
+        "main() - sends True straight away, then waits until interval seconds later for the next."
+        before = time.time()
+        wait = next(self.gen)
+        self.assertTrue(isinstance(wait, WaitUntil))
+        self.assertTrue(before + 0.05 <= wait.when <= time.time() + 0.05)
+        self.assertEqual([True], self.sink.recvAll("inbox"))
+        next(self.gen)   # woken early - nothing is due yet
+        self.assertEqual([], self.sink.recvAll("inbox"))
+
+    def test_noBurstAfterStall(self):
+        "main() - if it is late sending a message, the next is still a whole interval later, so there is no burst of messages to catch up."
+        next(self.gen)
+        time.sleep(0.3)
+        wait = next(self.gen)
+        next(self.gen)
+        self.assertEqual([True, True], self.sink.recvAll("inbox"))
+        self.assertTrue(wait.when > time.time())
+
+    def test_ignoresControl(self):
+        "main() - as before, ignores its control inbox and never terminates."
+        next(self.gen)
+        self.clock._deliver(producerFinished(), "control")
+        time.sleep(0.06)
+        next(self.gen)
+        self.assertEqual([True, True], self.sink.recvAll("inbox"))
+        self.assertFalse(self.sink.dataReady("control"))
+
+def suite():
+   return unittest.makeSuite(Test_CheapAndCheerfulClock)
+
+if __name__=='__main__':
+   unittest.main()